@@ -0,0 +1,87 @@
+"""
+Activity of the criteria: their comment and prompt session counts, and the
+date of their last comment or prompt message.
+
+They are denormalized on `ProjectAuditCriterion`, to be displayed on the audit
+grid without a query per criterion: saving a comment or a prompt updates them
+in its transaction, and deleting one (even in bulk) decrements them here.
+`repair_activity` recomputes them from the comments and prompts.
+"""
+
+from audits.models.audit import Comment, ProjectAuditCriterion, Prompt
+from django.db.models import Count, DateTimeField, IntegerField, Max, OuterRef
+from django.db.models import QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+
+@receiver(post_delete, sender=Comment)
+def on_comment_delete(sender, instance: Comment, **kwargs):
+    ProjectAuditCriterion.record_activity(
+        instance.project_audit_criterion_id, comments=-1
+    )
+
+
+@receiver(post_delete, sender=Prompt)
+def on_prompt_delete(sender, instance: Prompt, **kwargs):
+    ProjectAuditCriterion.record_activity(
+        instance.project_audit_criterion_id, prompt_sessions=-1
+    )
+
+
+def _aggregate(model, function, output_field):
+    return Subquery(
+        model.objects.filter(project_audit_criterion=OuterRef("id"))
+        .order_by()
+        .values("project_audit_criterion")
+        .annotate(value=function)
+        .values("value"),
+        output_field=output_field,
+    )
+
+
+def repair_activity(queryset: QuerySet[ProjectAuditCriterion] | None = None) -> int:
+    """
+    Recompute the activity of the criteria of `queryset` (all by default), and
+    return the number of criteria which were out of sync.
+    """
+    if queryset is None:
+        queryset = ProjectAuditCriterion.objects.all()
+    last_comment = _aggregate(Comment, Max("updated_at"), DateTimeField())
+    last_prompt = _aggregate(Prompt, Max("updated_at"), DateTimeField())
+    expected = queryset.annotate(
+        expected_comments=Coalesce(
+            _aggregate(Comment, Count("id"), IntegerField()), Value(0)
+        ),
+        expected_prompts=Coalesce(
+            _aggregate(Prompt, Count("id"), IntegerField()), Value(0)
+        ),
+        # Greatest is NULL if one of its arguments is NULL on some databases
+        expected_last_activity=Greatest(
+            Coalesce(last_comment, last_prompt), Coalesce(last_prompt, last_comment)
+        ),
+    )
+    repaired = []
+    for criterion in expected.only(
+        "id", "comment_count", "prompt_session_count", "last_activity_at"
+    ).iterator():
+        if (
+            criterion.comment_count,
+            criterion.prompt_session_count,
+            criterion.last_activity_at,
+        ) != (
+            criterion.expected_comments,
+            criterion.expected_prompts,
+            criterion.expected_last_activity,
+        ):
+            criterion.comment_count = criterion.expected_comments
+            criterion.prompt_session_count = criterion.expected_prompts
+            criterion.last_activity_at = criterion.expected_last_activity
+            repaired.append(criterion)
+    ProjectAuditCriterion.objects.bulk_update(
+        repaired,
+        ["comment_count", "prompt_session_count", "last_activity_at"],
+        batch_size=500,
+    )
+    return len(repaired)
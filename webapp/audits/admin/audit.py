@@ -1,4 +1,6 @@
-from audits.models.audit import AuditLibrary, Criterion, Tag
+from audits.ai.prompt_templates import compile_template
+from audits.models.audit import AuditLibrary, Criterion, PromptTemplate, Tag
+from django import forms
 from django.contrib import admin
 from django.utils.text import slugify
 from import_export import fields, resources
@@ -40,8 +42,31 @@ class CriterionResource(resources.ModelResource):
         ]
 
 
+class PromptTemplateForm(forms.ModelForm):
+    class Meta:
+        model = PromptTemplate
+        fields = ["name", "content"]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        name, content = cleaned_data.get("name"), cleaned_data.get("content")
+        if name and content:
+            try:
+                compile_template(name, content)
+            except ValueError as err:
+                self.add_error("content", str(err))
+        return cleaned_data
+
+
+class PromptTemplateInline(admin.StackedInline):
+    model = PromptTemplate
+    form = PromptTemplateForm
+    extra = 0
+
+
 @admin.register(AuditLibrary)
 class AuditLibraryAdmin(admin.ModelAdmin):
+    inlines = [PromptTemplateInline]
     list_display = ("name", "slug", "organization")
     search_fields = ("name", "slug", "organization__name")
     list_filter = ("organization",)
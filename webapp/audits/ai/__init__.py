@@ -0,0 +1 @@
+"""AI assistance for criterion assessment (prompt building, agent runs)."""
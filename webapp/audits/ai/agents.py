@@ -0,0 +1,197 @@
+"""
+Process-level agents sharing a pooled HTTP client.
+
+Creating an `Agent` (and its provider) per request also creates a new HTTP
+client, so every call pays for the connection and TLS setup. Agents are instead
+created once per process, keyed by model, prompt template and output type: the
+system prompt is given to each run. Anthropic models share a single HTTP client
+whose connections are kept alive, over HTTP/2 when `h2` is installed.
+
+Connections belong to the event loop which opened them (each thread running
+`Agent.run_sync` has its own), so the client dispatches requests to a connection
+pool per event loop. Every pool and agent is dropped in forked child processes,
+which must not share the sockets of their parent.
+"""
+
+import asyncio
+import importlib.util
+import os
+import threading
+import weakref
+
+import httpx
+from django.conf import settings
+from audits.ai.stand_in import StandInOptions, is_stand_in, stand_in_model
+from pydantic_ai import Agent
+from pydantic_ai.models import Model, infer_model
+from pydantic_ai.models.anthropic import AnthropicModel, AnthropicModelSettings
+from pydantic_ai.providers.anthropic import AnthropicProvider
+
+ANTHROPIC_PREFIX = "anthropic:"
+
+
+class LoopPooledTransport(httpx.AsyncBaseTransport):
+    """HTTP transport keeping a connection pool per event loop."""
+
+    def __init__(self, **transport_kwargs):
+        self.transport_kwargs = transport_kwargs
+        self._transports: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport
+        ] = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _get_transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = httpx.AsyncHTTPTransport(**self.transport_kwargs)
+                self._transports[loop] = transport
+        return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._get_transport().handle_async_request(request)
+
+    async def release(self) -> None:
+        """Close the connections of the running event loop, before it is closed."""
+        with self._lock:
+            transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+    async def aclose(self) -> None:
+        await self.release()
+
+
+class AgentFactory:
+    """
+    Agents and HTTP client shared by every request of the process.
+
+    Args:
+        api_key: The Anthropic API key, `ANTHROPIC_API_KEY` by default.
+        base_url: The Anthropic API URL, `ANTHROPIC_BASE_URL` by default.
+    """
+
+    def __init__(self, api_key: str | None = None, base_url: str | None = None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self._lock = threading.Lock()
+        self._http_client: httpx.AsyncClient | None = None
+        self._transport: LoopPooledTransport | None = None
+        self._models: dict[str, Model] = {}
+        self._agents: dict[tuple, tuple[Model, Agent]] = {}
+
+    def get_http_client(self) -> httpx.AsyncClient:
+        with self._lock:
+            if self._http_client is None:
+                self._transport = LoopPooledTransport(
+                    http2=(
+                        settings.AI_HTTP2 and importlib.util.find_spec("h2") is not None
+                    ),
+                    limits=httpx.Limits(
+                        max_connections=settings.AI_HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.AI_HTTP_MAX_CONNECTIONS,
+                        keepalive_expiry=settings.AI_HTTP_KEEPALIVE_EXPIRY,
+                    ),
+                )
+                self._http_client = httpx.AsyncClient(
+                    transport=self._transport,
+                    timeout=httpx.Timeout(timeout=600, connect=5),
+                )
+            return self._http_client
+
+    def get_model(self, model: Model | str | None = None) -> Model:
+        """Return the model instance for `model` (the configured one by default)."""
+        if model is None:
+            model = settings.ANTHROPIC_MODEL
+        if isinstance(model, Model):
+            return model
+        with self._lock:
+            cached = self._models.get(model)
+        if cached is not None:
+            return cached
+
+        if is_stand_in(model):
+            instance = stand_in_model(StandInOptions.parse(model))
+        elif model.startswith(ANTHROPIC_PREFIX):
+            provider = AnthropicProvider(
+                api_key=self.api_key or settings.ANTHROPIC_API_KEY or None,
+                base_url=self.base_url or settings.ANTHROPIC_BASE_URL or None,
+                http_client=self.get_http_client(),
+            )
+            instance = AnthropicModel(
+                model.removeprefix(ANTHROPIC_PREFIX), provider=provider
+            )
+        else:
+            instance = infer_model(model)
+        with self._lock:
+            return self._models.setdefault(model, instance)
+
+    def get_agent(
+        self,
+        template_name: str,
+        output_type=str,
+        model: Model | str | None = None,
+    ) -> Agent:
+        """
+        Return the agent of a prompt template.
+
+        The system prompt built from the template must be given to each run, as
+        `instructions`.
+        """
+        model = self.get_model(model)
+        # Models are not hashable: the model is kept with its agent so its id is
+        # not reused while the agent is cached.
+        key = (id(model), template_name, output_type)
+        with self._lock:
+            cached = self._agents.get(key)
+            if cached is None or cached[0] is not model:
+                agent = Agent(model, output_type=output_type, name=template_name)
+                cached = self._agents[key] = (model, agent)
+        return cached[1]
+
+    async def release_connections(self) -> None:
+        """Close the connections opened by the running event loop."""
+        if self._transport is not None:
+            await self._transport.release()
+
+    def reset(self) -> None:
+        """Forget the client, models and agents, without closing connections."""
+        self._lock = threading.Lock()
+        self._http_client = None
+        self._transport = None
+        self._models.clear()
+        self._agents.clear()
+
+
+def get_prompt_cache_settings() -> AnthropicModelSettings:
+    """
+    Model settings caching the prompt prefix on the provider side.
+
+    The system prompt of a criterion is the same for every turn of every session,
+    and a conversation only grows: both the instructions and the messages up to
+    the last user message are marked as cache breakpoints, so each turn reads
+    the previous one from the cache. Models other than Anthropic ignore them.
+    """
+    ttl = settings.AI_PROMPT_CACHE_TTL
+    if not ttl:
+        return AnthropicModelSettings()
+    return AnthropicModelSettings(
+        anthropic_cache_instructions=ttl, anthropic_cache_messages=ttl
+    )
+
+
+def is_ai_configured(model: Model | str | None = None) -> bool:
+    """Whether agents can be called: offline models don't need an API key."""
+    if model is None:
+        model = settings.ANTHROPIC_MODEL
+    if isinstance(model, str) and model.startswith(ANTHROPIC_PREFIX):
+        return bool(settings.ANTHROPIC_API_KEY)
+    return True
+
+
+agent_factory = AgentFactory()
+get_agent = agent_factory.get_agent
+
+# A forked worker must open its own connections
+os.register_at_fork(after_in_child=agent_factory.reset)
@@ -0,0 +1,511 @@
+"""
+Batch AI pre-assessment of every criterion of a project audit.
+
+Agent calls run concurrently in an asyncio event loop hosted by a worker thread,
+bounded by a semaphore. Results are sent back through a queue to the calling
+thread, which is the only one to use the Django ORM: each result is saved as a
+`Prompt` session as soon as it is available, so an interrupted run can be resumed
+without calling the agent again for the criteria already assessed. The event
+loop sends its own database calls (the rate limit of the organization, and the
+circuit breaker accounting) through the same queue, and awaits their result.
+
+Criteria can also be assessed in groups (by tag, or in chunks of a fixed size):
+a single agent call then returns a structured verdict for every criterion of the
+group, which is split back into one `Prompt` session per criterion.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Literal
+
+from audits.ai.agents import agent_factory, get_agent, is_ai_configured
+from audits.ai.circuit import CircuitBreaker, breaker
+from audits.ai.prompt import (
+    DEFAULT_USER_MESSAGE,
+    build_group_system_prompt,
+    build_system_prompt,
+    format_error_message,
+)
+from audits.ai.prompt_templates import TemplateName
+from audits.ai.ratelimit import acquire_organization
+from audits.ai.retry import RetryPolicy
+from audits.ai.telemetry import TurnMetrics, get_model_name, record_turn
+from audits.models.audit import (
+    AssessmentRun,
+    ProjectAudit,
+    ProjectAuditCriterion,
+    Prompt,
+)
+from audits.utils import natural_sort_key
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.translation import gettext
+from pydantic import BaseModel, Field
+from pydantic_ai.models import Model
+
+logger = logging.getLogger(__name__)
+
+Status = AssessmentRun.AssessmentRunStatus
+Grouping = AssessmentRun.AssessmentRunGrouping
+CriterionStatus = ProjectAuditCriterion.ProjectAuditCriterionStatus
+
+
+class CriterionVerdict(BaseModel):
+    """Verdict of the agent on one criterion of a group."""
+
+    public_id: str = Field(description="Public id of the criterion")
+    status: Literal[
+        "COMPLIANT", "PARTIALLY_COMPLIANT", "NOT_COMPLIANT", "NOT_APPLICABLE"
+    ]
+    rationale: str = Field(description="Markdown explanation of the verdict")
+
+
+class GroupAssessment(BaseModel):
+    """Structured output of the agent when assessing a group of criteria."""
+
+    verdicts: list[CriterionVerdict]
+
+
+@dataclass
+class AssessmentJob:
+    """
+    Criteria assessed by a single agent call, with everything needed to call it.
+
+    A job without `grouped` holds exactly one criterion and expects a free text
+    answer, a grouped job expects a `GroupAssessment`.
+    """
+
+    criterion_ids: dict[str, int]
+    system_prompt: str
+    grouped: bool = False
+
+    @property
+    def label(self) -> str:
+        return ", ".join(self.criterion_ids)
+
+
+@dataclass
+class AssessmentOutcome:
+    """Result of an assessment job."""
+
+    job: AssessmentJob
+    output: str | GroupAssessment | None = None
+    error: BaseException | None = None
+    attempts: int = 0
+    metrics: TurnMetrics | None = None
+
+
+@dataclass
+class DatabaseCall:
+    """Call sent by the event loop to the calling thread, to use the ORM."""
+
+    func: Callable
+    args: tuple
+    loop: asyncio.AbstractEventLoop
+    future: asyncio.Future
+
+    def run(self) -> None:
+        """Run the call in the calling thread, and resolve the awaited future."""
+        try:
+            result = self.func(*self.args)
+        except Exception as err:
+            self.loop.call_soon_threadsafe(_resolve, self.future, None, err)
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future, result, None)
+
+
+def _resolve(future: asyncio.Future, result: Any, error: Exception | None) -> None:
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+@dataclass
+class CriterionResult:
+    """Result of the assessment of one criterion, as saved in its prompt."""
+
+    criterion_id: int
+    content: str
+    error: bool = False
+    verdict: str | None = None
+
+
+def group_criteria(
+    criteria: list[ProjectAuditCriterion], grouping: str, group_size: int
+) -> list[list[ProjectAuditCriterion]]:
+    """
+    Split criteria in groups of at most `group_size` criteria.
+
+    With the tag grouping, a criterion belongs to the group of its first tag (by
+    name), and criteria without tag are grouped together. The criteria must have
+    their `criterion` and its `tags` loaded.
+    """
+    if grouping == Grouping.NONE:
+        return [[criterion] for criterion in criteria]
+
+    buckets: dict[str, list[ProjectAuditCriterion]] = {}
+    for criterion in criteria:
+        key = ""
+        if grouping == Grouping.TAG:
+            tags = sorted(tag.name for tag in criterion.criterion.tags.all())
+            key = tags[0] if tags else ""
+        buckets.setdefault(key, []).append(criterion)
+
+    # Untagged criteria come last
+    keys = sorted(buckets, key=lambda key: (key == "", natural_sort_key(key)))
+    return [
+        buckets[key][start : start + group_size]
+        for key in keys
+        for start in range(0, len(buckets[key]), group_size)
+    ]
+
+
+def split_outcome(outcome: AssessmentOutcome) -> list[CriterionResult]:
+    """Split the outcome of a job into the result of each of its criteria."""
+    job = outcome.job
+    if outcome.error is not None:
+        content = format_error_message(outcome.error)
+        return [
+            CriterionResult(criterion_id, content, error=True)
+            for criterion_id in job.criterion_ids.values()
+        ]
+    if not job.grouped:
+        [criterion_id] = job.criterion_ids.values()
+        return [CriterionResult(criterion_id, outcome.output)]
+
+    verdicts = {verdict.public_id: verdict for verdict in outcome.output.verdicts}
+    results = []
+    for public_id, criterion_id in job.criterion_ids.items():
+        verdict = verdicts.get(public_id)
+        if verdict is None:
+            results.append(
+                CriterionResult(
+                    criterion_id,
+                    format_error_message(gettext("No verdict was returned")),
+                    error=True,
+                )
+            )
+            continue
+        label = CriterionStatus(verdict.status).label
+        results.append(
+            CriterionResult(
+                criterion_id,
+                f"**{label}**\n\n{verdict.rationale}",
+                verdict=verdict.status,
+            )
+        )
+    return results
+
+
+class AssessmentRunner:
+    """Run (or resume) an `AssessmentRun`."""
+
+    def __init__(
+        self,
+        run: AssessmentRun,
+        *,
+        model: Model | str | None = None,
+        concurrency: int | None = None,
+        timeout: float | None = None,
+        max_retries: int | None = None,
+        backoff_base: float | None = None,
+        backoff_max: float | None = None,
+        breaker: CircuitBreaker | None = breaker,
+    ):
+        self.run = run
+        self.model = model
+        self.breaker = breaker
+        self.concurrency = concurrency or settings.AI_ASSESSMENT_CONCURRENCY
+        self.timeout = timeout or settings.AI_ASSESSMENT_TIMEOUT
+        self.max_retries = (
+            settings.AI_ASSESSMENT_MAX_RETRIES if max_retries is None else max_retries
+        )
+        self.backoff_base = (
+            settings.AI_ASSESSMENT_BACKOFF_BASE
+            if backoff_base is None
+            else backoff_base
+        )
+        self.backoff_max = (
+            settings.AI_ASSESSMENT_BACKOFF_MAX if backoff_max is None else backoff_max
+        )
+
+    def _get_model(self) -> Model | str:
+        if self.model is not None:
+            return self.model
+        if not is_ai_configured():
+            raise ValueError("ANTHROPIC_API_KEY is not configured.")
+        return settings.ANTHROPIC_MODEL
+
+    def _get_assessed_criterion_ids(self) -> set[int]:
+        """Criteria already successfully assessed by this run."""
+        assessed = set()
+        for prompt in self.run.prompts.all():
+            messages = prompt.prompt.get("messages", [])
+            if messages and messages[-1]["role"] == "assistant":
+                assessed.add(prompt.project_audit_criterion_id)
+        return assessed
+
+    def _get_pending_jobs(self, assessed: set[int]) -> list[AssessmentJob]:
+        criteria = list(
+            self.run.project_audit.project_audit_criteria.exclude(id__in=assessed)
+            .select_related("criterion")
+            .prefetch_related("criterion__tags")
+        )
+        criteria.sort(key=lambda x: natural_sort_key(x.criterion.public_id))
+        # Resources are shared by all criteria of the audit
+        resources = list(self.run.project_audit.project.resources.order_by("id"))
+        if self.run.grouping == Grouping.NONE:
+            return [
+                AssessmentJob(
+                    criterion_ids={criterion.criterion.public_id: criterion.id},
+                    system_prompt=build_system_prompt(criterion, resources=resources),
+                )
+                for criterion in criteria
+            ]
+        return [
+            AssessmentJob(
+                criterion_ids={
+                    criterion.criterion.public_id: criterion.id for criterion in group
+                },
+                system_prompt=build_group_system_prompt(group, resources),
+                grouped=True,
+            )
+            for group in group_criteria(
+                criteria, self.run.grouping, self.run.group_size
+            )
+        ]
+
+    async def _call(self, func: Callable, *args) -> Any:
+        """Run `func` in the calling thread (which may use the ORM)."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._results.put(DatabaseCall(func, args, loop, future))
+        return await future
+
+    async def _assess(
+        self, agent_model: Model | str, job: AssessmentJob, semaphore
+    ) -> AssessmentOutcome:
+        outcome = AssessmentOutcome(job=job)
+        if job.grouped:
+            agent = get_agent(
+                TemplateName.GROUP_SYSTEM_PROMPT, GroupAssessment, agent_model
+            )
+        else:
+            agent = get_agent(TemplateName.SYSTEM_PROMPT, str, agent_model)
+        outcome.metrics = metrics = TurnMetrics(model=get_model_name(agent), latency=0)
+        policy = RetryPolicy(
+            self.breaker, self.max_retries, self.backoff_base, self.backoff_max
+        )
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                # Each job takes a token of the organization bucket
+                await asyncio.sleep(
+                    await self._call(acquire_organization, self.organization_id)
+                )
+            except Exception as err:
+                outcome.error = metrics.error = err
+                metrics.latency = time.perf_counter() - start
+                return outcome
+            while True:
+                try:
+                    await self._call(policy.before_attempt)
+                except Exception as err:
+                    # The circuit is open: the provider is not called
+                    outcome.error = metrics.error = err
+                    metrics.latency = time.perf_counter() - start
+                    return outcome
+                outcome.attempts = policy.attempts
+                try:
+                    result = await asyncio.wait_for(
+                        agent.run(DEFAULT_USER_MESSAGE, instructions=job.system_prompt),
+                        timeout=self.timeout,
+                    )
+                except Exception as err:
+                    outcome.error = metrics.error = err
+                    delay = await self._call(policy.record_failure, err)
+                    if delay is None:
+                        metrics.latency = time.perf_counter() - start
+                        return outcome
+                    await asyncio.sleep(delay)
+                else:
+                    await self._call(policy.record_success)
+                    outcome.output = result.output
+                    outcome.error = metrics.error = None
+                    metrics.usage = result.usage()
+                    metrics.model = result.response.model_name or metrics.model
+                    metrics.latency = time.perf_counter() - start
+                    return outcome
+
+    async def _assess_all(self, agent_model, jobs: list[AssessmentJob], send) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def assess_and_send(job):
+            try:
+                outcome = await self._assess(agent_model, job, semaphore)
+            except BaseException as err:
+                outcome = AssessmentOutcome(job=job, error=err)
+            send(outcome)
+
+        try:
+            await asyncio.gather(*(assess_and_send(job) for job in jobs))
+        finally:
+            # The event loop is closed at the end of the run
+            await agent_factory.release_connections()
+
+    def _work(self, agent_model, jobs: list[AssessmentJob]):
+        """Worker thread: run the event loop, then signal the end with None."""
+        try:
+            asyncio.run(self._assess_all(agent_model, jobs, self._results.put))
+        finally:
+            self._results.put(None)
+
+    def _save_outcome(self, outcome: AssessmentOutcome) -> None:
+        if outcome.error is not None:
+            logger.error(
+                "Assessment of criteria %s failed: %s",
+                outcome.job.label,
+                outcome.error,
+            )
+        results = split_outcome(outcome)
+        failed = sum(result.error for result in results)
+
+        with transaction.atomic():
+            prompt = None
+            for result in results:
+                role = "error" if result.error else "assistant"
+                prompt = {
+                    "messages": [
+                        {"role": "user", "content": DEFAULT_USER_MESSAGE},
+                        {"role": role, "content": result.content},
+                    ]
+                }
+                if result.verdict:
+                    prompt["verdict"] = result.verdict
+                prompt, _ = Prompt.objects.update_or_create(
+                    assessment_run=self.run,
+                    project_audit_criterion_id=result.criterion_id,
+                    defaults={"name": gettext("AI pre-assessment"), "prompt": prompt},
+                )
+            AssessmentRun.objects.filter(id=self.run.id).update(
+                succeeded=F("succeeded") + len(results) - failed,
+                failed=F("failed") + failed,
+                updated_at=timezone.now(),
+            )
+            if outcome.metrics is not None:
+                project = self.run.project_audit.project
+                record_turn(
+                    project.organization_id,
+                    project.id,
+                    outcome.metrics,
+                    # A grouped assessment is shared by the prompts of its criteria
+                    prompt=None if outcome.job.grouped else prompt,
+                    user=self.run.user,
+                )
+
+    def run_sync(self) -> AssessmentRun:
+        """Assess every criterion not assessed yet, and return the updated run."""
+        run = self.run
+        try:
+            agent_model = self._get_model()
+            assessed = self._get_assessed_criterion_ids()
+            jobs = self._get_pending_jobs(assessed)
+            self.organization_id = run.project_audit.project.organization_id
+
+            run.status = Status.RUNNING
+            run.total = len(assessed) + sum(len(job.criterion_ids) for job in jobs)
+            run.succeeded = len(assessed)
+            run.failed = 0
+            run.save()
+
+            self._results: queue.Queue[AssessmentOutcome | DatabaseCall | None] = (
+                queue.Queue()
+            )
+            worker = threading.Thread(
+                target=self._work,
+                args=(agent_model, jobs),
+                name=f"assessment-run-{run.id}",
+                daemon=True,
+            )
+            worker.start()
+            while (item := self._results.get()) is not None:
+                if isinstance(item, DatabaseCall):
+                    item.run()
+                else:
+                    self._save_outcome(item)
+            worker.join()
+        except Exception:
+            logger.exception("Assessment run %s failed", run.id)
+            AssessmentRun.objects.filter(id=run.id).update(
+                status=Status.FAILED, updated_at=timezone.now()
+            )
+            raise
+        else:
+            AssessmentRun.objects.filter(id=run.id).update(
+                status=Status.COMPLETED, updated_at=timezone.now()
+            )
+        finally:
+            run.refresh_from_db()
+        return run
+
+
+def get_resumable_run(project_audit: ProjectAudit) -> AssessmentRun | None:
+    """Return the latest run of the audit if it is still active or can be resumed."""
+    run = project_audit.assessment_runs.order_by("-created_at").first()
+    if run is not None and (run.is_active or run.is_resumable):
+        return run
+    return None
+
+
+def get_assessment_run(
+    project_audit: ProjectAudit, user=None, **defaults
+) -> tuple[AssessmentRun, bool]:
+    """
+    Return the latest run of the audit if it is still active or can be resumed,
+    otherwise create a new one with the given `defaults` (e.g. its grouping).
+
+    Returns:
+        A tuple (run, created), like `QuerySet.get_or_create`.
+    """
+    run = get_resumable_run(project_audit)
+    if run is not None:
+        return run, False
+    run = AssessmentRun.objects.create(
+        project_audit=project_audit, user=user, **defaults
+    )
+    return run, True
+
+
+def _run_in_background(run_id: int) -> None:
+    try:
+        run = AssessmentRun.objects.get(id=run_id)
+        AssessmentRunner(run).run_sync()
+    except Exception:
+        logger.exception("Background assessment run %s failed", run_id)
+    finally:
+        connections.close_all()
+
+
+def start_assessment(run: AssessmentRun) -> threading.Thread:
+    """Run the assessment in a background thread of the current process."""
+    AssessmentRun.objects.filter(id=run.id).update(
+        status=Status.PENDING, updated_at=timezone.now()
+    )
+    thread = threading.Thread(
+        target=_run_in_background,
+        args=(run.id,),
+        name=f"assessment-run-{run.id}-main",
+        daemon=True,
+    )
+    thread.start()
+    return thread
@@ -0,0 +1,161 @@
+"""
+Micro-benchmark of the HTTP connections used by the agents.
+
+A local stand-in server answers like the Anthropic messages API and counts the
+connections it accepts, so the cost of opening a connection per request can be
+compared with the pooled client of `audits.ai.agents`.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from audits.ai.agents import AgentFactory
+from pydantic_ai import Agent
+from pydantic_ai.models.anthropic import AnthropicModel
+from pydantic_ai.providers.anthropic import AnthropicProvider
+
+STAND_IN_MODEL = "anthropic:stand-in"
+STAND_IN_API_KEY = "stand-in"  # pragma: allowlist secret
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    # Keep-alive requires HTTP/1.1
+    protocol_version = "HTTP/1.1"
+    # Headers and body are sent separately: don't wait for the client ACK
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.last_request = json.loads(body or b"null")
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body = json.dumps(
+            {
+                "id": "msg_stand_in",
+                "type": "message",
+                "role": "assistant",
+                "model": "stand-in",
+                "content": [{"type": "text", "text": self.server.answer}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": {"input_tokens": 10, "output_tokens": 5},
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Local server answering like the Anthropic messages API, in a thread."""
+
+    daemon_threads = True
+
+    def __init__(self, answer: str = "Compliant", latency: float = 0.0):
+        super().__init__(("127.0.0.1", 0), _StandInHandler)
+        self.answer = answer
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.last_request = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+    def reset_counters(self) -> None:
+        with self.lock:
+            self.connections = 0
+            self.requests = 0
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    requests: int
+    connections: int
+    duration: float
+
+    @property
+    def mean_ms(self) -> float:
+        return self.duration * 1000 / self.requests if self.requests else 0.0
+
+
+async def _run_with_new_clients(server: StandInServer, requests: int) -> None:
+    for _ in range(requests):
+        async with httpx.AsyncClient() as http_client:
+            provider = AnthropicProvider(
+                api_key=STAND_IN_API_KEY, base_url=server.url, http_client=http_client
+            )
+            agent = Agent(AnthropicModel("stand-in", provider=provider))
+            await agent.run("ping", instructions="Answer")
+
+
+async def _run_with_factory(
+    server: StandInServer, requests: int, factory: AgentFactory
+) -> None:
+    try:
+        for _ in range(requests):
+            agent = factory.get_agent("benchmark", model=STAND_IN_MODEL)
+            await agent.run("ping", instructions="Answer")
+    finally:
+        await factory.release_connections()
+
+
+def _measure(name: str, server: StandInServer, requests: int, run) -> BenchmarkResult:
+    server.reset_counters()
+    start = time.perf_counter()
+    asyncio.run(run)
+    return BenchmarkResult(
+        name=name,
+        requests=server.requests,
+        connections=server.connections,
+        duration=time.perf_counter() - start,
+    )
+
+
+def run_benchmark(requests: int = 50, latency: float = 0.0) -> list[BenchmarkResult]:
+    """Send `requests` sequential agent calls with a new client each, then pooled."""
+    with StandInServer(latency=latency) as server:
+        factory = AgentFactory(api_key=STAND_IN_API_KEY, base_url=server.url)
+        return [
+            _measure(
+                "new client per request",
+                server,
+                requests,
+                _run_with_new_clients(server, requests),
+            ),
+            _measure(
+                "pooled agent factory",
+                server,
+                requests,
+                _run_with_factory(server, requests, factory),
+            ),
+        ]
@@ -0,0 +1,181 @@
+"""
+Circuit breaker shared by every process calling the AI provider.
+
+After `failure_threshold` consecutive transient failures (timeouts, connection
+errors, 5xx and 429 responses), the breaker opens: calls fail at once without
+reaching the provider. After `reset_timeout` seconds a single probe call is let
+through (half-open state); the breaker closes when it succeeds and opens again
+when it fails.
+
+The state and the failure accounting are a `CircuitBreakerState` row, so that
+every worker stops calling a provider which is down, and a single probe call is
+made by the whole fleet, whatever the cache backend.
+"""
+
+import time
+from datetime import datetime
+
+from audits.models.audit import CircuitBreakerState
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+class CircuitOpenError(Exception):
+    """The circuit is open: the call is refused without reaching the provider."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"The AI provider is unavailable ({name} circuit open)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker whose state is kept in the `CircuitBreakerState` row of
+    `name`.
+
+    Args:
+        name: Name of the protected service.
+        failure_threshold: Consecutive failures opening the circuit,
+            `AI_CIRCUIT_FAILURE_THRESHOLD` by default.
+        reset_timeout: Seconds before a probe call is allowed,
+            `AI_CIRCUIT_RESET_TIMEOUT` by default.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int | None = None,
+        reset_timeout: float | None = None,
+    ):
+        self.name = name
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+
+    @property
+    def failure_threshold(self) -> int:
+        if self._failure_threshold is None:
+            return settings.AI_CIRCUIT_FAILURE_THRESHOLD
+        return self._failure_threshold
+
+    @property
+    def reset_timeout(self) -> float:
+        if self._reset_timeout is None:
+            return settings.AI_CIRCUIT_RESET_TIMEOUT
+        return self._reset_timeout
+
+    def _get(self) -> CircuitBreakerState:
+        return CircuitBreakerState.objects.filter(
+            name=self.name
+        ).first() or CircuitBreakerState(name=self.name)
+
+    def _get_opened_at(self) -> float | None:
+        return (
+            CircuitBreakerState.objects.filter(name=self.name)
+            .values_list("opened_at", flat=True)
+            .first()
+        )
+
+    def _reject(self, retry_after: float) -> CircuitOpenError:
+        CircuitBreakerState.objects.filter(name=self.name).update(
+            rejected_calls=F("rejected_calls") + 1
+        )
+        return CircuitOpenError(self.name, max(retry_after, 0.0))
+
+    def get_state(self) -> str:
+        opened_at = self._get_opened_at()
+        if opened_at is None:
+            return self.CLOSED
+        if time.time() - opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def get_retry_after(self) -> float:
+        """Seconds before a probe call is allowed, 0 if the circuit is closed."""
+        opened_at = self._get_opened_at()
+        if opened_at is None:
+            return 0.0
+        return max(0.0, opened_at + self.reset_timeout - time.time())
+
+    def before_call(self) -> None:
+        """
+        Check that a call can be made.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open and another
+                call is already probing the provider.
+        """
+        opened_at = self._get_opened_at()
+        if opened_at is None:
+            return
+        now = time.time()
+        retry_after = opened_at + self.reset_timeout - now
+        if retry_after > 0:
+            raise self._reject(retry_after)
+        # Only one probe call at a time, until it reports its result: the first
+        # worker setting `probe_until` makes it
+        probing = (
+            CircuitBreakerState.objects.filter(name=self.name, opened_at=opened_at)
+            .filter(Q(probe_until__isnull=True) | Q(probe_until__lte=now))
+            .update(probe_until=now + self.reset_timeout)
+        )
+        if not probing:
+            raise self._reject(0.0)
+
+    def record_success(self) -> None:
+        # Not written while the circuit is closed and without failure
+        CircuitBreakerState.objects.filter(name=self.name).filter(
+            Q(failures__gt=0) | Q(opened_at__isnull=False)
+        ).update(failures=0, opened_at=None, probe_until=None)
+
+    def record_failure(self, err: BaseException) -> None:
+        with transaction.atomic():
+            state, _ = CircuitBreakerState.objects.select_for_update().get_or_create(
+                name=self.name
+            )
+            state.failures += 1
+            state.total_failures += 1
+            state.last_failure = {
+                "error": type(err).__name__,
+                "at": timezone.now().isoformat(),
+            }
+            if state.failures >= self.failure_threshold or state.opened_at is not None:
+                # Opened, or opened again after a failed probe
+                state.opened_at = time.time()
+                state.probe_until = None
+            state.save()
+
+    def get_status(self) -> dict:
+        """State and failure accounting of the breaker."""
+        state = self._get()
+        opened_at = state.opened_at
+        return {
+            "name": self.name,
+            "state": self.get_state(),
+            "consecutive_failures": state.failures,
+            "failure_threshold": self.failure_threshold,
+            "total_failures": state.total_failures,
+            "rejected_calls": state.rejected_calls,
+            "last_failure": state.last_failure,
+            "opened_at": (
+                None
+                if opened_at is None
+                else datetime.fromtimestamp(
+                    opened_at, tz=timezone.get_current_timezone()
+                ).isoformat()
+            ),
+            "retry_after": (
+                None
+                if opened_at is None
+                else max(0.0, opened_at + self.reset_timeout - time.time())
+            ),
+        }
+
+
+breaker = CircuitBreaker("anthropic")
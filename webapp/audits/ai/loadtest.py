@@ -0,0 +1,208 @@
+"""
+Load test of the prompt flow, run in-process against `PromptFormView`.
+
+Conversations, replayed from recorded `Prompt` sessions or generated, are sent
+by a pool of worker threads, each one acting like a web server worker: a worker
+is busy for the whole duration of a request, including the agent call. Meant to
+be run with the offline stand-in model (see `audits.ai.stand_in`).
+"""
+
+import math
+import queue
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from audits.models.audit import ProjectAuditCriterion, Prompt
+from core.middleware import CURRENT_ORGANIZATION_SESSION_KEY
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+SYNTHETIC_QUESTIONS = [
+    "",
+    "Which evidence should we collect for this criterion?",
+    "Is the documentation enough to be compliant?",
+    "What is missing to be fully compliant?",
+    "Can you summarize the risks if this is not handled?",
+]
+
+
+@dataclass
+class Conversation:
+    """User messages sent in order in a single prompt session."""
+
+    criterion: ProjectAuditCriterion
+    messages: list[str]
+
+
+@dataclass
+class LoadTestResult:
+    """Latencies and worker usage of a load test."""
+
+    workers: int
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    duration: float = 0.0
+    busy: float = 0.0
+    session_ids: list[uuid.UUID] = field(default_factory=list)
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies)
+
+    def percentile(self, percent: float) -> float:
+        """Latency (seconds) under which `percent`% of the requests are served."""
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        rank = max(1, math.ceil(percent / 100 * len(latencies)))
+        return latencies[rank - 1]
+
+    @property
+    def occupancy(self) -> float:
+        """Share of the time the workers spent serving requests."""
+        if not self.duration:
+            return 0.0
+        return self.busy / (self.workers * self.duration)
+
+    @property
+    def throughput(self) -> float:
+        """Requests per second."""
+        return self.requests / self.duration if self.duration else 0.0
+
+
+def recorded_conversations(prompts, limit: int | None = None) -> list[Conversation]:
+    """Conversations of recorded prompt sessions, most recent first."""
+    prompts = prompts.select_related(
+        "project_audit_criterion__project_audit__project__organization"
+    ).order_by("-created_at")
+    conversations = []
+    for prompt in prompts[:limit]:
+        messages = [
+            message["content"]
+            for message in prompt.prompt.get("messages", [])
+            if message["role"] == "user"
+        ]
+        if messages:
+            conversations.append(Conversation(prompt.project_audit_criterion, messages))
+    return conversations
+
+
+def synthetic_conversations(
+    criteria: list[ProjectAuditCriterion],
+    count: int,
+    turns: int = 2,
+    seed: int = 0,
+) -> list[Conversation]:
+    """Conversations of `turns` questions on random criteria."""
+    if not criteria:
+        return []
+    rng = random.Random(seed)
+    return [
+        Conversation(
+            rng.choice(criteria),
+            [rng.choice(SYNTHETIC_QUESTIONS) for _ in range(turns)],
+        )
+        for _ in range(count)
+    ]
+
+
+def _prompt_url(criterion: ProjectAuditCriterion) -> str:
+    return reverse(
+        "audits:prompt",
+        kwargs={
+            "project_slug": criterion.project_audit.project.slug,
+            "audit_id": criterion.project_audit_id,
+            "criterion_id": criterion.id,
+        },
+    )
+
+
+def _allowed_host() -> str:
+    for host in settings.ALLOWED_HOSTS:
+        if host and host != "*" and not host.startswith("."):
+            return host
+    return "localhost"
+
+
+class _Worker(threading.Thread):
+    def __init__(
+        self,
+        user,
+        conversations: queue.Queue,
+        result: LoadTestResult,
+        lock: threading.Lock,
+    ):
+        super().__init__(daemon=True)
+        self.user = user
+        self.conversations = conversations
+        self.result = result
+        self.lock = lock
+
+    def _send(self, client: Client, conversation: Conversation) -> None:
+        organization = conversation.criterion.project_audit.project.organization
+        session = client.session
+        session[CURRENT_ORGANIZATION_SESSION_KEY] = (organization.id, organization.name)
+        session.save()
+        url = _prompt_url(conversation.criterion)
+        session_id = uuid.uuid4()
+        with self.lock:
+            self.result.session_ids.append(session_id)
+
+        for message in conversation.messages:
+            start = time.perf_counter()
+            response = client.post(url, {"message": message, "session_id": session_id})
+            latency = time.perf_counter() - start
+            with self.lock:
+                self.result.latencies.append(latency)
+                self.result.busy += latency
+                if response.status_code != 302:
+                    self.result.errors += 1
+
+    def run(self):
+        client = Client(raise_request_exception=False, HTTP_HOST=_allowed_host())
+        client.force_login(self.user)
+        try:
+            while True:
+                try:
+                    conversation = self.conversations.get_nowait()
+                except queue.Empty:
+                    return
+                self._send(client, conversation)
+        finally:
+            connections.close_all()
+
+
+def run_load_test(
+    conversations: list[Conversation], user, workers: int = 4
+) -> LoadTestResult:
+    """
+    Send every conversation to the prompt view with `workers` concurrent workers.
+
+    The user must be a member, allowed to add prompts, of the organizations of
+    the conversations; the requests of other conversations are counted as errors.
+    """
+    pending: queue.Queue[Conversation] = queue.Queue()
+    for conversation in conversations:
+        pending.put(conversation)
+    result = LoadTestResult(workers=workers)
+
+    lock = threading.Lock()
+    threads = [_Worker(user, pending, result, lock) for _ in range(workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result.duration = time.perf_counter() - start
+    return result
+
+
+def delete_load_test_prompts(result: LoadTestResult) -> int:
+    """Delete the prompt sessions created by a load test."""
+    deleted, _ = Prompt.objects.filter(session_id__in=result.session_ids).delete()
+    return deleted
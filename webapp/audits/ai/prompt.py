@@ -0,0 +1,134 @@
+"""System prompt construction for criterion assessment."""
+
+from audits.ai.prompt_templates import TemplateName, registry
+from audits.ai.retrieval import format_excerpts, search_excerpts
+from audits.models.audit import ProjectAuditCriterion
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    TextPart,
+    UserPromptPart,
+)
+
+DEFAULT_USER_MESSAGE = (
+    "can you check this assertion and tell me it is compliant, "
+    "not compliant, partially compliant or not applicable?"
+)
+
+
+def load_system_prompt(
+    criterion_name: str,
+    criterion_description: str,
+    resources: str,
+    language: str,
+    audit_library_id: int | None = None,
+    excerpts: str = "",
+) -> str:
+    return registry.render(
+        TemplateName.SYSTEM_PROMPT,
+        audit_library_id,
+        criterion_name=criterion_name,
+        criterion_description=criterion_description,
+        resources=resources,
+        excerpts=excerpts,
+        language=language,
+    )
+
+
+def format_resources(resources) -> str:
+    """Render project resources as the markdown list used in the system prompt."""
+    return "".join(
+        f"- {resource.get_type_display()}: {resource.url}\n" for resource in resources
+    )
+
+
+def build_system_prompt(
+    criterion: ProjectAuditCriterion,
+    resources=None,
+    language: str = "english",
+) -> str:
+    """
+    Build the system prompt for a project audit criterion.
+
+    Args:
+        criterion: The project audit criterion to assess.
+        resources: The project resources, fetched from the criterion project
+            if not given; the excerpts of their snapshots best matching the
+            criterion are included.
+        language: The language the agent must answer in.
+    """
+    if resources is None:
+        # A stable order keeps the prompt, and its cached prefix, identical
+        resources = criterion.project_audit.project.resources.order_by("id")
+    excerpts = search_excerpts(
+        criterion.project_audit.project_id,
+        f"{criterion.criterion.name} {criterion.criterion.description}",
+        resources,
+    )
+    return load_system_prompt(
+        criterion_name=criterion.criterion.name,
+        criterion_description=criterion.criterion.description,
+        resources=format_resources(resources),
+        language=language,
+        audit_library_id=criterion.criterion.audit_library_id,
+        excerpts=format_excerpts(excerpts, resources),
+    )
+
+
+def format_criteria(criteria) -> str:
+    """Render project audit criteria as the markdown sections of a group prompt."""
+    return "\n".join(
+        f"### {criterion.criterion.public_id}: {criterion.criterion.name}\n\n"
+        f"{criterion.criterion.description}\n"
+        for criterion in criteria
+    )
+
+
+def build_group_system_prompt(
+    criteria,
+    resources,
+    language: str = "english",
+) -> str:
+    """
+    Build the system prompt to assess several project audit criteria at once.
+
+    Args:
+        criteria: The project audit criteria to assess, with their criterion,
+            all from the same audit.
+        resources: The project resources; the excerpts of their snapshots best
+            matching the criteria are included.
+        language: The language the agent must answer in.
+    """
+    excerpts = search_excerpts(
+        criteria[0].project_audit.project_id,
+        " ".join(
+            f"{criterion.criterion.name} {criterion.criterion.description}"
+            for criterion in criteria
+        ),
+        resources,
+    )
+    return registry.render(
+        TemplateName.GROUP_SYSTEM_PROMPT,
+        criteria[0].criterion.audit_library_id,
+        criteria=format_criteria(criteria),
+        resources=format_resources(resources),
+        excerpts=format_excerpts(excerpts, resources),
+        language=language,
+    )
+
+
+def format_error_message(err: BaseException) -> str:
+    """Format an agent error as the markdown stored in the prompt history."""
+    return f"## An error occurred:\n\n{err}\n"
+
+
+def build_message_history(messages: list[dict]) -> list[ModelMessage]:
+    """Convert the user and assistant messages of a prompt to agent messages."""
+    history: list[ModelMessage] = []
+    for message in messages:
+        if message["role"] == "user":
+            history.append(ModelRequest(parts=[UserPromptPart(message["content"])]))
+        elif message["role"] == "assistant":
+            history.append(ModelResponse(parts=[TextPart(message["content"])]))
+    return history
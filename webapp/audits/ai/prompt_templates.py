@@ -0,0 +1,236 @@
+"""
+Registry of the prompt templates used to build the agent system prompts.
+
+Default templates are the markdown files of `audits/prompts/`: they are read and
+compiled once per process (and reloaded when their file changes in DEBUG).
+An audit library can override them with `PromptTemplate` records. Overrides are
+cached in the Django cache under a per-library version, bumped whenever one of
+them is saved or deleted. Each process reads the version from the cache at most
+every `PROMPT_TEMPLATES_VERSION_TTL` seconds, so rendering a prompt needs no disk
+access, query or cache lookup once the caches are warm, and an override change
+reaches the other processes within this delay.
+"""
+
+import logging
+import threading
+import time
+from pathlib import Path
+from string import Formatter
+
+from audits.models.audit import PromptTemplate
+from core.metrics import record_cache
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+TemplateName = PromptTemplate.PromptTemplateName
+
+# Placeholders available in each template
+TEMPLATE_FIELDS = {
+    TemplateName.SYSTEM_PROMPT: {
+        "criterion_name",
+        "criterion_description",
+        "resources",
+        "excerpts",
+        "language",
+    },
+    TemplateName.GROUP_SYSTEM_PROMPT: {
+        "criteria",
+        "resources",
+        "excerpts",
+        "language",
+    },
+}
+
+
+class CompiledTemplate:
+    """
+    A `str.format` template parsed once, rendered without parsing it again.
+
+    Only plain placeholders (`{name}`, optionally with a conversion or a format
+    spec) are supported; literal braces are escaped by doubling them.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self._segments = []
+        for literal, field_name, format_spec, conversion in Formatter().parse(source):
+            if field_name is not None and not field_name.isidentifier():
+                raise ValueError(f"Invalid placeholder: {{{field_name}}}")
+            if format_spec and "{" in format_spec:
+                raise ValueError(f"Nested placeholder in {{{field_name}}}")
+            self._segments.append((literal, field_name, format_spec, conversion))
+        self.fields = {
+            field_name
+            for _, field_name, _, _ in self._segments
+            if field_name is not None
+        }
+
+    def render(self, **context) -> str:
+        parts = []
+        for literal, field_name, format_spec, conversion in self._segments:
+            parts.append(literal)
+            if field_name is None:
+                continue
+            value = context[field_name]
+            if conversion == "r":
+                value = repr(value)
+            elif conversion == "a":
+                value = ascii(value)
+            elif conversion == "s":
+                value = str(value)
+            parts.append(format(value, format_spec or ""))
+        return "".join(parts)
+
+
+def compile_template(name: str, source: str) -> CompiledTemplate:
+    """
+    Compile a template, checking it only uses the placeholders of `name`.
+
+    Raises:
+        ValueError: If the template is invalid.
+    """
+    template = CompiledTemplate(source)
+    unknown = template.fields - TEMPLATE_FIELDS.get(name, set())
+    if unknown:
+        raise ValueError(
+            "Unknown placeholders: "
+            + ", ".join(f"{{{field}}}" for field in sorted(unknown))
+        )
+    return template
+
+
+def _version_key(audit_library_id: int) -> str:
+    return f"audits:prompt_templates:{audit_library_id}:version"
+
+
+# Versions read from the cache by this process, by library: (expiry, version)
+_versions: dict[int, tuple[float, int]] = {}
+
+
+def get_overrides_version(audit_library_id: int) -> int:
+    """Current version of the prompt template overrides of a library."""
+    now = time.monotonic()
+    memoized = _versions.get(audit_library_id)
+    if memoized is not None and memoized[0] > now:
+        return memoized[1]
+    key = _version_key(audit_library_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so an evicted version is never reused
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    _versions[audit_library_id] = (
+        now + settings.PROMPT_TEMPLATES_VERSION_TTL,
+        version,
+    )
+    return version
+
+
+def invalidate_overrides(audit_library_id: int) -> None:
+    """Make every process reload the overrides of a library."""
+    key = _version_key(audit_library_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+    _versions.pop(audit_library_id, None)
+
+
+class PromptTemplateRegistry:
+    """Compiled prompt templates, by name, with per-library overrides."""
+
+    def __init__(self, directory: Path, auto_reload: bool | None = None):
+        self.directory = Path(directory)
+        self._auto_reload = auto_reload
+        self._defaults: dict[str, tuple[float, CompiledTemplate]] = {}
+        self._overrides: dict[int, tuple[int, dict[str, CompiledTemplate]]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def auto_reload(self) -> bool:
+        if self._auto_reload is None:
+            return settings.DEBUG
+        return self._auto_reload
+
+    def _get_default(self, name: str) -> CompiledTemplate:
+        loaded = self._defaults.get(name)
+        if loaded is not None and not self.auto_reload:
+            return loaded[1]
+
+        path = self.directory / f"{name}.md"
+        mtime = path.stat().st_mtime
+        if loaded is not None and loaded[0] == mtime:
+            return loaded[1]
+        with self._lock:
+            template = CompiledTemplate(path.read_text(encoding="utf-8"))
+            self._defaults[name] = (mtime, template)
+        return template
+
+    def _load_overrides(self, audit_library_id: int) -> dict[str, str]:
+        return dict(
+            PromptTemplate.objects.filter(
+                audit_library_id=audit_library_id
+            ).values_list("name", "content")
+        )
+
+    def _get_overrides(self, audit_library_id: int) -> dict[str, CompiledTemplate]:
+        version = get_overrides_version(audit_library_id)
+        loaded = self._overrides.get(audit_library_id)
+        record_cache("prompt_templates", loaded is not None and loaded[0] == version)
+        if loaded is not None and loaded[0] == version:
+            return loaded[1]
+
+        key = f"audits:prompt_templates:{audit_library_id}:{version}"
+        sources = cache.get(key)
+        record_cache("prompt_templates_shared", sources is not None)
+        if sources is None:
+            sources = self._load_overrides(audit_library_id)
+            cache.set(key, sources)
+
+        overrides = {}
+        for name, source in sources.items():
+            try:
+                overrides[name] = compile_template(name, source)
+            except ValueError as err:
+                logger.error(
+                    "Invalid %s template for audit library %s, using the default "
+                    "one: %s",
+                    name,
+                    audit_library_id,
+                    err,
+                )
+        self._overrides[audit_library_id] = (version, overrides)
+        return overrides
+
+    def get(self, name: str, audit_library_id: int | None = None) -> CompiledTemplate:
+        """Return the template of the library if overridden, else the default one."""
+        if audit_library_id is not None:
+            override = self._get_overrides(audit_library_id).get(name)
+            if override is not None:
+                return override
+        return self._get_default(name)
+
+    def render(self, name: str, audit_library_id: int | None = None, **context) -> str:
+        return self.get(name, audit_library_id).render(**context)
+
+    def clear(self) -> None:
+        """Forget every template loaded by this process."""
+        with self._lock:
+            self._defaults.clear()
+            self._overrides.clear()
+        _versions.clear()
+
+
+registry = PromptTemplateRegistry(Path(settings.BASE_DIR) / "audits" / "prompts")
+
+
+@receiver(post_save, sender=PromptTemplate)
+@receiver(post_delete, sender=PromptTemplate)
+def _invalidate_prompt_template(sender, instance: PromptTemplate, **kwargs):
+    audit_library_id = instance.audit_library_id
+    transaction.on_commit(lambda: invalidate_overrides(audit_library_id))
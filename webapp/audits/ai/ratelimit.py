@@ -0,0 +1,180 @@
+"""
+Admission control of the agent calls, per organization and per user.
+
+Each organization, and each user within an organization, has a token bucket:
+`burst` calls can be made at once, then `rate` calls per minute. A call takes a
+token from both buckets before reaching the model; when a bucket is empty the
+call waits for its token if it comes soon enough, or is rejected at once with
+the delay after which it may be retried.
+
+Buckets are `RateLimitBucket` rows, shared by the workers, holding the
+"theoretical arrival time" of the next token (GCRA). A token is taken in a short
+transaction holding the lock of the row, so concurrent calls are counted exactly
+whatever the cache backend. User budgets depend on their role group in the
+organization.
+"""
+
+import time
+from dataclasses import dataclass
+
+from audits.models.audit import RateLimitBucket
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from organization.models.organization import OrganizationMember
+
+
+class RateLimitExceeded(Exception):
+    """No token is available in time; the call may be retried after `retry_after`."""
+
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"AI rate limit of {scope} exceeded")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class Budget:
+    """
+    Budget of a token bucket.
+
+    Args:
+        rate: Tokens added per minute.
+        burst: Maximum number of tokens in the bucket.
+    """
+
+    rate: float
+    burst: int
+
+    @classmethod
+    def from_setting(cls, value: dict | None) -> "Budget | None":
+        if not value:
+            return None
+        return cls(rate=float(value["rate"]), burst=int(value["burst"]))
+
+    @property
+    def interval_ms(self) -> int:
+        """Milliseconds between two tokens."""
+        return max(1, round(60_000 / self.rate))
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class TokenBucket:
+    """Token bucket stored in the `RateLimitBucket` row of `key`."""
+
+    def __init__(self, key: str, budget: Budget):
+        self.name = key
+        self.key = key
+        self.budget = budget
+
+    def _advance(self, now: int) -> int:
+        """Move the arrival time forward by one token, return its new value."""
+        interval = self.budget.interval_ms
+        with transaction.atomic():
+            bucket, created = RateLimitBucket.objects.select_for_update().get_or_create(
+                key=self.key, defaults={"arrival": now + interval}
+            )
+            if not created:
+                # A full bucket starts from now: tokens don't accumulate
+                # beyond `burst`
+                bucket.arrival = max(bucket.arrival, now) + interval
+                bucket.save(update_fields=["arrival"])
+        return bucket.arrival
+
+    def acquire(self, max_wait: float = 0.0) -> float:
+        """
+        Take a token, return the seconds to wait before using it.
+
+        Raises:
+            RateLimitExceeded: If the token is not available within `max_wait`.
+        """
+        if self.budget.rate <= 0 or self.budget.burst <= 0:
+            raise RateLimitExceeded(self.name, retry_after=60.0)
+        now = _now_ms()
+        arrival = self._advance(now)
+        wait_ms = arrival - now - self.budget.burst * self.budget.interval_ms
+        if wait_ms > max_wait * 1000:
+            self.release()
+            raise RateLimitExceeded(self.name, retry_after=wait_ms / 1000)
+        return max(0.0, wait_ms / 1000)
+
+    def release(self) -> None:
+        """Give back a token taken by `acquire`."""
+        RateLimitBucket.objects.filter(key=self.key).update(
+            arrival=F("arrival") - self.budget.interval_ms
+        )
+
+
+def get_user_budget(user, organization_id: int) -> Budget | None:
+    """Budget of a user in an organization, according to their role group."""
+    group_name = (
+        OrganizationMember.objects.filter(user=user, organization_id=organization_id)
+        .values_list("group__name", flat=True)
+        .first()
+    )
+    return Budget.from_setting(settings.AI_RATE_LIMIT_USER.get(group_name))
+
+
+def get_organization_bucket(organization_id: int) -> TokenBucket | None:
+    """Bucket of an organization, None without organization budget."""
+    budget = Budget.from_setting(settings.AI_RATE_LIMIT_ORGANIZATION)
+    if budget is None:
+        return None
+    return TokenBucket(f"organization:{organization_id}", budget)
+
+
+def get_buckets(user, organization_id: int) -> list[TokenBucket]:
+    """Buckets a call of `user` in an organization takes a token from."""
+    buckets = []
+    user_budget = get_user_budget(user, organization_id)
+    if user_budget is not None:
+        buckets.append(TokenBucket(f"user:{organization_id}:{user.pk}", user_budget))
+    organization_bucket = get_organization_bucket(organization_id)
+    if organization_bucket is not None:
+        buckets.append(organization_bucket)
+    return buckets
+
+
+def acquire_organization(organization_id: int, max_wait: float | None = None) -> float:
+    """
+    Take a token of the organization bucket for a call made on behalf of the
+    organization (e.g. by a batch assessment), without waiting for it: return
+    the seconds to wait before making the call.
+
+    Raises:
+        RateLimitExceeded: If the token is not available within `max_wait`
+            seconds (`AI_RATE_LIMIT_MAX_WAIT` by default).
+    """
+    if max_wait is None:
+        max_wait = settings.AI_RATE_LIMIT_MAX_WAIT
+    bucket = get_organization_bucket(organization_id)
+    if bucket is None:
+        return 0.0
+    return bucket.acquire(max_wait)
+
+
+def acquire(user, organization_id: int, max_wait: float | None = None) -> None:
+    """
+    Take a token for a call of `user` in an organization, waiting for it if needed.
+
+    Raises:
+        RateLimitExceeded: If a token is not available within `max_wait` seconds
+            (`AI_RATE_LIMIT_MAX_WAIT` by default); no token is taken then.
+    """
+    if max_wait is None:
+        max_wait = settings.AI_RATE_LIMIT_MAX_WAIT
+    acquired = []
+    wait = 0.0
+    try:
+        for bucket in get_buckets(user, organization_id):
+            wait = max(wait, bucket.acquire(max_wait))
+            acquired.append(bucket)
+    except RateLimitExceeded:
+        for bucket in acquired:
+            bucket.release()
+        raise
+    if wait:
+        time.sleep(wait)
@@ -0,0 +1,543 @@
+"""
+Retrieval of resource excerpts to ground the agent answers.
+
+A resource can have snapshots of its contents: an uploaded archive, extracted
+under `RESOURCE_SNAPSHOTS_ROOT`, or a local checkout under one of the
+`RESOURCE_SNAPSHOT_LOCAL_ROOTS`. The text files of the latest snapshot of each
+resource are split into chunks of lines and indexed in an SQLite FTS5 database
+per project, then ranked with BM25 against the criterion at prompt time.
+
+Indexing is incremental: a file is only chunked again when its hash changed, and
+the files gone from the snapshot are removed from the index. Searching only
+reads the top-ranked rows of the full-text index, so it stays in the
+milliseconds for tens of thousands of files.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import tarfile
+import threading
+import zipfile
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from organization.models.organization import Project, Resource, ResourceSnapshot
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+# Directories of dependencies, build outputs and version control
+SKIPPED_DIRECTORIES = {
+    ".git",
+    ".hg",
+    ".svn",
+    ".venv",
+    "venv",
+    "node_modules",
+    "__pycache__",
+    ".mypy_cache",
+    ".pytest_cache",
+    ".tox",
+    "dist",
+    "build",
+}
+# Bigger files are generated or data, not worth indexing
+MAX_FILE_SIZE = 512 * 1024
+CHUNK_LINES = 40
+# Caps the chunks of minified files
+CHUNK_MAX_CHARS = 4000
+MAX_QUERY_TERMS = 32
+# Chunks matching the terms of a search, beyond which frequent terms are ignored
+MAX_POSTINGS = 2000
+
+STOP_WORDS = frozenset("""
+    about above after again all also and any are because been before being
+    below between both but can cannot could did does doing down during each
+    few for from further had has have having here how into its itself just
+    more most must need not now off once only other our out over own same
+    shall should some such than that the their them then there these they
+    this those through too under until very was were what when where which
+    while who whom why will with would you your
+    aux avec ces cet cette dans des doit donc elle est etre être leur les
+    mais par pas peut pour que qui sans ses son sont sur tous tout une
+    """.split())
+
+# English stemming, on top of case and accents folding
+TOKENIZER = "porter unicode61"
+
+SCHEMA = f"""
+PRAGMA journal_mode = WAL;
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    resource_id INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    UNIQUE (resource_id, path)
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL,
+    start_line INTEGER NOT NULL,
+    end_line INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_file_id ON chunks (file_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    text, content='chunks', content_rowid='id', tokenize='{TOKENIZER}'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_vocab USING fts5vocab(chunks_fts, 'row');
+CREATE TRIGGER IF NOT EXISTS chunks_insert AFTER INSERT ON chunks BEGIN
+    INSERT INTO chunks_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS chunks_delete AFTER DELETE ON chunks BEGIN
+    INSERT INTO chunks_fts (chunks_fts, rowid, text)
+    VALUES ('delete', old.id, old.text);
+END;
+"""
+
+
+class SnapshotError(Exception):
+    """A snapshot cannot be taken from an archive or a local checkout."""
+
+
+@dataclass(frozen=True)
+class Excerpt:
+    """Chunk of a resource file matching a search."""
+
+    resource_id: int
+    path: str
+    start_line: int
+    end_line: int
+    text: str
+    score: float
+
+
+@dataclass
+class IndexStats:
+    """Files of a resource in the index, and what an update changed."""
+
+    files: int = 0
+    chunks: int = 0
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+
+
+def is_archive(name: str) -> bool:
+    return name.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def extract_archive(file, destination: Path, max_size: int | None = None) -> None:
+    """
+    Extract a zip or tar archive, refusing members outside of `destination`.
+
+    Raises:
+        SnapshotError: If the archive is invalid or too big once extracted.
+    """
+    if max_size is None:
+        max_size = settings.RESOURCE_SNAPSHOT_MAX_SIZE
+    destination.mkdir(parents=True, exist_ok=True)
+    try:
+        if file.name.lower().endswith(".zip"):
+            with zipfile.ZipFile(file) as archive:
+                members = archive.infolist()
+                if sum(member.file_size for member in members) > max_size:
+                    raise SnapshotError("The archive is too big once extracted")
+                # Member names are sanitized by `extract`
+                for member in members:
+                    archive.extract(member, destination)
+        else:
+            with tarfile.open(fileobj=file, mode="r:*") as archive:
+                members = archive.getmembers()
+                if sum(member.size for member in members) > max_size:
+                    raise SnapshotError("The archive is too big once extracted")
+                archive.extractall(destination, members=members, filter="data")
+    except (zipfile.BadZipFile, tarfile.TarError, OSError) as err:
+        raise SnapshotError(f"Invalid archive: {err}") from err
+
+
+def resolve_local_path(path: str) -> Path:
+    """
+    Resolve the path of a local checkout.
+
+    Raises:
+        SnapshotError: If the path is not a directory under one of the
+            `RESOURCE_SNAPSHOT_LOCAL_ROOTS`.
+    """
+    resolved = Path(path).resolve()
+    roots = [Path(root).resolve() for root in settings.RESOURCE_SNAPSHOT_LOCAL_ROOTS]
+    if not any(resolved.is_relative_to(root) for root in roots):
+        raise SnapshotError("This path is not in an allowed directory")
+    if not resolved.is_dir():
+        raise SnapshotError("This path is not a directory")
+    return resolved
+
+
+def iter_files(directory: Path):
+    """Yield the relative path and the path of the files to index, in order."""
+    for root, dirnames, filenames in os.walk(directory):
+        dirnames[:] = sorted(
+            name for name in dirnames if name not in SKIPPED_DIRECTORIES
+        )
+        for filename in sorted(filenames):
+            path = Path(root) / filename
+            if path.is_symlink():
+                continue
+            yield path.relative_to(directory).as_posix(), path
+
+
+def read_text_file(path: Path) -> bytes | None:
+    """Contents of a text file, None for binary and big files."""
+    try:
+        if path.stat().st_size > MAX_FILE_SIZE:
+            return None
+        data = path.read_bytes()
+    except OSError:
+        return None
+    if b"\0" in data[:8192]:
+        return None
+    return data
+
+
+def chunk_text(text: str) -> list[tuple[int, int, str]]:
+    """Split a text into chunks of lines: (first line, last line, text)."""
+    lines = text.splitlines()
+    chunks = []
+    for start in range(0, len(lines), CHUNK_LINES):
+        block = lines[start : start + CHUNK_LINES]
+        body = "\n".join(block).strip()
+        if body:
+            chunks.append((start + 1, start + len(block), body[:CHUNK_MAX_CHARS]))
+    return chunks
+
+
+def query_terms(text: str) -> list[str]:
+    """Significant words of `text`, in order of appearance."""
+    terms: list[str] = []
+    # The tokenizer also splits on underscores
+    for word in re.findall(r"[^\W_]+", text.lower()):
+        if len(word) < 3 or word.isdigit() or word in STOP_WORDS or word in terms:
+            continue
+        terms.append(word)
+        if len(terms) == MAX_QUERY_TERMS:
+            break
+    return terms
+
+
+_stemmers = threading.local()
+
+
+def stem_terms(terms: list[str]) -> list[str]:
+    """Terms as stored in the index by its tokenizer."""
+    connection = getattr(_stemmers, "connection", None)
+    if connection is None:
+        # The tokenizer is only reachable through an FTS5 table
+        connection = sqlite3.connect(":memory:", check_same_thread=False)
+        connection.executescript(
+            f"CREATE VIRTUAL TABLE terms USING fts5(term, tokenize='{TOKENIZER}');"
+            "CREATE VIRTUAL TABLE terms_vocab USING fts5vocab(terms, 'instance');"
+        )
+        _stemmers.connection = connection
+    with connection:
+        connection.execute("DELETE FROM terms")
+        connection.executemany(
+            "INSERT INTO terms (rowid, term) VALUES (?, ?)", enumerate(terms)
+        )
+        stems = dict(connection.execute("SELECT doc, term FROM terms_vocab"))
+    return [stems.get(position, term) for position, term in enumerate(terms)]
+
+
+def select_terms(
+    terms: list[str], stems: list[str], frequencies: dict[str, int]
+) -> list[str]:
+    """
+    Rarest indexed terms, whose chunks count at most `MAX_POSTINGS` together.
+
+    BM25 scores every chunk matching a term, so frequent terms make a search
+    slow while weighing little in the ranking. The rarest term is always kept.
+
+    Args:
+        terms: Terms of the search.
+        stems: Stem of each term.
+        frequencies: Number of chunks containing each stem.
+    """
+    # Terms sharing their stem are only searched once
+    counts = {}
+    seen = set()
+    for term, stem in zip(terms, stems):
+        if frequencies.get(stem) and stem not in seen:
+            seen.add(stem)
+            counts[term] = frequencies[stem]
+    selected = []
+    postings = 0
+    for term in sorted(counts, key=counts.get):
+        postings += counts[term]
+        if selected and postings > MAX_POSTINGS:
+            break
+        selected.append(term)
+    return selected
+
+
+class ResourceIndex:
+    """BM25 index of the resource files of a project, in an SQLite database."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.executescript(SCHEMA)
+        return connection
+
+    def _delete_files(self, connection: sqlite3.Connection, file_ids) -> None:
+        rows = [(file_id,) for file_id in file_ids]
+        connection.executemany("DELETE FROM chunks WHERE file_id = ?", rows)
+        connection.executemany("DELETE FROM files WHERE id = ?", rows)
+
+    def update(self, resource_id: int, directory: Path) -> IndexStats:
+        """Index the files of `directory` as the contents of a resource."""
+        stats = IndexStats()
+        with closing(self._connect()) as connection, connection:
+            known = {
+                path: (file_id, digest)
+                for file_id, path, digest in connection.execute(
+                    "SELECT id, path, hash FROM files WHERE resource_id = ?",
+                    (resource_id,),
+                )
+            }
+            seen = set()
+            for path, full_path in iter_files(directory):
+                data = read_text_file(full_path)
+                if data is None:
+                    continue
+                seen.add(path)
+                digest = hashlib.sha256(data).hexdigest()
+                file_id, known_digest = known.get(path, (None, None))
+                if known_digest == digest:
+                    continue
+                if file_id is None:
+                    file_id = connection.execute(
+                        "INSERT INTO files (resource_id, path, hash) VALUES (?, ?, ?)",
+                        (resource_id, path, digest),
+                    ).lastrowid
+                    stats.added += 1
+                else:
+                    connection.execute(
+                        "DELETE FROM chunks WHERE file_id = ?", (file_id,)
+                    )
+                    connection.execute(
+                        "UPDATE files SET hash = ? WHERE id = ?", (digest, file_id)
+                    )
+                    stats.updated += 1
+                connection.executemany(
+                    "INSERT INTO chunks (file_id, start_line, end_line, text) "
+                    "VALUES (?, ?, ?, ?)",
+                    [
+                        (file_id, *chunk)
+                        for chunk in chunk_text(data.decode("utf-8", errors="replace"))
+                    ],
+                )
+            removed = [
+                file_id for path, (file_id, _) in known.items() if path not in seen
+            ]
+            self._delete_files(connection, removed)
+            stats.removed = len(removed)
+            stats.files = len(seen)
+            stats.chunks = connection.execute(
+                "SELECT count(*) FROM chunks JOIN files ON files.id = chunks.file_id "
+                "WHERE files.resource_id = ?",
+                (resource_id,),
+            ).fetchone()[0]
+        return stats
+
+    def remove(self, resource_id: int) -> None:
+        """Remove the files of a resource from the index."""
+        if not self.path.exists():
+            return
+        with closing(self._connect()) as connection, connection:
+            file_ids = [
+                file_id
+                for (file_id,) in connection.execute(
+                    "SELECT id FROM files WHERE resource_id = ?", (resource_id,)
+                )
+            ]
+            self._delete_files(connection, file_ids)
+
+    def search(
+        self, text: str, limit: int, resource_ids: set[int] | None = None
+    ) -> list[Excerpt]:
+        """
+        Chunks best matching `text`, best first.
+
+        Args:
+            text: Free text, e.g. the name and description of a criterion.
+            limit: Maximum number of chunks.
+            resource_ids: Only return chunks of these resources.
+        """
+        terms = query_terms(text)
+        if not terms or limit <= 0 or not self.path.exists():
+            return []
+        # Over-fetch the top rows, cheap thanks to the FTS5 `rank` optimization,
+        # in case some of them are filtered out
+        fetched = limit * 4 if resource_ids is not None else limit
+        uri = f"{self.path.resolve().as_uri()}?mode=ro"
+        with closing(sqlite3.connect(uri, uri=True)) as connection:
+            stems = stem_terms(terms)
+            frequencies = dict(
+                connection.execute(
+                    "SELECT term, doc FROM chunks_vocab WHERE term IN "
+                    f"({', '.join('?' * len(stems))})",
+                    stems,
+                )
+            )
+            terms = select_terms(terms, stems, frequencies)
+            if not terms:
+                return []
+            rows = connection.execute(
+                "SELECT files.resource_id, files.path, chunks.start_line, "
+                "chunks.end_line, chunks.text, top.rank "
+                "FROM (SELECT rowid, rank FROM chunks_fts WHERE chunks_fts MATCH ? "
+                "ORDER BY rank LIMIT ?) AS top "
+                "JOIN chunks ON chunks.id = top.rowid "
+                "JOIN files ON files.id = chunks.file_id "
+                "ORDER BY top.rank, chunks.id",
+                (" OR ".join(f'"{term}"' for term in terms), fetched),
+            ).fetchall()
+        excerpts = [
+            Excerpt(resource_id, path, start_line, end_line, text, score)
+            for resource_id, path, start_line, end_line, text, score in rows
+            if resource_ids is None or resource_id in resource_ids
+        ]
+        return excerpts[:limit]
+
+
+def get_project_index(project_id: int) -> ResourceIndex:
+    return ResourceIndex(
+        Path(settings.RESOURCE_SNAPSHOTS_ROOT)
+        / "index"
+        / f"project-{project_id}.sqlite3"
+    )
+
+
+def search_excerpts(project_id: int, text: str, resources) -> list[Excerpt]:
+    """
+    Top `AI_RETRIEVAL_TOP_K` excerpts of the resources of a project for `text`.
+
+    A broken index must not prevent answering: errors are logged and no excerpt
+    is returned.
+    """
+    try:
+        return get_project_index(project_id).search(
+            text,
+            settings.AI_RETRIEVAL_TOP_K,
+            resource_ids={resource.id for resource in resources},
+        )
+    except sqlite3.Error:
+        logger.exception(
+            "Search in the resource index of project %s failed", project_id
+        )
+        return []
+
+
+def _fence(text: str) -> str:
+    fence = "```"
+    while fence in text:
+        fence += "`"
+    return fence
+
+
+def format_excerpts(excerpts: list[Excerpt], resources) -> str:
+    """Render excerpts as the markdown sections of the system prompt."""
+    names = {resource.id: resource.name for resource in resources}
+    sections = []
+    for excerpt in excerpts:
+        fence = _fence(excerpt.text)
+        sections.append(
+            f"### {names.get(excerpt.resource_id, '')}: {excerpt.path}, "
+            f"lines {excerpt.start_line}-{excerpt.end_line}\n\n"
+            f"{fence}\n{excerpt.text}\n{fence}\n"
+        )
+    return "\n".join(sections)
+
+
+def index_snapshot(snapshot: ResourceSnapshot) -> IndexStats:
+    """
+    Index a snapshot in the index of its project.
+
+    The previous snapshots of the resource are deleted once it is indexed.
+    """
+    snapshots = ResourceSnapshot.objects.filter(id=snapshot.id)
+    snapshots.update(status=ResourceSnapshot.Status.INDEXING, error="")
+    resource = snapshot.resource
+    try:
+        stats = get_project_index(resource.project_id).update(
+            resource.id, snapshot.get_directory()
+        )
+    except Exception as err:
+        snapshots.update(status=ResourceSnapshot.Status.FAILED, error=str(err))
+        raise
+    snapshots.update(
+        status=ResourceSnapshot.Status.INDEXED,
+        files=stats.files,
+        chunks=stats.chunks,
+        indexed_at=timezone.now(),
+    )
+    for previous in ResourceSnapshot.objects.filter(
+        resource_id=resource.id, id__lt=snapshot.id
+    ):
+        previous.delete()
+    return stats
+
+
+def _index_in_background(snapshot_id: int) -> None:
+    try:
+        index_snapshot(ResourceSnapshot.objects.get(id=snapshot_id))
+    except Exception:
+        logger.exception("Indexing of resource snapshot %s failed", snapshot_id)
+    finally:
+        connections.close_all()
+
+
+def start_indexing(snapshot: ResourceSnapshot) -> threading.Thread:
+    """Index the snapshot in a background thread of the current process."""
+    thread = threading.Thread(
+        target=_index_in_background,
+        args=(snapshot.id,),
+        name=f"resource-snapshot-{snapshot.id}",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+@receiver(post_delete, sender=ResourceSnapshot)
+def _delete_snapshot_files(sender, instance: ResourceSnapshot, **kwargs):
+    if instance.kind == ResourceSnapshot.Kind.ARCHIVE:
+        shutil.rmtree(instance.get_directory(), ignore_errors=True)
+
+
+@receiver(post_delete, sender=Resource)
+def _remove_resource_from_index(sender, instance: Resource, **kwargs):
+    try:
+        get_project_index(instance.project_id).remove(instance.id)
+    except sqlite3.Error:
+        logger.exception("Removal of resource %s from its index failed", instance.id)
+
+
+@receiver(post_delete, sender=Project)
+def _delete_project_index(sender, instance: Project, **kwargs):
+    path = get_project_index(instance.id).path
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{path}{suffix}").unlink(missing_ok=True)
@@ -0,0 +1,159 @@
+"""Helpers to retry transient AI provider failures."""
+
+import asyncio
+import logging
+import random
+import time
+
+from audits.ai.circuit import CircuitBreaker
+from core.profiling import measure
+from django.conf import settings
+from pydantic_ai import Agent
+from pydantic_ai.exceptions import ModelAPIError, ModelHTTPError
+
+logger = logging.getLogger(__name__)
+
+# HTTP status codes worth retrying: timeouts, conflicts and rate limiting
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+def is_transient_error(err: BaseException) -> bool:
+    """Tell if an agent error is worth retrying."""
+    if isinstance(err, ModelHTTPError):
+        return err.status_code in RETRYABLE_STATUS_CODES or err.status_code >= 500
+    return isinstance(err, (TimeoutError, ConnectionError, ModelAPIError))
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """
+    Delay before the next attempt, using exponential backoff with full jitter.
+
+    Args:
+        attempt: The number of the attempt which just failed (starting at 1).
+        base: The delay of the first retry, in seconds.
+        cap: The maximum delay, in seconds.
+
+    Returns:
+        A random delay between 0 and min(cap, base * 2 ** (attempt - 1)).
+    """
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+def _get_event_loop() -> asyncio.AbstractEventLoop:
+    """The event loop of the thread, the one `Agent.run_sync` uses."""
+    try:
+        return asyncio.get_event_loop()
+    except RuntimeError:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        return loop
+
+
+class RetryPolicy:
+    """
+    Retries of the transient failures of an agent call, reported to the circuit
+    breaker.
+
+    Each attempt starts with `before_attempt`, and ends with `record_success`,
+    or `record_failure` which tells how long to wait before the next attempt.
+    They use the database (the circuit breaker state), so an event loop calls
+    them from a thread allowed to.
+
+    Args:
+        breaker: Circuit breaker of the provider, if any.
+        max_retries: Retries of the transient errors, `AI_PROMPT_MAX_RETRIES` by
+            default.
+        backoff_base: Delay of the first retry, `AI_PROMPT_BACKOFF_BASE` by
+            default.
+        backoff_max: Maximum delay, `AI_PROMPT_BACKOFF_MAX` by default.
+    """
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker | None = None,
+        max_retries: int | None = None,
+        backoff_base: float | None = None,
+        backoff_max: float | None = None,
+    ):
+        self.breaker = breaker
+        self.max_retries = (
+            settings.AI_PROMPT_MAX_RETRIES if max_retries is None else max_retries
+        )
+        self.backoff_base = (
+            settings.AI_PROMPT_BACKOFF_BASE if backoff_base is None else backoff_base
+        )
+        self.backoff_max = (
+            settings.AI_PROMPT_BACKOFF_MAX if backoff_max is None else backoff_max
+        )
+        self.attempts = 0
+
+    def before_attempt(self) -> None:
+        """
+        Raises:
+            CircuitOpenError: If the breaker refuses the call.
+        """
+        self.attempts += 1
+        if self.breaker is not None:
+            self.breaker.before_call()
+
+    def record_success(self) -> None:
+        if self.breaker is not None:
+            self.breaker.record_success()
+
+    def record_failure(self, err: BaseException) -> float | None:
+        """
+        Report a failed attempt, and return the seconds to wait before the next
+        one, or None if the error is not retried.
+        """
+        transient = is_transient_error(err)
+        if transient and self.breaker is not None:
+            self.breaker.record_failure(err)
+        if not transient or self.attempts > self.max_retries:
+            return None
+        delay = backoff_delay(self.attempts, self.backoff_base, self.backoff_max)
+        logger.warning(
+            "Agent call failed (attempt %s), retrying in %.1fs: %s",
+            self.attempts,
+            delay,
+            err,
+        )
+        return delay
+
+
+def run_agent_sync(
+    agent: Agent,
+    user_prompt: str,
+    breaker: CircuitBreaker | None = None,
+    timeout: float | None = None,
+    max_retries: int | None = None,
+    **run_kwargs,
+):
+    """
+    Run an agent like `Agent.run_sync`, with a timeout and retries.
+
+    Each attempt is bounded by `timeout` seconds (`AI_PROMPT_TIMEOUT` by
+    default). Transient errors are retried up to `max_retries` times
+    (`AI_PROMPT_MAX_RETRIES` by default) with exponential backoff, and
+    reported to the circuit breaker (see `RetryPolicy`).
+
+    Raises:
+        CircuitOpenError: If the breaker refuses the call.
+    """
+    if timeout is None:
+        timeout = settings.AI_PROMPT_TIMEOUT
+    policy = RetryPolicy(breaker, max_retries)
+    while True:
+        policy.before_attempt()
+        try:
+            with measure("ai"):
+                result = _get_event_loop().run_until_complete(
+                    asyncio.wait_for(agent.run(user_prompt, **run_kwargs), timeout)
+                )
+        except Exception as err:
+            delay = policy.record_failure(err)
+            if delay is None:
+                raise
+            time.sleep(delay)
+        else:
+            policy.record_success()
+            return result
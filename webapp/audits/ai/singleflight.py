@@ -0,0 +1,91 @@
+"""
+Single-flight of identical concurrent agent calls.
+
+A double-click, or two tabs on the same prompt session, submits the same
+message twice. The first submission becomes the leader of the flight and calls
+the agent; the duplicates, submitted while the call is in flight or shortly
+after it landed, wait for the leader instead of calling the agent again.
+
+The flight is a `PromptFlight` row: inserting it only succeeds for the first
+caller (primary key), so duplicates are coalesced across every worker, whatever
+the cache backend. Expired flights are deleted by the next leaders.
+"""
+
+import hashlib
+import time
+import uuid
+from datetime import timedelta
+
+from audits.models.audit import PromptFlight
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+# Seconds during which a landed flight still absorbs its duplicates
+RECENT_WINDOW = 10
+
+
+def message_key(session_id, message: str) -> str:
+    """Flight key of a message sent in a prompt session."""
+    digest = hashlib.sha256(message.encode()).hexdigest()
+    return f"{session_id}:{digest}"
+
+
+class SingleFlight:
+    """
+    Flight of the calls sharing `key`.
+
+    Args:
+        key: Identity of the call.
+        timeout: Seconds after which the flight lock expires, in case its leader
+            died; it must exceed the longest call.
+    """
+
+    def __init__(self, key: str, timeout: float):
+        self.key = key
+        self.timeout = timeout
+        self.token = uuid.uuid4().hex
+
+    def lead(self) -> bool:
+        """Take the lead of the flight, unless it is in flight or just landed."""
+        now = timezone.now()
+        PromptFlight.objects.filter(expires_at__lte=now).delete()
+        try:
+            with transaction.atomic():
+                PromptFlight.objects.create(
+                    key=self.key,
+                    token=self.token,
+                    expires_at=now + timedelta(seconds=self.timeout),
+                )
+        except IntegrityError:
+            return False
+        return True
+
+    def wait(self, poll_interval: float = 0.2) -> bool:
+        """Wait for the leader to land, return False if it did not in time."""
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            in_flight = PromptFlight.objects.filter(
+                key=self.key, landed=False, expires_at__gt=timezone.now()
+            ).exists()
+            if not in_flight:
+                return True
+            time.sleep(poll_interval)
+        return False
+
+    def land(self, completed: bool = True) -> None:
+        """
+        End the flight led by this instance.
+
+        Args:
+            completed: Whether the call got its answer; duplicates of an aborted
+                or failed call are not absorbed afterwards, they are retries.
+        """
+        flight = PromptFlight.objects.filter(key=self.key, token=self.token)
+        if completed:
+            flight.update(
+                token="",
+                landed=True,
+                expires_at=timezone.now() + timedelta(seconds=RECENT_WINDOW),
+            )
+        else:
+            flight.delete()
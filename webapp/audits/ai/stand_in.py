@@ -0,0 +1,215 @@
+"""
+Offline stand-in for the AI model, to develop and load-test without API calls.
+
+Selected with `ANTHROPIC_MODEL=stand-in`, optionally followed by its options,
+e.g. `stand-in:latency=0.8,tokens_per_second=60,jitter=0.2`. The stand-in waits
+like a real model would (time to first token, then output tokens at a given
+rate) and answers with a canned text, or with a verdict for every criterion of
+a group assessment.
+
+Like Anthropic models, the stand-in caches the prompt prefixes marked by the
+`anthropic_cache_*` model settings, and reports the cache reads and writes in
+its usage.
+"""
+
+import asyncio
+import hashlib
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, fields
+
+from pydantic_ai.messages import ModelMessage, ModelResponse, TextPart, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+from pydantic_ai.usage import RequestUsage
+
+STAND_IN_PREFIX = "stand-in"
+
+DEFAULT_ANSWER = (
+    "**Partially compliant**\n\n"
+    "This is an offline answer of the stand-in model: no AI model was called."
+)
+
+# Criteria of the group system prompt are headed by "### <public id>: <name>"
+_CRITERION_HEADER = re.compile(r"^### (.+?): ", re.MULTILINE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text, about 4 characters per token."""
+    return max(1, len(text) // 4)
+
+
+@dataclass
+class StandInOptions:
+    """
+    Behavior of the stand-in model.
+
+    Args:
+        latency: Seconds before the first token.
+        tokens_per_second: Output rate, 0 to answer at once after `latency`.
+        jitter: Random variation of the delays, as a fraction of them.
+        answer: Text answer.
+    """
+
+    latency: float = 0.5
+    tokens_per_second: float = 50.0
+    jitter: float = 0.0
+    answer: str = DEFAULT_ANSWER
+
+    @classmethod
+    def parse(cls, spec: str) -> "StandInOptions":
+        """
+        Parse a `stand-in[:name=value,...]` model name.
+
+        Raises:
+            ValueError: If the spec is not a stand-in model or an option is invalid.
+        """
+        name, _, options = spec.partition(":")
+        if name != STAND_IN_PREFIX:
+            raise ValueError(f"Not a stand-in model: {spec}")
+        numeric = {field.name for field in fields(cls)} - {"answer"}
+        kwargs = {}
+        for option in filter(None, options.split(",")):
+            key, _, value = option.partition("=")
+            key = key.strip()
+            if key not in numeric:
+                raise ValueError(f"Unknown stand-in option: {key}")
+            kwargs[key] = float(value)
+        return cls(**kwargs)
+
+    def delay(self, output_tokens: int) -> float:
+        delay = self.latency
+        if self.tokens_per_second:
+            delay += output_tokens / self.tokens_per_second
+        if self.jitter:
+            delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return max(0.0, delay)
+
+
+CACHE_TTLS = {"5m": 300, "1h": 3600}
+
+
+class PromptCache:
+    """Prompt prefixes cached by the stand-in, until their TTL expires."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._expiry: dict[str, float] = {}
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._expiry.clear()
+
+    def use(
+        self, candidates: list[str], breakpoints: list[tuple[str, str | bool]]
+    ) -> tuple[int, int]:
+        """
+        Read the longest cached candidate prefix, then cache the breakpoints.
+
+        Returns:
+            The read and written tokens.
+        """
+        now = time.monotonic()
+        with self._lock:
+            read = max(
+                (
+                    estimate_tokens(text)
+                    for text in candidates
+                    if self._expiry.get(self._key(text), 0) > now
+                ),
+                default=0,
+            )
+            for text, ttl in breakpoints:
+                self._expiry[self._key(text)] = now + CACHE_TTLS.get(ttl, 300)
+        if not breakpoints:
+            return read, 0
+        longest = max(estimate_tokens(text) for text, _ in breakpoints)
+        return read, max(0, longest - read)
+
+
+prompt_cache = PromptCache()
+
+
+def _messages_text(messages: list[ModelMessage]) -> str:
+    return "".join(
+        f"{message.kind}:{getattr(part, 'content', '')}\n"
+        for message in messages
+        for part in message.parts
+    )
+
+
+def _cache_prefixes(
+    messages: list[ModelMessage], info: AgentInfo
+) -> tuple[list[str], list[tuple[str, str | bool]]]:
+    """
+    Cacheable prompt prefixes: the ones a cache hit can be found for, and the
+    ones marked as cache breakpoints, as Anthropic models place them.
+    """
+    model_settings = info.model_settings or {}
+    instructions = info.instructions or ""
+    candidates, breakpoints = [], []
+    if ttl := model_settings.get("anthropic_cache_instructions"):
+        candidates.append(instructions)
+        breakpoints.append((instructions, ttl))
+    if ttl := model_settings.get("anthropic_cache_messages"):
+        # The breakpoints of the previous turns are found again
+        candidates.extend(
+            instructions + _messages_text(messages[:end])
+            for end in range(1, len(messages) + 1)
+        )
+        breakpoints.append((instructions + _messages_text(messages), ttl))
+    return candidates, breakpoints
+
+
+def is_stand_in(model) -> bool:
+    return isinstance(model, str) and model.split(":", 1)[0] == STAND_IN_PREFIX
+
+
+def _output_args(info: AgentInfo) -> dict:
+    """Arguments of the output tool: a verdict per criterion of the prompt."""
+    public_ids = _CRITERION_HEADER.findall(info.instructions or "")
+    return {
+        "verdicts": [
+            {
+                "public_id": public_id,
+                "status": "PARTIALLY_COMPLIANT",
+                "rationale": DEFAULT_ANSWER,
+            }
+            for public_id in public_ids
+        ]
+    }
+
+
+def stand_in_model(options: StandInOptions | None = None) -> FunctionModel:
+    """Build a function model simulating the latency and output rate of a model."""
+    options = options or StandInOptions()
+
+    async def answer(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        input_text = (info.instructions or "") + _messages_text(messages)
+        cache_read, cache_write = prompt_cache.use(*_cache_prefixes(messages, info))
+        if info.output_tools:
+            args = _output_args(info)
+            part = ToolCallPart(info.output_tools[0].name, args)
+            output_tokens = estimate_tokens(str(args))
+        else:
+            part = TextPart(options.answer)
+            output_tokens = estimate_tokens(options.answer)
+
+        await asyncio.sleep(options.delay(output_tokens))
+        return ModelResponse(
+            parts=[part],
+            usage=RequestUsage(
+                input_tokens=estimate_tokens(input_text),
+                output_tokens=output_tokens,
+                cache_read_tokens=cache_read,
+                cache_write_tokens=cache_write,
+            ),
+            model_name=STAND_IN_PREFIX,
+        )
+
+    return FunctionModel(answer, model_name=STAND_IN_PREFIX)
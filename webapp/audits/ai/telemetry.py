@@ -0,0 +1,121 @@
+"""
+Usage and latency telemetry of the AI agent calls.
+
+Every call is saved as a `PromptTurn` and added, in the same transaction, to the
+`AIUsageDaily` rollup of its project, day and model: usage reports only read
+the rollups, never the raw turns.
+"""
+
+from dataclasses import dataclass
+
+from audits.models.audit import AIUsageDaily, Prompt, PromptTurn
+from core.metrics import AI_DURATION
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from pydantic_ai.usage import RunUsage
+
+
+@dataclass
+class TurnMetrics:
+    """What an agent call cost and how long it took."""
+
+    model: str
+    latency: float
+    usage: RunUsage | None = None
+    error: BaseException | None = None
+
+
+def get_model_name(agent) -> str:
+    model = agent.model
+    return getattr(model, "model_name", None) or str(model)
+
+
+def record_turn(
+    organization_id: int,
+    project_id: int,
+    metrics: TurnMetrics,
+    prompt: Prompt | None = None,
+    user=None,
+) -> PromptTurn:
+    """Save an agent call and add it to the daily rollup of its project."""
+    usage = metrics.usage or RunUsage()
+    latency_ms = round(metrics.latency * 1000)
+    AI_DURATION.observe(
+        metrics.latency,
+        model=metrics.model,
+        outcome="error" if metrics.error else "ok",
+    )
+    with transaction.atomic():
+        turn = PromptTurn.objects.create(
+            organization_id=organization_id,
+            project_id=project_id,
+            prompt=prompt,
+            user=user,
+            model=metrics.model,
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            cache_read_tokens=usage.cache_read_tokens,
+            cache_write_tokens=usage.cache_write_tokens,
+            latency_ms=latency_ms,
+            error_class=type(metrics.error).__name__ if metrics.error else "",
+        )
+        rollup, _ = AIUsageDaily.objects.get_or_create(
+            organization_id=organization_id,
+            project_id=project_id,
+            day=timezone.localdate(turn.created_at),
+            model=metrics.model,
+        )
+        AIUsageDaily.objects.filter(pk=rollup.pk).update(
+            turns=F("turns") + 1,
+            errors=F("errors") + (1 if metrics.error else 0),
+            input_tokens=F("input_tokens") + usage.input_tokens,
+            output_tokens=F("output_tokens") + usage.output_tokens,
+            cache_read_tokens=F("cache_read_tokens") + usage.cache_read_tokens,
+            cache_write_tokens=F("cache_write_tokens") + usage.cache_write_tokens,
+            latency_ms_total=F("latency_ms_total") + latency_ms,
+            latency_ms_max=Greatest(F("latency_ms_max"), latency_ms),
+        )
+    return turn
+
+
+USAGE_TOTALS = {
+    "turns": Sum("turns"),
+    "errors": Sum("errors"),
+    "input_tokens": Sum("input_tokens"),
+    "output_tokens": Sum("output_tokens"),
+    "cache_read_tokens": Sum("cache_read_tokens"),
+    "cache_write_tokens": Sum("cache_write_tokens"),
+    "latency_ms_total": Sum("latency_ms_total"),
+    "latency_ms_max": Max("latency_ms_max"),
+}
+
+
+def _with_mean_latency(rows) -> list[dict]:
+    rows = list(rows)
+    for row in rows:
+        row["latency_ms_mean"] = (
+            round(row["latency_ms_total"] / row["turns"]) if row["turns"] else 0
+        )
+    return rows
+
+
+def usage_by_day(organization_id: int, since) -> list[dict]:
+    """Usage of an organization per day since `since`, most recent first."""
+    return _with_mean_latency(
+        AIUsageDaily.objects.filter(organization_id=organization_id, day__gte=since)
+        .values("day")
+        .annotate(**USAGE_TOTALS)
+        .order_by("-day")
+    )
+
+
+def usage_by_project(organization_id: int, since) -> list[dict]:
+    """Usage of the projects of an organization since `since`, per model."""
+    return _with_mean_latency(
+        AIUsageDaily.objects.filter(organization_id=organization_id, day__gte=since)
+        .values("project_id", "project__name", "model")
+        .annotate(**USAGE_TOTALS)
+        .order_by("project__name", "model")
+    )
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AuditsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "audits"
+
+    def ready(self):
+        # Register the signal handlers invalidating the prompt templates cache,
+        # keeping the resource indexes in sync with their resources, and the
+        # activity and search documents of the criteria, comments and prompts
+        from audits import activity, search  # noqa: F401
+        from audits.ai import prompt_templates, retrieval  # noqa: F401
@@ -0,0 +1,97 @@
+"""
+Purge of the projects, project audits and resources soft deleted more than
+`SOFT_DELETE_RETENTION_DAYS` ago, run by the `purge_deleted` command.
+
+A project or an audit comes with the criteria, comments and prompts of its
+audits: millions of rows for a mature project, which a single `delete()` would
+load at once, in one long transaction. Here the criteria are deleted by chunks
+of ids, each chunk in its own transaction so that locks are short, with a pause
+between the chunks for the replicas to keep up. Each chunk is deleted with
+`QuerySet.delete()`, so the signals of the deleted rows are sent. The few
+remaining rows (audits, assessment runs, resources...) are deleted at the end.
+"""
+
+import time
+from datetime import timedelta
+
+from audits.models.audit import ProjectAudit, ProjectAuditCriterion, PromptTurn
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+from organization.models.organization import Project, Resource
+
+BATCH_SIZE = 1000
+
+
+def _chunks(queryset: QuerySet, batch_size: int, pause: float = 0.0):
+    """
+    Ids of the rows of `queryset`, by chunks, as they are deleted, with a pause
+    after each chunk.
+    """
+    while ids := list(
+        queryset.order_by("id").values_list("id", flat=True)[:batch_size]
+    ):
+        yield ids
+        if pause:
+            time.sleep(pause)
+
+
+def _delete_criteria(criteria: QuerySet, batch_size: int, pause: float) -> int:
+    deleted = 0
+    for ids in _chunks(criteria, batch_size, pause):
+        with transaction.atomic():
+            # With their comments, prompts and search documents; the usage of
+            # the AI calls is kept
+            _, counts = ProjectAuditCriterion.objects.filter(id__in=ids).delete()
+            deleted += counts.get(ProjectAuditCriterion._meta.label, 0)
+    return deleted
+
+
+def delete_project_audit(
+    audit: ProjectAudit, batch_size: int = BATCH_SIZE, pause: float = 0.0
+) -> None:
+    _delete_criteria(
+        ProjectAuditCriterion.objects.filter(project_audit=audit), batch_size, pause
+    )
+    ProjectAudit.all_objects.filter(id=audit.id).delete()
+
+
+def delete_project(
+    project: Project, batch_size: int = BATCH_SIZE, pause: float = 0.0
+) -> None:
+    _delete_criteria(
+        ProjectAuditCriterion.objects.filter(project_audit__project=project),
+        batch_size,
+        pause,
+    )
+    for ids in _chunks(PromptTurn.objects.filter(project=project), batch_size, pause):
+        PromptTurn.objects.filter(id__in=ids).delete()
+    Project.all_objects.filter(id=project.id).delete()
+
+
+def purge_deleted(
+    retention: timedelta, batch_size: int = BATCH_SIZE, pause: float = 0.0
+) -> dict[str, int]:
+    """
+    Hard delete the projects, audits and resources soft deleted more than
+    `retention` ago, and return their number by model name.
+    """
+    deleted_before = timezone.now() - retention
+    purged = {}
+    for model, delete in (
+        (Project, delete_project),
+        (ProjectAudit, delete_project_audit),
+    ):
+        expired = model.all_objects.filter(deleted_at__lte=deleted_before)
+        purged[model._meta.model_name] = 0
+        for ids in _chunks(expired, batch_size):
+            for instance in model.all_objects.filter(id__in=ids):
+                delete(instance, batch_size, pause)
+                purged[model._meta.model_name] += 1
+    # Few rows each, deleted with the signals cleaning their snapshots up
+    expired = Resource.all_objects.filter(deleted_at__lte=deleted_before)
+    purged["resource"] = 0
+    for ids in _chunks(expired, batch_size, pause):
+        Resource.all_objects.filter(id__in=ids).delete()
+        purged["resource"] += len(ids)
+    return purged
@@ -0,0 +1,224 @@
+"""
+Live updates of the pages open on a project audit.
+
+Views publish the changes of an audit (criteria statuses, comments) as Turbo
+Stream actions, stored as `AuditEvent` rows: the database is the broker. Pages
+subscribe with a `<turbo-stream-source>` to a server-sent events stream, which
+polls the events after the cursor of the page, so only the changed tiles or
+comments are patched.
+
+Fragments depending on the user (e.g. a comment with its edit links) are not
+pushed: the action replaces them with a turbo frame, which each page loads with
+its own session.
+
+Under WSGI, each open stream holds a worker thread, polling the database every
+`AUDIT_EVENTS_POLL_INTERVAL` seconds, for `AUDIT_EVENTS_STREAM_TIMEOUT`
+seconds, then ends: the browser reconnects from its last event id. A process
+serves at most `AUDIT_EVENTS_MAX_STREAMS` streams, which must stay below its
+worker threads: the other pages are told to reconnect after
+`AUDIT_EVENTS_BUSY_RETRY` milliseconds, and still work without live updates.
+
+Event ids are allocated on insert, not on commit: an event may become visible
+after an event with a greater id. Besides the events after its cursor, a stream
+reads again the events of the last `AUDIT_EVENTS_OVERLAP` seconds, and sends
+the ones it has not sent yet.
+"""
+
+import threading
+import time
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+
+from audits.models.audit import AuditEvent, ProjectAuditCriterion
+from django.conf import settings
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+EVENTS_BATCH_SIZE = 100
+# Seconds without event after which a comment line is sent
+KEEPALIVE_INTERVAL = 15
+
+_streams_lock = threading.Lock()
+# Streams open in this process
+_open_streams = 0
+
+
+def turbo_stream(action: str, target: str, content: str = "") -> str:
+    """
+    Turbo Stream element applying `action` to the element with id `target`,
+    with the `content` HTML.
+    """
+    if action == "remove":
+        return format_html(
+            '<turbo-stream action="remove" target="{}"></turbo-stream>', target
+        )
+    return format_html(
+        '<turbo-stream action="{}" target="{}"><template>{}</template>'
+        "</turbo-stream>",
+        action,
+        target,
+        mark_safe(content),
+    )
+
+
+def lazy_frame(frame_id: str, src: str) -> str:
+    """Turbo frame loading its content from `src`."""
+    return format_html('<turbo-frame id="{}" src="{}"></turbo-frame>', frame_id, src)
+
+
+def publish(project_audit_id: int, *streams: str) -> AuditEvent:
+    """
+    Push Turbo Stream actions to the pages open on an audit.
+
+    Call it once the change is committed, and outside of a transaction: an
+    event committed late, after events with greater ids were streamed, is only
+    sent if it was created less than `AUDIT_EVENTS_OVERLAP` seconds ago. The
+    expired events of the audit are deleted.
+    """
+    retention = timezone.now() - timedelta(seconds=settings.AUDIT_EVENTS_RETENTION)
+    AuditEvent.objects.filter(
+        project_audit_id=project_audit_id, created_at__lt=retention
+    ).delete()
+    return AuditEvent.objects.create(
+        project_audit_id=project_audit_id, stream="".join(streams)
+    )
+
+
+def tile_stream(criterion: ProjectAuditCriterion) -> str:
+    """Update the tile of a criterion on the audit grid."""
+    content = render_to_string(
+        "audits/projectaudit/tile.html", {"criterion": criterion}
+    )
+    return turbo_stream("update", f"criterion_tile_{criterion.id}", content)
+
+
+def _comment_fragment_url(criterion: ProjectAuditCriterion, comment_id: int) -> str:
+    return reverse(
+        "audits:comment_fragment",
+        kwargs={
+            "project_slug": criterion.project_audit.project.slug,
+            "audit_id": criterion.project_audit_id,
+            "criterion_id": criterion.id,
+            "pk": comment_id,
+        },
+    )
+
+
+def publish_status(criterion: ProjectAuditCriterion) -> AuditEvent:
+    """Push the new status of a criterion."""
+    return publish(criterion.project_audit_id, tile_stream(criterion))
+
+
+def publish_comment(
+    criterion: ProjectAuditCriterion, comment_id: int, action: str
+) -> AuditEvent:
+    """
+    Push a comment of `criterion` "created", "updated" or "deleted", and the
+    new activity of the criterion.
+    """
+    target = f"comment_{comment_id}"
+    if action == "deleted":
+        stream = turbo_stream("remove", target)
+    else:
+        frame = lazy_frame(target, _comment_fragment_url(criterion, comment_id))
+        if action == "created":
+            stream = turbo_stream("prepend", f"comments_{criterion.id}", frame)
+        else:
+            stream = turbo_stream("replace", target, frame)
+    criterion.refresh_from_db(
+        fields=["comment_count", "prompt_session_count", "last_activity_at"]
+    )
+    return publish(criterion.project_audit_id, stream, tile_stream(criterion))
+
+
+def last_event_id(project_audit_id: int) -> int:
+    """Cursor of a page rendered now: the id of the last event of the audit."""
+    event = (
+        AuditEvent.objects.filter(project_audit_id=project_audit_id)
+        .order_by("-id")
+        .only("id")
+        .first()
+    )
+    return event.id if event else 0
+
+
+def _format_event(event: AuditEvent, cursor: int) -> str:
+    data = "".join(f"data: {line}\n" for line in event.stream.splitlines())
+    # The id is the cursor the browser reconnects from, even when the event
+    # was committed after greater ones
+    return f"id: {cursor}\n{data}\n"
+
+
+def _open_stream() -> bool:
+    """Take a stream slot of the process, return False if all are taken."""
+    global _open_streams
+    with _streams_lock:
+        if _open_streams >= settings.AUDIT_EVENTS_MAX_STREAMS:
+            return False
+        _open_streams += 1
+        return True
+
+
+def _close_stream() -> None:
+    global _open_streams
+    with _streams_lock:
+        _open_streams -= 1
+
+
+def _poll_events(project_audit_id: int, cursor: int) -> Iterator[str]:
+    events = AuditEvent.objects.filter(project_audit_id=project_audit_id)
+    overlap = timedelta(seconds=settings.AUDIT_EVENTS_OVERLAP)
+    # Recent events already sent, by id; those before the cursor were sent by
+    # the previous streams of the page
+    sent: dict[int, datetime] = dict(
+        events.filter(
+            id__lte=cursor, created_at__gte=timezone.now() - overlap
+        ).values_list("id", "created_at")
+    )
+    yield f"retry: {settings.AUDIT_EVENTS_RETRY}\n\n"
+    start = last_write = time.monotonic()
+    while True:
+        window_start = timezone.now() - overlap
+        sent = {
+            event_id: created
+            for event_id, created in sent.items()
+            if created >= window_start
+        }
+        new_events = list(
+            events.filter(Q(id__gt=cursor) | Q(created_at__gte=window_start))
+            .exclude(id__in=sent)
+            .order_by("id")[:EVENTS_BATCH_SIZE]
+        )
+        now = time.monotonic()
+        for event in new_events:
+            cursor = max(cursor, event.id)
+            sent[event.id] = event.created_at
+            yield _format_event(event, cursor)
+            last_write = now
+        if now - last_write >= KEEPALIVE_INTERVAL:
+            # Keeps the connection open through proxies, and detects the
+            # disconnected clients
+            yield ": keepalive\n\n"
+            last_write = now
+        if now - start >= settings.AUDIT_EVENTS_STREAM_TIMEOUT:
+            return
+        time.sleep(settings.AUDIT_EVENTS_POLL_INTERVAL)
+
+
+def stream_events(project_audit_id: int, cursor: int) -> Iterator[str]:
+    """
+    Server-sent events of an audit after `cursor`, polled until the stream
+    times out, or a later retry when the process serves too many streams.
+    """
+    if not _open_stream():
+        yield f"retry: {settings.AUDIT_EVENTS_BUSY_RETRY}\n\n"
+        return
+    try:
+        yield from _poll_events(project_audit_id, cursor)
+    finally:
+        # Also when the response is closed, the client being disconnected
+        _close_stream()
@@ -1,7 +1,14 @@
 import uuid
 
-from audits.models.audit import AuditLibrary, Comment, ProjectAuditCriterion
+from audits.ai.retrieval import SnapshotError, is_archive, resolve_local_path
+from audits.models.audit import (
+    AssessmentRun,
+    AuditLibrary,
+    Comment,
+    ProjectAuditCriterion,
+)
 from django import forms
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from organization.models.organization import Project, Resource
 
@@ -63,6 +70,50 @@ class ResourceForm(forms.ModelForm):
         }
 
 
+class ResourceSnapshotForm(forms.Form):
+    """Snapshot of a resource: an uploaded archive or a local checkout."""
+
+    archive = forms.FileField(
+        label=_("Archive"),
+        required=False,
+        help_text=_("A zip or tar archive of the resource files"),
+    )
+    path = forms.CharField(
+        label=_("Local checkout"),
+        required=False,
+        max_length=1024,
+        help_text=_("Path of a checkout on the server"),
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not settings.RESOURCE_SNAPSHOT_LOCAL_ROOTS:
+            del self.fields["path"]
+
+    def clean_archive(self):
+        archive = self.cleaned_data.get("archive")
+        if archive and not is_archive(archive.name):
+            raise forms.ValidationError(_("Upload a zip or tar archive"))
+        return archive
+
+    def clean_path(self):
+        path = self.cleaned_data.get("path")
+        if not path:
+            return path
+        try:
+            return str(resolve_local_path(path))
+        except SnapshotError as err:
+            raise forms.ValidationError(str(err))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if bool(cleaned_data.get("archive")) == bool(cleaned_data.get("path")):
+            raise forms.ValidationError(
+                _("Upload an archive or give the path of a local checkout")
+            )
+        return cleaned_data
+
+
 class StatusUpdateForm(forms.ModelForm):
     class Meta:
         model = ProjectAuditCriterion
@@ -73,3 +124,9 @@ class StatusUpdateForm(forms.ModelForm):
         if status not in ProjectAuditCriterion.ProjectAuditCriterionStatus.values:
             raise forms.ValidationError(_("Invalid status"))
         return status
+
+
+class AssessmentRunForm(forms.ModelForm):
+    class Meta:
+        model = AssessmentRun
+        fields = ["grouping", "group_size"]
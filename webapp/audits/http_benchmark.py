@@ -0,0 +1,299 @@
+"""
+End-to-end benchmark of the hot pages of the webapp.
+
+The pages of an organization, typically seeded by `seed_scale`, are requested
+by concurrent workers, either in-process with Django's test client, or over
+HTTP against a running server (`base_url`). Each page gets its latency
+percentiles, queries (in-process only) and bytes per response.
+
+Runs are appended to a JSON history file, which also stores a baseline run:
+`compare` lists the metrics of a run which regressed beyond their threshold.
+"""
+
+import json
+import math
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass, field
+from pathlib import Path
+from statistics import fmean
+
+from audits.models.audit import ProjectAudit, ProjectAuditCriterion
+from core.middleware import CURRENT_ORGANIZATION_SESSION_KEY
+from core.query_budget import record_queries
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from organization.models.organization import Organization
+
+# Runs kept in the history file
+HISTORY_LIMIT = 100
+
+
+@dataclass
+class Endpoint:
+    name: str
+    url: str
+
+
+@dataclass
+class Thresholds:
+    # Relative increase of the p50 and p95 latencies, and of the response size
+    latency: float = 0.2
+    size: float = 0.1
+    # Additional queries per request
+    queries: float = 0
+
+
+@dataclass
+class EndpointResult:
+    name: str
+    latencies: list[float] = field(default_factory=list)
+    # Empty over HTTP, where the queries are not seen
+    queries: list[int] = field(default_factory=list)
+    sizes: list[int] = field(default_factory=list)
+    errors: int = 0
+
+    def percentile(self, percent: float) -> float:
+        """Latency (seconds) under which `percent`% of the requests are served."""
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        rank = max(1, math.ceil(percent / 100 * len(latencies)))
+        return latencies[rank - 1]
+
+    def summary(self) -> dict:
+        return {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "p50_ms": round(self.percentile(50) * 1000, 2),
+            "p95_ms": round(self.percentile(95) * 1000, 2),
+            "p99_ms": round(self.percentile(99) * 1000, 2),
+            "queries": round(fmean(self.queries), 1) if self.queries else None,
+            "bytes": round(fmean(self.sizes)) if self.sizes else 0,
+        }
+
+
+@dataclass
+class Regression:
+    endpoint: str
+    metric: str
+    baseline: float
+    current: float
+
+    def __str__(self) -> str:
+        return f"{self.endpoint} {self.metric}: {self.baseline} -> {self.current}"
+
+
+def hot_endpoints(organization: Organization) -> list[Endpoint]:
+    """
+    Hot pages of an organization: the dashboard, the project list, and the
+    first audit of its first project, with its most commented criterion.
+    """
+    endpoints = [
+        Endpoint("dashboard", reverse("dashboard")),
+        Endpoint("project_list", reverse("audits:project_list")),
+    ]
+    audit = (
+        ProjectAudit.objects.filter(project__organization=organization)
+        .select_related("project")
+        .order_by("project__name", "id")
+        .first()
+    )
+    if audit is None:
+        return endpoints
+    slug = audit.project.slug
+    endpoints.append(
+        Endpoint(
+            "projectaudit_detail",
+            reverse("audits:projectaudit_detail", args=[slug, audit.id]),
+        )
+    )
+    criterion = (
+        ProjectAuditCriterion.objects.filter(project_audit=audit)
+        .order_by("-comment_count", "id")
+        .first()
+    )
+    if criterion is not None:
+        endpoints += [
+            Endpoint(
+                "projectauditcriterion_detail",
+                reverse(
+                    "audits:projectauditcriterion_detail",
+                    args=[slug, audit.id, criterion.id],
+                ),
+            ),
+            Endpoint(
+                "comments_list",
+                reverse("audits:comments_list", args=[slug, audit.id, criterion.id]),
+            ),
+        ]
+    return endpoints
+
+
+def _allowed_host() -> str:
+    for host in settings.ALLOWED_HOSTS:
+        if host and host != "*" and not host.startswith("."):
+            return host
+    return "localhost"
+
+
+def _logged_client(user, organization: Organization) -> Client:
+    client = Client(raise_request_exception=False, HTTP_HOST=_allowed_host())
+    client.force_login(user)
+    session = client.session
+    session[CURRENT_ORGANIZATION_SESSION_KEY] = (organization.id, organization.name)
+    session.save()
+    return client
+
+
+class _Worker(threading.Thread):
+    def __init__(self, requests: queue.Queue, results: dict, lock, get):
+        super().__init__(daemon=True)
+        self.requests = requests
+        self.results = results
+        self.lock = lock
+        self.get = get
+
+    def run(self):
+        try:
+            while True:
+                try:
+                    endpoint, measured = self.requests.get_nowait()
+                except queue.Empty:
+                    return
+                with record_queries() as recorder:
+                    start = time.perf_counter()
+                    status, size = self.get(endpoint.url)
+                    latency = time.perf_counter() - start
+                if not measured:
+                    continue
+                result = self.results[endpoint.name]
+                with self.lock:
+                    if status != 200:
+                        result.errors += 1
+                    result.latencies.append(latency)
+                    result.sizes.append(size)
+                    if recorder.queries:
+                        result.queries.append(len(recorder.queries))
+        finally:
+            connections.close_all()
+
+
+def _client_get(user, organization: Organization):
+    """In-process GET, with a test client logged in for each worker."""
+    local = threading.local()
+
+    def get(url: str) -> tuple[int, int]:
+        if not hasattr(local, "client"):
+            local.client = _logged_client(user, organization)
+        response = local.client.get(url)
+        return response.status_code, len(response.content)
+
+    return get
+
+
+def _http_get(base_url: str, user, organization: Organization):
+    """GET over HTTP, with the session cookie of a logged in test client."""
+    client = _logged_client(user, organization)
+    cookie = f"{settings.SESSION_COOKIE_NAME}={client.session.session_key}"
+
+    def get(url: str) -> tuple[int, int]:
+        request = urllib.request.Request(
+            base_url.rstrip("/") + url, headers={"Cookie": cookie}
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, len(response.read())
+        except urllib.error.HTTPError as error:
+            return error.code, len(error.read())
+
+    return get
+
+
+def run_benchmark(
+    endpoints: list[Endpoint],
+    user,
+    organization: Organization,
+    requests: int = 50,
+    concurrency: int = 1,
+    warmup: int = 2,
+    base_url: str | None = None,
+) -> dict[str, EndpointResult]:
+    """
+    Request each endpoint `warmup` times (not measured), then `requests` times,
+    with `concurrency` workers.
+    """
+    if base_url:
+        get = _http_get(base_url, user, organization)
+    else:
+        get = _client_get(user, organization)
+    pending: queue.Queue[tuple[Endpoint, bool]] = queue.Queue()
+    for endpoint in endpoints:
+        for _ in range(warmup):
+            pending.put((endpoint, False))
+    for _ in range(requests):
+        for endpoint in endpoints:
+            pending.put((endpoint, True))
+    results = {endpoint.name: EndpointResult(endpoint.name) for endpoint in endpoints}
+    lock = threading.Lock()
+    workers = [_Worker(pending, results, lock, get) for _ in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results
+
+
+def make_run(
+    results: dict[str, EndpointResult], concurrency: int, base_url: str | None
+) -> dict:
+    """History entry of a benchmark run."""
+    return {
+        "date": timezone.now().isoformat(timespec="seconds"),
+        "target": base_url or "client",
+        "concurrency": concurrency,
+        "endpoints": {name: result.summary() for name, result in results.items()},
+    }
+
+
+def load_history(path: Path) -> dict:
+    if not path.exists():
+        return {"baseline": None, "runs": []}
+    return json.loads(path.read_text())
+
+
+def save_history(path: Path, history: dict, run: dict, baseline: bool = False):
+    """Append `run` to the history at `path`, and make it the baseline."""
+    history["runs"] = [*history["runs"], run][-HISTORY_LIMIT:]
+    if baseline:
+        history["baseline"] = run
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(history, indent=2) + "\n")
+
+
+def compare(run: dict, baseline: dict, thresholds: Thresholds) -> list[Regression]:
+    """Metrics of the endpoints of `run` which regressed from `baseline`."""
+    regressions = []
+    for name, current in run["endpoints"].items():
+        previous = baseline["endpoints"].get(name)
+        if previous is None:
+            continue
+        limits = {
+            "p50_ms": previous["p50_ms"] * (1 + thresholds.latency),
+            "p95_ms": previous["p95_ms"] * (1 + thresholds.latency),
+            "bytes": previous["bytes"] * (1 + thresholds.size),
+        }
+        if previous["queries"] is not None and current["queries"] is not None:
+            limits["queries"] = previous["queries"] + thresholds.queries
+        for metric, limit in limits.items():
+            if current[metric] > limit:
+                regressions.append(
+                    Regression(name, metric, previous[metric], current[metric])
+                )
+    return regressions
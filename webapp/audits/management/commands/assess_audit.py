@@ -0,0 +1,59 @@
+from audits.ai.assessment import AssessmentRunner, get_assessment_run
+from audits.models.audit import AssessmentRun, ProjectAudit
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Assess every criterion of a project audit with AI. "
+        "Resume the latest assessment of the audit if it was interrupted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("project_audit_id", type=int)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=None,
+            help="Maximum number of concurrent agent calls",
+        )
+        parser.add_argument(
+            "--grouping",
+            choices=AssessmentRun.AssessmentRunGrouping.values,
+            default=AssessmentRun.AssessmentRunGrouping.NONE,
+            help="Assess criteria one by one, or in groups by tag or by chunk",
+        )
+        parser.add_argument(
+            "--group-size",
+            type=int,
+            default=10,
+            help="Maximum number of criteria assessed by a single agent call",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            project_audit = ProjectAudit.objects.get(id=options["project_audit_id"])
+        except ProjectAudit.DoesNotExist:
+            raise CommandError(
+                f"Project audit {options['project_audit_id']} does not exist"
+            )
+
+        if options["group_size"] < 1:
+            raise CommandError("--group-size must be a positive integer")
+
+        run, created = get_assessment_run(
+            project_audit,
+            grouping=options["grouping"],
+            group_size=options["group_size"],
+        )
+        if not created:
+            self.stdout.write(f"Resuming assessment run {run.id}")
+
+        run = AssessmentRunner(run, concurrency=options["concurrency"]).run_sync()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Assessment run {run.id}: {run.succeeded}/{run.total} criteria "
+                f"assessed, {run.failed} failed"
+            )
+        )
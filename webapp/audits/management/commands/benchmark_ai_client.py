@@ -0,0 +1,27 @@
+from audits.ai.benchmark import run_benchmark
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare agent calls opening a new HTTP connection each with the pooled "
+        "agent factory, against a local stand-in of the Anthropic API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.0,
+            help="Seconds the stand-in server waits before answering",
+        )
+
+    def handle(self, *args, **options):
+        results = run_benchmark(options["requests"], options["latency"])
+        for result in results:
+            self.stdout.write(
+                f"{result.name}: {result.requests} requests, "
+                f"{result.connections} connections, "
+                f"{result.duration:.3f}s ({result.mean_ms:.2f} ms/request)"
+            )
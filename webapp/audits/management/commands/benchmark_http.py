@@ -0,0 +1,136 @@
+from pathlib import Path
+
+from audits.http_benchmark import (
+    Thresholds,
+    compare,
+    hot_endpoints,
+    load_history,
+    make_run,
+    run_benchmark,
+    save_history,
+)
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from organization.models.organization import Organization
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the hot pages (dashboard, project list, audit, criterion and "
+        "comments) of an organization, e.g. one generated by seed_scale: report "
+        "latency percentiles, queries and bytes per request, append the run to a "
+        "JSON history and compare it with the baseline of the history."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("organization", help="Name of the organization")
+        parser.add_argument(
+            "--user",
+            help="Email or username of the member browsing, the first member by "
+            "default",
+        )
+        parser.add_argument(
+            "--requests", type=int, default=50, help="Measured requests per page"
+        )
+        parser.add_argument(
+            "--warmup", type=int, default=2, help="Unmeasured requests per page"
+        )
+        parser.add_argument("--concurrency", type=int, default=1)
+        parser.add_argument(
+            "--base-url",
+            help="URL of a running server, e.g. http://localhost:8000, sharing the "
+            "database; the pages are requested in-process by default, which also "
+            "counts their queries",
+        )
+        parser.add_argument(
+            "--history",
+            type=Path,
+            default=settings.BASE_DIR / "var" / "benchmarks" / "http.json",
+        )
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Make this run the baseline of the history",
+        )
+        parser.add_argument(
+            "--latency-threshold",
+            type=float,
+            default=Thresholds.latency,
+            help="Relative increase of the p50 and p95 latencies failing the run",
+        )
+        parser.add_argument(
+            "--size-threshold",
+            type=float,
+            default=Thresholds.size,
+            help="Relative increase of the response size failing the run",
+        )
+        parser.add_argument(
+            "--queries-threshold",
+            type=float,
+            default=Thresholds.queries,
+            help="Additional queries per request failing the run",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            organization = Organization.objects.get(name=options["organization"])
+        except Organization.DoesNotExist:
+            raise CommandError(f"Organization {options['organization']} does not exist")
+        members = User.objects.filter(
+            organization_memberships__organization=organization
+        ).order_by("id")
+        if options["user"]:
+            members = members.filter(
+                Q(email=options["user"]) | Q(username=options["user"])
+            )
+        user = members.first()
+        if user is None:
+            raise CommandError(f"No such member of {organization.name}")
+
+        endpoints = hot_endpoints(organization)
+        results = run_benchmark(
+            endpoints,
+            user,
+            organization,
+            requests=options["requests"],
+            concurrency=options["concurrency"],
+            warmup=options["warmup"],
+            base_url=options["base_url"],
+        )
+        run = make_run(results, options["concurrency"], options["base_url"])
+        for name, summary in run["endpoints"].items():
+            queries = (
+                "" if summary["queries"] is None else f", {summary['queries']} queries"
+            )
+            self.stdout.write(
+                f"{name}: p50 {summary['p50_ms']:.0f} ms, p95 "
+                f"{summary['p95_ms']:.0f} ms, p99 {summary['p99_ms']:.0f} ms"
+                f"{queries}, {summary['bytes']} bytes"
+                + (f" ({summary['errors']} errors)" if summary["errors"] else "")
+            )
+
+        history = load_history(options["history"])
+        baseline = history["baseline"]
+        save_history(options["history"], history, run, options["save_baseline"])
+        self.stdout.write(f"Run saved to {options['history']}")
+        if options["save_baseline"]:
+            return
+        if baseline is None:
+            self.stdout.write("No baseline yet, see --save-baseline")
+            return
+        thresholds = Thresholds(
+            latency=options["latency_threshold"],
+            size=options["size_threshold"],
+            queries=options["queries_threshold"],
+        )
+        regressions = compare(run, baseline, thresholds)
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(f"Regression of {regression}")
+            raise CommandError(
+                f"{len(regressions)} regressions from the baseline of "
+                f"{baseline['date']}"
+            )
+        self.stdout.write(f"No regression from the baseline of {baseline['date']}")
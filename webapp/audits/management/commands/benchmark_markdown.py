@@ -0,0 +1,25 @@
+from audits.rendering_benchmark import run_benchmark
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the markdown rendering of long AI transcripts with a new "
+        "Markdown instance per message, the reused instance and the caches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--messages", type=int, default=40, help="Messages per transcript"
+        )
+        parser.add_argument(
+            "--views", type=int, default=20, help="Renders of the transcript"
+        )
+
+    def handle(self, *args, **options):
+        results = run_benchmark(options["messages"], options["views"])
+        for result in results:
+            self.stdout.write(
+                f"{result.name}: {result.messages} messages, "
+                f"{result.duration:.3f}s ({result.mean_us:.1f} µs/message)"
+            )
@@ -0,0 +1,84 @@
+import time
+
+from audits.ai.retrieval import get_project_index, index_snapshot
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from organization.models.organization import Project, ResourceSnapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Update the search index of the resource snapshots, e.g. after local "
+        "checkouts changed. Only the files whose hash changed are indexed again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--project",
+            type=int,
+            default=None,
+            help="Only index the resources of this project",
+        )
+        parser.add_argument(
+            "--search",
+            default=None,
+            help="Search the index of --project instead, and time the search",
+        )
+
+    def handle(self, *args, **options):
+        if options["search"] is not None:
+            if options["project"] is None:
+                raise CommandError("--search needs --project")
+            return self._search(options["project"], options["search"])
+
+        snapshots = (
+            ResourceSnapshot.objects.filter(
+                status__in=[
+                    ResourceSnapshot.Status.INDEXED,
+                    ResourceSnapshot.Status.FAILED,
+                ],
+                resource__deleted_at=None,
+            )
+            .select_related("resource")
+            .order_by("resource_id", "-created_at")
+        )
+        if options["project"] is not None:
+            snapshots = snapshots.filter(resource__project_id=options["project"])
+
+        indexed = set()
+        for snapshot in snapshots:
+            # Only the latest snapshot of each resource
+            if snapshot.resource_id in indexed:
+                continue
+            indexed.add(snapshot.resource_id)
+            start = time.perf_counter()
+            try:
+                stats = index_snapshot(snapshot)
+            except Exception as err:
+                self.stderr.write(f"{snapshot}: {err}")
+                continue
+            self.stdout.write(
+                f"{snapshot.resource}: {stats.files} files, {stats.chunks} chunks "
+                f"({stats.added} added, {stats.updated} updated, {stats.removed} "
+                f"removed) in {time.perf_counter() - start:.2f}s"
+            )
+        self.stdout.write(self.style.SUCCESS(f"{len(indexed)} resources indexed"))
+
+    def _search(self, project_id: int, text: str) -> None:
+        if not Project.objects.filter(id=project_id).exists():
+            raise CommandError(f"Project {project_id} does not exist")
+        start = time.perf_counter()
+        excerpts = get_project_index(project_id).search(
+            text, settings.AI_RETRIEVAL_TOP_K
+        )
+        duration = time.perf_counter() - start
+        for excerpt in excerpts:
+            self.stdout.write(
+                f"{excerpt.score:.2f} {excerpt.path}:"
+                f"{excerpt.start_line}-{excerpt.end_line}"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(excerpts)} excerpts found in {duration * 1000:.1f}ms"
+            )
+        )
@@ -0,0 +1,114 @@
+from audits.ai.loadtest import (
+    delete_load_test_prompts,
+    recorded_conversations,
+    run_load_test,
+    synthetic_conversations,
+)
+from audits.ai.stand_in import is_stand_in
+from audits.models.audit import ProjectAuditCriterion, Prompt
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the AI prompt flow offline: replay recorded prompt sessions "
+        "and synthetic conversations against the prompt view, with the stand-in "
+        "model, and report latency percentiles and worker occupancy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "email", help="Email of the user sending the prompts, a writer or admin"
+        )
+        parser.add_argument(
+            "--sessions",
+            type=int,
+            default=0,
+            help="Number of recorded prompt sessions to replay",
+        )
+        parser.add_argument(
+            "--synthetic",
+            type=int,
+            default=0,
+            help="Number of synthetic conversations",
+        )
+        parser.add_argument(
+            "--turns", type=int, default=2, help="Questions per synthetic conversation"
+        )
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument(
+            "--model",
+            default="stand-in",
+            help="Stand-in model, e.g. stand-in:latency=0.8,tokens_per_second=60",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--rate-limit",
+            action="store_true",
+            help="Apply the AI rate limits, disabled by default",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the prompt sessions created by the load test",
+        )
+
+    def handle(self, *args, **options):
+        if not is_stand_in(options["model"]):
+            raise CommandError("The load test only runs with a stand-in model")
+        try:
+            user = User.objects.get(email=options["email"])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['email']} does not exist")
+
+        organization_ids = user.organization_memberships.values("organization_id")
+        conversations = recorded_conversations(
+            Prompt.objects.filter(
+                project_audit_criterion__project_audit__project__organization_id__in=(
+                    organization_ids
+                )
+            ),
+            limit=options["sessions"],
+        )
+        if options["synthetic"]:
+            criteria = list(
+                ProjectAuditCriterion.objects.filter(
+                    project_audit__project__organization_id__in=organization_ids
+                ).select_related("project_audit__project__organization")
+            )
+            conversations += synthetic_conversations(
+                criteria, options["synthetic"], options["turns"], options["seed"]
+            )
+        if not conversations:
+            raise CommandError("No conversation to send")
+
+        overridden = {"ANTHROPIC_MODEL": options["model"]}
+        if not options["rate_limit"]:
+            overridden.update(AI_RATE_LIMIT_ORGANIZATION=None, AI_RATE_LIMIT_USER={})
+        previous = {name: getattr(settings, name) for name in overridden}
+        for name, value in overridden.items():
+            setattr(settings, name, value)
+        try:
+            result = run_load_test(conversations, user, options["workers"])
+        finally:
+            for name, value in previous.items():
+                setattr(settings, name, value)
+        if not options["keep"]:
+            delete_load_test_prompts(result)
+
+        self.stdout.write(
+            f"{result.requests} requests ({result.errors} errors) in "
+            f"{result.duration:.2f}s, {result.throughput:.1f} requests/s"
+        )
+        self.stdout.write(
+            "Latency: "
+            + ", ".join(
+                f"p{percent} {result.percentile(percent) * 1000:.0f} ms"
+                for percent in (50, 95, 99)
+            )
+        )
+        self.stdout.write(
+            f"Worker occupancy: {result.occupancy:.0%} of {result.workers} workers"
+        )
@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from audits.deletion import BATCH_SIZE, purge_deleted
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Hard delete the projects, project audits and resources soft deleted "
+        "more than SOFT_DELETE_RETENTION_DAYS ago, by small batches. To be "
+        "scheduled, e.g. daily."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retention-days",
+            type=int,
+            default=settings.SOFT_DELETE_RETENTION_DAYS,
+            help="Only purge the rows soft deleted this many days ago",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Rows deleted by each statement",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.1,
+            help="Seconds to wait between the batches, for the replicas to keep up",
+        )
+
+    def handle(self, *args, **options):
+        purged = purge_deleted(
+            timedelta(days=options["retention_days"]),
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{purged['project']} projects, {purged['projectaudit']} audits "
+                f"and {purged['resource']} resources purged"
+            )
+        )
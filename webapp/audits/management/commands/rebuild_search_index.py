@@ -0,0 +1,21 @@
+from audits.search import BATCH_SIZE, rebuild_index
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the full-text search documents of the criteria, comments and "
+        "AI discussions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Number of documents created per query",
+        )
+
+    def handle(self, *args, **options):
+        indexed = rebuild_index(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"{indexed} documents indexed"))
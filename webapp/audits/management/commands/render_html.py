@@ -0,0 +1,24 @@
+from audits.rerender import BATCH_SIZE, rerender_comments, rerender_prompts
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the HTML stored with the comments and prompt messages which were "
+        "never rendered, or by an older renderer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Render every row again, even the up to date ones",
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        comments = rerender_comments(options["force"], options["batch_size"])
+        prompts = rerender_prompts(options["force"], options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"{comments} comments and {prompts} prompts rendered")
+        )
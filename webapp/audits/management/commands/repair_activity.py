@@ -0,0 +1,25 @@
+from audits.activity import repair_activity
+from audits.models.audit import ProjectAuditCriterion
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the comment and prompt session counts, and the last activity, "
+        "of the audit criteria from their comments and prompts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--audit",
+            type=int,
+            default=None,
+            help="Only repair the criteria of this project audit",
+        )
+
+    def handle(self, *args, **options):
+        queryset = ProjectAuditCriterion.objects.all()
+        if options["audit"] is not None:
+            queryset = queryset.filter(project_audit_id=options["audit"])
+        repaired = repair_activity(queryset)
+        self.stdout.write(self.style.SUCCESS(f"{repaired} criteria repaired"))
@@ -0,0 +1,69 @@
+from audits.seeding import BATCH_SIZE, Shape, seed_scale
+from django.core.management.base import BaseCommand, CommandError
+from organization.models.organization import Organization
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic organization at production scale (projects, "
+        "libraries, criteria, comments and prompt sessions), reproducible from "
+        "its seed."
+    )
+
+    def add_arguments(self, parser):
+        defaults = Shape()
+        parser.add_argument(
+            "--name", default=None, help='Organization name (default "Scale <seed>")'
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed")
+        for option, kind, help in [
+            ("projects", int, "Projects"),
+            ("libraries", int, "Audit libraries"),
+            ("criteria", int, "Criteria of each library"),
+            ("audits", int, "Audits of each project"),
+            ("resources", int, "Resources of each project"),
+            ("users", int, "Members of the organization"),
+            ("comments", float, "Average comments of a criterion of an audit"),
+            (
+                "prompt_sessions",
+                float,
+                "Average prompt sessions of a criterion of an audit",
+            ),
+        ]:
+            parser.add_argument(
+                f"--{option.replace('_', '-')}",
+                type=kind,
+                default=getattr(defaults, option),
+                help=f"{help} (default {getattr(defaults, option)})",
+            )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Rows inserted per query",
+        )
+
+    def handle(self, *args, **options):
+        name = options["name"] or f"Scale {options['seed']}"
+        if Organization.objects.filter(name=name).exists():
+            raise CommandError(f'The organization "{name}" already exists')
+        shape = Shape(
+            **{option: options[option] for option in Shape.__dataclass_fields__}
+        )
+
+        def progress(model: str, count: int) -> None:
+            if options["verbosity"] >= 2:
+                self.stdout.write(f"{model}: {count}")
+
+        result = seed_scale(
+            name, shape, options["seed"], options["batch_size"], progress
+        )
+        for model, count in result.counts.items():
+            self.stdout.write(f"{model}: {count}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Organization "{name}" (id {result.organization.id}) seeded with '
+                f"{sum(result.counts.values())} rows in {result.duration:.1f}s"
+            )
+        )
+        self.stdout.write("Run rebuild_search_index to make it searchable.")
@@ -0,0 +1,40 @@
+# Generated by Django 6.0.2 on 2026-10-19 07:12
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("audits", "0003_assessmentrun"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="assessmentrun",
+            name="group_size",
+            field=models.PositiveSmallIntegerField(
+                default=10,
+                validators=[
+                    django.core.validators.MinValueValidator(1),
+                    django.core.validators.MaxValueValidator(50),
+                ],
+                verbose_name="Maximum criteria per request",
+            ),
+        ),
+        migrations.AddField(
+            model_name="assessmentrun",
+            name="grouping",
+            field=models.CharField(
+                choices=[
+                    ("NONE", "One request per criterion"),
+                    ("TAG", "Criteria grouped by tag"),
+                    ("CHUNK", "Criteria grouped in chunks"),
+                ],
+                default="NONE",
+                max_length=255,
+                verbose_name="Grouping",
+            ),
+        ),
+    ]
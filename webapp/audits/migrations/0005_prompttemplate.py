@@ -0,0 +1,50 @@
+# Generated by Django 6.0.2 on 2026-10-19 07:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("audits", "0004_assessmentrun_grouping"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PromptTemplate",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                (
+                    "name",
+                    models.CharField(
+                        choices=[
+                            ("system_prompt", "System prompt"),
+                            ("group_system_prompt", "Group system prompt"),
+                        ],
+                        max_length=255,
+                        verbose_name="Name",
+                    ),
+                ),
+                ("content", models.TextField(verbose_name="Content")),
+                (
+                    "audit_library",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="prompt_templates",
+                        to="audits.auditlibrary",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("audit_library", "name"),
+                        name="unique_prompt_template_per_library",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-19 08:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("audits", "0006_prompt_turn_ai_usage_daily"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="comment_html",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="html_version",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="prompt",
+            name="html_version",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 6.0.2 on 2026-10-19 08:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("audits", "0007_rendered_html"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["project_audit_criterion", "created_at", "id"],
+                name="audits_comm_project_bc2d23_idx",
+            ),
+        ),
+    ]
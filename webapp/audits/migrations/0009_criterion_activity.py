@@ -0,0 +1,55 @@
+# Generated by Django 6.0.2 on 2026-10-19 08:58
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def compute_activity(apps, schema_editor):
+    ProjectAuditCriterion = apps.get_model("audits", "ProjectAuditCriterion")
+    criteria = ProjectAuditCriterion.objects.annotate(
+        comments_total=Count("comments", distinct=True),
+        prompts_total=Count("prompts", distinct=True),
+        last_comment_at=Max("comments__updated_at"),
+        last_prompt_at=Max("prompts__updated_at"),
+    ).filter(models.Q(comments_total__gt=0) | models.Q(prompts_total__gt=0))
+    updated = []
+    for criterion in criteria.iterator():
+        criterion.comment_count = criterion.comments_total
+        criterion.prompt_session_count = criterion.prompts_total
+        criterion.last_activity_at = max(
+            date
+            for date in (criterion.last_comment_at, criterion.last_prompt_at)
+            if date is not None
+        )
+        updated.append(criterion)
+    ProjectAuditCriterion.objects.bulk_update(
+        updated,
+        ["comment_count", "prompt_session_count", "last_activity_at"],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("audits", "0008_comment_keyset_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="projectauditcriterion",
+            name="comment_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="projectauditcriterion",
+            name="last_activity_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="projectauditcriterion",
+            name="prompt_session_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(compute_activity, migrations.RunPython.noop),
+    ]
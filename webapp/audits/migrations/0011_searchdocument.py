@@ -0,0 +1,130 @@
+# Generated by Django 6.0.2 on 2026-10-19 09:13
+
+import re
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+POSTGRESQL_INDEX = """
+ALTER TABLE audits_searchdocument ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{config}', title), 'A')
+        || setweight(to_tsvector('{config}', body), 'B')
+    ) STORED;
+CREATE INDEX audits_searchdocument_vector_idx
+    ON audits_searchdocument USING GIN (search_vector);
+"""
+
+# External content FTS5 table, kept in sync by triggers. The triggers are lost
+# if a later migration makes SQLite rebuild audits_searchdocument.
+SQLITE_INDEX = [
+    """
+    CREATE VIRTUAL TABLE audits_searchdocument_fts USING fts5(
+        title, body,
+        content='audits_searchdocument', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER audits_searchdocument_ai AFTER INSERT ON audits_searchdocument
+    BEGIN
+        INSERT INTO audits_searchdocument_fts(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER audits_searchdocument_ad AFTER DELETE ON audits_searchdocument
+    BEGIN
+        INSERT INTO audits_searchdocument_fts(
+            audits_searchdocument_fts, rowid, title, body
+        ) VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER audits_searchdocument_au AFTER UPDATE ON audits_searchdocument
+    BEGIN
+        INSERT INTO audits_searchdocument_fts(
+            audits_searchdocument_fts, rowid, title, body
+        ) VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO audits_searchdocument_fts(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+
+def create_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        config = settings.SEARCH_CONFIG
+        if not re.fullmatch(r"\w+", config):
+            raise ValueError(f"Invalid text search configuration: {config!r}")
+        schema_editor.execute(POSTGRESQL_INDEX.format(config=config))
+    elif vendor == "sqlite":
+        for statement in SQLITE_INDEX:
+            schema_editor.execute(statement)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS audits_searchdocument_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("audits", "0010_auditevent"),
+        ("organization", "0004_resourcesnapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchDocument",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("criterion", "Criterion"),
+                            ("comment", "Comment"),
+                            ("prompt", "AI discussion"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("object_id", models.PositiveIntegerField()),
+                ("title", models.CharField(max_length=255)),
+                ("body", models.TextField(blank=True, default="")),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "organization",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_documents",
+                        to="organization.organization",
+                    ),
+                ),
+                (
+                    "project_audit_criterion",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_documents",
+                        to="audits.projectauditcriterion",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("kind", "object_id"), name="unique_search_document"
+                    )
+                ],
+            },
+        ),
+        # Dropped with its table on PostgreSQL
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
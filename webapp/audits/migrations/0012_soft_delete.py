@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("audits", "0011_searchdocument"),
+        ("organization", "0006_soft_delete"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="projectaudit",
+            name="deleted_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="projectaudit",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["project"],
+                name="projectaudit_live_project_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="projectaudit",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True), _negated=True),
+                fields=["deleted_at"],
+                name="projectaudit_deleted_at_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.2 on 2026-10-19 11:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("audits", "0013_ratelimitbucket"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PromptFlight",
+            fields=[
+                (
+                    "key",
+                    models.CharField(max_length=255, primary_key=True, serialize=False),
+                ),
+                ("token", models.CharField(blank=True, max_length=32)),
+                ("landed", models.BooleanField(default=False)),
+                ("expires_at", models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-19 11:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("audits", "0014_promptflight"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CircuitBreakerState",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=255, primary_key=True, serialize=False),
+                ),
+                ("failures", models.PositiveIntegerField(default=0)),
+                ("total_failures", models.PositiveIntegerField(default=0)),
+                ("rejected_calls", models.PositiveIntegerField(default=0)),
+                ("last_failure", models.JSONField(blank=True, null=True)),
+                ("opened_at", models.FloatField(blank=True, null=True)),
+                ("probe_until", models.FloatField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 6.0.2 on 2026-10-19 11:44
+
+import uuid
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def split_duplicate_sessions(apps, schema_editor):
+    """Give a session of its own to the prompts created twice by a race."""
+    Prompt = apps.get_model("audits", "Prompt")
+    duplicates = (
+        Prompt.objects.values("project_audit_criterion", "session_id")
+        .annotate(count=Count("id"), first_id=Min("id"))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates.iterator():
+        prompts = Prompt.objects.filter(
+            project_audit_criterion=duplicate["project_audit_criterion"],
+            session_id=duplicate["session_id"],
+        ).exclude(id=duplicate["first_id"])
+        for prompt in prompts:
+            prompt.session_id = uuid.uuid4()
+            prompt.save(update_fields=["session_id"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("audits", "0015_circuitbreakerstate"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="prompt",
+            name="audits_prom_project_16d8da_idx",
+        ),
+        migrations.RunPython(split_duplicate_sessions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="prompt",
+            constraint=models.UniqueConstraint(
+                fields=("project_audit_criterion", "session_id"),
+                name="unique_prompt_session_per_criterion",
+            ),
+        ),
+    ]
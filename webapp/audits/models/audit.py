@@ -1,8 +1,15 @@
+from datetime import timedelta
 from uuid import uuid4
 
-from core.models.mixin import TimestampedModel
+from audits.rendering import RENDERER_VERSION, render
+from core.models.mixin import NOT_DELETED, SoftDeleteModel, TimestampedModel
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django_extensions.db.fields import AutoSlugField
 from organization.models.organization import Organization, Project
@@ -64,7 +71,35 @@ class Tag(TimestampedModel, models.Model):
         return self.name
 
 
-class ProjectAudit(TimestampedModel, models.Model):
+class PromptTemplate(TimestampedModel, models.Model):
+    """Audit library specific version of an AI prompt template."""
+
+    class PromptTemplateName(models.TextChoices):
+        SYSTEM_PROMPT = "system_prompt", _("System prompt")
+        GROUP_SYSTEM_PROMPT = "group_system_prompt", _("Group system prompt")
+
+    id = models.AutoField(primary_key=True)
+    audit_library = models.ForeignKey(
+        AuditLibrary, on_delete=models.CASCADE, related_name="prompt_templates"
+    )
+    name = models.CharField(
+        max_length=255, choices=PromptTemplateName.choices, verbose_name=_("Name")
+    )
+    content = models.TextField(verbose_name=_("Content"))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["audit_library", "name"],
+                name="unique_prompt_template_per_library",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.audit_library} - {self.get_name_display()}"
+
+
+class ProjectAudit(SoftDeleteModel, TimestampedModel, models.Model):
     """Audit instance for a specific project."""
 
     id = models.AutoField(primary_key=True)
@@ -75,6 +110,20 @@ class ProjectAudit(TimestampedModel, models.Model):
         AuditLibrary, on_delete=models.CASCADE, related_name="projects"
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["project"],
+                condition=NOT_DELETED,
+                name="projectaudit_live_project_idx",
+            ),
+            models.Index(
+                fields=["deleted_at"],
+                condition=~NOT_DELETED,
+                name="projectaudit_deleted_at_idx",
+            ),
+        ]
+
 
 class ProjectAuditCriterion(TimestampedModel, models.Model):
     """Assessment of a specific criterion for a project audit."""
@@ -99,10 +148,39 @@ class ProjectAuditCriterion(TimestampedModel, models.Model):
         default=ProjectAuditCriterionStatus.NOT_HANDLED_YET,
         verbose_name=_("Status"),
     )
+    # Activity displayed on the audit grid, kept up to date by the writes of
+    # the comments and prompts (see `record_activity`)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    prompt_session_count = models.PositiveIntegerField(default=0, editable=False)
+    last_activity_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return f"{self.criterion.public_id} - {self.criterion.name}"
 
+    @classmethod
+    def record_activity(
+        cls, criterion_id: int, comments: int = 0, prompt_sessions: int = 0, at=None
+    ) -> None:
+        """
+        Add to the activity counters of a criterion, and move its last activity
+        to `at` if it is later.
+
+        Call it in the transaction writing the comment or prompt.
+        """
+        values = {}
+        if comments:
+            values["comment_count"] = Greatest(F("comment_count") + comments, 0)
+        if prompt_sessions:
+            values["prompt_session_count"] = Greatest(
+                F("prompt_session_count") + prompt_sessions, 0
+            )
+        if at is not None:
+            values["last_activity_at"] = Greatest(
+                Coalesce(F("last_activity_at"), at), at
+            )
+        if values:
+            cls.objects.filter(id=criterion_id).update(**values)
+
 
 class Comment(TimestampedModel, models.Model):
     """User comment on a criterion assessment."""
@@ -117,6 +195,34 @@ class Comment(TimestampedModel, models.Model):
     comment = models.TextField(
         blank=True, default="", null=False, verbose_name=_("Comment")
     )
+    # Sanitized HTML of the comment, rendered when it is saved
+    comment_html = models.TextField(blank=True, default="", editable=False)
+    html_version = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the comments of a criterion
+            models.Index(fields=["project_audit_criterion", "created_at", "id"]),
+        ]
+
+    def render_html(self) -> None:
+        """Render the comment into `comment_html`."""
+        self.comment_html = render(self.comment) if self.comment else ""
+        self.html_version = RENDERER_VERSION
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if update_fields is None or "comment" in update_fields:
+            self.render_html()
+            if update_fields is not None:
+                update_fields = {*update_fields, "comment_html", "html_version"}
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, update_fields=update_fields, **kwargs)
+            ProjectAuditCriterion.record_activity(
+                self.project_audit_criterion_id,
+                comments=1 if adding else 0,
+                at=self.updated_at,
+            )
 
 
 class Prompt(TimestampedModel, models.Model):
@@ -129,12 +235,364 @@ class Prompt(TimestampedModel, models.Model):
     )
     name = models.CharField(max_length=255, default="Prompt")
     prompt = models.JSONField(blank=True, default=dict, null=False)
+    # Renderer of the "html" of the assistant and error messages
+    html_version = models.PositiveSmallIntegerField(default=0, editable=False)
+    assessment_run = models.ForeignKey(
+        "AssessmentRun",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="prompts",
+    )
 
     class Meta:
+        constraints = [
+            # A session of a criterion is created once, even by concurrent requests
+            models.UniqueConstraint(
+                fields=["project_audit_criterion", "session_id"],
+                name="unique_prompt_session_per_criterion",
+            ),
+        ]
         indexes = [
-            models.Index(fields=["project_audit_criterion", "session_id"]),
             models.Index(fields=["project_audit_criterion", "created_at"]),
         ]
 
     def __str__(self):
         return f"{self.name} ({self.created_at.strftime('%Y-%m-%d %H:%M:%S')})"
+
+    # Messages rendered from markdown; user messages are displayed as text
+    RENDERED_ROLES = ("assistant", "error")
+
+    def render_html(self) -> None:
+        """
+        Store the sanitized HTML of the messages under their "html" key.
+
+        Only the messages without HTML are rendered, unless it is stale.
+        """
+        stale = self.html_version != RENDERER_VERSION
+        for message in self.prompt.get("messages", []):
+            if message.get("role") in self.RENDERED_ROLES and (
+                stale or "html" not in message
+            ):
+                message["html"] = render(message.get("content") or "")
+        self.html_version = RENDERER_VERSION
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if update_fields is None or "prompt" in update_fields:
+            self.render_html()
+            if update_fields is not None:
+                update_fields = {*update_fields, "html_version"}
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, update_fields=update_fields, **kwargs)
+            ProjectAuditCriterion.record_activity(
+                self.project_audit_criterion_id,
+                prompt_sessions=1 if adding else 0,
+                at=self.updated_at,
+            )
+
+
+class AssessmentRun(TimestampedModel, models.Model):
+    """Batch AI pre-assessment of every criterion of a project audit."""
+
+    class AssessmentRunStatus(models.TextChoices):
+        PENDING = "PENDING", _("Pending")
+        RUNNING = "RUNNING", _("Running")
+        COMPLETED = "COMPLETED", _("Completed")
+        FAILED = "FAILED", _("Failed")
+
+    class AssessmentRunGrouping(models.TextChoices):
+        NONE = "NONE", _("One request per criterion")
+        TAG = "TAG", _("Criteria grouped by tag")
+        CHUNK = "CHUNK", _("Criteria grouped in chunks")
+
+    id = models.AutoField(primary_key=True)
+    project_audit = models.ForeignKey(
+        ProjectAudit, on_delete=models.CASCADE, related_name="assessment_runs"
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="assessment_runs",
+    )
+    status = models.CharField(
+        max_length=255,
+        choices=AssessmentRunStatus.choices,
+        default=AssessmentRunStatus.PENDING,
+        verbose_name=_("Status"),
+    )
+    grouping = models.CharField(
+        max_length=255,
+        choices=AssessmentRunGrouping.choices,
+        default=AssessmentRunGrouping.NONE,
+        verbose_name=_("Grouping"),
+    )
+    group_size = models.PositiveSmallIntegerField(
+        default=10,
+        validators=[MinValueValidator(1), MaxValueValidator(50)],
+        verbose_name=_("Maximum criteria per request"),
+    )
+    total = models.PositiveIntegerField(default=0)
+    succeeded = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["project_audit", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"Assessment #{self.id} ({self.get_status_display()})"
+
+    @property
+    def processed(self) -> int:
+        return self.succeeded + self.failed
+
+    @property
+    def progress(self) -> int:
+        """Percentage of processed criteria."""
+        if not self.total:
+            return 0
+        return int(self.processed * 100 / self.total)
+
+    @property
+    def is_stale(self) -> bool:
+        """
+        A running assessment which did not record any result for longer than
+        the worst case of a single criterion was interrupted (e.g. restart).
+        """
+        if self.status != self.AssessmentRunStatus.RUNNING:
+            return False
+        worst_case = settings.AI_ASSESSMENT_TIMEOUT * (
+            settings.AI_ASSESSMENT_MAX_RETRIES + 1
+        )
+        return timezone.now() - self.updated_at > timedelta(seconds=2 * worst_case)
+
+    @property
+    def is_active(self) -> bool:
+        return (
+            self.status
+            in (self.AssessmentRunStatus.PENDING, self.AssessmentRunStatus.RUNNING)
+            and not self.is_stale
+        )
+
+    @property
+    def is_resumable(self) -> bool:
+        """The run can be resumed to (re)assess missing or failed criteria."""
+        if self.status == self.AssessmentRunStatus.COMPLETED:
+            return self.failed > 0
+        return not self.is_active
+
+
+class PromptTurn(TimestampedModel, models.Model):
+    """Usage and latency of a single AI agent call."""
+
+    class CacheStatus(models.TextChoices):
+        HIT = "HIT", _("Hit")
+        WRITE = "WRITE", _("Write")
+        MISS = "MISS", _("Miss")
+
+    id = models.BigAutoField(primary_key=True)
+    organization = models.ForeignKey(
+        Organization, on_delete=models.CASCADE, related_name="prompt_turns"
+    )
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="prompt_turns"
+    )
+    prompt = models.ForeignKey(
+        Prompt,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="turns",
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="prompt_turns",
+    )
+    model = models.CharField(max_length=255, verbose_name=_("Model"))
+    input_tokens = models.PositiveIntegerField(default=0)
+    output_tokens = models.PositiveIntegerField(default=0)
+    cache_read_tokens = models.PositiveIntegerField(default=0)
+    cache_write_tokens = models.PositiveIntegerField(default=0)
+    latency_ms = models.PositiveIntegerField(default=0)
+    error_class = models.CharField(max_length=255, blank=True, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["organization", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.model} ({self.created_at.strftime('%Y-%m-%d %H:%M:%S')})"
+
+    @property
+    def cache_status(self) -> str:
+        """Whether the provider served the prompt prefix from its cache."""
+        if self.cache_read_tokens:
+            return self.CacheStatus.HIT
+        if self.cache_write_tokens:
+            return self.CacheStatus.WRITE
+        return self.CacheStatus.MISS
+
+
+class AIUsageDaily(models.Model):
+    """Daily rollup of the prompt turns of a project, per model."""
+
+    id = models.BigAutoField(primary_key=True)
+    organization = models.ForeignKey(
+        Organization, on_delete=models.CASCADE, related_name="ai_usage"
+    )
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="ai_usage"
+    )
+    day = models.DateField()
+    model = models.CharField(max_length=255, verbose_name=_("Model"))
+    turns = models.PositiveIntegerField(default=0)
+    errors = models.PositiveIntegerField(default=0)
+    input_tokens = models.PositiveBigIntegerField(default=0)
+    output_tokens = models.PositiveBigIntegerField(default=0)
+    cache_read_tokens = models.PositiveBigIntegerField(default=0)
+    cache_write_tokens = models.PositiveBigIntegerField(default=0)
+    latency_ms_total = models.PositiveBigIntegerField(default=0)
+    latency_ms_max = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["organization", "day", "project", "model"],
+                name="unique_ai_usage_per_day",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["project", "day"]),
+        ]
+
+    def __str__(self):
+        return f"{self.project} - {self.day} - {self.model}"
+
+
+class RateLimitBucket(models.Model):
+    """
+    Token bucket of the AI calls of an organization or a user (see
+    audits.ai.ratelimit), updated under a row lock.
+    """
+
+    key = models.CharField(max_length=255, primary_key=True)
+    # Theoretical arrival time of the next token, in milliseconds since the epoch
+    arrival = models.BigIntegerField()
+
+    def __str__(self):
+        return self.key
+
+
+class CircuitBreakerState(models.Model):
+    """
+    State and failure accounting of the circuit breaker of an AI provider (see
+    audits.ai.circuit), shared by every worker.
+    """
+
+    name = models.CharField(max_length=255, primary_key=True)
+    # Consecutive failures, reset by a success
+    failures = models.PositiveIntegerField(default=0)
+    total_failures = models.PositiveIntegerField(default=0)
+    rejected_calls = models.PositiveIntegerField(default=0)
+    last_failure = models.JSONField(null=True, blank=True)
+    # Times in seconds since the epoch: opening of the circuit, and end of the
+    # probe call in progress when half-open
+    opened_at = models.FloatField(null=True, blank=True)
+    probe_until = models.FloatField(null=True, blank=True)
+
+    def __str__(self):
+        return self.name
+
+
+class PromptFlight(models.Model):
+    """
+    Flight of the identical submissions of a prompt message (see
+    audits.ai.singleflight): the row is the lock of its leader.
+    """
+
+    key = models.CharField(max_length=255, primary_key=True)
+    # Token of the leader, until it lands
+    token = models.CharField(max_length=32, blank=True)
+    landed = models.BooleanField(default=False)
+    # End of the lock in flight, or of the absorption of duplicates once landed
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.key
+
+
+class AuditEvent(models.Model):
+    """
+    Change of a project audit, pushed to the pages open on it.
+
+    The increasing id is the cursor of the subscribers: they read the events
+    after the last one they received.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    project_audit = models.ForeignKey(
+        ProjectAudit, on_delete=models.CASCADE, related_name="events"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Turbo Stream actions applied by the pages
+    stream = models.TextField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["project_audit", "id"]),
+        ]
+
+    def __str__(self):
+        return f"Event #{self.id} of audit #{self.project_audit_id}"
+
+
+class SearchDocument(models.Model):
+    """
+    Searchable text of a criterion, comment or prompt, for the search of its
+    organization (see `audits.search`).
+
+    The full-text index is created by the migration for the database backend:
+    a generated tsvector column with a GIN index on PostgreSQL, an FTS5 table
+    kept in sync by triggers on SQLite.
+    """
+
+    class Kind(models.TextChoices):
+        CRITERION = "criterion", _("Criterion")
+        COMMENT = "comment", _("Comment")
+        PROMPT = "prompt", _("AI discussion")
+
+    id = models.BigAutoField(primary_key=True)
+    organization = models.ForeignKey(
+        Organization, on_delete=models.CASCADE, related_name="search_documents"
+    )
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    object_id = models.PositiveIntegerField()
+    # Criterion of the comment or prompt, to link the results to its page
+    project_audit_criterion = models.ForeignKey(
+        ProjectAuditCriterion,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="search_documents",
+    )
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True, default="")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "object_id"], name="unique_search_document"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.object_id}"
@@ -0,0 +1,35 @@
+"""
+Query budgets of the audits views (see `core.query_budget`), checked against
+the large dataset of audits/tests/views/test_query_budgets.py.
+"""
+
+from core.query_budget import QueryBudget, register
+
+register(
+    {
+        "audits:ai_status": QueryBudget(queries=10),
+        "audits:ai_usage": QueryBudget(queries=12),
+        "audits:search": QueryBudget(queries=12),
+        "audits:project_list": QueryBudget(queries=12),
+        "audits:project_form": QueryBudget(queries=10),
+        "audits:project_detail": QueryBudget(queries=13),
+        "audits:project_delete": QueryBudget(queries=11),
+        "audits:projectaudit_detail": QueryBudget(queries=18),
+        "audits:projectaudit_new": QueryBudget(queries=12),
+        "audits:projectaudit_delete": QueryBudget(queries=13),
+        "audits:projectaudit_assessment": QueryBudget(queries=15),
+        "audits:resource_detail": QueryBudget(queries=14),
+        "audits:resource_new": QueryBudget(queries=11),
+        "audits:resource_edit": QueryBudget(queries=13),
+        "audits:resource_delete": QueryBudget(queries=13),
+        "audits:resource_snapshot": QueryBudget(queries=14),
+        "audits:projectauditcriterion_detail": QueryBudget(queries=21),
+        "audits:comments_list": QueryBudget(queries=17),
+        "audits:comment_create": QueryBudget(queries=11),
+        "audits:comment_update": QueryBudget(queries=14),
+        "audits:comment_delete": QueryBudget(queries=14),
+        "audits:comment_form_cancel": QueryBudget(queries=10),
+        "audits:comment_fragment": QueryBudget(queries=15),
+        "audits:prompt": QueryBudget(queries=15),
+    }
+)
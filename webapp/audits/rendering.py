@@ -0,0 +1,244 @@
+"""
+Markdown rendering of criteria descriptions, comments and prompt messages.
+
+Building a `markdown.Markdown` instance loads its extensions, which costs more
+than converting a short message: each thread reuses its own instance, reset
+after every conversion. Rendered HTML is cached in two layers, keyed by the
+hash of the text: a per-process LRU, then the shared cache, so a long prompt
+history is only converted once for every worker.
+
+The HTML is sanitized: only an allowlist of tags and attributes is kept, so a
+text written by a user or by the model cannot inject scripts. Comments and
+prompt messages store it at write time, with the `RENDERER_VERSION` it was
+rendered with: bumping the version when the rendering changes makes the stored
+HTML stale, and re-rendered in the background (see `audits.rerender`).
+"""
+
+import hashlib
+import re
+import threading
+from functools import lru_cache
+from html import escape
+from html.parser import HTMLParser
+
+import markdown
+from core.metrics import CACHE_REQUESTS, record_cache, registry
+from django.core.cache import cache
+
+EXTENSIONS = ["extra", "nl2br"]
+# Bump when the rendering changes, to re-render the stored HTML
+RENDERER_VERSION = 2
+
+ALLOWED_TAGS = {
+    "a",
+    "abbr",
+    "b",
+    "blockquote",
+    "br",
+    "code",
+    "dd",
+    "del",
+    "div",
+    "dl",
+    "dt",
+    "em",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "hr",
+    "i",
+    "img",
+    "li",
+    "ol",
+    "p",
+    "pre",
+    "span",
+    "strong",
+    "sub",
+    "sup",
+    "table",
+    "tbody",
+    "td",
+    "tfoot",
+    "th",
+    "thead",
+    "tr",
+    "ul",
+}
+VOID_TAGS = {"br", "hr", "img"}
+# Tags dropped with their contents
+DROPPED_TAGS = {"script", "style", "iframe", "object", "embed", "template"}
+# Attributes by tag, "*" for every tag
+ALLOWED_ATTRIBUTES = {
+    "*": {"title"},
+    "a": {"class", "href", "rel"},
+    "code": {"class"},
+    "div": {"class"},
+    "img": {"src", "alt"},
+    "li": {"id"},
+    "sup": {"id"},
+    "td": {"style"},
+    "th": {"style"},
+}
+URL_ATTRIBUTES = {"href", "src"}
+ALLOWED_URL_SCHEMES = {"http", "https", "mailto"}
+# Values of the attributes markdown generates, the others are removed: a user
+# written class or id could restyle the page or clobber the id of an element
+# targeted by the page (Turbo frames and streams)
+_ALLOWED_VALUES = {
+    # Language of the fenced code blocks, and footnotes
+    "class": re.compile(
+        r"^(language-[\w+#.-]+|footnote|footnote-ref|footnote-backref)$"
+    ),
+    # Footnotes and their references
+    "id": re.compile(r"^fn(ref\d*)?:[\w-]+$"),
+    # Table column alignment
+    "style": re.compile(r"^text-align: (left|right|center);?$"),
+}
+
+CACHE_PREFIX = "audits:markdown"
+# Rendered texts kept by each process
+LRU_SIZE = 1024
+# Seconds a rendered text is kept in the shared cache
+CACHE_TIMEOUT = 7 * 24 * 3600
+# Shorter texts are converted faster than they are fetched from the shared cache
+SHARED_CACHE_MIN_LENGTH = 512
+
+_CODE_FENCE = re.compile(r"\n\s*```")
+
+_local = threading.local()
+
+
+def get_markdown() -> markdown.Markdown:
+    """Markdown converter of the current thread."""
+    converter = getattr(_local, "converter", None)
+    if converter is None:
+        converter = _local.converter = markdown.Markdown(extensions=EXTENSIONS)
+    return converter
+
+
+def convert(text: str) -> str:
+    """Convert markdown to HTML, without caching."""
+    # Avoid not well displayed code blocks
+    text = _CODE_FENCE.sub("\n```", text)
+    converter = get_markdown()
+    try:
+        return converter.convert(text)
+    finally:
+        converter.reset()
+
+
+def _is_safe_url(url: str) -> bool:
+    # Browsers ignore control characters and spaces in schemes
+    url = re.sub(r"[\x00-\x20]", "", url).lower()
+    scheme, separator, _ = url.partition(":")
+    if not separator or "/" in scheme or "?" in scheme or "#" in scheme:
+        # Relative URL
+        return True
+    return scheme in ALLOWED_URL_SCHEMES
+
+
+class _Sanitizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self.dropped_depth = 0
+
+    def _start(self, tag: str, attrs, self_closing: bool) -> None:
+        if tag in DROPPED_TAGS:
+            if not self_closing:
+                self.dropped_depth += 1
+            return
+        if self.dropped_depth or tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRIBUTES["*"] | ALLOWED_ATTRIBUTES.get(tag, set())
+        rendered = []
+        for name, value in attrs:
+            value = value or ""
+            if name not in allowed:
+                continue
+            if name in URL_ATTRIBUTES and not _is_safe_url(value):
+                continue
+            if name in _ALLOWED_VALUES and not _ALLOWED_VALUES[name].match(value):
+                continue
+            rendered.append(f' {name}="{escape(value)}"')
+        end = " />" if tag in VOID_TAGS else ">"
+        self.parts.append(f"<{tag}{''.join(rendered)}{end}")
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs, self_closing=False)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs, self_closing=True)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropped_depth = max(0, self.dropped_depth - 1)
+        elif not self.dropped_depth and tag in ALLOWED_TAGS and tag not in VOID_TAGS:
+            self.parts.append(f"</{tag}>")
+
+    def handle_data(self, data):
+        if not self.dropped_depth:
+            self.parts.append(escape(data, quote=False))
+
+
+def sanitize(html: str) -> str:
+    """
+    Keep the allowed tags and attributes of an HTML fragment.
+
+    Other tags are removed, keeping their text (escaped), except scripts and
+    the like which are removed with their contents. URLs must be relative or
+    use an allowed scheme.
+    """
+    sanitizer = _Sanitizer()
+    sanitizer.feed(html)
+    sanitizer.close()
+    return "".join(sanitizer.parts)
+
+
+def render(text: str) -> str:
+    """Convert markdown to sanitized HTML, without caching."""
+    return sanitize(convert(text))
+
+
+def _cache_key(text: str) -> str:
+    digest = hashlib.sha256(text.encode()).hexdigest()
+    return f"{CACHE_PREFIX}:{RENDERER_VERSION}:{digest}"
+
+
+@lru_cache(maxsize=LRU_SIZE)
+def _render(text: str) -> str:
+    if len(text) < SHARED_CACHE_MIN_LENGTH:
+        return render(text)
+    key = _cache_key(text)
+    html = cache.get(key)
+    record_cache("markdown_shared", html is not None)
+    if html is None:
+        html = render(text)
+        cache.set(key, html, CACHE_TIMEOUT)
+    return html
+
+
+@registry.collector
+def _collect_cache_info() -> None:
+    info = _render.cache_info()
+    CACHE_REQUESTS.set(info.hits, cache="markdown", result="hit")
+    CACHE_REQUESTS.set(info.misses, cache="markdown", result="miss")
+
+
+def render_markdown(text) -> str:
+    """
+    Convert markdown to sanitized HTML, from the caches when it was already
+    rendered.
+    """
+    if not text:
+        return ""
+    return _render(str(text))
+
+
+def clear_cache() -> None:
+    """Forget the texts rendered by this process."""
+    _render.cache_clear()
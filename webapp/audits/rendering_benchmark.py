@@ -0,0 +1,122 @@
+"""
+Micro-benchmark of the markdown rendering of prompt transcripts.
+
+A prompt page renders every message of its history on every view. The
+benchmark renders generated AI transcripts as the page does, comparing a new
+`markdown.Markdown` instance per message with the thread's reused instance, and
+with the per-process and shared caches of `audits.rendering`.
+"""
+
+import random
+import time
+from dataclasses import dataclass
+
+import markdown
+from audits import rendering
+
+VERDICTS = ["compliant", "partially compliant", "not compliant", "not applicable"]
+TOPICS = [
+    "encryption at rest",
+    "backup retention",
+    "access reviews",
+    "password hashing",
+    "audit logging",
+    "incident response",
+]
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    messages: int
+    duration: float
+
+    @property
+    def mean_us(self) -> float:
+        """Microseconds per rendered message."""
+        return self.duration / self.messages * 1_000_000 if self.messages else 0.0
+
+
+def generate_answer(rng: random.Random, sections: int = 4) -> str:
+    """A long assistant answer, formatted like the model answers."""
+    parts = [
+        f"## Verdict: **{rng.choice(VERDICTS)}**\n",
+        f"The criterion about {rng.choice(TOPICS)} is partially covered.",
+    ]
+    for number in range(1, sections + 1):
+        topic = rng.choice(TOPICS)
+        parts.append(f"\n### {number}. {topic.capitalize()}\n")
+        parts.extend(
+            f"- *{rng.choice(TOPICS)}*: evidence `{rng.randrange(1000)}` was "
+            f"reviewed and is {rng.choice(VERDICTS)}"
+            for _ in range(rng.randint(3, 6))
+        )
+        parts.append(
+            "\n| Control | Status |\n|---|---|\n"
+            + "".join(
+                f"| {rng.choice(TOPICS)} | {rng.choice(VERDICTS)} |\n" for _ in range(3)
+            )
+        )
+        parts.append(
+            "```python\n"
+            f"def check_{number}():\n"
+            f"    return settings.get({topic!r})\n"
+            "```"
+        )
+    return "\n".join(parts)
+
+
+def generate_transcript(messages: int, seed: int = 0) -> list[str]:
+    """Contents of the user and assistant messages of a long prompt session."""
+    rng = random.Random(seed)
+    return [
+        (
+            f"Is the {rng.choice(TOPICS)} evidence enough?"
+            if index % 2 == 0
+            else generate_answer(rng)
+        )
+        for index in range(messages)
+    ]
+
+
+def _render_new_instance(text: str) -> str:
+    # What the markdown filter used to do for every message
+    converter = markdown.Markdown(extensions=rendering.EXTENSIONS)
+    return converter.convert(text)
+
+
+def _time(name: str, render, transcript: list[str], views: int) -> BenchmarkResult:
+    start = time.perf_counter()
+    for _ in range(views):
+        for text in transcript:
+            render(text)
+    return BenchmarkResult(name, len(transcript) * views, time.perf_counter() - start)
+
+
+def run_benchmark(messages: int = 40, views: int = 20) -> list[BenchmarkResult]:
+    """
+    Render `views` times a transcript of `messages` messages.
+
+    Returns the results of: a new Markdown instance per message, the reused
+    instance of the thread, renders from the shared cache only, and from both
+    caches (the steady state of a process).
+    """
+    transcript = generate_transcript(messages)
+    results = [
+        _time("new instance", _render_new_instance, transcript, views),
+        _time("reused instance", rendering.convert, transcript, views),
+    ]
+
+    rendering.clear_cache()
+    for text in transcript:
+        rendering.render_markdown(text)
+
+    def render_from_shared_cache(text):
+        rendering.clear_cache()
+        return rendering.render_markdown(text)
+
+    results.append(_time("shared cache", render_from_shared_cache, transcript, views))
+    for text in transcript:
+        rendering.render_markdown(text)
+    results.append(_time("process cache", rendering.render_markdown, transcript, views))
+    return results
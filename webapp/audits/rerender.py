@@ -0,0 +1,114 @@
+"""
+Re-rendering of the HTML stored with comments and prompt messages.
+
+Rows rendered by an older `RENDERER_VERSION` (or never rendered) are stale.
+The first read of a stale row starts a background re-render of every stale row,
+once for all the workers: a lock in the shared cache elects the process doing
+it, and the rows are read and updated in batches.
+"""
+
+import logging
+import threading
+
+from audits.models.audit import Comment, Prompt
+from audits.rendering import RENDERER_VERSION
+from django.core.cache import cache
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "audits:rerender"
+# Seconds after which a re-render is assumed dead, and can be started again
+LOCK_TIMEOUT = 3600
+BATCH_SIZE = 200
+
+
+def _stale(queryset, force: bool):
+    if force:
+        return queryset
+    return queryset.exclude(html_version=RENDERER_VERSION)
+
+
+def _rerender(queryset, fields: list[str], force: bool, batch_size: int) -> int:
+    rendered = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                _stale(queryset, force)
+                .filter(id__gt=last_id)
+                .select_for_update(skip_locked=True)
+                .order_by("id")[:batch_size]
+            )
+            if not batch:
+                return rendered
+            for row in batch:
+                if force:
+                    # Rendered again even if it is up to date
+                    row.html_version = 0
+                row.render_html()
+            queryset.model.objects.bulk_update(batch, fields)
+        rendered += len(batch)
+        last_id = batch[-1].id
+
+
+def rerender_comments(force: bool = False, batch_size: int = BATCH_SIZE) -> int:
+    """Render the stale comments, or all of them with `force`; return their count."""
+    return _rerender(
+        Comment.objects.all(), ["comment_html", "html_version"], force, batch_size
+    )
+
+
+def rerender_prompts(force: bool = False, batch_size: int = BATCH_SIZE) -> int:
+    """Render the stale prompts, or all of them with `force`; return their count."""
+    return _rerender(
+        Prompt.objects.all(), ["prompt", "html_version"], force, batch_size
+    )
+
+
+def _done_key() -> str:
+    return f"{CACHE_PREFIX}:{RENDERER_VERSION}:done"
+
+
+def _lock_key() -> str:
+    return f"{CACHE_PREFIX}:{RENDERER_VERSION}:lock"
+
+
+def _rerender_in_background() -> None:
+    try:
+        comments = rerender_comments()
+        prompts = rerender_prompts()
+        cache.set(_done_key(), True, None)
+        logger.info(
+            "Rendered the HTML of %s comments and %s prompts (renderer %s)",
+            comments,
+            prompts,
+            RENDERER_VERSION,
+        )
+    except Exception:
+        logger.exception("Background re-render of the stored HTML failed")
+    finally:
+        cache.delete(_lock_key())
+        connections.close_all()
+
+
+def start_rerender() -> threading.Thread | None:
+    """
+    Re-render the stale rows in a background thread, unless they already were
+    or another process is doing it.
+    """
+    if cache.get(_done_key()) or not cache.add(_lock_key(), True, LOCK_TIMEOUT):
+        return None
+    thread = threading.Thread(
+        target=_rerender_in_background,
+        name=f"rerender-html-{RENDERER_VERSION}",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def ensure_rendered(rows) -> None:
+    """Start the background re-render if one of `rows` is stale."""
+    if any(row.html_version != RENDERER_VERSION for row in rows):
+        start_rerender()
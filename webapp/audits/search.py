@@ -0,0 +1,369 @@
+"""
+Full-text search of the criteria, comments and AI discussions of an
+organization.
+
+Each of them is copied, when it is saved, into a `SearchDocument` of its
+organization. The documents are indexed by the database: a generated tsvector
+column with a GIN index on PostgreSQL (weighting titles above bodies), an FTS5
+table on SQLite for local development and the tests.
+
+Results are ranked (ts_rank_cd, or BM25 on SQLite), highlighted, and paginated
+with a (rank, id) keyset cursor: only the page rows are highlighted. Ranking
+reads the whole document, so only the `SEARCH_MAX_CANDIDATES` most recent
+matches are ranked: a query matching more documents (e.g. a common word in a
+large organization) may miss older, better ranked ones.
+"""
+
+import re
+from dataclasses import dataclass, field
+
+from audits.models.audit import (
+    Comment,
+    Criterion,
+    ProjectAuditCriterion,
+    Prompt,
+    SearchDocument,
+)
+from core.pagination import KeysetPage, decode_cursor, encode_cursor
+from django.conf import settings
+from django.db import connection
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import Http404
+from django.utils.html import escape
+from django.utils.safestring import SafeString, mark_safe
+
+# Highlighted terms are delimited by control characters, replaced by <mark>
+# tags once the text is escaped
+MARK_START = "\x02"
+MARK_END = "\x03"
+_MARKS = re.compile(f"[{MARK_START}{MARK_END}]")
+_QUERY_TERMS = re.compile(r'"([^"]*)"|(\S+)')
+# Words in the highlights of the results
+HIGHLIGHT_WORDS = 30
+BATCH_SIZE = 500
+
+
+@dataclass
+class SearchResult:
+    document: SearchDocument
+    rank: float
+    # Excerpt of the body, with the matching terms in <mark> tags
+    highlight: SafeString
+    # Criteria of the audits the result links to
+    targets: list[ProjectAuditCriterion] = field(default_factory=list)
+    session_id: str | None = None
+
+
+def _clean(text: str) -> str:
+    return _MARKS.sub("", text or "")
+
+
+def _criterion_title(criterion: Criterion) -> str:
+    return f"{criterion.public_id} - {criterion.name}"[:255]
+
+
+def _prompt_body(prompt: Prompt) -> str:
+    return "\n\n".join(
+        message.get("content") or "" for message in prompt.prompt.get("messages", [])
+    )
+
+
+def build_criterion_document(criterion: Criterion) -> SearchDocument:
+    return SearchDocument(
+        organization_id=criterion.audit_library.organization_id,
+        kind=SearchDocument.Kind.CRITERION,
+        object_id=criterion.id,
+        title=_clean(_criterion_title(criterion)),
+        body=_clean(criterion.description),
+    )
+
+
+def build_comment_document(comment: Comment) -> SearchDocument:
+    criterion = comment.project_audit_criterion
+    return SearchDocument(
+        organization_id=criterion.project_audit.project.organization_id,
+        kind=SearchDocument.Kind.COMMENT,
+        object_id=comment.id,
+        project_audit_criterion=criterion,
+        title=_clean(_criterion_title(criterion.criterion)),
+        body=_clean(comment.comment),
+    )
+
+
+def build_prompt_document(prompt: Prompt) -> SearchDocument:
+    criterion = prompt.project_audit_criterion
+    return SearchDocument(
+        organization_id=criterion.project_audit.project.organization_id,
+        kind=SearchDocument.Kind.PROMPT,
+        object_id=prompt.id,
+        project_audit_criterion=criterion,
+        title=_clean(f"{prompt.name} - {_criterion_title(criterion.criterion)}")[:255],
+        body=_clean(_prompt_body(prompt)),
+    )
+
+
+def save_document(document: SearchDocument) -> None:
+    """Create or update the search document of an object."""
+    SearchDocument.objects.update_or_create(
+        kind=document.kind,
+        object_id=document.object_id,
+        defaults={
+            "organization_id": document.organization_id,
+            "project_audit_criterion": document.project_audit_criterion,
+            "title": document.title,
+            "body": document.body,
+        },
+    )
+
+
+@receiver(post_save, sender=Criterion)
+def on_criterion_save(sender, instance: Criterion, raw=False, **kwargs):
+    if not raw:
+        save_document(build_criterion_document(instance))
+
+
+@receiver(post_save, sender=Comment)
+def on_comment_save(sender, instance: Comment, raw=False, **kwargs):
+    if not raw:
+        save_document(build_comment_document(instance))
+
+
+@receiver(post_save, sender=Prompt)
+def on_prompt_save(sender, instance: Prompt, raw=False, **kwargs):
+    if not raw:
+        save_document(build_prompt_document(instance))
+
+
+@receiver(post_delete, sender=Criterion)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Prompt)
+def on_delete(sender, instance, **kwargs):
+    SearchDocument.objects.filter(
+        kind=sender._meta.model_name, object_id=instance.id
+    ).delete()
+
+
+def rebuild_index(batch_size: int = BATCH_SIZE) -> int:
+    """Replace every search document, and return their number."""
+    sources = [
+        (
+            Criterion.objects.select_related("audit_library"),
+            build_criterion_document,
+        ),
+        (
+            Comment.objects.select_related(
+                "project_audit_criterion__project_audit__project",
+                "project_audit_criterion__criterion",
+            ),
+            build_comment_document,
+        ),
+        (
+            Prompt.objects.select_related(
+                "project_audit_criterion__project_audit__project",
+                "project_audit_criterion__criterion",
+            ),
+            build_prompt_document,
+        ),
+    ]
+    SearchDocument.objects.all().delete()
+    total = 0
+    for queryset, build in sources:
+        batch = []
+        for row in queryset.order_by("id").iterator(chunk_size=batch_size):
+            batch.append(build(row))
+            if len(batch) >= batch_size:
+                SearchDocument.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+        total += len(batch)
+    return total
+
+
+def fts5_query(text: str) -> str:
+    """
+    FTS5 query matching every word and "quoted phrase" of `text`, without its
+    operators.
+    """
+    terms = []
+    for phrase, word in _QUERY_TERMS.findall(text):
+        term = phrase or word
+        if re.search(r"\w", term):
+            terms.append('"{}"'.format(term.replace('"', '""')))
+    return " ".join(terms)
+
+
+def _highlight(text: str) -> SafeString:
+    return mark_safe(
+        escape(text or "").replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+    )
+
+
+# The comments and prompts of the soft deleted audits are not found, until they
+# are purged: filtered by the query, so that the pages stay full
+_LIVE_AUDIT = """
+    AND ({document}.project_audit_criterion_id IS NULL OR NOT EXISTS (
+        SELECT 1 FROM audits_projectauditcriterion AS criterion
+        JOIN audits_projectaudit AS audit ON audit.id = criterion.project_audit_id
+        WHERE criterion.id = {document}.project_audit_criterion_id
+            AND audit.deleted_at IS NOT NULL
+    ))
+"""
+
+
+def _postgresql_sql(after: bool) -> str:
+    keyset = "AND (rank < %s OR (rank = %s AND id < %s))" if after else ""
+    return f"""
+        WITH candidates AS (
+            SELECT id
+            FROM audits_searchdocument,
+                websearch_to_tsquery(%s::regconfig, %s) AS query
+            WHERE organization_id = %s AND search_vector @@ query
+                {_LIVE_AUDIT.format(document="audits_searchdocument")}
+            ORDER BY id DESC
+            LIMIT %s
+        ),
+        matches AS (
+            -- In double precision, like the rank of the cursors
+            SELECT document.id,
+                ts_rank_cd(document.search_vector, query)::float8 AS rank
+            FROM candidates
+            JOIN audits_searchdocument AS document ON document.id = candidates.id
+            CROSS JOIN websearch_to_tsquery(%s::regconfig, %s) AS query
+        ),
+        page AS (
+            SELECT id, rank FROM matches
+            WHERE true {keyset}
+            ORDER BY rank DESC, id DESC
+            LIMIT %s
+        )
+        SELECT document.id, document.organization_id, document.kind,
+            document.object_id, document.project_audit_criterion_id,
+            document.title, document.updated_at, page.rank,
+            ts_headline(
+                %s::regconfig, document.body,
+                websearch_to_tsquery(%s::regconfig, %s), %s
+            ) AS highlight
+        FROM page JOIN audits_searchdocument AS document ON document.id = page.id
+        ORDER BY page.rank DESC, page.id DESC
+    """
+
+
+def _sqlite_sql(after: bool) -> str:
+    keyset = "AND (rank < %s OR (rank = %s AND id < %s))" if after else ""
+    return f"""
+        SELECT * FROM (
+            SELECT document.id, document.organization_id, document.kind,
+                document.object_id, document.project_audit_criterion_id,
+                document.title, document.updated_at,
+                -bm25(audits_searchdocument_fts, 10.0, 1.0) AS rank,
+                snippet(
+                    audits_searchdocument_fts, 1, char(2), char(3), '…', %s
+                ) AS highlight
+            FROM audits_searchdocument_fts
+            JOIN audits_searchdocument AS document
+                ON document.id = audits_searchdocument_fts.rowid
+            WHERE audits_searchdocument_fts MATCH %s
+                AND document.organization_id = %s
+                {_LIVE_AUDIT.format(document="document")}
+            ORDER BY document.id DESC
+            LIMIT %s
+        )
+        WHERE true {keyset}
+        ORDER BY rank DESC, id DESC
+        LIMIT %s
+    """
+
+
+def _query(organization_id: int, text: str, after: tuple | None, size: int):
+    keyset = [after[0], after[0], after[1]] if after else []
+    candidates = settings.SEARCH_MAX_CANDIDATES
+    if connection.vendor == "postgresql":
+        config = settings.SEARCH_CONFIG
+        options = (
+            f'StartSel="{MARK_START}", StopSel="{MARK_END}", '
+            f"MaxWords={HIGHLIGHT_WORDS}, MinWords={HIGHLIGHT_WORDS // 2}, "
+            "MaxFragments=2"
+        )
+        params = [config, text, organization_id, candidates, config, text]
+        params += [*keyset, size, config, config, text, options]
+        return SearchDocument.objects.raw(_postgresql_sql(bool(after)), params)
+    query = fts5_query(text)
+    if not query:
+        return []
+    params = [HIGHLIGHT_WORDS // 2, query, organization_id, candidates]
+    params += [*keyset, size]
+    return SearchDocument.objects.raw(_sqlite_sql(bool(after)), params)
+
+
+def search(
+    organization_id: int, text: str, cursor: str | None = None, size: int = 20
+) -> KeysetPage:
+    """
+    Page of the `SearchResult` of `text` in the documents of an organization,
+    best ranked first, after `cursor`.
+
+    Raise Http404 when the cursor is invalid.
+    """
+    after = None
+    if cursor:
+        try:
+            rank, id = decode_cursor(cursor)
+            after = (float(rank), id)
+        except (ValueError, TypeError) as err:
+            raise Http404("Invalid cursor") from err
+    if not text.strip():
+        return KeysetPage([], None)
+    # One more row tells whether there is a next page
+    documents = list(_query(organization_id, text, after, size + 1))
+    next_cursor = None
+    if len(documents) > size:
+        documents = documents[:size]
+        next_cursor = encode_cursor(documents[-1].rank, documents[-1].id)
+    results = [
+        SearchResult(document, document.rank, _highlight(document.highlight))
+        for document in documents
+    ]
+    _add_targets(organization_id, results)
+    return KeysetPage(results, next_cursor)
+
+
+def _add_targets(organization_id: int, results: list[SearchResult]) -> None:
+    """Add the criteria of the audits, and the prompt sessions, of the results."""
+    criterion_ids = set()
+    project_criterion_ids = set()
+    prompt_ids = set()
+    for result in results:
+        document = result.document
+        if document.kind == SearchDocument.Kind.CRITERION:
+            criterion_ids.add(document.object_id)
+        else:
+            project_criterion_ids.add(document.project_audit_criterion_id)
+        if document.kind == SearchDocument.Kind.PROMPT:
+            prompt_ids.add(document.object_id)
+    if not results:
+        return
+    targets = ProjectAuditCriterion.objects.filter(
+        project_audit__project__organization_id=organization_id,
+        project_audit__deleted_at=None,
+    ).select_related("project_audit__project", "project_audit__audit_library")
+    by_criterion: dict[int, list[ProjectAuditCriterion]] = {}
+    by_id = {}
+    for target in targets.filter(id__in=project_criterion_ids) | targets.filter(
+        criterion_id__in=criterion_ids
+    ):
+        by_criterion.setdefault(target.criterion_id, []).append(target)
+        by_id[target.id] = target
+    sessions = dict(
+        Prompt.objects.filter(id__in=prompt_ids).values_list("id", "session_id")
+    )
+    for result in results:
+        document = result.document
+        if document.kind == SearchDocument.Kind.CRITERION:
+            result.targets = by_criterion.get(document.object_id, [])
+        elif document.project_audit_criterion_id in by_id:
+            result.targets = [by_id[document.project_audit_criterion_id]]
+        if document.kind == SearchDocument.Kind.PROMPT:
+            session_id = sessions.get(document.object_id)
+            result.session_id = str(session_id) if session_id else None
@@ -0,0 +1,414 @@
+"""
+Synthetic organizations at production scale, to reproduce locally the
+performance of large tenants.
+
+Rows are inserted by batches, skipping the `save()` methods and the signals:
+the activity counters of the criteria and the stored HTML of the comments and
+prompts are computed here instead, from a pool of pre-rendered texts. The search
+documents are not created (run `rebuild_search_index` afterwards).
+
+The small tables are filled with `bulk_create`. The criteria of the audits,
+comments and prompts (millions of rows) are inserted with `executemany`, with
+ids reserved after the current maximum: the database should not be written to
+by anything else meanwhile. Their sequences are reset at the end.
+
+The same seed and shape generate the same dataset.
+"""
+
+import random
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from itertools import accumulate
+
+from audits.models.audit import (
+    AuditLibrary,
+    Comment,
+    Criterion,
+    ProjectAudit,
+    ProjectAuditCriterion,
+    Prompt,
+)
+from audits.rendering import RENDERER_VERSION, render
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.text import slugify
+from organization.models.organization import (
+    Organization,
+    OrganizationMember,
+    Project,
+    Resource,
+)
+
+BATCH_SIZE = 5000
+# Tables filled with `executemany`, and their inserted fields (after the id)
+INSERTED_MODELS = [ProjectAuditCriterion, Comment, Prompt]
+CRITERION_FIELDS = [
+    "created_at",
+    "updated_at",
+    "project_audit",
+    "criterion",
+    "status",
+    "comment_count",
+    "prompt_session_count",
+    "last_activity_at",
+]
+COMMENT_FIELDS = [
+    "created_at",
+    "updated_at",
+    "user",
+    "project_audit_criterion",
+    "comment",
+    "comment_html",
+    "html_version",
+]
+PROMPT_FIELDS = [
+    "created_at",
+    "updated_at",
+    "session_id",
+    "project_audit_criterion",
+    "name",
+    "prompt",
+    "html_version",
+]
+# Distinct texts of the comments and prompt answers, rendered once
+TEXT_POOL_SIZE = 200
+
+TOPICS = [
+    "encryption at rest",
+    "backup retention",
+    "access reviews",
+    "password hashing",
+    "audit logging",
+    "incident response",
+    "data minimisation",
+    "key rotation",
+    "vendor assessment",
+    "change management",
+]
+VERDICTS = ["Compliant", "Partially compliant", "Not compliant", "Not applicable"]
+Status = ProjectAuditCriterion.ProjectAuditCriterionStatus
+# Statuses of the criteria, as in a tenant half way through its audits
+STATUS_WEIGHTS = {
+    Status.NOT_HANDLED_YET: 40,
+    Status.COMPLIANT: 30,
+    Status.PARTIALLY_COMPLIANT: 12,
+    Status.NOT_COMPLIANT: 10,
+    Status.NOT_APPLICABLE: 8,
+}
+
+
+@dataclass
+class Shape:
+    projects: int = 500
+    libraries: int = 20
+    # Criteria of each library
+    criteria: int = 1000
+    # Audits of each project, each of a different library
+    audits: int = 4
+    resources: int = 5
+    users: int = 50
+    # Average comments and prompt sessions of a criterion of an audit; most
+    # criteria have none, a few have many
+    comments: float = 0.2
+    prompt_sessions: float = 0.05
+
+
+@dataclass
+class SeedResult:
+    organization: Organization
+    # Rows created, by model name
+    counts: dict[str, int] = field(default_factory=dict)
+    duration: float = 0.0
+
+
+def _geometric(rng: random.Random, mean: float) -> int:
+    """Random count of average `mean`, skewed towards 0."""
+    if mean <= 0:
+        return 0
+    probability = mean / (1 + mean)
+    count = 0
+    while rng.random() < probability:
+        count += 1
+    return count
+
+
+class Seeder:
+    def __init__(
+        self,
+        shape: Shape,
+        seed: int = 0,
+        batch_size: int = BATCH_SIZE,
+        progress: Callable[[str, int], None] | None = None,
+    ):
+        self.shape = shape
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.progress = progress or (lambda model, count: None)
+        self.counts: dict[str, int] = {}
+        self.now = timezone.now()
+        self.statuses = list(STATUS_WEIGHTS)
+        self.weights = list(accumulate(STATUS_WEIGHTS.values()))
+
+    def _create(self, model, rows: list) -> list:
+        created = []
+        for start in range(0, len(rows), self.batch_size):
+            created += model.objects.bulk_create(rows[start : start + self.batch_size])
+        name = model._meta.model_name
+        self.counts[name] = self.counts.get(name, 0) + len(created)
+        self.progress(name, self.counts[name])
+        return created
+
+    def _sentence(self) -> str:
+        topic = self.rng.choice(TOPICS)
+        return f"{topic.capitalize()} is reviewed every {self.rng.randint(1, 90)} days."
+
+    def _text_pools(self) -> None:
+        self.comment_pool = []
+        # Messages of the prompts, as database values
+        self.prompt_pool = []
+        for _ in range(TEXT_POOL_SIZE):
+            comment = " ".join(self._sentence() for _ in range(self.rng.randint(1, 4)))
+            self.comment_pool.append((comment, render(comment)))
+            answer = f"**{self.rng.choice(VERDICTS)}**\n\n" + "\n".join(
+                f"- {self._sentence()}" for _ in range(3)
+            )
+            messages = [
+                {"role": "user", "content": "Is this criterion compliant?"},
+                {"role": "assistant", "content": answer, "html": render(answer)},
+            ]
+            self.prompt_pool.append(
+                Prompt._meta.get_field("prompt").get_db_prep_save(
+                    {"messages": messages}, connection
+                )
+            )
+
+    def seed_organization(self, name: str) -> Organization:
+        organization = Organization.objects.create(
+            name=name, description=f"Synthetic tenant (seed {self.seed})"
+        )
+        self.counts["organization"] = 1
+        password = make_password(None)
+        self.users = self._create(
+            User,
+            [
+                User(username=f"{slugify(name)}-{number}", password=password)
+                for number in range(self.shape.users)
+            ],
+        )
+        group, _ = Group.objects.get_or_create(name="writer")
+        self._create(
+            OrganizationMember,
+            [
+                OrganizationMember(user=user, organization=organization, group=group)
+                for user in self.users
+            ],
+        )
+        return organization
+
+    def seed_libraries(self, organization: Organization) -> dict[int, list[int]]:
+        """Create the libraries and criteria; return the criteria of each library."""
+        libraries = self._create(
+            AuditLibrary,
+            [
+                AuditLibrary(
+                    organization=organization,
+                    name=f"Library {number:03d}",
+                    slug=f"library-{number:03d}",
+                )
+                for number in range(self.shape.libraries)
+            ],
+        )
+        criteria = self._create(
+            Criterion,
+            [
+                Criterion(
+                    audit_library=library,
+                    public_id=f"L{index:03d}-{number:04d}",
+                    name=self._sentence()[:-1],
+                    description=self._sentence(),
+                )
+                for index, library in enumerate(libraries)
+                for number in range(self.shape.criteria)
+            ],
+        )
+        by_library: dict[int, list[int]] = {library.id: [] for library in libraries}
+        for criterion in criteria:
+            by_library[criterion.audit_library_id].append(criterion.id)
+        return by_library
+
+    def seed_projects(
+        self, organization: Organization, criteria: dict[int, list[int]]
+    ) -> None:
+        projects = self._create(
+            Project,
+            [
+                Project(
+                    organization=organization,
+                    name=f"Project {number:04d}",
+                    slug=f"project-{number:04d}",
+                    description=self._sentence(),
+                )
+                for number in range(self.shape.projects)
+            ],
+        )
+        self._create(
+            Resource,
+            [
+                Resource(
+                    project=project,
+                    name=f"Resource {number}",
+                    type=self.rng.choice(Resource.ResourceType.values),
+                    description=self._sentence(),
+                )
+                for project in projects
+                for number in range(self.shape.resources)
+            ],
+        )
+        audits_per_project = min(self.shape.audits, len(criteria))
+        audits = self._create(
+            ProjectAudit,
+            [
+                ProjectAudit(project=project, audit_library_id=library_id)
+                for project in projects
+                for library_id in self.rng.sample(sorted(criteria), audits_per_project)
+            ],
+        )
+        self._reserve_ids()
+        batch = []
+        for audit in audits:
+            for criterion_id in criteria[audit.audit_library_id]:
+                batch.append((audit.id, criterion_id))
+                if len(batch) >= self.batch_size:
+                    self._seed_criteria(batch)
+                    batch = []
+        self._seed_criteria(batch)
+        self._reset_sequences()
+
+    def _reserve_ids(self) -> None:
+        """Ids of the next rows of the tables filled by `_insert`."""
+        self.next_id = {
+            model: (model.objects.aggregate(Max("id"))["id__max"] or 0) + 1
+            for model in INSERTED_MODELS
+        }
+
+    def _reset_sequences(self) -> None:
+        sql = connection.ops.sequence_reset_sql(no_style(), INSERTED_MODELS)
+        with connection.cursor() as cursor:
+            for statement in sql:
+                cursor.execute(statement)
+
+    def _insert(self, model, fields: list[str], rows: list[tuple]) -> None:
+        """
+        Insert rows of database values, starting with their id, in one
+        `executemany`: several times faster than `bulk_create`, which prepares
+        each value of each row.
+        """
+        if not rows:
+            return
+        quote = connection.ops.quote_name
+        columns = ", ".join(
+            quote(model._meta.get_field(name).column) for name in ["id", *fields]
+        )
+        sql = (
+            f"INSERT INTO {quote(model._meta.db_table)} ({columns}) "
+            f"VALUES ({', '.join(['%s'] * (len(fields) + 1))})"
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+        self.next_id[model] += len(rows)
+        name = model._meta.model_name
+        self.counts[name] = self.counts.get(name, 0) + len(rows)
+        self.progress(name, self.counts[name])
+
+    def _seed_criteria(self, batch: list[tuple[int, int]]) -> None:
+        """
+        Create a batch of criteria of audits, from their (audit id, criterion id),
+        with their comments and prompts.
+        """
+        now = connection.ops.adapt_datetimefield_value(self.now)
+        criteria = []
+        comments = []
+        prompts = []
+        criterion_id = self.next_id[ProjectAuditCriterion]
+        for audit_id, library_criterion_id in batch:
+            comment_count = _geometric(self.rng, self.shape.comments)
+            prompt_count = _geometric(self.rng, self.shape.prompt_sessions)
+            status = self.rng.choices(self.statuses, cum_weights=self.weights)[0]
+            criteria.append(
+                (
+                    criterion_id,
+                    now,
+                    now,
+                    audit_id,
+                    library_criterion_id,
+                    status,
+                    comment_count,
+                    prompt_count,
+                    now if comment_count or prompt_count else None,
+                )
+            )
+            for _ in range(comment_count):
+                text, html = self.rng.choice(self.comment_pool)
+                user = self.rng.choice(self.users)
+                comments.append(
+                    (
+                        self.next_id[Comment] + len(comments),
+                        now,
+                        now,
+                        user.id,
+                        criterion_id,
+                        text,
+                        html,
+                        RENDERER_VERSION,
+                    )
+                )
+            for _ in range(prompt_count):
+                prompts.append(
+                    (
+                        self.next_id[Prompt] + len(prompts),
+                        now,
+                        now,
+                        self._session_id(),
+                        criterion_id,
+                        f"Review of {self.rng.choice(TOPICS)}",
+                        self.rng.choice(self.prompt_pool),
+                        RENDERER_VERSION,
+                    )
+                )
+            criterion_id += 1
+        with transaction.atomic():
+            self._insert(ProjectAuditCriterion, CRITERION_FIELDS, criteria)
+            self._insert(Comment, COMMENT_FIELDS, comments)
+            self._insert(Prompt, PROMPT_FIELDS, prompts)
+
+    def _session_id(self):
+        session_id = uuid.UUID(int=self.rng.getrandbits(128), version=4)
+        return Prompt._meta.get_field("session_id").get_db_prep_value(
+            session_id, connection
+        )
+
+    def run(self, name: str) -> SeedResult:
+        start = time.perf_counter()
+        self._text_pools()
+        organization = self.seed_organization(name)
+        criteria = self.seed_libraries(organization)
+        self.seed_projects(organization, criteria)
+        return SeedResult(organization, self.counts, time.perf_counter() - start)
+
+
+def seed_scale(
+    name: str,
+    shape: Shape | None = None,
+    seed: int = 0,
+    batch_size: int = BATCH_SIZE,
+    progress: Callable[[str, int], None] | None = None,
+) -> SeedResult:
+    """Generate an organization named `name` of the given shape."""
+    return Seeder(shape or Shape(), seed, batch_size, progress).run(name)
@@ -1,6 +1,4 @@
-import re
-
-import markdown
+from audits.rendering import render_markdown
 from django import template
 from django.utils.safestring import mark_safe
 
@@ -10,18 +8,4 @@ register = template.Library()
 @register.filter(name="markdown")
 def markdown_filter(value):
     """Convert markdown to HTML."""
-    if not value:
-        return ""
-
-    if isinstance(value, str):
-        # Avoid not well displayed code blocks
-        value = re.sub(r"\n\s*```", "\n```", value)
-
-    # Configure markdown extensions
-    md = markdown.Markdown(extensions=["extra", "nl2br"])
-
-    # Convert markdown to HTML
-    html = md.convert(value)
-    md.reset()
-
-    return mark_safe(html)
+    return mark_safe(render_markdown(value))
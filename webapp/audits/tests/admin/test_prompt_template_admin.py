@@ -0,0 +1,20 @@
+import pytest
+from audits.admin.audit import PromptTemplateForm
+
+
+class TestPromptTemplateForm:
+    def test_valid_template(self):
+        form = PromptTemplateForm(
+            data={"name": "system_prompt", "content": "Assess {criterion_name}."}
+        )
+        assert form.is_valid(), form.errors
+
+    @pytest.mark.parametrize(
+        "content",
+        ["Assess {criteria}.", "Assess {criterion_name.upper}.", "Assess {"],
+    )
+    def test_invalid_placeholders(self, content):
+        form = PromptTemplateForm(data={"name": "system_prompt", "content": content})
+
+        assert not form.is_valid()
+        assert "content" in form.errors
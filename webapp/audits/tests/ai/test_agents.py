@@ -0,0 +1,161 @@
+import asyncio
+import threading
+
+import pytest
+from audits.ai.agents import (
+    AgentFactory,
+    LoopPooledTransport,
+    get_prompt_cache_settings,
+    is_ai_configured,
+)
+from audits.ai.benchmark import STAND_IN_API_KEY, STAND_IN_MODEL, StandInServer
+from pydantic_ai.models.anthropic import AnthropicModel
+from pydantic_ai.models.function import FunctionModel
+from pydantic_ai.models.test import TestModel
+
+
+@pytest.fixture
+def server():
+    with StandInServer(answer="Compliant") as server:
+        yield server
+
+
+@pytest.fixture
+def factory(server):
+    return AgentFactory(api_key=STAND_IN_API_KEY, base_url=server.url)
+
+
+class TestAgentFactory:
+    def test_agents_are_cached_by_template_and_output_type(self):
+        factory = AgentFactory()
+        model = TestModel()
+
+        agent = factory.get_agent("system_prompt", model=model)
+
+        assert factory.get_agent("system_prompt", model=model) is agent
+        assert factory.get_agent("group_system_prompt", model=model) is not agent
+        assert factory.get_agent("system_prompt", dict, model=model) is not agent
+        assert factory.get_agent("system_prompt", model=TestModel()) is not agent
+
+    def test_configured_model_by_default(self, settings):
+        settings.ANTHROPIC_MODEL = TestModel(custom_output_text="ok")
+        factory = AgentFactory()
+
+        agent = factory.get_agent("system_prompt")
+
+        assert agent.model is settings.ANTHROPIC_MODEL
+
+    def test_stand_in_model(self):
+        factory = AgentFactory()
+
+        model = factory.get_model("stand-in:latency=0")
+
+        assert isinstance(model, FunctionModel)
+        assert factory.get_model("stand-in:latency=0") is model
+
+    def test_anthropic_models_share_the_http_client(self, factory):
+        model = factory.get_model(STAND_IN_MODEL)
+
+        assert isinstance(model, AnthropicModel)
+        assert factory.get_model(STAND_IN_MODEL) is model
+        assert model.client._client is factory.get_http_client()
+
+    def test_connections_are_reused(self, server, factory):
+        agent = factory.get_agent("system_prompt", model=STAND_IN_MODEL)
+
+        for _ in range(3):
+            result = agent.run_sync("ping", instructions="Answer")
+            assert result.output == "Compliant"
+
+        assert server.requests == 3
+        assert server.connections == 1
+
+    def test_each_event_loop_has_its_own_connections(self, server, factory):
+        agent = factory.get_agent("system_prompt", model=STAND_IN_MODEL)
+
+        async def run_twice():
+            await agent.run("ping", instructions="Answer")
+            await agent.run("ping", instructions="Answer")
+            await factory.release_connections()
+
+        threads = [
+            threading.Thread(target=asyncio.run, args=(run_twice(),)) for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert server.requests == 4
+        assert server.connections == 2
+
+    def test_reset(self, factory):
+        client = factory.get_http_client()
+        agent = factory.get_agent("system_prompt", model=STAND_IN_MODEL)
+
+        factory.reset()
+
+        assert factory.get_http_client() is not client
+        assert factory.get_agent("system_prompt", model=STAND_IN_MODEL) is not agent
+
+
+class TestLoopPooledTransport:
+    def test_release_closes_the_pool_of_the_running_loop(self):
+        transport = LoopPooledTransport()
+
+        async def use_and_release():
+            pool = transport._get_transport()
+            assert transport._get_transport() is pool
+            await transport.release()
+            return pool
+
+        pool = asyncio.run(use_and_release())
+
+        assert pool not in transport._transports.values()
+
+
+class TestGetPromptCacheSettings:
+    def test_cache_breakpoints(self, settings):
+        settings.AI_PROMPT_CACHE_TTL = "1h"
+
+        assert get_prompt_cache_settings() == {
+            "anthropic_cache_instructions": "1h",
+            "anthropic_cache_messages": "1h",
+        }
+
+    def test_disabled(self, settings):
+        settings.AI_PROMPT_CACHE_TTL = ""
+
+        assert get_prompt_cache_settings() == {}
+
+    def test_anthropic_request(self, server, factory, settings):
+        settings.AI_PROMPT_CACHE_TTL = "5m"
+        agent = factory.get_agent("system_prompt", model=STAND_IN_MODEL)
+
+        agent.run_sync(
+            "ping",
+            instructions="Answer",
+            model_settings=get_prompt_cache_settings(),
+        )
+
+        request = server.last_request
+        assert request["system"][-1]["cache_control"]["type"] == "ephemeral"
+        assert request["messages"][-1]["content"][-1]["cache_control"]["type"] == (
+            "ephemeral"
+        )
+
+
+class TestIsAiConfigured:
+    def test_anthropic_model_requires_api_key(self, settings):
+        settings.ANTHROPIC_MODEL = "anthropic:claude-sonnet-4-0"
+        settings.ANTHROPIC_API_KEY = ""
+        assert not is_ai_configured()
+
+        settings.ANTHROPIC_API_KEY = "test"  # pragma: allowlist secret
+        assert is_ai_configured()
+
+    def test_offline_models_do_not_require_api_key(self, settings):
+        settings.ANTHROPIC_API_KEY = ""
+
+        assert is_ai_configured("stand-in")
+        assert is_ai_configured(TestModel())
@@ -0,0 +1,544 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+from audits.ai.assessment import (
+    AssessmentJob,
+    AssessmentOutcome,
+    AssessmentRunner,
+    CriterionVerdict,
+    GroupAssessment,
+    get_assessment_run,
+    group_criteria,
+    split_outcome,
+    start_assessment,
+)
+from audits.ai.circuit import CircuitBreaker
+from audits.ai.prompt import DEFAULT_USER_MESSAGE
+from audits.models.audit import (
+    AIUsageDaily,
+    AssessmentRun,
+    Prompt,
+    PromptTurn,
+    RateLimitBucket,
+)
+from audits.tests.factories import (
+    AssessmentRunFactory,
+    ProjectAuditCriterionFactory,
+    ProjectAuditFactory,
+    PromptFactory,
+    TagFactory,
+)
+from pydantic_ai.exceptions import ModelHTTPError
+from pydantic_ai.messages import ModelMessage, ModelResponse, TextPart, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+from pydantic_ai.models.test import TestModel
+
+Status = AssessmentRun.AssessmentRunStatus
+Grouping = AssessmentRun.AssessmentRunGrouping
+
+
+@pytest.fixture
+def project_audit():
+    project_audit = ProjectAuditFactory()
+    ProjectAuditCriterionFactory.create_batch(3, project_audit=project_audit)
+    return project_audit
+
+
+def runner_for(run, model, **kwargs):
+    kwargs.setdefault("backoff_base", 0)
+    kwargs.setdefault("backoff_max", 0)
+    return AssessmentRunner(run, model=model, **kwargs)
+
+
+@pytest.mark.django_db
+class TestAssessmentRunner:
+    def test_run_assesses_every_criterion(self, project_audit):
+        run = AssessmentRunFactory(project_audit=project_audit)
+
+        run = runner_for(run, TestModel(custom_output_text="Compliant")).run_sync()
+
+        assert run.status == Status.COMPLETED
+        assert run.total == 3
+        assert run.succeeded == 3
+        assert run.failed == 0
+        prompts = Prompt.objects.filter(assessment_run=run)
+        assert prompts.count() == 3
+        assert {p.project_audit_criterion for p in prompts} == set(
+            project_audit.project_audit_criteria.all()
+        )
+        for prompt in prompts:
+            assert prompt.prompt == {
+                "messages": [
+                    {"role": "user", "content": DEFAULT_USER_MESSAGE},
+                    {
+                        "role": "assistant",
+                        "content": "Compliant",
+                        "html": "<p>Compliant</p>",
+                    },
+                ]
+            }
+
+    def test_run_records_the_agent_calls(self, project_audit):
+        run = AssessmentRunFactory(project_audit=project_audit)
+
+        runner_for(run, TestModel(custom_output_text="Compliant")).run_sync()
+
+        turns = PromptTurn.objects.filter(project=project_audit.project)
+        assert turns.count() == 3
+        assert {turn.prompt.assessment_run_id for turn in turns} == {run.id}
+        assert all(turn.model == "test" and turn.output_tokens for turn in turns)
+        assert AIUsageDaily.objects.get(project=project_audit.project).turns == 3
+
+    def test_run_uses_criterion_system_prompt(self, project_audit):
+        instructions = []
+
+        def answer(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+            instructions.append(info.instructions)
+            return ModelResponse(parts=[TextPart("ok")])
+
+        run = AssessmentRunFactory(project_audit=project_audit)
+        runner_for(run, FunctionModel(answer)).run_sync()
+
+        names = {c.criterion.name for c in project_audit.project_audit_criteria.all()}
+        assert len(instructions) == 3
+        for name in names:
+            assert any(name in instruction for instruction in instructions)
+
+    def test_concurrency_is_bounded(self, project_audit):
+        ProjectAuditCriterionFactory.create_batch(5, project_audit=project_audit)
+        lock = threading.Lock()
+        in_flight = 0
+        max_in_flight = 0
+
+        async def answer(messages, info):
+            nonlocal in_flight, max_in_flight
+            with lock:
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.1)
+            with lock:
+                in_flight -= 1
+            return ModelResponse(parts=[TextPart("ok")])
+
+        run = AssessmentRunFactory(project_audit=project_audit)
+        run = runner_for(run, FunctionModel(answer), concurrency=2).run_sync()
+
+        assert run.succeeded == 8
+        assert max_in_flight == 2
+
+    def test_transient_errors_are_retried(self, project_audit):
+        calls = 0
+
+        def answer(messages, info):
+            nonlocal calls
+            calls += 1
+            if calls <= 2:
+                raise ModelHTTPError(529, "test", body="overloaded")
+            return ModelResponse(parts=[TextPart("ok")])
+
+        run = AssessmentRunFactory(project_audit=project_audit)
+        run = runner_for(run, FunctionModel(answer), concurrency=1).run_sync()
+
+        assert run.succeeded == 3
+        assert run.failed == 0
+        assert calls == 5
+
+    def test_errors_are_stored_after_max_retries(self, project_audit, settings):
+        settings.AI_CIRCUIT_FAILURE_THRESHOLD = 10
+        calls = 0
+
+        def answer(messages, info):
+            nonlocal calls
+            calls += 1
+            raise ModelHTTPError(503, "test", body="unavailable")
+
+        run = AssessmentRunFactory(project_audit=project_audit)
+        run = runner_for(run, FunctionModel(answer), max_retries=2).run_sync()
+
+        assert run.status == Status.COMPLETED
+        assert run.succeeded == 0
+        assert run.failed == 3
+        assert calls == 9
+        for prompt in run.prompts.all():
+            assert prompt.prompt["messages"][-1]["role"] == "error"
+        assert run.is_resumable
+
+    def test_failures_open_the_circuit(self, project_audit):
+        calls = 0
+
+        def answer(messages, info):
+            nonlocal calls
+            calls += 1
+            raise ModelHTTPError(503, "test", body="unavailable")
+
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+        run = AssessmentRunFactory(project_audit=project_audit)
+        run = runner_for(
+            run, FunctionModel(answer), concurrency=1, max_retries=3, breaker=breaker
+        ).run_sync()
+
+        # The circuit opens after 2 failures, the other calls are not made
+        assert calls == 2
+        assert breaker.get_state() == breaker.OPEN
+        assert run.failed == 3
+        contents = [
+            prompt.prompt["messages"][-1]["content"] for prompt in run.prompts.all()
+        ]
+        assert sum("circuit open" in content for content in contents) == 3
+
+    def test_success_closes_the_circuit(self, project_audit):
+        calls = 0
+
+        def answer(messages, info):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise ModelHTTPError(529, "test", body="overloaded")
+            return ModelResponse(parts=[TextPart("ok")])
+
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+        run = AssessmentRunFactory(project_audit=project_audit)
+        run = runner_for(
+            run, FunctionModel(answer), concurrency=1, breaker=breaker
+        ).run_sync()
+
+        assert run.succeeded == 3
+        assert breaker.get_status()["consecutive_failures"] == 0
+        assert breaker.get_status()["total_failures"] == 1
+
+    def test_jobs_take_a_token_of_the_organization(self, project_audit, settings):
+        settings.AI_RATE_LIMIT_ORGANIZATION = {"rate": 1, "burst": 2}
+        settings.AI_RATE_LIMIT_MAX_WAIT = 0
+        run = AssessmentRunFactory(project_audit=project_audit)
+
+        run = runner_for(run, TestModel(custom_output_text="ok")).run_sync()
+
+        # The third job exceeds the budget of the organization
+        assert run.succeeded == 2
+        assert run.failed == 1
+        assert run.is_resumable
+        organization_id = project_audit.project.organization_id
+        assert RateLimitBucket.objects.filter(
+            key=f"organization:{organization_id}"
+        ).exists()
+        error = run.prompts.get(prompt__messages__1__role="error")
+        assert "rate limit" in error.prompt["messages"][-1]["content"]
+
+    def test_non_transient_errors_are_not_retried(self, project_audit):
+        calls = 0
+
+        def answer(messages, info):
+            nonlocal calls
+            calls += 1
+            raise ModelHTTPError(400, "test", body="bad request")
+
+        run = AssessmentRunFactory(project_audit=project_audit)
+        run = runner_for(run, FunctionModel(answer), max_retries=3).run_sync()
+
+        assert run.failed == 3
+        assert calls == 3
+
+    def test_calls_are_timed_out(self, project_audit):
+        async def answer(messages, info):
+            await asyncio.sleep(10)
+
+        run = AssessmentRunFactory(project_audit=project_audit)
+        run = runner_for(
+            run, FunctionModel(answer), timeout=0.01, max_retries=0
+        ).run_sync()
+
+        assert run.failed == 3
+
+    def test_resume_only_assesses_missing_or_failed_criteria(self, project_audit):
+        done, failed, _missing = project_audit.project_audit_criteria.order_by("id")
+        run = AssessmentRunFactory(project_audit=project_audit, status=Status.FAILED)
+        PromptFactory(
+            assessment_run=run,
+            project_audit_criterion=done,
+            prompt={
+                "messages": [
+                    {"role": "user", "content": "?"},
+                    {"role": "assistant", "content": "Already done"},
+                ]
+            },
+        )
+        PromptFactory(
+            assessment_run=run,
+            project_audit_criterion=failed,
+            prompt={
+                "messages": [
+                    {"role": "user", "content": "?"},
+                    {"role": "error", "content": "boom"},
+                ]
+            },
+        )
+        calls = 0
+
+        def answer(messages, info):
+            nonlocal calls
+            calls += 1
+            return ModelResponse(parts=[TextPart("ok")])
+
+        run = runner_for(run, FunctionModel(answer)).run_sync()
+
+        assert calls == 2
+        assert run.status == Status.COMPLETED
+        assert run.succeeded == 3
+        assert run.failed == 0
+        # The failed session is updated, not duplicated
+        assert run.prompts.count() == 3
+        assert (
+            run.prompts.get(project_audit_criterion=failed).prompt["messages"][-1][
+                "content"
+            ]
+            == "ok"
+        )
+        assert (
+            run.prompts.get(project_audit_criterion=done).prompt["messages"][-1][
+                "content"
+            ]
+            == "Already done"
+        )
+
+    def test_missing_api_key(self, project_audit, settings):
+        settings.ANTHROPIC_API_KEY = ""
+        run = AssessmentRunFactory(project_audit=project_audit)
+
+        with pytest.raises(ValueError):
+            AssessmentRunner(run).run_sync()
+
+        run.refresh_from_db()
+        assert run.status == Status.FAILED
+
+
+@pytest.mark.django_db
+class TestAssessmentRunnerGrouped:
+    @pytest.fixture
+    def grouped_audit(self):
+        project_audit = ProjectAuditFactory()
+        for public_id in ["1", "2", "3", "4", "5"]:
+            ProjectAuditCriterionFactory(
+                project_audit=project_audit, criterion__public_id=public_id
+            )
+        return project_audit
+
+    def verdicts_for(self, public_ids):
+        def answer(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+            verdicts = [
+                {"public_id": public_id, "status": "COMPLIANT", "rationale": "Fine"}
+                for public_id in public_ids
+                if f"### {public_id}:" in info.instructions
+            ]
+            return ModelResponse(
+                parts=[ToolCallPart(info.output_tools[0].name, {"verdicts": verdicts})]
+            )
+
+        return answer
+
+    def test_criteria_are_assessed_in_chunks(self, grouped_audit):
+        calls = 0
+        answer = self.verdicts_for(["1", "2", "3", "4", "5"])
+
+        def counting_answer(messages, info):
+            nonlocal calls
+            calls += 1
+            return answer(messages, info)
+
+        run = AssessmentRunFactory(
+            project_audit=grouped_audit, grouping=Grouping.CHUNK, group_size=2
+        )
+        run = runner_for(run, FunctionModel(counting_answer)).run_sync()
+
+        assert calls == 3
+        # A turn per agent call, not attached to the prompts it is shared by
+        turns = PromptTurn.objects.filter(project=grouped_audit.project)
+        assert turns.count() == 3
+        assert all(turn.prompt is None for turn in turns)
+        assert run.status == Status.COMPLETED
+        assert run.total == 5
+        assert run.succeeded == 5
+        prompts = Prompt.objects.filter(assessment_run=run)
+        assert prompts.count() == 5
+        for prompt in prompts:
+            assert prompt.prompt["verdict"] == "COMPLIANT"
+            assert prompt.prompt["messages"][1] == {
+                "role": "assistant",
+                "content": "**🟢 Compliant**\n\nFine",
+                "html": "<p><strong>🟢 Compliant</strong></p>\n<p>Fine</p>",
+            }
+
+    def test_missing_verdicts_are_failed(self, grouped_audit):
+        run = AssessmentRunFactory(
+            project_audit=grouped_audit, grouping=Grouping.CHUNK, group_size=5
+        )
+        run = runner_for(run, FunctionModel(self.verdicts_for(["1", "2"]))).run_sync()
+
+        assert run.succeeded == 2
+        assert run.failed == 3
+        failed = Prompt.objects.filter(
+            assessment_run=run, project_audit_criterion__criterion__public_id="5"
+        ).get()
+        assert failed.prompt["messages"][-1]["role"] == "error"
+        assert "verdict" not in failed.prompt
+
+    def test_group_errors_fail_every_criterion_of_the_group(self, grouped_audit):
+        def answer(messages, info):
+            raise ModelHTTPError(400, "test", body="bad request")
+
+        run = AssessmentRunFactory(
+            project_audit=grouped_audit, grouping=Grouping.CHUNK, group_size=3
+        )
+        run = runner_for(run, FunctionModel(answer)).run_sync()
+
+        assert run.succeeded == 0
+        assert run.failed == 5
+        assert Prompt.objects.filter(assessment_run=run).count() == 5
+
+
+@pytest.mark.django_db
+class TestGroupCriteria:
+    def test_no_grouping(self):
+        criteria = ProjectAuditCriterionFactory.create_batch(3)
+
+        assert group_criteria(criteria, Grouping.NONE, 10) == [
+            [criteria[0]],
+            [criteria[1]],
+            [criteria[2]],
+        ]
+
+    def test_chunks(self):
+        criteria = ProjectAuditCriterionFactory.create_batch(5)
+
+        assert group_criteria(criteria, Grouping.CHUNK, 2) == [
+            criteria[0:2],
+            criteria[2:4],
+            criteria[4:5],
+        ]
+
+    def test_tags(self):
+        criteria = ProjectAuditCriterionFactory.create_batch(5)
+        security = TagFactory(name="security")
+        access = TagFactory(name="access")
+        security.criteria.add(criteria[0].criterion, criteria[2].criterion)
+        # The first tag by name is used
+        access.criteria.add(criteria[1].criterion, criteria[3].criterion)
+        security.criteria.add(criteria[3].criterion)
+
+        groups = group_criteria(criteria, Grouping.TAG, 10)
+
+        assert groups == [
+            [criteria[1], criteria[3]],
+            [criteria[0], criteria[2]],
+            [criteria[4]],
+        ]
+
+    def test_tags_are_split_by_group_size(self):
+        criteria = ProjectAuditCriterionFactory.create_batch(3)
+        TagFactory(name="security").criteria.add(*(c.criterion for c in criteria))
+
+        groups = group_criteria(criteria, Grouping.TAG, 2)
+
+        assert groups == [criteria[0:2], criteria[2:3]]
+
+
+class TestSplitOutcome:
+    def test_single_criterion(self):
+        job = AssessmentJob(criterion_ids={"1.1": 7}, system_prompt="")
+
+        [result] = split_outcome(AssessmentOutcome(job=job, output="Compliant"))
+
+        assert result.criterion_id == 7
+        assert result.content == "Compliant"
+        assert not result.error
+        assert result.verdict is None
+
+    def test_error(self):
+        job = AssessmentJob(
+            criterion_ids={"1": 1, "2": 2}, system_prompt="", grouped=True
+        )
+
+        results = split_outcome(AssessmentOutcome(job=job, error=ValueError("boom")))
+
+        assert [r.criterion_id for r in results] == [1, 2]
+        assert all(r.error for r in results)
+        assert all("boom" in r.content for r in results)
+
+    def test_group(self):
+        job = AssessmentJob(
+            criterion_ids={"1": 1, "2": 2}, system_prompt="", grouped=True
+        )
+        output = GroupAssessment(
+            verdicts=[
+                CriterionVerdict(
+                    public_id="2", status="NOT_COMPLIANT", rationale="No HTTPS"
+                ),
+                CriterionVerdict(public_id="99", status="COMPLIANT", rationale="?"),
+            ]
+        )
+
+        results = split_outcome(AssessmentOutcome(job=job, output=output))
+
+        assert results[0].criterion_id == 1
+        assert results[0].error
+        assert results[1].criterion_id == 2
+        assert results[1].verdict == "NOT_COMPLIANT"
+        assert results[1].content == "**🔴 Not Compliant**\n\nNo HTTPS"
+
+
+@pytest.mark.django_db
+class TestGetAssessmentRun:
+    def test_creates_run_when_none(self, project_audit):
+        run, created = get_assessment_run(project_audit)
+
+        assert created
+        assert run.project_audit == project_audit
+        assert run.status == Status.PENDING
+
+    def test_returns_active_run(self, project_audit):
+        existing = AssessmentRunFactory(
+            project_audit=project_audit, status=Status.RUNNING
+        )
+
+        assert get_assessment_run(project_audit) == (existing, False)
+
+    def test_returns_resumable_run(self, project_audit):
+        existing = AssessmentRunFactory(
+            project_audit=project_audit, status=Status.COMPLETED, failed=1
+        )
+
+        assert get_assessment_run(project_audit) == (existing, False)
+
+    def test_creates_run_with_defaults(self, project_audit):
+        run, created = get_assessment_run(
+            project_audit, grouping=Grouping.TAG, group_size=4
+        )
+
+        assert created
+        assert run.grouping == Grouping.TAG
+        assert run.group_size == 4
+
+    def test_creates_new_run_when_latest_succeeded(self, project_audit):
+        existing = AssessmentRunFactory(
+            project_audit=project_audit, status=Status.COMPLETED, failed=0
+        )
+
+        run, created = get_assessment_run(project_audit)
+
+        assert created
+        assert run != existing
+
+
+@pytest.mark.django_db
+class TestStartAssessment:
+    def test_start_assessment_runs_in_background_thread(self, project_audit):
+        run = AssessmentRunFactory(project_audit=project_audit, status=Status.FAILED)
+
+        with patch("audits.ai.assessment._run_in_background") as run_in_background:
+            thread = start_assessment(run)
+            thread.join()
+
+        run_in_background.assert_called_once_with(run.id)
+        run.refresh_from_db()
+        assert run.status == Status.PENDING
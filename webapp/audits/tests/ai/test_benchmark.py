@@ -0,0 +1,20 @@
+from audits.ai.benchmark import BenchmarkResult, run_benchmark
+
+
+class TestRunBenchmark:
+    def test_pooled_factory_reuses_connections(self):
+        new_clients, pooled = run_benchmark(requests=5)
+
+        assert new_clients.requests == 5
+        assert new_clients.connections == 5
+        assert pooled.requests == 5
+        assert pooled.connections == 1
+
+
+class TestBenchmarkResult:
+    def test_mean_ms(self):
+        result = BenchmarkResult("test", requests=4, connections=1, duration=0.2)
+        assert result.mean_ms == 50.0
+
+    def test_mean_ms_without_requests(self):
+        assert BenchmarkResult("test", 0, 0, 1.0).mean_ms == 0.0
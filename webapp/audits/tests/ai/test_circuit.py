@@ -0,0 +1,126 @@
+from unittest.mock import patch
+
+import pytest
+from audits.ai.circuit import CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def clock():
+    now = [1_000_000.0]
+    with patch("audits.ai.circuit.time.time", side_effect=lambda: now[0]):
+        yield now
+
+
+@pytest.fixture
+def breaker(db, clock):
+    return CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+
+
+class TestCircuitBreaker:
+    def test_closed(self, breaker):
+        breaker.before_call()
+
+        assert breaker.get_state() == CircuitBreaker.CLOSED
+        assert breaker.get_retry_after() == 0
+
+    def test_opens_after_consecutive_failures(self, breaker):
+        for _ in range(2):
+            breaker.record_failure(TimeoutError())
+        breaker.before_call()
+
+        breaker.record_failure(TimeoutError())
+
+        assert breaker.get_state() == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError) as exc_info:
+            breaker.before_call()
+        assert exc_info.value.retry_after == 30
+
+    def test_success_resets_failures(self, breaker):
+        for _ in range(2):
+            breaker.record_failure(TimeoutError())
+        breaker.record_success()
+        for _ in range(2):
+            breaker.record_failure(TimeoutError())
+
+        assert breaker.get_state() == CircuitBreaker.CLOSED
+
+    def test_single_probe_when_half_open(self, breaker, clock):
+        for _ in range(3):
+            breaker.record_failure(TimeoutError())
+
+        clock[0] += 30
+
+        assert breaker.get_state() == CircuitBreaker.HALF_OPEN
+        breaker.before_call()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_successful_probe_closes(self, breaker, clock):
+        for _ in range(3):
+            breaker.record_failure(TimeoutError())
+        clock[0] += 30
+        breaker.before_call()
+
+        breaker.record_success()
+
+        assert breaker.get_state() == CircuitBreaker.CLOSED
+        breaker.before_call()
+
+    def test_failed_probe_opens_again(self, breaker, clock):
+        for _ in range(3):
+            breaker.record_failure(TimeoutError())
+        clock[0] += 30
+        breaker.before_call()
+
+        breaker.record_failure(ConnectionError())
+
+        assert breaker.get_state() == CircuitBreaker.OPEN
+        assert breaker.get_retry_after() == 30
+
+    def test_state_is_shared(self, breaker):
+        for _ in range(3):
+            breaker.record_failure(TimeoutError())
+
+        other = CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+
+        assert other.get_state() == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            other.before_call()
+
+    def test_single_probe_of_the_workers(self, breaker, clock):
+        for _ in range(3):
+            breaker.record_failure(TimeoutError())
+        clock[0] += 30
+
+        breaker.before_call()
+
+        other = CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+        with pytest.raises(CircuitOpenError):
+            other.before_call()
+        # The probe of a worker which died expires
+        clock[0] += 30
+        other.before_call()
+
+    def test_status(self, breaker):
+        for _ in range(3):
+            breaker.record_failure(TimeoutError())
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+        status = breaker.get_status()
+
+        assert status["state"] == "open"
+        assert status["consecutive_failures"] == 3
+        assert status["total_failures"] == 3
+        assert status["rejected_calls"] == 1
+        assert status["last_failure"]["error"] == "TimeoutError"
+        assert status["retry_after"] == 30
+        assert status["opened_at"]
+
+    def test_settings(self, db, settings):
+        settings.AI_CIRCUIT_FAILURE_THRESHOLD = 1
+        breaker = CircuitBreaker("test")
+
+        breaker.record_failure(TimeoutError())
+
+        assert breaker.get_state() == CircuitBreaker.OPEN
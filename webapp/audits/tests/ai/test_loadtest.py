@@ -0,0 +1,128 @@
+import pytest
+from audits.ai.loadtest import (
+    LoadTestResult,
+    delete_load_test_prompts,
+    recorded_conversations,
+    run_load_test,
+    synthetic_conversations,
+)
+from audits.models.audit import Prompt
+from audits.tests.factories import ProjectAuditCriterionFactory, PromptFactory
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from organization.tests.factories import (
+    OrganizationFactory,
+    OrganizationMemberFactory,
+    UserFactory,
+)
+
+
+@pytest.fixture
+def writer():
+    call_command("loaddata", "content_type", verbosity=0)
+    call_command("loaddata", "auth", verbosity=0)
+    user = UserFactory()
+    organization = OrganizationFactory()
+    OrganizationMemberFactory(
+        user=user, organization=organization, group=Group.objects.get(name="writer")
+    )
+    return user, organization
+
+
+class TestLoadTestResult:
+    def test_percentile(self):
+        result = LoadTestResult(workers=1, latencies=[0.4, 0.1, 0.3, 0.2])
+
+        assert result.percentile(50) == 0.2
+        assert result.percentile(95) == 0.4
+        assert result.percentile(0) == 0.1
+
+    def test_empty(self):
+        result = LoadTestResult(workers=2)
+
+        assert result.percentile(99) == 0.0
+        assert result.occupancy == 0.0
+        assert result.throughput == 0.0
+
+    def test_occupancy_and_throughput(self):
+        result = LoadTestResult(workers=2, latencies=[1.0] * 6, duration=4.0, busy=6.0)
+
+        assert result.occupancy == 0.75
+        assert result.throughput == 1.5
+
+
+@pytest.mark.django_db
+class TestRecordedConversations:
+    def test_recorded_conversations(self):
+        prompt = PromptFactory(
+            prompt={
+                "messages": [
+                    {"role": "user", "content": "Hi"},
+                    {"role": "assistant", "content": "Hello"},
+                    {"role": "user", "content": "And?"},
+                ]
+            }
+        )
+        PromptFactory(prompt={"messages": []})
+
+        [conversation] = recorded_conversations(Prompt.objects.all())
+
+        assert conversation.criterion == prompt.project_audit_criterion
+        assert conversation.messages == ["Hi", "And?"]
+
+    def test_limit(self):
+        PromptFactory.create_batch(
+            3, prompt={"messages": [{"role": "user", "content": "Hi"}]}
+        )
+
+        assert len(recorded_conversations(Prompt.objects.all(), limit=2)) == 2
+
+
+@pytest.mark.django_db
+class TestSyntheticConversations:
+    def test_synthetic_conversations_are_deterministic(self):
+        criteria = ProjectAuditCriterionFactory.create_batch(3)
+
+        conversations = synthetic_conversations(criteria, count=5, turns=3, seed=1)
+
+        assert len(conversations) == 5
+        assert all(len(c.messages) == 3 for c in conversations)
+        again = synthetic_conversations(criteria, count=5, turns=3, seed=1)
+        assert [(c.criterion, c.messages) for c in again] == [
+            (c.criterion, c.messages) for c in conversations
+        ]
+
+    def test_without_criteria(self):
+        assert synthetic_conversations([], count=5) == []
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRunLoadTest:
+    def test_run_load_test(self, writer, settings):
+        settings.ANTHROPIC_MODEL = "stand-in:latency=0,tokens_per_second=0"
+        user, organization = writer
+        criteria = ProjectAuditCriterionFactory.create_batch(
+            2, project_audit__project__organization=organization
+        )
+        other = ProjectAuditCriterionFactory()
+        conversations = synthetic_conversations(criteria, count=3, turns=2)
+        conversations += synthetic_conversations([other], count=1, turns=1)
+
+        # A single worker: the SQLite test database does not allow concurrent writes
+        result = run_load_test(conversations, user, workers=1)
+
+        assert result.requests == 7
+        assert result.errors == 1
+        assert len(result.session_ids) == 4
+        assert 0 < result.occupancy <= 1
+        assert Prompt.objects.count() == 3
+        prompt = Prompt.objects.first()
+        assert [m["role"] for m in prompt.prompt["messages"]] == [
+            "user",
+            "assistant",
+            "user",
+            "assistant",
+        ]
+
+        assert delete_load_test_prompts(result) == 3
+        assert not Prompt.objects.exists()
@@ -0,0 +1,277 @@
+from unittest.mock import patch
+
+import pytest
+from audits.ai.prompt import (
+    build_group_system_prompt,
+    build_message_history,
+    build_system_prompt,
+    format_error_message,
+    format_resources,
+    load_system_prompt,
+)
+from audits.ai.prompt_templates import PromptTemplateRegistry
+from audits.tests.factories import ProjectAuditCriterionFactory, PromptTemplateFactory
+from audits.ai.retrieval import get_project_index
+from organization.tests.factories import ResourceFactory
+from pydantic_ai.messages import ModelRequest, ModelResponse
+
+
+@pytest.fixture
+def template_content():
+    return (
+        "# Agent Description\n\n"
+        "You are an expert assistant.\n\n"
+        "## Criterion to analyze\n\n"
+        "{criterion_name}\n"
+        "Detailed description: {criterion_description}.\n\n"
+        "## Language used\n\n"
+        "Respond in {language}.\n\n"
+        "## Resources\n\n"
+        "{resources}\n"
+    )
+
+
+@pytest.fixture
+def template_registry(tmp_path, template_content):
+    (tmp_path / "system_prompt.md").write_text(template_content, encoding="utf-8")
+    return patch(
+        "audits.ai.prompt.registry",
+        PromptTemplateRegistry(tmp_path, auto_reload=False),
+    )
+
+
+class TestLoadSystemPrompt:
+    """Unit tests for the load_system_prompt function."""
+
+    def test_load_system_prompt_replaces_all_placeholders(self, template_registry):
+        """Test that all placeholders are correctly replaced."""
+
+        with template_registry:
+
+            result = load_system_prompt(
+                criterion_name="Test Criterion",
+                criterion_description="This is a test description",
+                resources="- Resource 1: http://example.com\n- Resource 2: http://test.com",
+                language="french",
+            )
+
+            assert result == (
+                "# Agent Description\n\n"
+                "You are an expert assistant.\n\n"
+                "## Criterion to analyze\n\n"
+                "Test Criterion\n"
+                "Detailed description: This is a test description.\n\n"
+                "## Language used\n\n"
+                "Respond in french.\n\n"
+                "## Resources\n\n"
+                "- Resource 1: http://example.com\n"
+                "- Resource 2: http://test.com\n"
+            )
+
+    def test_load_system_prompt_with_empty_strings(self, template_registry):
+        """Test that the function works with empty strings."""
+
+        with template_registry:
+
+            result = load_system_prompt(
+                criterion_name="",
+                criterion_description="",
+                resources="",
+                language="",
+            )
+
+            assert result == (
+                "# Agent Description\n\n"
+                "You are an expert assistant.\n\n"
+                "## Criterion to analyze\n\n"
+                "\n"
+                "Detailed description: .\n\n"
+                "## Language used\n\n"
+                "Respond in .\n\n"
+                "## Resources\n\n"
+                "\n"
+            )
+
+    def test_load_system_prompt_with_special_characters(self, template_registry):
+        """Test that the function handles special characters correctly."""
+
+        with template_registry:
+
+            result = load_system_prompt(
+                criterion_name="Criterion & Test < > \" '",
+                criterion_description="Description with\nnewlines\tand\ttabs",
+                resources="Resource: https://example.com?param=value&other=test",
+                language="français",
+            )
+
+            assert result == (
+                "# Agent Description\n\n"
+                "You are an expert assistant.\n\n"
+                "## Criterion to analyze\n\n"
+                "Criterion & Test < > \" '\n"
+                "Detailed description: Description with\nnewlines\tand\ttabs.\n\n"
+                "## Language used\n\n"
+                "Respond in français.\n\n"
+                "## Resources\n\n"
+                "Resource: https://example.com?param=value&other=test\n"
+            )
+
+    def test_load_system_prompt_uses_default_template(self):
+        """Test that the default template of audits/prompts is used."""
+        result = load_system_prompt(
+            criterion_name="Criterion with accents éàù",
+            criterion_description="Test",
+            resources="",
+            language="french",
+        )
+
+        assert result.startswith("# Agent Description")
+        assert "Criterion with accents éàù\n" in result
+        assert "Respond in french." in result
+
+    @pytest.mark.django_db
+    def test_load_system_prompt_uses_audit_library_template(self, template_registry):
+        """Test that the template of the audit library is used if any."""
+        template = PromptTemplateFactory(content="Assess {criterion_name}")
+
+        with template_registry:
+            result = load_system_prompt(
+                criterion_name="Backups",
+                criterion_description="",
+                resources="",
+                language="french",
+                audit_library_id=template.audit_library_id,
+            )
+
+        assert result == "Assess Backups"
+
+
+@pytest.mark.django_db
+class TestFormatResources:
+    def test_format_resources(self):
+        resource = ResourceFactory(type="backend_code", url="https://example.com/api")
+
+        assert format_resources([resource]) == (
+            "- Backend Code: https://example.com/api\n"
+        )
+
+    def test_format_resources_empty(self):
+        assert format_resources([]) == ""
+
+
+@pytest.mark.django_db
+class TestBuildSystemPrompt:
+    def test_build_system_prompt_uses_criterion_and_project_resources(self):
+        criterion = ProjectAuditCriterionFactory(
+            criterion__name="Encryption at rest",
+            criterion__description="Data must be encrypted",
+        )
+        ResourceFactory(
+            project=criterion.project_audit.project,
+            type="infrastructure",
+            url="https://example.com/infra",
+        )
+
+        system_prompt = build_system_prompt(criterion)
+
+        assert "Encryption at rest" in system_prompt
+        assert "Data must be encrypted" in system_prompt
+        assert "- Infrastructure: https://example.com/infra" in system_prompt
+        assert "Respond in english." in system_prompt
+
+    def test_build_system_prompt_with_given_resources(self):
+        criterion = ProjectAuditCriterionFactory()
+        ResourceFactory(project=criterion.project_audit.project, url="https://a.com")
+        other = ResourceFactory(type="frontend_code", url="https://b.com")
+
+        system_prompt = build_system_prompt(
+            criterion, resources=[other], language="french"
+        )
+
+        assert "- Frontend Code: https://b.com" in system_prompt
+        assert "https://a.com" not in system_prompt
+        assert "Respond in french." in system_prompt
+
+    def test_build_system_prompt_includes_resource_excerpts(self, settings, tmp_path):
+        settings.RESOURCE_SNAPSHOTS_ROOT = tmp_path / "snapshots"
+        criterion = ProjectAuditCriterionFactory(
+            criterion__name="Backups",
+            criterion__description="The database is backed up every day",
+        )
+        resource = ResourceFactory(
+            project=criterion.project_audit.project, name="Backend"
+        )
+        repository = tmp_path / "repository"
+        repository.mkdir()
+        (repository / "cron.py").write_text("schedule(backup_database, daily=True)")
+        (repository / "README.md").write_text("Nothing relevant here")
+        get_project_index(resource.project_id).update(resource.id, repository)
+
+        system_prompt = build_system_prompt(criterion)
+
+        assert (
+            "### Backend: cron.py, lines 1-1\n\n"
+            "```\nschedule(backup_database, daily=True)\n```\n"
+        ) in system_prompt
+        assert "Nothing relevant here" not in system_prompt
+
+    def test_build_system_prompt_uses_audit_library_template(self):
+        criterion = ProjectAuditCriterionFactory(criterion__name="Backups")
+        PromptTemplateFactory(
+            audit_library=criterion.criterion.audit_library,
+            content="Assess {criterion_name} in {language}",
+        )
+
+        assert build_system_prompt(criterion) == "Assess Backups in english"
+
+
+@pytest.mark.django_db
+class TestBuildGroupSystemPrompt:
+    def test_build_group_system_prompt(self):
+        criteria = [
+            ProjectAuditCriterionFactory(
+                criterion__public_id="1.1",
+                criterion__name="Encryption at rest",
+                criterion__description="Data must be encrypted",
+            ),
+            ProjectAuditCriterionFactory(
+                criterion__public_id="1.2", criterion__name="Backups"
+            ),
+        ]
+        resource = ResourceFactory(type="infrastructure", url="https://example.com")
+
+        system_prompt = build_group_system_prompt(criteria, [resource])
+
+        assert "### 1.1: Encryption at rest\n\nData must be encrypted\n" in (
+            system_prompt
+        )
+        assert "### 1.2: Backups" in system_prompt
+        assert "- Infrastructure: https://example.com" in system_prompt
+        assert "Respond in english." in system_prompt
+
+
+class TestFormatErrorMessage:
+    def test_format_error_message(self):
+        assert format_error_message(ValueError("boom")) == (
+            "## An error occurred:\n\nboom\n"
+        )
+
+
+class TestBuildMessageHistory:
+    def test_build_message_history(self):
+        history = build_message_history(
+            [
+                {"role": "user", "content": "Is it compliant?"},
+                {"role": "assistant", "content": "Yes"},
+                {"role": "error", "content": "## An error occurred"},
+            ]
+        )
+
+        assert len(history) == 2
+        assert isinstance(history[0], ModelRequest)
+        assert history[0].parts[0].content == "Is it compliant?"
+        assert isinstance(history[1], ModelResponse)
+        assert history[1].parts[0].content == "Yes"
+
+    def test_build_message_history_empty(self):
+        assert build_message_history([]) == []
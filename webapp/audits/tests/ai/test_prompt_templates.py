@@ -0,0 +1,205 @@
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from audits.ai import prompt_templates
+from audits.ai.prompt_templates import (
+    CompiledTemplate,
+    PromptTemplateRegistry,
+    compile_template,
+    get_overrides_version,
+    invalidate_overrides,
+)
+from audits.tests.factories import AuditLibraryFactory, PromptTemplateFactory
+from django.core.cache import cache
+
+
+@pytest.fixture
+def locmem_cache(settings):
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+    cache.clear()
+    prompt_templates._versions.clear()
+
+
+@pytest.fixture
+def prompts_dir(tmp_path):
+    (tmp_path / "system_prompt.md").write_text(
+        "Assess {criterion_name} in {language}.", encoding="utf-8"
+    )
+    return tmp_path
+
+
+class TestCompiledTemplate:
+    def test_render(self):
+        template = CompiledTemplate("Hello {name}, {{literal}} {count:03d} {name!r}")
+
+        assert template.fields == {"name", "count"}
+        assert template.render(name="Ada", count=7) == (
+            "Hello Ada, {literal} 007 'Ada'"
+        )
+
+    def test_render_matches_str_format(self):
+        source = "# Title\n\n{a}\nDescription: {b}.\n"
+        context = {"a": "x{y}", "b": "éàù"}
+
+        assert CompiledTemplate(source).render(**context) == source.format(**context)
+
+    def test_render_missing_field(self):
+        with pytest.raises(KeyError):
+            CompiledTemplate("{name}").render()
+
+    @pytest.mark.parametrize("source", ["{a.b}", "{a[0]}", "{}", "{a:{b}}", "{"])
+    def test_unsupported_placeholders(self, source):
+        with pytest.raises(ValueError):
+            CompiledTemplate(source)
+
+
+class TestCompileTemplate:
+    def test_known_placeholders(self):
+        template = compile_template("system_prompt", "{criterion_name} {resources}")
+        assert template.fields == {"criterion_name", "resources"}
+
+    def test_unknown_placeholders(self):
+        with pytest.raises(ValueError, match=r"\{criteria\}"):
+            compile_template("system_prompt", "{criteria}")
+
+
+@pytest.mark.django_db
+class TestPromptTemplateRegistry:
+    def test_default_template_is_read_once(self, prompts_dir):
+        registry = PromptTemplateRegistry(prompts_dir, auto_reload=False)
+
+        with patch.object(
+            Path, "read_text", autospec=True, side_effect=Path.read_text
+        ) as read:
+            first = registry.render(
+                "system_prompt", criterion_name="Backups", language="french"
+            )
+            second = registry.render(
+                "system_prompt", criterion_name="Logs", language="english"
+            )
+
+        assert first == "Assess Backups in french."
+        assert second == "Assess Logs in english."
+        assert read.call_count == 1
+
+    def test_default_template_is_not_reloaded_without_auto_reload(self, prompts_dir):
+        registry = PromptTemplateRegistry(prompts_dir, auto_reload=False)
+        registry.get("system_prompt")
+
+        (prompts_dir / "system_prompt.md").write_text("Changed", encoding="utf-8")
+
+        assert registry.get("system_prompt").source.startswith("Assess")
+
+    def test_default_template_is_reloaded_when_modified(self, prompts_dir):
+        registry = PromptTemplateRegistry(prompts_dir, auto_reload=True)
+        registry.get("system_prompt")
+
+        path = prompts_dir / "system_prompt.md"
+        path.write_text("Changed", encoding="utf-8")
+        mtime = path.stat().st_mtime + 10
+        os.utime(path, (mtime, mtime))
+
+        assert registry.get("system_prompt").source == "Changed"
+
+    def test_auto_reload_follows_debug(self, prompts_dir, settings):
+        registry = PromptTemplateRegistry(prompts_dir)
+
+        settings.DEBUG = True
+        assert registry.auto_reload
+        settings.DEBUG = False
+        assert not registry.auto_reload
+
+    def test_library_override(self, prompts_dir, locmem_cache):
+        registry = PromptTemplateRegistry(prompts_dir, auto_reload=False)
+        template = PromptTemplateFactory(content="Custom {criterion_name}")
+        other_library = AuditLibraryFactory()
+
+        assert (
+            registry.render(
+                "system_prompt",
+                template.audit_library_id,
+                criterion_name="Backups",
+                language="french",
+            )
+            == "Custom Backups"
+        )
+        assert registry.render(
+            "system_prompt",
+            other_library.id,
+            criterion_name="Backups",
+            language="french",
+        ) == ("Assess Backups in french.")
+
+    def test_override_is_cached(
+        self, prompts_dir, locmem_cache, django_assert_num_queries
+    ):
+        registry = PromptTemplateRegistry(prompts_dir, auto_reload=False)
+        template = PromptTemplateFactory()
+        registry.get("system_prompt", template.audit_library_id)
+
+        with django_assert_num_queries(0):
+            registry.get("system_prompt", template.audit_library_id)
+        # Another process only needs the shared cache
+        with django_assert_num_queries(0):
+            PromptTemplateRegistry(prompts_dir).get(
+                "system_prompt", template.audit_library_id
+            )
+
+    def test_override_change_invalidates_cache(
+        self, prompts_dir, locmem_cache, django_capture_on_commit_callbacks
+    ):
+        registry = PromptTemplateRegistry(prompts_dir, auto_reload=False)
+        template = PromptTemplateFactory(content="Before")
+        library_id = template.audit_library_id
+        assert registry.get("system_prompt", library_id).source == "Before"
+
+        with django_capture_on_commit_callbacks(execute=True):
+            template.content = "After"
+            template.save()
+        assert registry.get("system_prompt", library_id).source == "After"
+
+        with django_capture_on_commit_callbacks(execute=True):
+            template.delete()
+        assert registry.get("system_prompt", library_id).source.startswith("Assess")
+
+    def test_invalid_override_falls_back_to_default(self, prompts_dir, locmem_cache):
+        registry = PromptTemplateRegistry(prompts_dir, auto_reload=False)
+        template = PromptTemplateFactory(content="{unknown}")
+
+        template = registry.get("system_prompt", template.audit_library_id)
+
+        assert template.source.startswith("Assess")
+
+
+class TestOverridesVersion:
+    def test_invalidate_overrides_changes_version(self, locmem_cache):
+        version = get_overrides_version(1)
+
+        assert get_overrides_version(1) == version
+        invalidate_overrides(1)
+        assert get_overrides_version(1) != version
+
+    def test_invalidate_overrides_without_version(self, locmem_cache):
+        invalidate_overrides(2)
+
+        assert get_overrides_version(2) is not None
+
+    def test_version_is_memoized(self, locmem_cache, settings):
+        settings.PROMPT_TEMPLATES_VERSION_TTL = 60
+        version = get_overrides_version(3)
+
+        with patch.object(cache, "get") as get:
+            assert get_overrides_version(3) == version
+        get.assert_not_called()
+
+    def test_version_is_read_again_after_ttl(self, locmem_cache, settings):
+        settings.PROMPT_TEMPLATES_VERSION_TTL = 0
+        version = get_overrides_version(4)
+        # Bumped by another process
+        cache.incr("audits:prompt_templates:4:version")
+
+        assert get_overrides_version(4) == version + 1
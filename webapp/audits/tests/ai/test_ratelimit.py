@@ -0,0 +1,168 @@
+from unittest.mock import patch
+
+import pytest
+from audits.ai.ratelimit import (
+    Budget,
+    RateLimitExceeded,
+    TokenBucket,
+    acquire,
+    acquire_organization,
+    get_user_budget,
+)
+from audits.models.audit import RateLimitBucket
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from organization.tests.factories import OrganizationMemberFactory
+
+
+@pytest.fixture
+def clock():
+    """Frozen time of the buckets, in milliseconds."""
+    now = [1_000_000_000]
+    with patch("audits.ai.ratelimit._now_ms", side_effect=lambda: now[0]):
+        yield now
+
+
+@pytest.fixture
+def writer(db):
+    call_command("loaddata", "content_type", verbosity=0)
+    call_command("loaddata", "auth", verbosity=0)
+    return OrganizationMemberFactory(group=Group.objects.get(name="writer"))
+
+
+class TestBudget:
+    def test_from_setting(self):
+        assert Budget.from_setting({"rate": 30, "burst": 5}) == Budget(30.0, 5)
+        assert Budget.from_setting(None) is None
+
+    def test_interval(self):
+        assert Budget(rate=30, burst=1).interval_ms == 2000
+
+
+class TestTokenBucket:
+    def test_burst_then_rate(self, db, clock):
+        bucket = TokenBucket("test", Budget(rate=60, burst=3))
+
+        assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+        with pytest.raises(RateLimitExceeded) as exc_info:
+            bucket.acquire()
+        assert exc_info.value.retry_after == 1.0
+
+        clock[0] += 1000
+        assert bucket.acquire() == 0
+        with pytest.raises(RateLimitExceeded):
+            bucket.acquire()
+
+    def test_tokens_do_not_accumulate_beyond_burst(self, db, clock):
+        bucket = TokenBucket("test", Budget(rate=60, burst=2))
+        bucket.acquire()
+
+        clock[0] += 3_600_000
+
+        assert [bucket.acquire() for _ in range(2)] == [0, 0]
+        with pytest.raises(RateLimitExceeded):
+            bucket.acquire()
+
+    def test_wait_for_a_token(self, db, clock):
+        bucket = TokenBucket("test", Budget(rate=60, burst=1))
+        bucket.acquire()
+
+        assert bucket.acquire(max_wait=1.5) == 1.0
+        assert bucket.acquire(max_wait=2.5) == 2.0
+        # Waiting calls are queued behind each other
+        with pytest.raises(RateLimitExceeded) as exc_info:
+            bucket.acquire(max_wait=2.5)
+        assert exc_info.value.retry_after == 3.0
+
+    def test_rejected_calls_take_no_token(self, db, clock):
+        bucket = TokenBucket("test", Budget(rate=60, burst=1))
+        bucket.acquire()
+        for _ in range(5):
+            with pytest.raises(RateLimitExceeded):
+                bucket.acquire()
+
+        clock[0] += 1000
+
+        assert bucket.acquire() == 0
+
+    def test_bucket_is_shared_by_the_workers(self, db, clock):
+        budget = Budget(rate=60, burst=2)
+        TokenBucket("test", budget).acquire()
+        TokenBucket("test", budget).acquire()
+
+        with pytest.raises(RateLimitExceeded):
+            TokenBucket("test", budget).acquire()
+        assert RateLimitBucket.objects.get(key="test").arrival == clock[0] + 2000
+
+    def test_empty_budget(self, db):
+        with pytest.raises(RateLimitExceeded):
+            TokenBucket("test", Budget(rate=0, burst=0)).acquire()
+
+
+class TestGetUserBudget:
+    def test_budget_of_the_role_group(self, writer, settings):
+        settings.AI_RATE_LIMIT_USER = {"writer": {"rate": 10, "burst": 2}}
+
+        assert get_user_budget(writer.user, writer.organization_id) == Budget(10, 2)
+
+    def test_no_budget(self, writer, settings):
+        settings.AI_RATE_LIMIT_USER = {"administrator": {"rate": 10, "burst": 2}}
+
+        assert get_user_budget(writer.user, writer.organization_id) is None
+
+
+class TestAcquire:
+    def test_user_and_organization_buckets(self, writer, settings):
+        settings.AI_RATE_LIMIT_USER = {"writer": {"rate": 1, "burst": 1}}
+        settings.AI_RATE_LIMIT_ORGANIZATION = {"rate": 1, "burst": 2}
+        other = OrganizationMemberFactory(
+            organization=writer.organization, group=writer.group
+        )
+
+        acquire(writer.user, writer.organization_id, max_wait=0)
+        with pytest.raises(RateLimitExceeded, match="user"):
+            acquire(writer.user, writer.organization_id, max_wait=0)
+        acquire(other.user, other.organization_id, max_wait=0)
+        # The organization budget is shared by its members
+        third = OrganizationMemberFactory(
+            organization=writer.organization, group=writer.group
+        )
+        with pytest.raises(RateLimitExceeded, match="organization"):
+            acquire(third.user, third.organization_id, max_wait=0)
+
+    def test_rejection_gives_back_the_tokens(self, writer, settings):
+        settings.AI_RATE_LIMIT_USER = {"writer": {"rate": 1, "burst": 2}}
+        settings.AI_RATE_LIMIT_ORGANIZATION = {"rate": 1, "burst": 1}
+        acquire(writer.user, writer.organization_id, max_wait=0)
+        with pytest.raises(RateLimitExceeded):
+            acquire(writer.user, writer.organization_id, max_wait=0)
+
+        settings.AI_RATE_LIMIT_ORGANIZATION = None
+
+        acquire(writer.user, writer.organization_id, max_wait=0)
+
+    def test_wait_for_the_tokens(self, writer, settings, clock):
+        settings.AI_RATE_LIMIT_USER = {"writer": {"rate": 60, "burst": 1}}
+        settings.AI_RATE_LIMIT_ORGANIZATION = None
+        acquire(writer.user, writer.organization_id, max_wait=0)
+
+        with patch("audits.ai.ratelimit.time.sleep") as sleep:
+            acquire(writer.user, writer.organization_id, max_wait=5)
+
+        sleep.assert_called_once_with(1.0)
+
+
+class TestAcquireOrganization:
+    def test_organization_bucket(self, writer, settings, clock):
+        settings.AI_RATE_LIMIT_ORGANIZATION = {"rate": 60, "burst": 1}
+        acquire(writer.user, writer.organization_id, max_wait=0)
+
+        # The wait is returned to the caller, which may not block
+        assert acquire_organization(writer.organization_id, max_wait=5) == 1.0
+        with pytest.raises(RateLimitExceeded, match="organization"):
+            acquire_organization(writer.organization_id, max_wait=0)
+
+    def test_no_budget(self, writer, settings):
+        settings.AI_RATE_LIMIT_ORGANIZATION = None
+
+        assert acquire_organization(writer.organization_id, max_wait=0) == 0.0
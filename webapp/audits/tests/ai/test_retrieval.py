@@ -0,0 +1,397 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+from audits.ai.retrieval import (
+    CHUNK_LINES,
+    MAX_POSTINGS,
+    Excerpt,
+    ResourceIndex,
+    SnapshotError,
+    chunk_text,
+    extract_archive,
+    format_excerpts,
+    get_project_index,
+    index_snapshot,
+    iter_files,
+    query_terms,
+    read_text_file,
+    resolve_local_path,
+    search_excerpts,
+    select_terms,
+    stem_terms,
+)
+from organization.models.organization import ResourceSnapshot
+from organization.tests.factories import ResourceFactory, ResourceSnapshotFactory
+
+
+@pytest.fixture
+def snapshots_root(settings, tmp_path):
+    settings.RESOURCE_SNAPSHOTS_ROOT = tmp_path / "snapshots"
+    return settings.RESOURCE_SNAPSHOTS_ROOT
+
+
+@pytest.fixture
+def repository(tmp_path):
+    directory = tmp_path / "repository"
+    (directory / "src").mkdir(parents=True)
+    (directory / "src" / "backup.py").write_text(
+        "def backup_database():\n    encrypt(dump())\n", encoding="utf-8"
+    )
+    (directory / "README.md").write_text(
+        "# Project\n\nPasswords are hashed with argon2.\n", encoding="utf-8"
+    )
+    return directory
+
+
+@pytest.fixture
+def index(tmp_path):
+    return ResourceIndex(tmp_path / "index" / "project.sqlite3")
+
+
+def _zip(files: dict[str, str]) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    buffer.seek(0)
+    buffer.name = "repository.zip"
+    return buffer
+
+
+def _tar(files: dict[str, str]) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, content in files.items():
+            data = content.encode()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    buffer.seek(0)
+    buffer.name = "repository.tar.gz"
+    return buffer
+
+
+class TestQueryTerms:
+    def test_query_terms(self):
+        assert query_terms("The data must be encrypted at rest, data included") == [
+            "data",
+            "encrypted",
+            "rest",
+            "included",
+        ]
+
+    def test_query_terms_split_identifiers(self):
+        assert query_terms("Sécurité des mots_de_passe") == [
+            "sécurité",
+            "mots",
+            "passe",
+        ]
+
+    def test_query_terms_skip_numbers_and_short_words(self):
+        assert query_terms("Keep 2024 logs 12 months in S3") == [
+            "keep",
+            "logs",
+            "months",
+        ]
+
+
+class TestStemTerms:
+    def test_stem_terms(self):
+        assert stem_terms(["backups", "encrypted", "sécurité"]) == [
+            "backup",
+            "encrypt",
+            "securit",
+        ]
+
+
+class TestSelectTerms:
+    def test_select_terms_keeps_rarest_terms(self):
+        terms = ["data", "encryption", "backup", "unknown"]
+        frequencies = {"encryption": 10, "data": MAX_POSTINGS, "backup": 50}
+
+        assert select_terms(terms, terms, frequencies) == ["encryption", "backup"]
+
+    def test_select_terms_keeps_the_rarest_frequent_term(self):
+        terms = ["data", "file"]
+        frequencies = {"data": MAX_POSTINGS * 2, "file": MAX_POSTINGS + 1}
+
+        assert select_terms(terms, terms, frequencies) == ["file"]
+
+    def test_select_terms_searches_a_stem_once(self):
+        terms = ["backups", "backup"]
+
+        assert select_terms(terms, ["backup", "backup"], {"backup": 3}) == ["backups"]
+
+
+class TestChunkText:
+    def test_chunk_text(self):
+        text = "\n".join(f"line {number}" for number in range(1, CHUNK_LINES + 6))
+
+        chunks = chunk_text(text)
+
+        assert [(start, end) for start, end, _ in chunks] == [
+            (1, CHUNK_LINES),
+            (CHUNK_LINES + 1, CHUNK_LINES + 5),
+        ]
+        assert chunks[1][2].startswith(f"line {CHUNK_LINES + 1}\n")
+
+    def test_chunk_text_skips_blank_chunks(self):
+        assert chunk_text("\n" * (CHUNK_LINES * 2) + "end") == [
+            (CHUNK_LINES * 2 + 1, CHUNK_LINES * 2 + 1, "end")
+        ]
+
+
+class TestIterFiles:
+    def test_iter_files_skips_dependencies_and_symlinks(self, repository):
+        (repository / "node_modules" / "lib").mkdir(parents=True)
+        (repository / "node_modules" / "lib" / "index.js").write_text("x")
+        (repository / ".git").mkdir()
+        (repository / ".git" / "HEAD").write_text("ref")
+        (repository / "link.md").symlink_to(repository / "README.md")
+
+        assert [path for path, _ in iter_files(repository)] == [
+            "README.md",
+            "src/backup.py",
+        ]
+
+
+class TestReadTextFile:
+    def test_read_text_file(self, repository):
+        assert read_text_file(repository / "README.md").startswith(b"# Project")
+
+    def test_read_text_file_skips_binary_files(self, tmp_path):
+        path = tmp_path / "image.png"
+        path.write_bytes(b"\x89PNG\0\0")
+
+        assert read_text_file(path) is None
+
+
+class TestExtractArchive:
+    def test_extract_zip(self, tmp_path):
+        extract_archive(_zip({"src/app.py": "print(1)"}), tmp_path / "out")
+
+        assert (tmp_path / "out" / "src" / "app.py").read_text() == "print(1)"
+
+    def test_extract_tar(self, tmp_path):
+        extract_archive(_tar({"src/app.py": "print(1)"}), tmp_path / "out")
+
+        assert (tmp_path / "out" / "src" / "app.py").read_text() == "print(1)"
+
+    def test_extract_zip_keeps_members_inside_destination(self, tmp_path):
+        extract_archive(_zip({"../../evil.py": "x"}), tmp_path / "out")
+
+        assert not (tmp_path / "evil.py").exists()
+        assert (tmp_path / "out" / "evil.py").exists()
+
+    def test_extract_tar_refuses_members_outside_destination(self, tmp_path):
+        with pytest.raises(SnapshotError):
+            extract_archive(_tar({"../evil.py": "x"}), tmp_path / "out")
+
+        assert not (tmp_path / "evil.py").exists()
+
+    def test_extract_archive_too_big(self, tmp_path):
+        with pytest.raises(SnapshotError, match="too big"):
+            extract_archive(_zip({"a.txt": "x" * 100}), tmp_path / "out", max_size=10)
+
+    def test_extract_invalid_archive(self, tmp_path):
+        file = io.BytesIO(b"not an archive")
+        file.name = "repository.zip"
+
+        with pytest.raises(SnapshotError, match="Invalid archive"):
+            extract_archive(file, tmp_path / "out")
+
+
+class TestResolveLocalPath:
+    def test_resolve_local_path(self, settings, repository):
+        settings.RESOURCE_SNAPSHOT_LOCAL_ROOTS = [str(repository.parent)]
+
+        assert resolve_local_path(str(repository / "src" / "..")) == repository
+
+    def test_resolve_local_path_outside_roots(self, settings, repository):
+        settings.RESOURCE_SNAPSHOT_LOCAL_ROOTS = [str(repository / "src")]
+
+        with pytest.raises(SnapshotError, match="not in an allowed directory"):
+            resolve_local_path(str(repository / "src" / ".."))
+
+    def test_resolve_local_path_not_a_directory(self, settings, repository):
+        settings.RESOURCE_SNAPSHOT_LOCAL_ROOTS = [str(repository)]
+
+        with pytest.raises(SnapshotError, match="not a directory"):
+            resolve_local_path(str(repository / "README.md"))
+
+
+class TestResourceIndex:
+    def test_search(self, index, repository):
+        stats = index.update(1, repository)
+
+        assert (stats.files, stats.chunks, stats.added) == (2, 2, 2)
+        excerpts = index.search("Backups of the database are encrypted", limit=5)
+        assert excerpts == [
+            Excerpt(
+                resource_id=1,
+                path="src/backup.py",
+                start_line=1,
+                end_line=2,
+                text="def backup_database():\n    encrypt(dump())",
+                score=excerpts[0].score,
+            )
+        ]
+
+    def test_search_ranks_best_chunks_first(self, index, repository):
+        (repository / "password.md").write_text("password password password")
+        index.update(1, repository)
+
+        excerpts = index.search("password hashed", limit=5)
+
+        assert [excerpt.path for excerpt in excerpts] == ["README.md", "password.md"]
+
+    def test_search_filters_resources(self, index, repository, tmp_path):
+        other = tmp_path / "other"
+        other.mkdir()
+        (other / "backup.md").write_text("Database backup every night")
+        index.update(1, repository)
+        index.update(2, other)
+
+        excerpts = index.search("database backup", limit=5, resource_ids={2})
+
+        assert [excerpt.resource_id for excerpt in excerpts] == [2]
+
+    def test_search_without_index(self, index):
+        assert index.search("database", limit=5) == []
+
+    def test_update_is_incremental(self, index, repository):
+        index.update(1, repository)
+        (repository / "src" / "backup.py").write_text("def restore():\n    pass\n")
+        (repository / "README.md").unlink()
+        (repository / "CHANGELOG.md").write_text("Argon2 upgrade")
+
+        stats = index.update(1, repository)
+
+        assert (stats.files, stats.added, stats.updated, stats.removed) == (2, 1, 1, 1)
+        assert index.search("backup database", limit=5) == []
+        assert [excerpt.path for excerpt in index.search("restore", limit=5)] == [
+            "src/backup.py"
+        ]
+        assert [excerpt.path for excerpt in index.search("argon2", limit=5)] == [
+            "CHANGELOG.md"
+        ]
+
+    def test_update_unchanged_files(self, index, repository):
+        index.update(1, repository)
+
+        stats = index.update(1, repository)
+
+        assert (stats.files, stats.chunks) == (2, 2)
+        assert (stats.added, stats.updated, stats.removed) == (0, 0, 0)
+
+    def test_remove(self, index, repository):
+        index.update(1, repository)
+
+        index.remove(1)
+
+        assert index.search("database", limit=5) == []
+
+
+class TestFormatExcerpts:
+    def test_format_excerpts(self):
+        resource = ResourceFactory.build(id=1, name="Backend")
+        excerpt = Excerpt(1, "src/app.py", 3, 4, "```\ncode\n```", -1.0)
+
+        assert format_excerpts([excerpt], [resource]) == (
+            "### Backend: src/app.py, lines 3-4\n\n````\n```\ncode\n```\n````\n"
+        )
+
+    def test_format_excerpts_empty(self):
+        assert format_excerpts([], []) == ""
+
+
+@pytest.mark.django_db
+class TestSearchExcerpts:
+    def test_search_excerpts(self, settings, snapshots_root, repository):
+        settings.AI_RETRIEVAL_TOP_K = 1
+        resource = ResourceFactory()
+        get_project_index(resource.project_id).update(resource.id, repository)
+        (repository / "backup.md").write_text("Database backups")
+        get_project_index(resource.project_id).update(resource.id, repository)
+
+        excerpts = search_excerpts(resource.project_id, "database backup", [resource])
+
+        assert len(excerpts) == 1
+
+    def test_search_excerpts_ignores_broken_index(self, snapshots_root):
+        resource = ResourceFactory()
+        path = get_project_index(resource.project_id).path
+        path.parent.mkdir(parents=True)
+        path.write_text("not a database")
+
+        assert search_excerpts(resource.project_id, "database", [resource]) == []
+
+
+@pytest.mark.django_db
+class TestIndexSnapshot:
+    def test_index_snapshot(self, snapshots_root, repository):
+        snapshot = ResourceSnapshotFactory(
+            kind=ResourceSnapshot.Kind.LOCAL, source=str(repository)
+        )
+
+        index_snapshot(snapshot)
+
+        snapshot.refresh_from_db()
+        assert snapshot.status == ResourceSnapshot.Status.INDEXED
+        assert (snapshot.files, snapshot.chunks) == (2, 2)
+        assert snapshot.indexed_at is not None
+        index = get_project_index(snapshot.resource.project_id)
+        assert index.search("database", limit=5)[0].resource_id == snapshot.resource_id
+
+    def test_index_snapshot_deletes_previous_snapshots(
+        self, snapshots_root, repository
+    ):
+        previous = ResourceSnapshotFactory()
+        previous.get_directory().mkdir(parents=True)
+        snapshot = ResourceSnapshotFactory(
+            resource=previous.resource,
+            kind=ResourceSnapshot.Kind.LOCAL,
+            source=str(repository),
+        )
+
+        index_snapshot(snapshot)
+
+        assert not ResourceSnapshot.objects.filter(id=previous.id).exists()
+        assert not previous.get_directory().exists()
+        assert repository.exists()
+
+    def test_index_snapshot_failure(self, snapshots_root, tmp_path):
+        snapshot = ResourceSnapshotFactory()
+        # Make the index path a directory so that it cannot be opened
+        get_project_index(snapshot.resource.project_id).path.mkdir(parents=True)
+
+        with pytest.raises(Exception):
+            index_snapshot(snapshot)
+
+        snapshot.refresh_from_db()
+        assert snapshot.status == ResourceSnapshot.Status.FAILED
+        assert snapshot.error
+
+    def test_deleted_resource_is_removed_from_index(self, snapshots_root, repository):
+        snapshot = ResourceSnapshotFactory(
+            kind=ResourceSnapshot.Kind.LOCAL, source=str(repository)
+        )
+        index_snapshot(snapshot)
+        index = get_project_index(snapshot.resource.project_id)
+
+        snapshot.resource.delete()
+
+        assert index.search("database", limit=5) == []
+
+    def test_deleted_project_index_is_deleted(self, snapshots_root, repository):
+        snapshot = ResourceSnapshotFactory(
+            kind=ResourceSnapshot.Kind.LOCAL, source=str(repository)
+        )
+        index_snapshot(snapshot)
+        index = get_project_index(snapshot.resource.project_id)
+
+        snapshot.resource.project.delete()
+
+        assert not index.path.exists()
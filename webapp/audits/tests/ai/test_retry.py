@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+from audits.ai.circuit import CircuitBreaker, CircuitOpenError
+from audits.ai.retry import backoff_delay, is_transient_error, run_agent_sync
+from core.profiling import RequestTimings, timings_scope
+from pydantic_ai import Agent
+from pydantic_ai.exceptions import ModelAPIError, ModelHTTPError, UserError
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+
+
+@pytest.fixture
+def no_backoff(settings):
+    settings.AI_PROMPT_BACKOFF_BASE = 0
+    settings.AI_PROMPT_BACKOFF_MAX = 0
+
+
+def failing_agent(errors: list[BaseException]) -> tuple[Agent, list]:
+    """Agent raising `errors` in turn, then answering "Done"."""
+    calls = []
+
+    def answer(messages, info):
+        calls.append(messages)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return ModelResponse(parts=[TextPart("Done")])
+
+    return Agent(FunctionModel(answer)), calls
+
+
+class TestIsTransientError:
+    @pytest.mark.parametrize("status_code", [408, 409, 429, 500, 502, 529])
+    def test_retryable_http_status(self, status_code):
+        assert is_transient_error(ModelHTTPError(status_code, "model"))
+
+    @pytest.mark.parametrize("status_code", [400, 401, 403, 404])
+    def test_client_http_errors_are_not_retried(self, status_code):
+        assert not is_transient_error(ModelHTTPError(status_code, "model"))
+
+    def test_timeout_and_connection_errors(self):
+        assert is_transient_error(TimeoutError())
+        assert is_transient_error(ConnectionError())
+        assert is_transient_error(ModelAPIError("model", "connection reset"))
+
+    def test_other_errors_are_not_retried(self):
+        assert not is_transient_error(ValueError("boom"))
+        assert not is_transient_error(UserError("bad configuration"))
+
+
+class TestBackoffDelay:
+    def test_delay_is_bounded_by_exponential_backoff(self):
+        for attempt in range(1, 5):
+            for _ in range(50):
+                delay = backoff_delay(attempt, base=1.0, cap=100.0)
+                assert 0 <= delay <= 2 ** (attempt - 1)
+
+    def test_delay_is_capped(self):
+        for _ in range(50):
+            assert backoff_delay(10, base=1.0, cap=3.0) <= 3.0
+
+    def test_delay_is_jittered(self):
+        delays = {backoff_delay(3, base=1.0, cap=100.0) for _ in range(20)}
+        assert len(delays) > 1
+
+
+class TestRunAgentSync:
+    def test_transient_errors_are_retried(self, no_backoff):
+        agent, calls = failing_agent([ModelHTTPError(529, "model"), TimeoutError()])
+
+        result = run_agent_sync(agent, "Hi", max_retries=2)
+
+        assert result.output == "Done"
+        assert len(calls) == 3
+
+    def test_retries_are_bounded(self, no_backoff):
+        agent, calls = failing_agent([ModelHTTPError(500, "model")] * 5)
+
+        with pytest.raises(ModelHTTPError):
+            run_agent_sync(agent, "Hi", max_retries=2)
+        assert len(calls) == 3
+
+    def test_other_errors_are_not_retried(self, no_backoff):
+        agent, calls = failing_agent([ModelHTTPError(400, "model")])
+
+        with pytest.raises(ModelHTTPError):
+            run_agent_sync(agent, "Hi", max_retries=2)
+        assert len(calls) == 1
+
+    def test_timeout(self, no_backoff):
+        async def answer(messages, info):
+            await asyncio.sleep(5)
+            return ModelResponse(parts=[TextPart("Too late")])
+
+        with pytest.raises(TimeoutError):
+            run_agent_sync(
+                Agent(FunctionModel(answer)), "Hi", timeout=0.01, max_retries=0
+            )
+
+    def test_failures_open_the_breaker(self, no_backoff, db):
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+        agent, calls = failing_agent([ModelHTTPError(503, "model")] * 5)
+
+        with pytest.raises(CircuitOpenError):
+            run_agent_sync(agent, "Hi", breaker=breaker, max_retries=5)
+        # The third attempt fails fast
+        assert len(calls) == 2
+
+    def test_success_closes_the_breaker(self, no_backoff, db):
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+        agent, _ = failing_agent([ModelHTTPError(503, "model")])
+
+        run_agent_sync(agent, "Hi", breaker=breaker, max_retries=1)
+
+        assert breaker.get_status()["consecutive_failures"] == 0
+        assert breaker.get_status()["total_failures"] == 1
+
+    def test_calls_are_measured(self, no_backoff):
+        agent, _ = failing_agent([TimeoutError()])
+
+        with timings_scope(RequestTimings()) as timings:
+            run_agent_sync(agent, "Hi", max_retries=1)
+
+        assert timings.durations["ai"] > 0
@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+import pytest
+from audits.ai.singleflight import SingleFlight, message_key
+from audits.models.audit import PromptFlight
+from django.utils import timezone
+
+
+def test_message_key():
+    assert message_key("session", "Hi") == message_key("session", "Hi")
+    assert message_key("session", "Hi") != message_key("session", "Hello")
+    assert message_key("session", "Hi") != message_key("other", "Hi")
+
+
+@pytest.mark.django_db
+class TestSingleFlight:
+    def test_single_leader(self):
+        leader = SingleFlight("key", timeout=5)
+
+        assert leader.lead()
+        assert not SingleFlight("key", timeout=5).lead()
+        assert SingleFlight("other", timeout=5).lead()
+
+    def test_duplicates_wait_for_the_leader(self, monkeypatch):
+        leader = SingleFlight("key", timeout=5)
+        leader.lead()
+        duplicate = SingleFlight("key", timeout=5)
+        assert not duplicate.lead()
+        polls = []
+
+        def sleep(seconds):
+            # The leader lands, in another worker, during the second poll
+            polls.append(seconds)
+            if len(polls) == 2:
+                leader.land()
+
+        monkeypatch.setattr("audits.ai.singleflight.time.sleep", sleep)
+
+        assert duplicate.wait(poll_interval=0.01)
+        assert polls == [0.01, 0.01]
+
+    def test_wait_timeout(self):
+        SingleFlight("key", timeout=5).lead()
+
+        assert not SingleFlight("key", timeout=0.05).wait(poll_interval=0.01)
+
+    def test_landed_flight_absorbs_duplicates(self):
+        leader = SingleFlight("key", timeout=5)
+        leader.lead()
+        leader.land()
+
+        duplicate = SingleFlight("key", timeout=5)
+        assert not duplicate.lead()
+        assert duplicate.wait()
+
+    def test_aborted_flight_does_not_absorb_duplicates(self):
+        leader = SingleFlight("key", timeout=5)
+        leader.lead()
+        leader.land(completed=False)
+
+        assert SingleFlight("key", timeout=5).lead()
+
+    def test_land_keeps_the_lock_of_another_leader(self):
+        expired = SingleFlight("key", timeout=5)
+        expired.lead()
+        PromptFlight.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        # The lock of `expired` expired, and another leader took it
+        new_leader = SingleFlight("key", timeout=5)
+        assert new_leader.lead()
+
+        expired.land(completed=False)
+
+        assert not SingleFlight("key", timeout=5).lead()
+
+    def test_expired_flights_are_deleted(self):
+        SingleFlight("key", timeout=5).lead()
+        PromptFlight.objects.update(expires_at=timezone.now())
+
+        SingleFlight("other", timeout=5).lead()
+
+        assert list(PromptFlight.objects.values_list("key", flat=True)) == ["other"]
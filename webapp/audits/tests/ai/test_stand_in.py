@@ -0,0 +1,181 @@
+import time
+from unittest.mock import patch
+
+import pytest
+from audits.ai.assessment import GroupAssessment
+from audits.ai.stand_in import (
+    DEFAULT_ANSWER,
+    PromptCache,
+    StandInOptions,
+    estimate_tokens,
+    is_stand_in,
+    prompt_cache,
+    stand_in_model,
+)
+from pydantic_ai import Agent
+from pydantic_ai.models.anthropic import AnthropicModelSettings
+
+CACHE_SETTINGS = AnthropicModelSettings(
+    anthropic_cache_instructions=True, anthropic_cache_messages=True
+)
+INSTRUCTIONS = "You are an auditor." * 100
+
+
+class TestStandInOptions:
+    def test_parse_defaults(self):
+        assert StandInOptions.parse("stand-in") == StandInOptions()
+
+    def test_parse_options(self):
+        options = StandInOptions.parse(
+            "stand-in:latency=0.8, tokens_per_second=60,jitter=0.2"
+        )
+
+        assert options.latency == 0.8
+        assert options.tokens_per_second == 60
+        assert options.jitter == 0.2
+
+    @pytest.mark.parametrize(
+        "spec",
+        [
+            "anthropic:claude",
+            "stand-in:unknown=1",
+            "stand-in:answer=1",
+            "stand-in:latency=x",
+        ],
+    )
+    def test_parse_invalid(self, spec):
+        with pytest.raises(ValueError):
+            StandInOptions.parse(spec)
+
+    def test_delay(self):
+        options = StandInOptions(latency=0.5, tokens_per_second=50)
+        assert options.delay(100) == 2.5
+
+    def test_delay_without_token_rate(self):
+        assert StandInOptions(latency=0.5, tokens_per_second=0).delay(100) == 0.5
+
+    def test_delay_with_jitter(self):
+        options = StandInOptions(latency=1, tokens_per_second=0, jitter=0.5)
+
+        delays = [options.delay(10) for _ in range(50)]
+
+        assert all(0.5 <= delay <= 1.5 for delay in delays)
+        assert len(set(delays)) > 1
+
+
+def test_is_stand_in():
+    assert is_stand_in("stand-in")
+    assert is_stand_in("stand-in:latency=1")
+    assert not is_stand_in("anthropic:claude-sonnet-4-0")
+    assert not is_stand_in(None)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("a" * 40) == 10
+
+
+class TestStandInModel:
+    def test_text_answer(self):
+        agent = Agent(stand_in_model(StandInOptions(latency=0, tokens_per_second=0)))
+
+        result = agent.run_sync("Is it compliant?", instructions="You are an auditor")
+
+        assert result.output == DEFAULT_ANSWER
+        assert result.usage().output_tokens == estimate_tokens(DEFAULT_ANSWER)
+        assert result.usage().input_tokens > 0
+
+    def test_simulated_delay(self):
+        agent = Agent(stand_in_model(StandInOptions(latency=0.05, tokens_per_second=0)))
+
+        start = time.perf_counter()
+        agent.run_sync("Is it compliant?")
+
+        assert time.perf_counter() - start >= 0.05
+
+    def test_group_assessment(self):
+        agent = Agent(
+            stand_in_model(StandInOptions(latency=0, tokens_per_second=0)),
+            output_type=GroupAssessment,
+        )
+
+        result = agent.run_sync(
+            "Assess", instructions="### 1.1: Backups\n\n### 1.2: Logs\n"
+        )
+
+        assert [verdict.public_id for verdict in result.output.verdicts] == [
+            "1.1",
+            "1.2",
+        ]
+
+
+class TestPromptCache:
+    def test_read_the_longest_cached_prefix(self):
+        cache = PromptCache()
+
+        assert cache.use(["a" * 40], [("a" * 40, "5m")]) == (0, 10)
+        assert cache.use(["a" * 40, "a" * 80], [("a" * 80, "5m")]) == (10, 10)
+        assert cache.use(["a" * 40, "a" * 80], [("a" * 80, "5m")]) == (20, 0)
+
+    def test_expiry(self):
+        cache = PromptCache()
+        cache.use([], [("a" * 40, "5m")])
+
+        with patch("audits.ai.stand_in.time.monotonic", return_value=1e12):
+            assert cache.use(["a" * 40], []) == (0, 0)
+
+    def test_clear(self):
+        cache = PromptCache()
+        cache.use([], [("a" * 40, "5m")])
+
+        cache.clear()
+
+        assert cache.use(["a" * 40], []) == (0, 0)
+
+
+class TestStandInModelPromptCache:
+    @pytest.fixture(autouse=True)
+    def empty_cache(self):
+        prompt_cache.clear()
+        yield
+        prompt_cache.clear()
+
+    @pytest.fixture
+    def agent(self):
+        return Agent(stand_in_model(StandInOptions(latency=0, tokens_per_second=0)))
+
+    def test_no_cache_without_settings(self, agent):
+        for _ in range(2):
+            usage = agent.run_sync("Hi", instructions=INSTRUCTIONS).usage()
+
+        assert usage.cache_read_tokens == usage.cache_write_tokens == 0
+
+    def test_instructions_are_cached(self, agent):
+        first = agent.run_sync(
+            "Hi", instructions=INSTRUCTIONS, model_settings=CACHE_SETTINGS
+        )
+        # Another session of the same criterion
+        second = agent.run_sync(
+            "Hello", instructions=INSTRUCTIONS, model_settings=CACHE_SETTINGS
+        )
+
+        assert first.usage().cache_read_tokens == 0
+        assert first.usage().cache_write_tokens > estimate_tokens(INSTRUCTIONS)
+        assert second.usage().cache_read_tokens == estimate_tokens(INSTRUCTIONS)
+
+    def test_conversation_is_cached(self, agent):
+        first = agent.run_sync(
+            "Hi", instructions=INSTRUCTIONS, model_settings=CACHE_SETTINGS
+        )
+
+        second = agent.run_sync(
+            "And?",
+            instructions=INSTRUCTIONS,
+            message_history=first.all_messages(),
+            model_settings=CACHE_SETTINGS,
+        )
+
+        # The previous turn is read from the cache, only the new messages are
+        # written
+        assert second.usage().cache_read_tokens == first.usage().cache_write_tokens
+        assert 0 < second.usage().cache_write_tokens < estimate_tokens(INSTRUCTIONS)
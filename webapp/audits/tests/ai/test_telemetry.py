@@ -0,0 +1,165 @@
+from datetime import timedelta
+
+import pytest
+from audits.ai.telemetry import (
+    TurnMetrics,
+    get_model_name,
+    record_turn,
+    usage_by_day,
+    usage_by_project,
+)
+from audits.models.audit import AIUsageDaily, PromptTurn
+from audits.tests.factories import PromptFactory
+from core.metrics import AI_DURATION
+from django.utils import timezone
+from organization.tests.factories import ProjectFactory, UserFactory
+from pydantic_ai import Agent
+from pydantic_ai.models.test import TestModel
+from pydantic_ai.usage import RunUsage
+
+
+@pytest.fixture
+def project():
+    return ProjectFactory()
+
+
+def record(project, latency=0.1, model="claude", error=None, **usage):
+    return record_turn(
+        project.organization_id,
+        project.id,
+        TurnMetrics(model=model, latency=latency, usage=RunUsage(**usage), error=error),
+    )
+
+
+def test_get_model_name():
+    assert get_model_name(Agent(TestModel())) == "test"
+
+
+@pytest.mark.django_db
+class TestRecordTurn:
+    def test_turn(self, project):
+        prompt = PromptFactory(project_audit_criterion__project_audit__project=project)
+        user = UserFactory()
+
+        turn = record_turn(
+            project.organization_id,
+            project.id,
+            TurnMetrics(
+                model="claude",
+                latency=1.2345,
+                usage=RunUsage(
+                    input_tokens=100,
+                    output_tokens=20,
+                    cache_read_tokens=80,
+                    cache_write_tokens=0,
+                ),
+            ),
+            prompt=prompt,
+            user=user,
+        )
+
+        turn.refresh_from_db()
+        assert turn.prompt == prompt
+        assert turn.user == user
+        assert turn.organization_id == project.organization_id
+        assert (turn.input_tokens, turn.output_tokens) == (100, 20)
+        assert turn.cache_status == PromptTurn.CacheStatus.HIT
+        assert turn.latency_ms == 1234
+        assert turn.error_class == ""
+
+    def test_error(self, project):
+        turn = record_turn(
+            project.organization_id,
+            project.id,
+            TurnMetrics(model="claude", latency=0.5, error=TimeoutError()),
+        )
+
+        assert turn.error_class == "TimeoutError"
+        assert turn.input_tokens == 0
+
+    def test_daily_rollup(self, project):
+        record(project, latency=0.1, input_tokens=10, output_tokens=1)
+        record(project, latency=0.3, input_tokens=20, output_tokens=2)
+        record(project, latency=0.2, error=TimeoutError())
+        record(project, model="other", input_tokens=5)
+
+        rollup = AIUsageDaily.objects.get(project=project, model="claude")
+        assert rollup.day == timezone.localdate()
+        assert rollup.organization_id == project.organization_id
+        assert rollup.turns == 3
+        assert rollup.errors == 1
+        assert rollup.input_tokens == 30
+        assert rollup.output_tokens == 3
+        assert rollup.latency_ms_total == 600
+        assert rollup.latency_ms_max == 300
+        assert AIUsageDaily.objects.get(project=project, model="other").turns == 1
+
+    def test_latency_metric(self, project):
+        labels = '["metric-test", "error"]'
+        before = AI_DURATION.snapshot().get(labels)
+
+        record(project, latency=0.7, model="metric-test", error=TimeoutError())
+
+        counts = AI_DURATION.snapshot()[labels]
+        assert before is None
+        assert sum(counts[:-1]) == 1
+        assert counts[-1] == 0.7
+
+
+@pytest.mark.django_db
+class TestUsageReports:
+    def test_usage_by_day(self, project, django_assert_num_queries):
+        other_project = ProjectFactory(organization=project.organization)
+        record(project, latency=0.1, input_tokens=10)
+        record(other_project, latency=0.3, input_tokens=20)
+        AIUsageDaily.objects.create(
+            organization=project.organization,
+            project=project,
+            day=timezone.localdate() - timedelta(days=1),
+            model="claude",
+            turns=2,
+            latency_ms_total=1000,
+            latency_ms_max=600,
+        )
+        # Other organizations are not reported
+        record(ProjectFactory(), input_tokens=1000)
+
+        with django_assert_num_queries(1):
+            rows = usage_by_day(
+                project.organization_id, timezone.localdate() - timedelta(days=1)
+            )
+
+        assert [(row["day"], row["turns"]) for row in rows] == [
+            (timezone.localdate(), 2),
+            (timezone.localdate() - timedelta(days=1), 2),
+        ]
+        assert rows[0]["input_tokens"] == 30
+        assert rows[0]["latency_ms_mean"] == 200
+        assert rows[0]["latency_ms_max"] == 300
+        assert rows[1]["latency_ms_mean"] == 500
+
+    def test_usage_since(self, project):
+        AIUsageDaily.objects.create(
+            organization=project.organization,
+            project=project,
+            day=timezone.localdate() - timedelta(days=10),
+            model="claude",
+            turns=2,
+        )
+
+        assert usage_by_day(project.organization_id, timezone.localdate()) == []
+
+    def test_usage_by_project(self, project):
+        record(project, model="claude", input_tokens=10)
+        record(project, model="claude", input_tokens=10)
+        record(project, model="stand-in", input_tokens=1)
+
+        rows = usage_by_project(project.organization_id, timezone.localdate())
+
+        assert [
+            (row["project__name"], row["model"], row["turns"], row["input_tokens"])
+            for row in rows
+        ] == [
+            (project.name, "claude", 2, 20),
+            (project.name, "stand-in", 1, 1),
+        ]
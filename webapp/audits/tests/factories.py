@@ -1,11 +1,13 @@
 import factory
 from audits.models.audit import (
+    AssessmentRun,
     AuditLibrary,
     Comment,
     Criterion,
     ProjectAudit,
     ProjectAuditCriterion,
     Prompt,
+    PromptTemplate,
     Tag,
 )
 from django.contrib.auth.models import User
@@ -39,6 +41,15 @@ class TagFactory(factory.django.DjangoModelFactory):
     name = Sequence(lambda n: f"Tag {n}")
 
 
+class PromptTemplateFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = PromptTemplate
+
+    audit_library = factory.SubFactory(AuditLibraryFactory)
+    name = PromptTemplate.PromptTemplateName.SYSTEM_PROMPT
+    content = "Assess {criterion_name} in {language}."
+
+
 class UserFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = User
@@ -91,3 +102,10 @@ class PromptFactory(factory.django.DjangoModelFactory):
     project_audit_criterion = factory.SubFactory(ProjectAuditCriterionFactory)
     name = Faker("sentence", nb_words=3)
     prompt = factory.LazyFunction(lambda: {"messages": []})
+
+
+class AssessmentRunFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = AssessmentRun
+
+    project_audit = factory.SubFactory(ProjectAuditFactory)
@@ -0,0 +1,77 @@
+from io import StringIO
+
+import pytest
+from audits.models.audit import AssessmentRun
+from audits.tests.factories import (
+    AssessmentRunFactory,
+    ProjectAuditCriterionFactory,
+    ProjectAuditFactory,
+)
+from django.core.management import CommandError, call_command
+from pydantic_ai.models.test import TestModel
+
+Status = AssessmentRun.AssessmentRunStatus
+
+
+@pytest.fixture
+def test_model(settings):
+    settings.ANTHROPIC_API_KEY = "test"  # pragma: allowlist secret
+    settings.ANTHROPIC_MODEL = TestModel(custom_output_text="Compliant")
+
+
+@pytest.mark.django_db
+class TestAssessAuditCommand:
+    def test_assess_audit(self, test_model):
+        project_audit = ProjectAuditFactory()
+        ProjectAuditCriterionFactory.create_batch(2, project_audit=project_audit)
+        out = StringIO()
+
+        call_command("assess_audit", project_audit.id, stdout=out)
+
+        run = AssessmentRun.objects.get(project_audit=project_audit)
+        assert run.status == Status.COMPLETED
+        assert run.succeeded == 2
+        assert "2/2 criteria assessed, 0 failed" in out.getvalue()
+
+    def test_assess_audit_grouped(self, test_model):
+        project_audit = ProjectAuditFactory()
+        ProjectAuditCriterionFactory.create_batch(3, project_audit=project_audit)
+
+        call_command(
+            "assess_audit",
+            project_audit.id,
+            "--grouping",
+            "CHUNK",
+            "--group-size",
+            "2",
+            stdout=StringIO(),
+        )
+
+        run = AssessmentRun.objects.get(project_audit=project_audit)
+        assert run.grouping == AssessmentRun.AssessmentRunGrouping.CHUNK
+        assert run.group_size == 2
+        assert run.total == 3
+        assert run.processed == 3
+
+    def test_assess_audit_invalid_group_size(self):
+        project_audit = ProjectAuditFactory()
+
+        with pytest.raises(CommandError):
+            call_command("assess_audit", project_audit.id, "--group-size", "0")
+
+    def test_assess_audit_resumes_interrupted_run(self, test_model):
+        project_audit = ProjectAuditFactory()
+        ProjectAuditCriterionFactory(project_audit=project_audit)
+        run = AssessmentRunFactory(project_audit=project_audit, status=Status.FAILED)
+        out = StringIO()
+
+        call_command("assess_audit", project_audit.id, stdout=out)
+
+        run.refresh_from_db()
+        assert run.status == Status.COMPLETED
+        assert AssessmentRun.objects.filter(project_audit=project_audit).count() == 1
+        assert f"Resuming assessment run {run.id}" in out.getvalue()
+
+    def test_assess_audit_unknown_audit(self):
+        with pytest.raises(CommandError):
+            call_command("assess_audit", 0)
@@ -0,0 +1,14 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+
+class TestBenchmarkAiClientCommand:
+    def test_benchmark_ai_client(self):
+        out = StringIO()
+
+        call_command("benchmark_ai_client", "--requests", "3", stdout=out)
+
+        output = out.getvalue()
+        assert "new client per request: 3 requests, 3 connections" in output
+        assert "pooled agent factory: 3 requests, 1 connections" in output
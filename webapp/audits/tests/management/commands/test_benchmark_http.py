@@ -0,0 +1,82 @@
+import json
+from io import StringIO
+
+import pytest
+from audits.tests.factories import ProjectAuditCriterionFactory
+from django.contrib.auth.models import Group
+from django.core.management import CommandError, call_command
+from organization.tests.factories import (
+    OrganizationFactory,
+    OrganizationMemberFactory,
+    UserFactory,
+)
+
+
+@pytest.fixture
+def organization():
+    call_command("loaddata", "content_type", verbosity=0)
+    call_command("loaddata", "auth", verbosity=0)
+    organization = OrganizationFactory(name="Tenant")
+    OrganizationMemberFactory(
+        user=UserFactory(email="reader@example.com"),
+        organization=organization,
+        group=Group.objects.get(name="reader"),
+    )
+    ProjectAuditCriterionFactory(project_audit__project__organization=organization)
+    return organization
+
+
+def _benchmark(path, *arguments):
+    out = StringIO()
+    call_command(
+        "benchmark_http",
+        "Tenant",
+        "--requests=2",
+        "--warmup=0",
+        f"--history={path}",
+        *arguments,
+        stdout=out,
+        stderr=StringIO(),
+    )
+    return out.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBenchmarkHttpCommand:
+    def test_first_run(self, organization, tmp_path):
+        path = tmp_path / "http.json"
+
+        out = _benchmark(path, "--user=reader@example.com")
+
+        assert "projectaudit_detail: p50" in out
+        assert "No baseline yet" in out
+        history = json.loads(path.read_text())
+        assert history["baseline"] is None
+        assert len(history["runs"]) == 1
+
+    def test_compare_with_baseline(self, organization, tmp_path):
+        path = tmp_path / "http.json"
+        _benchmark(path, "--save-baseline")
+
+        out = _benchmark(path, "--latency-threshold=1000", "--size-threshold=1")
+
+        assert "No regression from the baseline" in out
+        assert len(json.loads(path.read_text())["runs"]) == 2
+
+    def test_regression(self, organization, tmp_path):
+        path = tmp_path / "http.json"
+        _benchmark(path, "--save-baseline")
+        history = json.loads(path.read_text())
+        history["baseline"]["endpoints"]["dashboard"]["queries"] = 0
+        path.write_text(json.dumps(history))
+
+        with pytest.raises(CommandError, match="1 regressions"):
+            _benchmark(path, "--latency-threshold=1000", "--size-threshold=1")
+
+    def test_unknown_organization(self, tmp_path):
+        with pytest.raises(CommandError, match="does not exist"):
+            _benchmark(tmp_path / "http.json")
+
+    def test_unknown_user(self, organization, tmp_path):
+        with pytest.raises(CommandError, match="No such member"):
+            _benchmark(tmp_path / "http.json", "--user=nobody")
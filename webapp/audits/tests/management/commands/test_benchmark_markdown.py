@@ -0,0 +1,27 @@
+from io import StringIO
+
+import pytest
+from audits.rendering import clear_cache
+from django.core.cache import cache
+from django.core.management import call_command
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+    cache.clear()
+    clear_cache()
+
+
+class TestBenchmarkMarkdownCommand:
+    def test_benchmark_markdown(self):
+        out = StringIO()
+
+        call_command("benchmark_markdown", messages=2, views=1, stdout=out)
+
+        output = out.getvalue()
+        assert "new instance: 2 messages" in output
+        assert "process cache: 2 messages" in output
+        assert "µs/message" in output
@@ -0,0 +1,96 @@
+from io import StringIO
+
+import pytest
+from audits.ai.retrieval import get_project_index
+from django.core.management import CommandError, call_command
+from organization.models.organization import ResourceSnapshot
+from organization.tests.factories import ResourceSnapshotFactory
+
+
+@pytest.fixture
+def snapshots_root(settings, tmp_path):
+    settings.RESOURCE_SNAPSHOTS_ROOT = tmp_path / "snapshots"
+    return settings.RESOURCE_SNAPSHOTS_ROOT
+
+
+@pytest.fixture
+def repository(tmp_path):
+    directory = tmp_path / "repository"
+    directory.mkdir()
+    (directory / "backup.py").write_text("def backup_database(): pass\n")
+    return directory
+
+
+@pytest.mark.django_db
+class TestIndexResourcesCommand:
+    def test_index_latest_snapshots(self, snapshots_root, repository):
+        snapshot = ResourceSnapshotFactory(
+            kind=ResourceSnapshot.Kind.LOCAL,
+            source=str(repository),
+            status=ResourceSnapshot.Status.INDEXED,
+        )
+        ResourceSnapshotFactory(status=ResourceSnapshot.Status.PENDING)
+        out = StringIO()
+
+        call_command("index_resources", stdout=out)
+
+        assert "1 files, 1 chunks (1 added, 0 updated, 0 removed)" in out.getvalue()
+        assert "1 resources indexed" in out.getvalue()
+        index = get_project_index(snapshot.resource.project_id)
+        assert index.search("backup", limit=5)
+
+    def test_index_is_incremental(self, snapshots_root, repository):
+        ResourceSnapshotFactory(
+            kind=ResourceSnapshot.Kind.LOCAL,
+            source=str(repository),
+            status=ResourceSnapshot.Status.INDEXED,
+        )
+        call_command("index_resources", stdout=StringIO())
+        (repository / "restore.py").write_text("def restore(): pass\n")
+        out = StringIO()
+
+        call_command("index_resources", stdout=out)
+
+        assert "(1 added, 0 updated, 0 removed)" in out.getvalue()
+
+    def test_index_project(self, snapshots_root, repository):
+        snapshot = ResourceSnapshotFactory(
+            kind=ResourceSnapshot.Kind.LOCAL,
+            source=str(repository),
+            status=ResourceSnapshot.Status.INDEXED,
+        )
+        ResourceSnapshotFactory(
+            kind=ResourceSnapshot.Kind.LOCAL,
+            source=str(repository),
+            status=ResourceSnapshot.Status.INDEXED,
+        )
+        out = StringIO()
+
+        call_command(
+            "index_resources", project=snapshot.resource.project_id, stdout=out
+        )
+
+        assert "1 resources indexed" in out.getvalue()
+
+    def test_search(self, snapshots_root, repository):
+        snapshot = ResourceSnapshotFactory(
+            kind=ResourceSnapshot.Kind.LOCAL,
+            source=str(repository),
+            status=ResourceSnapshot.Status.INDEXED,
+        )
+        call_command("index_resources", stdout=StringIO())
+        out = StringIO()
+
+        call_command(
+            "index_resources",
+            project=snapshot.resource.project_id,
+            search="database backups",
+            stdout=out,
+        )
+
+        assert "backup.py:1-1" in out.getvalue()
+        assert "1 excerpts found in" in out.getvalue()
+
+    def test_search_needs_project(self):
+        with pytest.raises(CommandError, match="--search needs --project"):
+            call_command("index_resources", search="backups")
@@ -0,0 +1,103 @@
+from io import StringIO
+
+import pytest
+from audits.models.audit import Prompt
+from audits.tests.factories import ProjectAuditCriterionFactory, PromptFactory
+from django.contrib.auth.models import Group
+from django.core.management import CommandError, call_command
+from organization.tests.factories import (
+    OrganizationFactory,
+    OrganizationMemberFactory,
+    UserFactory,
+)
+
+STAND_IN = "stand-in:latency=0,tokens_per_second=0"
+
+
+@pytest.fixture
+def writer():
+    call_command("loaddata", "content_type", verbosity=0)
+    call_command("loaddata", "auth", verbosity=0)
+    user = UserFactory(email="writer@example.com")
+    organization = OrganizationFactory()
+    OrganizationMemberFactory(
+        user=user, organization=organization, group=Group.objects.get(name="writer")
+    )
+    return user, organization
+
+
+@pytest.mark.django_db(transaction=True)
+class TestLoadTestPromptsCommand:
+    def test_load_test_prompts(self, writer):
+        _, organization = writer
+        criterion = ProjectAuditCriterionFactory(
+            project_audit__project__organization=organization
+        )
+        recorded = PromptFactory(
+            project_audit_criterion=criterion,
+            prompt={"messages": [{"role": "user", "content": "Hi"}]},
+        )
+        # Sessions of other organizations are not replayed
+        PromptFactory(prompt={"messages": [{"role": "user", "content": "Hi"}]})
+        out = StringIO()
+
+        call_command(
+            "load_test_prompts",
+            "writer@example.com",
+            "--sessions",
+            "5",
+            "--synthetic",
+            "2",
+            "--workers",
+            "1",
+            "--model",
+            STAND_IN,
+            stdout=out,
+        )
+
+        output = out.getvalue()
+        assert "5 requests (0 errors)" in output
+        assert "p50" in output and "p95" in output and "p99" in output
+        assert "Worker occupancy:" in output
+        # The prompts of the load test are deleted
+        assert Prompt.objects.filter(project_audit_criterion=criterion).get() == (
+            recorded
+        )
+
+    def test_keep_prompts(self, writer):
+        _, organization = writer
+        ProjectAuditCriterionFactory(project_audit__project__organization=organization)
+
+        call_command(
+            "load_test_prompts",
+            "writer@example.com",
+            "--synthetic",
+            "1",
+            "--workers",
+            "1",
+            "--model",
+            STAND_IN,
+            "--keep",
+            stdout=StringIO(),
+        )
+
+        assert Prompt.objects.count() == 1
+
+    def test_real_models_are_refused(self, writer):
+        with pytest.raises(CommandError):
+            call_command(
+                "load_test_prompts",
+                "writer@example.com",
+                "--synthetic",
+                "1",
+                "--model",
+                "anthropic:claude-sonnet-4-0",
+            )
+
+    def test_unknown_user(self):
+        with pytest.raises(CommandError):
+            call_command("load_test_prompts", "nobody@example.com", "--synthetic", "1")
+
+    def test_nothing_to_send(self, writer):
+        with pytest.raises(CommandError):
+            call_command("load_test_prompts", "writer@example.com")
@@ -0,0 +1,32 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from audits.models.audit import ProjectAudit
+from audits.tests.factories import ProjectAuditFactory
+from django.core.management import call_command
+from django.utils import timezone
+from organization.tests.factories import ResourceFactory
+
+
+@pytest.mark.django_db
+class TestPurgeDeletedCommand:
+    def test_purge_deleted(self):
+        ProjectAuditFactory(deleted_at=timezone.now() - timedelta(days=31))
+        recent = ProjectAuditFactory(deleted_at=timezone.now())
+        out = StringIO()
+
+        call_command("purge_deleted", "--pause", "0", stdout=out)
+
+        assert "0 projects, 1 audits and 0 resources purged" in out.getvalue()
+        assert list(ProjectAudit.all_objects.all()) == [recent]
+
+    def test_retention_days(self):
+        ResourceFactory(deleted_at=timezone.now() - timedelta(days=2))
+        out = StringIO()
+
+        call_command(
+            "purge_deleted", "--retention-days", "1", "--pause", "0", stdout=out
+        )
+
+        assert "0 projects, 0 audits and 1 resources purged" in out.getvalue()
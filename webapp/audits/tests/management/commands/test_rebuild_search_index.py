@@ -0,0 +1,20 @@
+from io import StringIO
+
+import pytest
+from audits.models.audit import SearchDocument
+from audits.tests.factories import CommentFactory
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+class TestRebuildSearchIndexCommand:
+    def test_rebuild(self):
+        comment = CommentFactory(comment="Keys are rotated")
+        SearchDocument.objects.all().delete()
+        out = StringIO()
+
+        call_command("rebuild_search_index", "--batch-size", 1, stdout=out)
+
+        # The comment and its criterion
+        assert "2 documents indexed" in out.getvalue()
+        assert SearchDocument.objects.get(kind="comment", object_id=comment.id)
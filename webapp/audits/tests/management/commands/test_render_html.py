@@ -0,0 +1,32 @@
+from io import StringIO
+
+import pytest
+from audits.models.audit import Comment, Prompt
+from audits.rendering import RENDERER_VERSION
+from audits.tests.factories import CommentFactory, PromptFactory
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+class TestRenderHtmlCommand:
+    def test_render_stale_rows(self):
+        comment = CommentFactory(comment="*Text*")
+        Comment.objects.filter(id=comment.id).update(html_version=0)
+        PromptFactory()
+        out = StringIO()
+
+        call_command("render_html", stdout=out)
+
+        assert "1 comments and 0 prompts rendered" in out.getvalue()
+        comment.refresh_from_db()
+        assert comment.html_version == RENDERER_VERSION
+
+    def test_render_force(self):
+        CommentFactory()
+        PromptFactory()
+        out = StringIO()
+
+        call_command("render_html", "--force", "--batch-size", "1", stdout=out)
+
+        assert "1 comments and 1 prompts rendered" in out.getvalue()
+        assert Prompt.objects.get().html_version == RENDERER_VERSION
@@ -0,0 +1,33 @@
+from io import StringIO
+
+import pytest
+from audits.models.audit import ProjectAuditCriterion
+from audits.tests.factories import CommentFactory, ProjectAuditCriterionFactory
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+class TestRepairActivityCommand:
+    def test_repair(self):
+        criterion = ProjectAuditCriterionFactory()
+        CommentFactory(project_audit_criterion=criterion)
+        ProjectAuditCriterion.objects.update(comment_count=0)
+        out = StringIO()
+
+        call_command("repair_activity", stdout=out)
+
+        assert "1 criteria repaired" in out.getvalue()
+        criterion.refresh_from_db()
+        assert criterion.comment_count == 1
+
+    def test_repair_audit(self):
+        criterion = ProjectAuditCriterionFactory()
+        ProjectAuditCriterionFactory()
+        ProjectAuditCriterion.objects.update(comment_count=2)
+        out = StringIO()
+
+        call_command(
+            "repair_activity", "--audit", criterion.project_audit_id, stdout=out
+        )
+
+        assert "1 criteria repaired" in out.getvalue()
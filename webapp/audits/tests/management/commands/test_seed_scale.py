@@ -0,0 +1,33 @@
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from organization.models.organization import Organization
+
+ARGUMENTS = [
+    "--projects=2",
+    "--libraries=2",
+    "--criteria=3",
+    "--audits=1",
+    "--users=1",
+    "--comments=1",
+]
+
+
+@pytest.mark.django_db
+class TestSeedScaleCommand:
+    def test_seed(self):
+        out = StringIO()
+
+        call_command("seed_scale", "--seed=3", *ARGUMENTS, stdout=out)
+
+        organization = Organization.objects.get(name="Scale 3")
+        assert organization.projects.count() == 2
+        assert "projectauditcriterion: 6" in out.getvalue()
+        assert 'Organization "Scale 3"' in out.getvalue()
+
+    def test_existing_organization(self):
+        call_command("seed_scale", "--name=Tenant", *ARGUMENTS, stdout=StringIO())
+
+        with pytest.raises(CommandError, match="already exists"):
+            call_command("seed_scale", "--name=Tenant", *ARGUMENTS)
@@ -1,24 +1,33 @@
+from datetime import timedelta
+
 import pytest
 from audits.models.audit import (
+    AssessmentRun,
     AuditLibrary,
     Comment,
     Criterion,
     ProjectAudit,
     ProjectAuditCriterion,
     Prompt,
+    PromptTemplate,
+    PromptTurn,
     Tag,
 )
+from audits.rendering import RENDERER_VERSION
 from audits.tests.factories import (
+    AssessmentRunFactory,
     AuditLibraryFactory,
     CommentFactory,
     CriterionFactory,
     ProjectAuditCriterionFactory,
     ProjectAuditFactory,
     PromptFactory,
+    PromptTemplateFactory,
     TagFactory,
     UserFactory,
 )
 from django.db import IntegrityError
+from django.utils import timezone
 from organization.models.organization import Organization
 from organization.tests.factories import OrganizationFactory, ProjectFactory
 
@@ -253,6 +262,26 @@ class TestTag:
         assert str(tag) == "Tag Test"
 
 
+@pytest.mark.django_db
+class TestPromptTemplate:
+    def test_unique_per_audit_library_and_name(self, audit_library):
+        PromptTemplateFactory(audit_library=audit_library)
+
+        with pytest.raises(IntegrityError):
+            PromptTemplateFactory(audit_library=audit_library)
+
+    def test_cascade_delete(self, audit_library):
+        template = PromptTemplateFactory(audit_library=audit_library)
+
+        audit_library.delete()
+
+        assert not PromptTemplate.objects.filter(id=template.id).exists()
+
+    def test_str_representation(self):
+        template = PromptTemplateFactory(audit_library__name="RGAA")
+        assert str(template) == "RGAA - System prompt"
+
+
 @pytest.fixture
 def project(organization):
     return ProjectFactory(organization=organization)
@@ -448,6 +477,35 @@ class TestProjectAuditCriterion:
         assert project_audit_criterion2 in criterion.project_audit_criteria.all()
         assert criterion.project_audit_criteria.count() == 2
 
+    def test_activity_default(self, project_audit_criterion):
+        assert project_audit_criterion.comment_count == 0
+        assert project_audit_criterion.prompt_session_count == 0
+        assert project_audit_criterion.last_activity_at is None
+
+    def test_record_activity(self, project_audit_criterion):
+        at = timezone.now()
+
+        ProjectAuditCriterion.record_activity(
+            project_audit_criterion.id, comments=2, prompt_sessions=1, at=at
+        )
+        ProjectAuditCriterion.record_activity(
+            project_audit_criterion.id, comments=-1, at=at - timedelta(hours=1)
+        )
+
+        project_audit_criterion.refresh_from_db()
+        assert project_audit_criterion.comment_count == 1
+        assert project_audit_criterion.prompt_session_count == 1
+        assert project_audit_criterion.last_activity_at == at
+
+    def test_record_activity_never_negative(self, project_audit_criterion):
+        ProjectAuditCriterion.record_activity(
+            project_audit_criterion.id, comments=-1, prompt_sessions=-1
+        )
+
+        project_audit_criterion.refresh_from_db()
+        assert project_audit_criterion.comment_count == 0
+        assert project_audit_criterion.prompt_session_count == 0
+
 
 @pytest.mark.django_db
 class TestProjectAuditCriterionComment:
@@ -545,6 +603,55 @@ class TestProjectAuditCriterionComment:
         assert comment2 in project_audit_criterion.comments.all()
         assert project_audit_criterion.comments.count() == 2
 
+    def test_save_records_activity(self, project_audit_criterion):
+        comment = CommentFactory(project_audit_criterion=project_audit_criterion)
+        comment.save()
+
+        project_audit_criterion.refresh_from_db()
+        assert project_audit_criterion.comment_count == 1
+        assert project_audit_criterion.last_activity_at == comment.updated_at
+
+    def test_delete_records_activity(self, project_audit_criterion):
+        CommentFactory.create_batch(2, project_audit_criterion=project_audit_criterion)
+
+        Comment.objects.filter(project_audit_criterion=project_audit_criterion)[
+            :1
+        ].get().delete()
+
+        project_audit_criterion.refresh_from_db()
+        assert project_audit_criterion.comment_count == 1
+
+    def test_save_renders_html(self, project_audit_criterion):
+        comment = CommentFactory(
+            project_audit_criterion=project_audit_criterion,
+            comment="**Done**<script>alert(1)</script>",
+        )
+
+        comment.refresh_from_db()
+        assert comment.comment_html == "<p><strong>Done</strong></p>"
+        assert comment.html_version == RENDERER_VERSION
+
+    def test_save_with_update_fields_renders_html(self, project_audit_criterion):
+        comment = CommentFactory(
+            project_audit_criterion=project_audit_criterion, comment="Old"
+        )
+        comment.comment = "*New*"
+
+        comment.save(update_fields=["comment"])
+
+        comment.refresh_from_db()
+        assert comment.comment_html == "<p><em>New</em></p>"
+
+    def test_save_other_fields_does_not_render(self, project_audit_criterion):
+        comment = CommentFactory(project_audit_criterion=project_audit_criterion)
+        Comment.objects.filter(id=comment.id).update(html_version=0)
+        comment.html_version = 0
+
+        comment.save(update_fields=["updated_at"])
+
+        comment.refresh_from_db()
+        assert comment.html_version == 0
+
 
 @pytest.mark.django_db
 class TestPrompt:
@@ -566,6 +673,16 @@ class TestPrompt:
 
         assert prompt1.session_id != prompt2.session_id
 
+    def test_unique_session_per_criterion(self, project_audit_criterion):
+        prompt = PromptFactory(project_audit_criterion=project_audit_criterion)
+        PromptFactory(session_id=prompt.session_id)
+
+        with pytest.raises(IntegrityError):
+            PromptFactory(
+                project_audit_criterion=project_audit_criterion,
+                session_id=prompt.session_id,
+            )
+
     def test_name_default(self, project_audit_criterion):
         prompt = PromptFactory(
             project_audit_criterion=project_audit_criterion, name="Prompt"
@@ -611,3 +728,156 @@ class TestPrompt:
         str_repr = str(prompt)
         assert "Test Prompt" in str_repr
         assert prompt.created_at.strftime("%Y-%m-%d") in str_repr
+
+    def test_save_records_activity(self, project_audit_criterion):
+        prompt = PromptFactory(project_audit_criterion=project_audit_criterion)
+        prompt.prompt = {"messages": [{"role": "user", "content": "Hi"}]}
+        prompt.save()
+
+        project_audit_criterion.refresh_from_db()
+        assert project_audit_criterion.prompt_session_count == 1
+        assert project_audit_criterion.last_activity_at == prompt.updated_at
+
+    def test_bulk_delete_records_activity(self, project_audit_criterion):
+        PromptFactory.create_batch(3, project_audit_criterion=project_audit_criterion)
+
+        Prompt.objects.filter(project_audit_criterion=project_audit_criterion).delete()
+
+        project_audit_criterion.refresh_from_db()
+        assert project_audit_criterion.prompt_session_count == 0
+
+    def test_save_renders_assistant_messages(self, project_audit_criterion):
+        prompt = PromptFactory(
+            project_audit_criterion=project_audit_criterion,
+            prompt={
+                "messages": [
+                    {"role": "user", "content": "**Question**"},
+                    {"role": "assistant", "content": "**Answer**"},
+                    {"role": "error", "content": "Failed"},
+                ]
+            },
+        )
+
+        prompt.refresh_from_db()
+        messages = prompt.prompt["messages"]
+        assert "html" not in messages[0]
+        assert messages[1]["html"] == "<p><strong>Answer</strong></p>"
+        assert messages[2]["html"] == "<p>Failed</p>"
+        assert prompt.html_version == RENDERER_VERSION
+
+    def test_render_html_keeps_rendered_messages(self, project_audit_criterion):
+        prompt = PromptFactory(
+            project_audit_criterion=project_audit_criterion,
+            prompt={"messages": [{"role": "assistant", "content": "First"}]},
+        )
+        prompt.prompt["messages"][0]["html"] = "<p>Kept</p>"
+        prompt.prompt["messages"].append({"role": "assistant", "content": "Second"})
+
+        prompt.render_html()
+
+        assert [message["html"] for message in prompt.prompt["messages"]] == [
+            "<p>Kept</p>",
+            "<p>Second</p>",
+        ]
+
+    def test_render_html_stale_renders_every_message(self, project_audit_criterion):
+        prompt = PromptFactory(
+            project_audit_criterion=project_audit_criterion,
+            prompt={"messages": [{"role": "assistant", "content": "First"}]},
+        )
+        prompt.prompt["messages"][0]["html"] = "<p>Old</p>"
+        prompt.html_version = 0
+
+        prompt.render_html()
+
+        assert prompt.prompt["messages"][0]["html"] == "<p>First</p>"
+        assert prompt.html_version == RENDERER_VERSION
+
+
+@pytest.mark.django_db
+class TestAssessmentRun:
+    Status = AssessmentRun.AssessmentRunStatus
+
+    def test_default_status(self):
+        run = AssessmentRunFactory()
+
+        assert run.status == self.Status.PENDING
+        assert run.is_active
+        assert not run.is_resumable
+
+    def test_progress(self):
+        run = AssessmentRunFactory(total=8, succeeded=3, failed=1)
+
+        assert run.processed == 4
+        assert run.progress == 50
+
+    def test_progress_without_criteria(self):
+        run = AssessmentRunFactory(total=0)
+
+        assert run.progress == 0
+
+    def test_completed_run_is_resumable_only_with_failures(self):
+        run = AssessmentRunFactory(status=self.Status.COMPLETED, failed=0)
+        assert not run.is_active
+        assert not run.is_resumable
+
+        run.failed = 2
+        assert run.is_resumable
+
+    def test_failed_run_is_resumable(self):
+        run = AssessmentRunFactory(status=self.Status.FAILED)
+
+        assert not run.is_active
+        assert run.is_resumable
+
+    def test_stale_running_run_is_resumable(self, settings):
+        settings.AI_ASSESSMENT_TIMEOUT = 10
+        settings.AI_ASSESSMENT_MAX_RETRIES = 2
+        run = AssessmentRunFactory(status=self.Status.RUNNING)
+        assert not run.is_stale
+        assert run.is_active
+
+        AssessmentRun.objects.filter(id=run.id).update(
+            updated_at=timezone.now() - timedelta(seconds=61)
+        )
+        run.refresh_from_db()
+
+        assert run.is_stale
+        assert not run.is_active
+        assert run.is_resumable
+
+    def test_cascade_delete_project_audit(self):
+        run = AssessmentRunFactory()
+        run_id = run.id
+
+        run.project_audit.delete()
+
+        assert not AssessmentRun.objects.filter(id=run_id).exists()
+
+    def test_prompts_are_kept_when_run_is_deleted(self):
+        run = AssessmentRunFactory()
+        prompt = PromptFactory(assessment_run=run)
+
+        run.delete()
+
+        prompt.refresh_from_db()
+        assert prompt.assessment_run is None
+
+
+@pytest.mark.django_db
+class TestPromptTurn:
+    @pytest.mark.parametrize(
+        "cache_read_tokens,cache_write_tokens,status",
+        [
+            (100, 0, PromptTurn.CacheStatus.HIT),
+            (100, 20, PromptTurn.CacheStatus.HIT),
+            (0, 20, PromptTurn.CacheStatus.WRITE),
+            (0, 0, PromptTurn.CacheStatus.MISS),
+        ],
+    )
+    def test_cache_status(self, cache_read_tokens, cache_write_tokens, status):
+        turn = PromptTurn(
+            cache_read_tokens=cache_read_tokens, cache_write_tokens=cache_write_tokens
+        )
+
+        assert turn.cache_status == status
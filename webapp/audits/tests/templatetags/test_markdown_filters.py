@@ -0,0 +1,17 @@
+from audits.rendering import clear_cache
+from audits.templatetags.markdown_filters import markdown_filter
+from django.utils.safestring import SafeString
+
+
+class TestMarkdownFilter:
+    def setup_method(self):
+        clear_cache()
+
+    def test_markdown_filter(self):
+        html = markdown_filter("*emphasis*")
+
+        assert html == "<p><em>emphasis</em></p>"
+        assert isinstance(html, SafeString)
+
+    def test_markdown_filter_empty(self):
+        assert markdown_filter("") == ""
@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+import pytest
+from audits.activity import repair_activity
+from audits.models.audit import ProjectAuditCriterion
+from audits.tests.factories import (
+    CommentFactory,
+    ProjectAuditCriterionFactory,
+    PromptFactory,
+)
+from django.utils import timezone
+
+
+@pytest.mark.django_db
+class TestRepairActivity:
+    def test_repair_activity(self):
+        criterion = ProjectAuditCriterionFactory()
+        comment = CommentFactory(project_audit_criterion=criterion)
+        prompt = PromptFactory(project_audit_criterion=criterion)
+        ProjectAuditCriterion.objects.filter(id=criterion.id).update(
+            comment_count=5, prompt_session_count=0, last_activity_at=None
+        )
+
+        assert repair_activity() == 1
+
+        criterion.refresh_from_db()
+        assert criterion.comment_count == 1
+        assert criterion.prompt_session_count == 1
+        assert criterion.last_activity_at == max(comment.updated_at, prompt.updated_at)
+
+    def test_repair_activity_comments_only(self):
+        criterion = ProjectAuditCriterionFactory()
+        comment = CommentFactory(project_audit_criterion=criterion)
+        ProjectAuditCriterion.objects.filter(id=criterion.id).update(
+            last_activity_at=timezone.now() - timedelta(days=1)
+        )
+
+        assert repair_activity() == 1
+
+        criterion.refresh_from_db()
+        assert criterion.last_activity_at == comment.updated_at
+
+    def test_repair_activity_in_sync(self):
+        criterion = ProjectAuditCriterionFactory()
+        CommentFactory(project_audit_criterion=criterion)
+        PromptFactory(project_audit_criterion=criterion)
+        ProjectAuditCriterionFactory()
+
+        assert repair_activity() == 0
+
+    def test_repair_activity_queryset(self):
+        criterion = ProjectAuditCriterionFactory()
+        other = ProjectAuditCriterionFactory()
+        ProjectAuditCriterion.objects.update(comment_count=3)
+
+        assert repair_activity(ProjectAuditCriterion.objects.filter(id=other.id)) == 1
+
+        criterion.refresh_from_db()
+        assert criterion.comment_count == 3
@@ -0,0 +1,144 @@
+from datetime import timedelta
+
+import pytest
+from audits.deletion import delete_project, delete_project_audit, purge_deleted
+from audits.models.audit import (
+    Comment,
+    ProjectAudit,
+    ProjectAuditCriterion,
+    Prompt,
+    PromptTurn,
+    SearchDocument,
+)
+from audits.tests.factories import (
+    CommentFactory,
+    ProjectAuditCriterionFactory,
+    ProjectAuditFactory,
+    PromptFactory,
+)
+from django.db.models.signals import post_delete
+from django.utils import timezone
+from organization.models.organization import Project, Resource
+from organization.tests.factories import ProjectFactory, ResourceFactory
+
+
+def _turn(prompt: Prompt) -> PromptTurn:
+    project = prompt.project_audit_criterion.project_audit.project
+    return PromptTurn.objects.create(
+        organization=project.organization,
+        project=project,
+        prompt=prompt,
+        model="test-model",
+    )
+
+
+@pytest.mark.django_db
+class TestDelete:
+    def test_delete_project_audit(self):
+        criterion = ProjectAuditCriterionFactory()
+        other = ProjectAuditCriterionFactory()
+        CommentFactory(project_audit_criterion=criterion)
+        turn = _turn(PromptFactory(project_audit_criterion=criterion))
+        audit = criterion.project_audit
+
+        delete_project_audit(audit)
+
+        assert not ProjectAudit.all_objects.filter(id=audit.id).exists()
+        assert list(ProjectAuditCriterion.objects.all()) == [other]
+        assert not Comment.objects.exists()
+        assert not Prompt.objects.exists()
+        assert not SearchDocument.objects.exclude(
+            kind=SearchDocument.Kind.CRITERION
+        ).exists()
+        turn.refresh_from_db()
+        assert turn.prompt is None
+
+    def test_delete_project(self):
+        project = ProjectFactory()
+        audit = ProjectAuditFactory(project=project)
+        criteria = ProjectAuditCriterionFactory.create_batch(3, project_audit=audit)
+        CommentFactory(project_audit_criterion=criteria[0])
+        _turn(PromptFactory(project_audit_criterion=criteria[1]))
+        ResourceFactory(project=project)
+
+        delete_project(project)
+
+        assert not Project.all_objects.filter(id=project.id).exists()
+        assert not ProjectAudit.all_objects.exists()
+        assert not Resource.all_objects.exists()
+        assert not ProjectAuditCriterion.objects.exists()
+        assert not PromptTurn.objects.exists()
+        assert not SearchDocument.objects.exclude(
+            kind=SearchDocument.Kind.CRITERION
+        ).exists()
+
+    def test_delete_sends_the_signals(self):
+        criterion = ProjectAuditCriterionFactory()
+        CommentFactory(project_audit_criterion=criterion)
+        PromptFactory(project_audit_criterion=criterion)
+        deleted = []
+
+        def receiver(sender, instance, **kwargs):
+            deleted.append(sender)
+
+        post_delete.connect(receiver, sender=Comment)
+        post_delete.connect(receiver, sender=Prompt)
+        try:
+            delete_project_audit(criterion.project_audit, batch_size=1)
+        finally:
+            post_delete.disconnect(receiver, sender=Comment)
+            post_delete.disconnect(receiver, sender=Prompt)
+
+        assert sorted(deleted, key=str) == [Comment, Prompt]
+
+    def test_delete_project_by_chunks(self):
+        project = ProjectFactory()
+        audit = ProjectAuditFactory(project=project)
+        for criterion in ProjectAuditCriterionFactory.create_batch(
+            5, project_audit=audit
+        ):
+            CommentFactory(project_audit_criterion=criterion)
+
+        delete_project(project, batch_size=2)
+
+        assert not ProjectAuditCriterion.objects.exists()
+        assert not Comment.objects.exists()
+
+
+@pytest.mark.django_db
+class TestPurgeDeleted:
+    def test_purge_deleted(self):
+        expired = timezone.now() - timedelta(days=31)
+        project = ProjectFactory()
+        ProjectAuditCriterionFactory(project_audit__project=project)
+        ResourceFactory(project=project)
+        project.soft_delete()
+        Project.all_objects.update(deleted_at=expired)
+        ProjectAudit.all_objects.update(deleted_at=expired)
+        Resource.all_objects.update(deleted_at=expired)
+        audit = ProjectAuditFactory(deleted_at=expired)
+        resource = ResourceFactory(deleted_at=expired)
+        recent = ProjectAuditFactory(deleted_at=timezone.now())
+        live = ProjectAuditFactory()
+
+        purged = purge_deleted(timedelta(days=30), batch_size=1)
+
+        assert purged == {"project": 1, "projectaudit": 1, "resource": 1}
+        assert set(ProjectAudit.all_objects.all()) == {recent, live}
+        assert not Project.all_objects.filter(id=project.id).exists()
+        assert not ProjectAudit.all_objects.filter(id=audit.id).exists()
+        assert not Resource.all_objects.filter(id=resource.id).exists()
+        assert not ProjectAuditCriterion.objects.filter(
+            project_audit__project=project
+        ).exists()
+
+    def test_pause_between_batches(self, monkeypatch):
+        pauses = []
+        monkeypatch.setattr("audits.deletion.time.sleep", pauses.append)
+        audit = ProjectAuditFactory(deleted_at=timezone.now())
+        ProjectAuditCriterionFactory.create_batch(3, project_audit=audit)
+
+        purge_deleted(timedelta(0), batch_size=2, pause=0.5)
+
+        assert pauses == [0.5, 0.5]
+        assert not ProjectAuditCriterion.objects.exists()
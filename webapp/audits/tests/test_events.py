@@ -0,0 +1,173 @@
+from datetime import timedelta
+
+import pytest
+from audits import events
+from audits.events import (
+    last_event_id,
+    lazy_frame,
+    publish,
+    publish_comment,
+    publish_status,
+    stream_events,
+    tile_stream,
+    turbo_stream,
+)
+from audits.models.audit import AuditEvent
+from audits.tests.factories import (
+    CommentFactory,
+    ProjectAuditCriterionFactory,
+    ProjectAuditFactory,
+)
+from django.utils import timezone
+
+
+@pytest.fixture
+def fast_stream(settings):
+    settings.AUDIT_EVENTS_STREAM_TIMEOUT = 0
+    settings.AUDIT_EVENTS_POLL_INTERVAL = 0
+
+
+class TestTurboStream:
+    def test_turbo_stream(self):
+        assert turbo_stream("update", "tile_1", "<p>Done</p>") == (
+            '<turbo-stream action="update" target="tile_1">'
+            "<template><p>Done</p></template></turbo-stream>"
+        )
+
+    def test_turbo_stream_remove(self):
+        assert turbo_stream("remove", "comment_1") == (
+            '<turbo-stream action="remove" target="comment_1"></turbo-stream>'
+        )
+
+    def test_lazy_frame_escapes_src(self):
+        assert lazy_frame("comment_1", "/c/?a=1&b=2") == (
+            '<turbo-frame id="comment_1" src="/c/?a=1&amp;b=2"></turbo-frame>'
+        )
+
+
+@pytest.mark.django_db
+class TestPublish:
+    def test_publish(self):
+        audit = ProjectAuditFactory()
+
+        event = publish(audit.id, "<a>", "<b>")
+
+        assert event.stream == "<a><b>"
+        assert last_event_id(audit.id) == event.id
+
+    def test_publish_deletes_expired_events(self, settings):
+        audit = ProjectAuditFactory()
+        expired = publish(audit.id, "old")
+        AuditEvent.objects.filter(id=expired.id).update(
+            created_at=timezone.now()
+            - timedelta(seconds=settings.AUDIT_EVENTS_RETENTION + 1)
+        )
+
+        publish(audit.id, "new")
+
+        assert not AuditEvent.objects.filter(id=expired.id).exists()
+
+    def test_last_event_id_without_event(self):
+        assert last_event_id(ProjectAuditFactory().id) == 0
+
+    def test_publish_status(self):
+        criterion = ProjectAuditCriterionFactory()
+
+        event = publish_status(criterion)
+
+        assert event.project_audit_id == criterion.project_audit_id
+        assert event.stream == tile_stream(criterion)
+        assert f'target="criterion_tile_{criterion.id}"' in event.stream
+        assert criterion.get_status_display() in event.stream
+
+    def test_publish_comment_created(self):
+        comment = CommentFactory()
+        criterion = comment.project_audit_criterion
+
+        event = publish_comment(criterion, comment.id, "created")
+
+        assert f'action="prepend" target="comments_{criterion.id}"' in event.stream
+        assert f'<turbo-frame id="comment_{comment.id}" src="/' in event.stream
+        # The activity of the tile is up to date
+        assert "1 comment" in event.stream
+
+    def test_publish_comment_updated(self):
+        comment = CommentFactory()
+
+        event = publish_comment(comment.project_audit_criterion, comment.id, "updated")
+
+        assert f'action="replace" target="comment_{comment.id}"' in event.stream
+
+    def test_publish_comment_deleted(self):
+        criterion = ProjectAuditCriterionFactory()
+
+        event = publish_comment(criterion, 42, "deleted")
+
+        assert '<turbo-stream action="remove" target="comment_42">' in event.stream
+
+
+@pytest.mark.django_db
+class TestStreamEvents:
+    def test_stream_events_after_cursor(self, fast_stream):
+        audit = ProjectAuditFactory()
+        first = publish(audit.id, "<first>")
+        second = publish(audit.id, "<second>\n<line>")
+        publish(ProjectAuditFactory().id, "<other audit>")
+
+        chunks = list(stream_events(audit.id, first.id))
+
+        assert chunks == [
+            "retry: 1000\n\n",
+            f"id: {second.id}\ndata: <second>\ndata: <line>\n\n",
+        ]
+
+    def test_stream_events_keepalive(self, fast_stream, settings, monkeypatch):
+        monkeypatch.setattr("audits.events.KEEPALIVE_INTERVAL", 0)
+        audit = ProjectAuditFactory()
+
+        chunks = list(stream_events(audit.id, 0))
+
+        assert chunks[-1] == ": keepalive\n\n"
+
+    def test_stream_events_polls_until_timeout(self, settings):
+        settings.AUDIT_EVENTS_STREAM_TIMEOUT = 0.05
+        settings.AUDIT_EVENTS_POLL_INTERVAL = 0.01
+        audit = ProjectAuditFactory()
+        stream = stream_events(audit.id, 0)
+        next(stream)
+        event = publish(audit.id, "<late>")
+
+        assert f"id: {event.id}\ndata: <late>\n\n" in list(stream)
+
+    def test_stream_events_sends_events_committed_late(self, settings):
+        settings.AUDIT_EVENTS_POLL_INTERVAL = 0
+        audit = ProjectAuditFactory()
+        first = publish(audit.id, "<first>")
+        newer = AuditEvent.objects.create(
+            id=first.id + 10, project_audit=audit, stream="<newer>"
+        )
+        stream = stream_events(audit.id, first.id)
+        next(stream)
+        assert next(stream) == f"id: {newer.id}\ndata: <newer>\n\n"
+
+        # Committed after the newer event, with a smaller id
+        AuditEvent.objects.create(id=first.id + 5, project_audit=audit, stream="<late>")
+
+        # Sent once, with the cursor of the page
+        assert next(stream) == f"id: {newer.id}\ndata: <late>\n\n"
+        settings.AUDIT_EVENTS_STREAM_TIMEOUT = 0
+        assert list(stream) == []
+
+    def test_stream_events_are_capped(self, fast_stream, settings):
+        settings.AUDIT_EVENTS_MAX_STREAMS = 1
+        settings.AUDIT_EVENTS_BUSY_RETRY = 15000
+        audit = ProjectAuditFactory()
+        stream = stream_events(audit.id, 0)
+        next(stream)
+
+        assert list(stream_events(audit.id, 0)) == ["retry: 15000\n\n"]
+
+        # The slot is released with the response
+        stream.close()
+        assert events._open_streams == 0
+        assert next(stream_events(audit.id, 0)) == "retry: 1000\n\n"
@@ -1,7 +1,13 @@
 import uuid
 
 import pytest
-from audits.forms import CommentForm, NewAuditForm, PromptForm, StatusUpdateForm
+from audits.forms import (
+    CommentForm,
+    NewAuditForm,
+    PromptForm,
+    ResourceSnapshotForm,
+    StatusUpdateForm,
+)
 from audits.models.audit import Comment, ProjectAuditCriterion
 from audits.tests.factories import (
     AuditLibraryFactory,
@@ -9,6 +15,7 @@ from audits.tests.factories import (
     ProjectAuditCriterionFactory,
 )
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
 
 User = get_user_model()
 
@@ -238,3 +245,49 @@ class TestStatusUpdateForm:
         updated_criterion = form.save()
         assert updated_criterion.status == STATUS_CLASS.COMPLIANT
         assert updated_criterion.pk == project_audit_criterion.pk
+
+
+class TestResourceSnapshotForm:
+    """Test the ResourceSnapshotForm."""
+
+    def test_form_without_local_roots_has_no_path_field(self, settings):
+        settings.RESOURCE_SNAPSHOT_LOCAL_ROOTS = []
+        form = ResourceSnapshotForm()
+        assert list(form.fields) == ["archive"]
+
+    def test_form_valid_with_archive(self):
+        archive = SimpleUploadedFile("repository.tar.gz", b"data")
+        form = ResourceSnapshotForm(data={}, files={"archive": archive})
+        assert form.is_valid()
+
+    def test_form_invalid_with_other_file(self):
+        archive = SimpleUploadedFile("repository.rar", b"data")
+        form = ResourceSnapshotForm(data={}, files={"archive": archive})
+        assert not form.is_valid()
+        assert "archive" in form.errors
+
+    def test_form_valid_with_allowed_path(self, settings, tmp_path):
+        settings.RESOURCE_SNAPSHOT_LOCAL_ROOTS = [str(tmp_path)]
+        form = ResourceSnapshotForm(data={"path": str(tmp_path)})
+        assert form.is_valid()
+        assert form.cleaned_data["path"] == str(tmp_path.resolve())
+
+    def test_form_invalid_with_path_outside_roots(self, settings, tmp_path):
+        settings.RESOURCE_SNAPSHOT_LOCAL_ROOTS = [str(tmp_path / "checkouts")]
+        form = ResourceSnapshotForm(data={"path": str(tmp_path)})
+        assert not form.is_valid()
+        assert "path" in form.errors
+
+    def test_form_invalid_with_archive_and_path(self, settings, tmp_path):
+        settings.RESOURCE_SNAPSHOT_LOCAL_ROOTS = [str(tmp_path)]
+        archive = SimpleUploadedFile("repository.zip", b"data")
+        form = ResourceSnapshotForm(
+            data={"path": str(tmp_path)}, files={"archive": archive}
+        )
+        assert not form.is_valid()
+        assert "__all__" in form.errors
+
+    def test_form_invalid_when_empty(self):
+        form = ResourceSnapshotForm(data={})
+        assert not form.is_valid()
+        assert "__all__" in form.errors
@@ -0,0 +1,198 @@
+import pytest
+from audits.http_benchmark import (
+    HISTORY_LIMIT,
+    EndpointResult,
+    Thresholds,
+    compare,
+    hot_endpoints,
+    load_history,
+    make_run,
+    run_benchmark,
+    save_history,
+)
+from audits.tests.factories import CommentFactory, ProjectAuditCriterionFactory
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from organization.tests.factories import (
+    OrganizationFactory,
+    OrganizationMemberFactory,
+    UserFactory,
+)
+
+
+@pytest.fixture
+def member():
+    call_command("loaddata", "content_type", verbosity=0)
+    call_command("loaddata", "auth", verbosity=0)
+    user = UserFactory()
+    organization = OrganizationFactory()
+    OrganizationMemberFactory(
+        user=user, organization=organization, group=Group.objects.get(name="reader")
+    )
+    return user, organization
+
+
+def _summary(p50=10.0, p95=20.0, queries=5.0, size=1000):
+    return {
+        "requests": 10,
+        "errors": 0,
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p95,
+        "queries": queries,
+        "bytes": size,
+    }
+
+
+class TestEndpointResult:
+    def test_summary(self):
+        result = EndpointResult(
+            "dashboard",
+            latencies=[0.004, 0.001, 0.003, 0.002],
+            queries=[3, 5],
+            sizes=[100, 300],
+            errors=1,
+        )
+
+        assert result.summary() == {
+            "requests": 4,
+            "errors": 1,
+            "p50_ms": 2.0,
+            "p95_ms": 4.0,
+            "p99_ms": 4.0,
+            "queries": 4.0,
+            "bytes": 200,
+        }
+
+    def test_empty(self):
+        summary = EndpointResult("dashboard").summary()
+
+        assert summary["p99_ms"] == 0.0
+        assert summary["queries"] is None
+
+
+class TestCompare:
+    def test_within_thresholds(self):
+        baseline = {"endpoints": {"dashboard": _summary()}}
+        run = {"endpoints": {"dashboard": _summary(p50=11.9, p95=23.9, size=1099)}}
+
+        assert compare(run, baseline, Thresholds()) == []
+
+    def test_regressions(self):
+        baseline = {"endpoints": {"dashboard": _summary()}}
+        run = {
+            "endpoints": {
+                "dashboard": _summary(p95=30.0, queries=6.0, size=1200),
+                "project_list": _summary(p50=100.0),
+            }
+        }
+
+        regressions = compare(run, baseline, Thresholds())
+
+        assert [(r.endpoint, r.metric) for r in regressions] == [
+            ("dashboard", "p95_ms"),
+            ("dashboard", "bytes"),
+            ("dashboard", "queries"),
+        ]
+        assert str(regressions[0]) == "dashboard p95_ms: 20.0 -> 30.0"
+
+    def test_queries_unknown_over_http(self):
+        baseline = {"endpoints": {"dashboard": _summary()}}
+        run = {"endpoints": {"dashboard": _summary(queries=None)}}
+
+        assert compare(run, baseline, Thresholds()) == []
+
+
+class TestHistory:
+    def test_load_missing(self, tmp_path):
+        assert load_history(tmp_path / "http.json") == {"baseline": None, "runs": []}
+
+    def test_save(self, tmp_path):
+        path = tmp_path / "benchmarks" / "http.json"
+        history = load_history(path)
+
+        save_history(path, history, {"date": "first"}, baseline=True)
+        save_history(path, load_history(path), {"date": "second"})
+
+        history = load_history(path)
+        assert history["baseline"] == {"date": "first"}
+        assert history["runs"] == [{"date": "first"}, {"date": "second"}]
+
+    def test_limit(self, tmp_path):
+        path = tmp_path / "http.json"
+        history = {
+            "baseline": None,
+            "runs": [{"date": n} for n in range(HISTORY_LIMIT)],
+        }
+
+        save_history(path, history, {"date": "last"})
+
+        runs = load_history(path)["runs"]
+        assert len(runs) == HISTORY_LIMIT
+        assert runs[0] == {"date": 1}
+        assert runs[-1] == {"date": "last"}
+
+
+@pytest.mark.django_db
+class TestHotEndpoints:
+    def test_hot_endpoints(self, member):
+        _, organization = member
+        criterion = ProjectAuditCriterionFactory(
+            project_audit__project__organization=organization
+        )
+        commented = ProjectAuditCriterionFactory(project_audit=criterion.project_audit)
+        CommentFactory(project_audit_criterion=commented)
+        audit = criterion.project_audit
+
+        endpoints = {e.name: e.url for e in hot_endpoints(organization)}
+
+        prefix = f"/audits/project/{audit.project.slug}/audit/{audit.id}/"
+        assert endpoints["dashboard"] == "/dashboard/"
+        assert endpoints["project_list"] == "/audits/project/"
+        assert endpoints["projectaudit_detail"].startswith(prefix)
+        assert str(commented.id) in endpoints["projectauditcriterion_detail"]
+        assert str(commented.id) in endpoints["comments_list"]
+
+    def test_without_audit(self, member):
+        _, organization = member
+
+        endpoints = hot_endpoints(organization)
+
+        assert [e.name for e in endpoints] == ["dashboard", "project_list"]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRunBenchmark:
+    def test_client(self, member):
+        user, organization = member
+        ProjectAuditCriterionFactory(project_audit__project__organization=organization)
+        endpoints = hot_endpoints(organization)
+
+        results = run_benchmark(
+            endpoints, user, organization, requests=3, concurrency=2, warmup=1
+        )
+
+        assert set(results) == {e.name for e in endpoints}
+        for result in results.values():
+            assert result.errors == 0
+            assert len(result.latencies) == 3
+            assert len(result.queries) == 3
+            assert min(result.sizes) > 0
+        run = make_run(results, 2, None)
+        assert run["target"] == "client"
+        assert run["endpoints"]["dashboard"]["queries"] > 0
+
+    def test_server(self, member, live_server):
+        user, organization = member
+        ProjectAuditCriterionFactory(project_audit__project__organization=organization)
+        endpoints = hot_endpoints(organization)
+
+        results = run_benchmark(
+            endpoints, user, organization, requests=2, base_url=live_server.url
+        )
+
+        for result in results.values():
+            assert result.errors == 0
+            assert len(result.latencies) == 2
+            assert result.queries == []
+            assert min(result.sizes) > 0
@@ -0,0 +1,165 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+from audits import rendering
+from audits.rendering import (
+    SHARED_CACHE_MIN_LENGTH,
+    clear_cache,
+    convert,
+    get_markdown,
+    render,
+    render_markdown,
+    sanitize,
+)
+from core.metrics import registry
+from django.core.cache import cache
+
+LONG_TEXT = "## Verdict\n\n" + "- **compliant** item\n" * (
+    SHARED_CACHE_MIN_LENGTH // 10
+)
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+    cache.clear()
+    clear_cache()
+    yield
+    clear_cache()
+
+
+class TestGetMarkdown:
+    def test_get_markdown_is_reused_by_thread(self):
+        assert get_markdown() is get_markdown()
+
+    def test_get_markdown_differs_between_threads(self):
+        converters = []
+        thread = threading.Thread(target=lambda: converters.append(get_markdown()))
+        thread.start()
+        thread.join()
+
+        assert converters[0] is not get_markdown()
+
+
+class TestConvert:
+    def test_convert(self):
+        assert convert("**bold**\nline") == "<p><strong>bold</strong><br />\nline</p>"
+
+    def test_convert_fixes_indented_code_fences(self):
+        assert "<code>" in convert("Code:\n\n  ```\nx = 1\n  ```")
+
+    def test_convert_resets_the_converter(self):
+        convert("Note[^1]\n\n[^1]: A footnote")
+
+        assert "footnote" not in convert("Plain text")
+
+
+class TestSanitize:
+    def test_sanitize_keeps_allowed_tags(self):
+        html = '<p><a href="https://example.com" rel="nofollow">link</a></p>'
+
+        assert sanitize(html) == html
+
+    def test_sanitize_removes_scripts_with_their_contents(self):
+        assert sanitize("<p>a<script>alert(1)</script>b</p>") == "<p>ab</p>"
+
+    def test_sanitize_keeps_text_of_other_tags(self):
+        assert sanitize("<form><b>bold</b> &lt;x&gt;</form>") == "<b>bold</b> &lt;x&gt;"
+
+    def test_sanitize_removes_event_handlers(self):
+        assert sanitize('<img src="a.png" onerror="alert(1)">') == '<img src="a.png" />'
+
+    @pytest.mark.parametrize(
+        "url", ["javascript:alert(1)", " JaVaScript:alert(1)", "data:text/html,x"]
+    )
+    def test_sanitize_removes_unsafe_urls(self, url):
+        assert sanitize(f'<a href="{url}">x</a>') == "<a>x</a>"
+
+    @pytest.mark.parametrize("url", ["/audits/", "#fn-1", "mailto:a@example.com"])
+    def test_sanitize_keeps_safe_urls(self, url):
+        assert sanitize(f'<a href="{url}">x</a>') == f'<a href="{url}">x</a>'
+
+    def test_sanitize_keeps_table_alignment_only(self):
+        html = '<td style="text-align: right;">1</td><td style="color: red">2</td>'
+
+        assert sanitize(html) == '<td style="text-align: right;">1</td><td>2</td>'
+
+    def test_sanitize_removes_user_classes_and_ids(self):
+        html = (
+            '<div class="fixed inset-0 z-50" id="comment_form_frame">'
+            '<a class="btn" id="comments_1" href="/x">Log in</a>'
+            '<p class="footnote" id="criterion_tile_1">x</p></div>'
+        )
+
+        assert sanitize(html) == '<div><a href="/x">Log in</a><p>x</p></div>'
+
+
+class TestRender:
+    def test_render_sanitizes_markdown(self):
+        html = render("[x](javascript:alert(1)) <script>alert(1)</script>")
+
+        assert "javascript" not in html
+        assert "<script" not in html
+
+    def test_render_keeps_tables_and_footnotes(self):
+        html = render("| a | b |\n|---|--:|\n| 1 | 2 |\n\nNote[^1]\n\n[^1]: Text")
+
+        assert '<td style="text-align: right;">2</td>' in html
+        assert 'class="footnote"' in html
+        assert '<sup id="fnref:1"><a class="footnote-ref" href="#fn:1">' in html
+        assert '<li id="fn:1">' in html
+
+    def test_render_keeps_code_language(self):
+        html = render("```python\nx = 1\n```")
+
+        assert '<code class="language-python">' in html
+
+
+class TestRenderMarkdown:
+    def test_render_markdown_empty(self):
+        assert render_markdown("") == ""
+        assert render_markdown(None) == ""
+
+    def test_render_markdown(self):
+        assert render_markdown("# Title") == "<h1>Title</h1>"
+
+    def test_render_markdown_is_cached_by_process(self):
+        with patch.object(rendering, "convert", wraps=convert) as mock_convert:
+            render_markdown("# Title")
+            render_markdown("# Title")
+
+        assert mock_convert.call_count == 1
+
+    def test_render_markdown_long_text_is_shared(self):
+        html = render_markdown(LONG_TEXT)
+        clear_cache()
+
+        with patch.object(rendering, "convert") as mock_convert:
+            assert render_markdown(LONG_TEXT) == html
+
+        mock_convert.assert_not_called()
+
+    def test_render_markdown_short_text_is_not_shared(self):
+        render_markdown("# Title")
+
+        assert cache.get(rendering._cache_key("# Title")) is None
+
+    def test_render_markdown_cache_metrics(self):
+        render_markdown(LONG_TEXT)
+        render_markdown(LONG_TEXT)
+
+        values = registry.snapshot()["cosqua_cache_requests_total"]
+        assert values['["markdown", "hit"]'] == 1
+        assert values['["markdown", "miss"]'] == 1
+        assert values['["markdown_shared", "miss"]'] >= 1
+
+    def test_render_markdown_cache_key_depends_on_version(self):
+        key = rendering._cache_key(LONG_TEXT)
+
+        with patch.object(
+            rendering, "RENDERER_VERSION", rendering.RENDERER_VERSION + 1
+        ):
+            assert rendering._cache_key(LONG_TEXT) != key
@@ -0,0 +1,50 @@
+import pytest
+from audits.rendering import clear_cache
+from audits.rendering_benchmark import (
+    BenchmarkResult,
+    generate_transcript,
+    run_benchmark,
+)
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+    cache.clear()
+    clear_cache()
+
+
+class TestBenchmarkResult:
+    def test_mean_us(self):
+        assert BenchmarkResult("name", messages=4, duration=0.002).mean_us == 500.0
+
+    def test_mean_us_without_messages(self):
+        assert BenchmarkResult("name", messages=0, duration=0.0).mean_us == 0.0
+
+
+class TestGenerateTranscript:
+    def test_generate_transcript_is_deterministic(self):
+        assert generate_transcript(4, seed=1) == generate_transcript(4, seed=1)
+
+    def test_generate_transcript_alternates_questions_and_answers(self):
+        transcript = generate_transcript(4)
+
+        assert transcript[0].endswith("?")
+        assert transcript[1].startswith("## Verdict")
+        assert "```python" in transcript[1]
+
+
+class TestRunBenchmark:
+    def test_run_benchmark(self):
+        results = run_benchmark(messages=4, views=2)
+
+        assert [result.name for result in results] == [
+            "new instance",
+            "reused instance",
+            "shared cache",
+            "process cache",
+        ]
+        assert all(result.messages == 8 for result in results)
@@ -0,0 +1,137 @@
+from unittest.mock import patch
+
+import pytest
+from audits import rerender
+from audits.models.audit import Comment, Prompt
+from audits.rendering import RENDERER_VERSION
+from audits.rerender import (
+    ensure_rendered,
+    rerender_comments,
+    rerender_prompts,
+    start_rerender,
+)
+from audits.tests.factories import CommentFactory, PromptFactory
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+    cache.clear()
+
+
+def stale_comment(text="**Stale**"):
+    comment = CommentFactory(comment=text)
+    Comment.objects.filter(id=comment.id).update(comment_html="", html_version=0)
+    return comment
+
+
+def stale_prompt(text="**Stale**"):
+    prompt = PromptFactory(
+        prompt={"messages": [{"role": "assistant", "content": text}]}
+    )
+    Prompt.objects.filter(id=prompt.id).update(
+        prompt={"messages": [{"role": "assistant", "content": text}]}, html_version=0
+    )
+    return prompt
+
+
+@pytest.mark.django_db
+class TestRerenderComments:
+    def test_rerender_comments_stale_only(self):
+        comment = stale_comment()
+        CommentFactory()
+
+        assert rerender_comments(batch_size=1) == 1
+
+        comment.refresh_from_db()
+        assert comment.comment_html == "<p><strong>Stale</strong></p>"
+        assert comment.html_version == RENDERER_VERSION
+
+    def test_rerender_comments_force(self):
+        comment = CommentFactory(comment="Text")
+        Comment.objects.filter(id=comment.id).update(comment_html="<p>Old</p>")
+
+        assert rerender_comments(force=True) == 1
+
+        comment.refresh_from_db()
+        assert comment.comment_html == "<p>Text</p>"
+
+
+@pytest.mark.django_db
+class TestRerenderPrompts:
+    def test_rerender_prompts_stale_only(self):
+        prompt = stale_prompt()
+        PromptFactory()
+
+        assert rerender_prompts() == 1
+
+        prompt.refresh_from_db()
+        assert prompt.prompt["messages"][0]["html"] == "<p><strong>Stale</strong></p>"
+        assert prompt.html_version == RENDERER_VERSION
+
+    def test_rerender_prompts_force(self):
+        prompt = PromptFactory(
+            prompt={"messages": [{"role": "assistant", "content": "Text"}]}
+        )
+        prompt.prompt["messages"][0]["html"] = "<p>Old</p>"
+        Prompt.objects.filter(id=prompt.id).update(prompt=prompt.prompt)
+
+        assert rerender_prompts(force=True) == 1
+
+        prompt.refresh_from_db()
+        assert prompt.prompt["messages"][0]["html"] == "<p>Text</p>"
+
+
+@pytest.mark.django_db(transaction=True)
+class TestStartRerender:
+    def test_start_rerender(self):
+        comment = stale_comment()
+        prompt = stale_prompt()
+
+        thread = start_rerender()
+        thread.join()
+
+        comment.refresh_from_db()
+        prompt.refresh_from_db()
+        assert comment.html_version == RENDERER_VERSION
+        assert prompt.html_version == RENDERER_VERSION
+        assert cache.get(rerender._done_key())
+        assert cache.get(rerender._lock_key()) is None
+
+    def test_start_rerender_done(self):
+        cache.set(rerender._done_key(), True)
+
+        assert start_rerender() is None
+
+    def test_start_rerender_locked(self):
+        cache.set(rerender._lock_key(), True)
+
+        assert start_rerender() is None
+
+    def test_start_rerender_failure_releases_lock(self):
+        with patch.object(rerender, "rerender_comments", side_effect=RuntimeError):
+            start_rerender().join()
+
+        assert cache.get(rerender._lock_key()) is None
+        assert cache.get(rerender._done_key()) is None
+
+
+@pytest.mark.django_db
+class TestEnsureRendered:
+    def test_ensure_rendered_up_to_date(self):
+        with patch.object(rerender, "start_rerender") as mock_start:
+            ensure_rendered([CommentFactory(), PromptFactory()])
+
+        mock_start.assert_not_called()
+
+    def test_ensure_rendered_stale(self):
+        comment = CommentFactory()
+        comment.html_version = 0
+
+        with patch.object(rerender, "start_rerender") as mock_start:
+            ensure_rendered([comment])
+
+        mock_start.assert_called_once()
@@ -0,0 +1,321 @@
+import pytest
+from audits.models.audit import SearchDocument
+from audits.search import _query, fts5_query, rebuild_index, search
+from audits.tests.factories import (
+    CommentFactory,
+    CriterionFactory,
+    ProjectAuditCriterionFactory,
+    PromptFactory,
+)
+from django.db import connection
+from django.http import Http404
+from organization.tests.factories import OrganizationFactory
+
+
+@pytest.fixture
+def organization():
+    return OrganizationFactory()
+
+
+@pytest.fixture
+def project_audit_criterion(organization):
+    return ProjectAuditCriterionFactory(
+        project_audit__project__organization=organization,
+        project_audit__audit_library__organization=organization,
+        criterion__audit_library__organization=organization,
+        criterion__name="Data protection",
+        criterion__description="Personal data is protected.",
+    )
+
+
+class TestFts5Query:
+    def test_fts5_query(self):
+        assert fts5_query('"encryption at rest" AND keys*') == (
+            '"encryption at rest" "AND" "keys*"'
+        )
+
+    def test_fts5_query_escapes_quotes(self):
+        assert fts5_query('it"s') == '"it""s"'
+
+    def test_fts5_query_skips_punctuation(self):
+        assert fts5_query("- ( )") == ""
+
+
+@pytest.mark.django_db
+class TestSearchDocuments:
+    def test_criterion_is_indexed(self, organization):
+        criterion = CriterionFactory(
+            audit_library__organization=organization, public_id="ENC-1"
+        )
+
+        document = SearchDocument.objects.get(kind="criterion", object_id=criterion.id)
+
+        assert document.organization == organization
+        assert document.title == f"ENC-1 - {criterion.name}"
+        assert document.body == criterion.description
+
+    def test_comment_is_indexed_and_updated(self, project_audit_criterion):
+        comment = CommentFactory(
+            project_audit_criterion=project_audit_criterion, comment="First"
+        )
+        comment.comment = "Second"
+        comment.save()
+
+        document = SearchDocument.objects.get(kind="comment", object_id=comment.id)
+        assert document.body == "Second"
+        assert document.project_audit_criterion == project_audit_criterion
+
+    def test_prompt_is_indexed(self, project_audit_criterion):
+        prompt = PromptFactory(
+            project_audit_criterion=project_audit_criterion,
+            prompt={
+                "messages": [
+                    {"role": "user", "content": "Question"},
+                    {"role": "assistant", "content": "Answer"},
+                ]
+            },
+        )
+
+        document = SearchDocument.objects.get(kind="prompt", object_id=prompt.id)
+        assert document.body == "Question\n\nAnswer"
+
+    def test_deleted_objects_are_unindexed(self, project_audit_criterion):
+        comment = CommentFactory(project_audit_criterion=project_audit_criterion)
+        PromptFactory(project_audit_criterion=project_audit_criterion)
+
+        comment.delete()
+        project_audit_criterion.prompts.all().delete()
+
+        assert not SearchDocument.objects.exclude(kind="criterion").exists()
+
+    def test_rebuild_index(self, project_audit_criterion):
+        CommentFactory(project_audit_criterion=project_audit_criterion)
+        PromptFactory(project_audit_criterion=project_audit_criterion)
+        SearchDocument.objects.all().delete()
+
+        assert rebuild_index(batch_size=1) == 3
+
+        assert set(SearchDocument.objects.values_list("kind", flat=True)) == {
+            "criterion",
+            "comment",
+            "prompt",
+        }
+
+
+@pytest.mark.django_db
+class TestSearch:
+    def test_search_ranks_and_highlights(self, organization, project_audit_criterion):
+        comment = CommentFactory(
+            project_audit_criterion=project_audit_criterion,
+            comment="Backups use encryption at rest with <rotated> keys.",
+        )
+        CommentFactory(
+            project_audit_criterion=project_audit_criterion,
+            comment="Encryption is discussed, at length, but nothing is at rest.",
+        )
+
+        page = search(organization.id, '"encryption at rest"')
+
+        assert [result.document.object_id for result in page.rows] == [comment.id]
+        result = page.rows[0]
+        assert "<mark>encryption" in result.highlight
+        assert "<rotated>" not in result.highlight
+        assert result.targets == [project_audit_criterion]
+
+    @pytest.mark.sqlite
+    def test_search_highlights_the_phrase(self, organization, project_audit_criterion):
+        CommentFactory(
+            project_audit_criterion=project_audit_criterion,
+            comment="Backups use encryption at rest with <rotated> keys.",
+        )
+
+        page = search(organization.id, '"encryption at rest"')
+
+        assert page.rows[0].highlight == (
+            "Backups use <mark>encryption at rest</mark> with &lt;rotated&gt; keys."
+        )
+
+    def test_search_title_is_ranked_first(self, organization, project_audit_criterion):
+        other = ProjectAuditCriterionFactory(
+            project_audit=project_audit_criterion.project_audit,
+            criterion__audit_library__organization=organization,
+            criterion__name="Backups",
+        )
+        CommentFactory(
+            project_audit_criterion=other,
+            comment="The protection of the backups is fine.",
+        )
+
+        page = search(organization.id, "protection")
+
+        # The criterion name and the comment body both match
+        assert page.rows[0].document.kind == SearchDocument.Kind.CRITERION
+        assert page.rows[0].targets == [project_audit_criterion]
+
+    def test_search_prompt_session(self, organization, project_audit_criterion):
+        prompt = PromptFactory(
+            project_audit_criterion=project_audit_criterion,
+            prompt={"messages": [{"role": "assistant", "content": "Use TLS"}]},
+        )
+
+        page = search(organization.id, "tls")
+
+        assert page.rows[0].session_id == str(prompt.session_id)
+
+    def test_search_is_scoped_to_the_organization(self, project_audit_criterion):
+        CommentFactory(
+            project_audit_criterion=project_audit_criterion, comment="encryption"
+        )
+
+        assert search(OrganizationFactory().id, "encryption").rows == []
+
+    def test_search_skips_deleted_audits(self, organization, project_audit_criterion):
+        CommentFactory(
+            project_audit_criterion=project_audit_criterion, comment="encryption"
+        )
+        project_audit_criterion.project_audit.soft_delete()
+
+        assert search(organization.id, "encryption").rows == []
+        assert search(organization.id, "protection").rows[0].targets == []
+
+    def test_search_pages(self, organization, project_audit_criterion):
+        comments = CommentFactory.create_batch(
+            5, project_audit_criterion=project_audit_criterion, comment="firewall"
+        )
+
+        ids = []
+        cursor = None
+        while True:
+            page = search(organization.id, "firewall", cursor, size=2)
+            ids += [result.document.object_id for result in page.rows]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        # Same rank: the most recent documents first
+        assert ids == [comment.id for comment in reversed(comments)]
+
+    def test_search_ranks_the_most_recent_matches(
+        self, organization, project_audit_criterion, settings
+    ):
+        settings.SEARCH_MAX_CANDIDATES = 2
+        CommentFactory.create_batch(
+            2, project_audit_criterion=project_audit_criterion, comment="protection"
+        )
+
+        page = search(organization.id, "protection")
+
+        # The criterion, best ranked but older, is not a candidate
+        assert [result.document.kind for result in page.rows] == [
+            SearchDocument.Kind.COMMENT,
+            SearchDocument.Kind.COMMENT,
+        ]
+
+    def test_search_pages_skip_deleted_audits(
+        self, organization, project_audit_criterion
+    ):
+        live = CommentFactory.create_batch(
+            2, project_audit_criterion=project_audit_criterion, comment="firewall"
+        )
+        deleted = ProjectAuditCriterionFactory(
+            project_audit__project__organization=organization,
+            project_audit__audit_library__organization=organization,
+            criterion__audit_library__organization=organization,
+        )
+        CommentFactory.create_batch(
+            3, project_audit_criterion=deleted, comment="firewall"
+        )
+        deleted.project_audit.soft_delete()
+
+        page = search(organization.id, "firewall", size=2)
+
+        assert [result.document.object_id for result in page.rows] == [
+            comment.id for comment in reversed(live)
+        ]
+        assert not page.has_next
+
+    def test_search_empty_query(self, organization):
+        assert search(organization.id, "  ").rows == []
+        assert search(organization.id, "--").rows == []
+
+    def test_search_invalid_cursor(self, organization):
+        with pytest.raises(Http404):
+            search(organization.id, "x", "invalid")
+
+
+@pytest.mark.postgresql
+@pytest.mark.django_db
+class TestPostgreSQLSearch:
+    def test_search_vector_weights_the_title(self, project_audit_criterion):
+        document = SearchDocument.objects.get(kind="criterion")
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT search_vector::text FROM audits_searchdocument WHERE id = %s",
+                [document.id],
+            )
+            [vector] = cursor.fetchone()
+
+        # "Data protection" in the title, "Personal data is protected." in the body
+        assert "'protect':4A,8B" in vector
+
+    def test_search_uses_the_gin_index(self, organization, project_audit_criterion):
+        SearchDocument.objects.bulk_create(
+            SearchDocument(
+                organization=organization,
+                kind=SearchDocument.Kind.COMMENT,
+                object_id=object_id,
+                title="Backups",
+                body="The backups are encrypted.",
+            )
+            for object_id in range(2000)
+        )
+        query = _query(organization.id, "protection", None, 20)
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE audits_searchdocument")
+            cursor.execute(f"EXPLAIN {query.raw_query}", query.params)
+            plan = "\n".join(row for (row,) in cursor.fetchall())
+
+        assert "audits_searchdocument_vector_idx" in plan
+
+    def test_search_highlights_the_words(self, organization, project_audit_criterion):
+        CommentFactory(
+            project_audit_criterion=project_audit_criterion,
+            comment="Backups use encryption at rest with <rotated> keys.",
+        )
+
+        page = search(organization.id, '"encryption at rest"')
+
+        # ts_headline drops the tags of the text, and skips the stop words
+        assert page.rows[0].highlight == (
+            "Backups use <mark>encryption</mark> at <mark>rest</mark> with   keys"
+        )
+
+    def test_search_excludes_words(self, organization, project_audit_criterion):
+        comment = CommentFactory(
+            project_audit_criterion=project_audit_criterion, comment="encrypted backups"
+        )
+        CommentFactory(
+            project_audit_criterion=project_audit_criterion, comment="encrypted keys"
+        )
+
+        page = search(organization.id, "encrypted -keys")
+
+        assert [result.document.object_id for result in page.rows] == [comment.id]
+
+    def test_search_pages_by_rank(self, organization, project_audit_criterion):
+        # Ranks in single precision do not round trip through the cursor
+        comments = [
+            CommentFactory(
+                project_audit_criterion=project_audit_criterion,
+                comment=" ".join(["firewall"] * count),
+            )
+            for count in (1, 2, 3)
+        ]
+
+        first = search(organization.id, "firewall", size=2)
+        second = search(organization.id, "firewall", first.next_cursor, size=2)
+
+        ids = [result.document.object_id for result in first.rows + second.rows]
+        assert ids == [comment.id for comment in reversed(comments)]
@@ -0,0 +1,76 @@
+import pytest
+from audits.activity import repair_activity
+from audits.models.audit import Comment, ProjectAuditCriterion, Prompt
+from audits.rendering import RENDERER_VERSION
+from audits.seeding import Shape, seed_scale
+from audits.tests.factories import CommentFactory, ProjectAuditCriterionFactory
+
+SHAPE = Shape(
+    projects=3,
+    libraries=2,
+    criteria=5,
+    audits=2,
+    resources=1,
+    users=2,
+    comments=2.0,
+    prompt_sessions=0.5,
+)
+
+
+def _dataset(organization):
+    criteria = ProjectAuditCriterion.objects.filter(
+        project_audit__project__organization=organization
+    ).order_by("id")
+    return (
+        list(criteria.values_list("criterion__public_id", "status", "comment_count")),
+        list(
+            Comment.objects.filter(project_audit_criterion__in=criteria)
+            .order_by("id")
+            .values_list("comment", flat=True)
+        ),
+    )
+
+
+@pytest.mark.django_db
+class TestSeedScale:
+    def test_shape(self):
+        result = seed_scale("Scale", SHAPE, seed=1, batch_size=4)
+
+        organization = result.organization
+        assert organization.memberships.count() == 2
+        assert organization.projects.count() == 3
+        assert organization.audit_libraries.count() == 2
+        assert result.counts["criterion"] == 10
+        assert result.counts["projectaudit"] == 6
+        assert result.counts["projectauditcriterion"] == 30
+        assert result.counts["comment"] == Comment.objects.count()
+        assert result.counts["prompt"] == Prompt.objects.count()
+
+    def test_activity_and_html(self):
+        seed_scale("Scale", SHAPE, seed=1, batch_size=4)
+
+        assert repair_activity() == 0
+        comment = Comment.objects.first()
+        assert comment.html_version == RENDERER_VERSION
+        assert comment.comment_html.startswith("<p>")
+        prompt = Prompt.objects.first()
+        assert prompt.html_version == RENDERER_VERSION
+        assert prompt.prompt["messages"][1]["html"].startswith("<p><strong>")
+
+    def test_deterministic(self):
+        first = seed_scale("First", SHAPE, seed=7).organization
+        second = seed_scale("Second", SHAPE, seed=7, batch_size=3).organization
+        other = seed_scale("Other", SHAPE, seed=8).organization
+
+        assert _dataset(first) == _dataset(second)
+        assert _dataset(first) != _dataset(other)
+
+    def test_rows_created_afterwards(self):
+        result = seed_scale("Scale", SHAPE, seed=1)
+
+        # The sequences continue after the inserted ids
+        criterion = ProjectAuditCriterionFactory()
+        comment = CommentFactory(project_audit_criterion=criterion)
+
+        assert criterion.id > result.counts["projectauditcriterion"]
+        assert comment.id > result.counts["comment"]
@@ -0,0 +1,96 @@
+import pytest
+from audits.ai.circuit import breaker
+from audits.ai.telemetry import TurnMetrics, record_turn
+from core.middleware import CURRENT_ORGANIZATION_SESSION_KEY
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.urls import reverse
+from organization.tests.factories import (
+    OrganizationMemberFactory,
+    ProjectFactory,
+    UserFactory,
+)
+from pydantic_ai.usage import RunUsage
+
+
+@pytest.mark.django_db
+class TestAIStatusView:
+    def test_login_required(self, client):
+        response = client.get(reverse("audits:ai_status"))
+
+        assert response.status_code == 302
+
+    def test_staff_required(self, client):
+        client.force_login(UserFactory())
+
+        response = client.get(reverse("audits:ai_status"))
+
+        assert response.status_code == 403
+
+    def test_status(self, client, db):
+        client.force_login(UserFactory(is_staff=True))
+        breaker.record_failure(TimeoutError())
+
+        response = client.get(reverse("audits:ai_status"))
+
+        assert response.status_code == 200
+        status = response.json()["circuit_breaker"]
+        assert status["state"] == "closed"
+        assert status["total_failures"] == 1
+        assert status["last_failure"]["error"] == "TimeoutError"
+
+
+@pytest.mark.django_db
+class TestAIUsageView:
+    @pytest.fixture
+    def logged_reader(self, client):
+        call_command("loaddata", "content_type", verbosity=0)
+        call_command("loaddata", "auth", verbosity=0)
+        member = OrganizationMemberFactory(group=Group.objects.get(name="reader"))
+        client.force_login(member.user)
+        session = client.session
+        session[CURRENT_ORGANIZATION_SESSION_KEY] = (
+            member.organization_id,
+            member.organization.name,
+        )
+        session.save()
+        return client, member.organization
+
+    def test_organization_required(self, client):
+        client.force_login(UserFactory())
+
+        response = client.get(reverse("audits:ai_usage"))
+
+        assert response.status_code == 403
+
+    def test_usage(self, logged_reader):
+        client, organization = logged_reader
+        project = ProjectFactory(organization=organization, name="Website")
+        record_turn(
+            organization.id,
+            project.id,
+            TurnMetrics(model="claude", latency=0.25, usage=RunUsage(input_tokens=42)),
+        )
+        other = ProjectFactory(name="Elsewhere")
+        record_turn(
+            other.organization_id,
+            other.id,
+            TurnMetrics(model="claude", latency=0.25),
+        )
+
+        response = client.get(reverse("audits:ai_usage"), {"days": 7})
+
+        assert response.status_code == 200
+        assert response.context["days"] == 7
+        assert [row["turns"] for row in response.context["usage_by_day"]] == [1]
+        assert [
+            row["project__name"] for row in response.context["usage_by_project"]
+        ] == ["Website"]
+        assert "42" in response.content.decode()
+
+    def test_unknown_period(self, logged_reader):
+        client, _ = logged_reader
+
+        response = client.get(reverse("audits:ai_usage"), {"days": "forever"})
+
+        assert response.context["days"] == 30
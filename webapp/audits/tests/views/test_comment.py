@@ -1,5 +1,5 @@
 import pytest
-from audits.models.audit import Comment
+from audits.models.audit import AuditEvent, Comment
 from audits.tests.factories import CommentFactory, ProjectAuditCriterionFactory
 from core.middleware import CURRENT_ORGANIZATION_SESSION_KEY
 from django.contrib.auth import get_user_model
@@ -130,6 +130,110 @@ class TestCommentListView:
             comment1,
         ]  # Ordered by -created_at
 
+    def test_comment_list_view_displays_stored_html(
+        self, client, admin_group, project_audit_criterion
+    ):
+        user = UserFactory()
+        organization = project_audit_criterion.project_audit.project.organization
+        OrganizationMemberFactory(
+            user=user, organization=organization, group=admin_group
+        )
+        CommentFactory(
+            project_audit_criterion=project_audit_criterion,
+            comment="**Reviewed**<script>alert(1)</script>",
+        )
+
+        client.force_login(user)
+        session = client.session
+        session[CURRENT_ORGANIZATION_SESSION_KEY] = (organization.id, organization.name)
+        session.save()
+
+        url = reverse(
+            "audits:comments_list",
+            kwargs={
+                "project_slug": project_audit_criterion.project_audit.project.slug,
+                "audit_id": project_audit_criterion.project_audit.id,
+                "criterion_id": project_audit_criterion.id,
+            },
+        )
+        response = client.get(url)
+
+        assert "<strong>Reviewed</strong>" in response.content.decode()
+        assert "alert(1)" not in response.content.decode()
+
+    def test_comment_list_view_pages(
+        self, client, admin_group, project_audit_criterion, settings
+    ):
+        settings.COMMENTS_PAGE_SIZE = 2
+        user = UserFactory()
+        organization = project_audit_criterion.project_audit.project.organization
+        OrganizationMemberFactory(
+            user=user, organization=organization, group=admin_group
+        )
+        comments = [
+            CommentFactory(project_audit_criterion=project_audit_criterion)
+            for _ in range(5)
+        ]
+        comments.reverse()
+
+        client.force_login(user)
+        session = client.session
+        session[CURRENT_ORGANIZATION_SESSION_KEY] = (organization.id, organization.name)
+        session.save()
+
+        url = reverse(
+            "audits:comments_list",
+            kwargs={
+                "project_slug": project_audit_criterion.project_audit.project.slug,
+                "audit_id": project_audit_criterion.project_audit.id,
+                "criterion_id": project_audit_criterion.id,
+            },
+        )
+        response = client.get(url)
+        page = response.context["page"]
+
+        assert response.context["comments"] == comments[:2]
+        assert f'id="comments_page_{page.next_cursor}"' in response.content.decode()
+        assert 'loading="lazy"' in response.content.decode()
+
+        response = client.get(url, {"cursor": page.next_cursor})
+
+        assert response.context["comments"] == comments[2:4]
+        assert response.templates[0].name == "audits/comment/page.html"
+        assert f'id="comments_page_{page.next_cursor}"' in response.content.decode()
+
+        response = client.get(url, {"cursor": response.context["page"].next_cursor})
+
+        assert response.context["comments"] == comments[4:]
+        assert not response.context["page"].has_next
+        assert 'loading="lazy"' not in response.content.decode()
+
+    def test_comment_list_view_invalid_cursor(
+        self, client, admin_group, project_audit_criterion
+    ):
+        user = UserFactory()
+        organization = project_audit_criterion.project_audit.project.organization
+        OrganizationMemberFactory(
+            user=user, organization=organization, group=admin_group
+        )
+
+        client.force_login(user)
+        session = client.session
+        session[CURRENT_ORGANIZATION_SESSION_KEY] = (organization.id, organization.name)
+        session.save()
+
+        url = reverse(
+            "audits:comments_list",
+            kwargs={
+                "project_slug": project_audit_criterion.project_audit.project.slug,
+                "audit_id": project_audit_criterion.project_audit.id,
+                "criterion_id": project_audit_criterion.id,
+            },
+        )
+        response = client.get(url, {"cursor": "invalid"})
+
+        assert response.status_code == 404
+
 
 @pytest.mark.django_db
 class TestCommentListViewPermissions:
@@ -414,6 +518,13 @@ class TestCommentCreateView:
             in last_redirect_url
         )
 
+        # Pushed to the pages open on the audit
+        event = AuditEvent.objects.get(
+            project_audit=project_audit_criterion.project_audit
+        )
+        assert f'target="comments_{project_audit_criterion.id}"' in event.stream
+        assert f'<turbo-frame id="comment_{comment.id}"' in event.stream
+
 
 @pytest.mark.django_db
 class TestCommentCreateViewPermissions:
@@ -665,6 +776,11 @@ class TestCommentUpdateView:
             in last_redirect_url
         )
 
+        event = AuditEvent.objects.get(
+            project_audit=project_audit_criterion.project_audit
+        )
+        assert f'action="replace" target="comment_{comment.id}"' in event.stream
+
     def test_comment_update_view_with_turbo_frame_header(
         self, client, admin_group, project_audit_criterion
     ):
@@ -1022,6 +1138,12 @@ class TestCommentDeleteView:
             in last_redirect_url
         )
 
+        # Pushed to the pages open on the audit
+        event = AuditEvent.objects.get(
+            project_audit=project_audit_criterion.project_audit
+        )
+        assert f'action="remove" target="comment_{comment_id}"' in event.stream
+
 
 @pytest.mark.django_db
 class TestCommentDeleteViewPermissions:
@@ -1,5 +1,5 @@
 import pytest
-from audits.models.audit import ProjectAuditCriterion
+from audits.models.audit import AuditEvent, ProjectAuditCriterion
 from audits.tests.factories import ProjectAuditCriterionFactory
 from core.middleware import CURRENT_ORGANIZATION_SESSION_KEY
 from django.contrib.auth import get_user_model
@@ -428,6 +428,44 @@ class TestCriterionStatusUpdateView:
             in last_redirect_url
         )
 
+    def test_criterion_status_update_view_post_publishes_tile(
+        self, client, admin_group
+    ):
+        user = UserFactory()
+        organization = OrganizationFactory()
+        OrganizationMemberFactory(
+            user=user, organization=organization, group=admin_group
+        )
+        project_audit_criterion = ProjectAuditCriterionFactory(
+            project_audit__project__organization=organization
+        )
+
+        client.force_login(user)
+        session = client.session
+        session[CURRENT_ORGANIZATION_SESSION_KEY] = (organization.id, organization.name)
+        session.save()
+
+        url = reverse(
+            "audits:projectauditcriterion_detail",
+            kwargs={
+                "project_slug": project_audit_criterion.project_audit.project.slug,
+                "audit_id": project_audit_criterion.project_audit.id,
+                "pk": project_audit_criterion.id,
+            },
+        )
+        new_status = ProjectAuditCriterion.ProjectAuditCriterionStatus.COMPLIANT
+        client.post(url, data={"status": new_status})
+
+        event = AuditEvent.objects.get(
+            project_audit=project_audit_criterion.project_audit
+        )
+        assert f'target="criterion_tile_{project_audit_criterion.id}"' in event.stream
+        assert str(new_status.label) in event.stream
+
+        response = client.get(url)
+
+        assert response.context["events_cursor"] == event.id
+
     def test_criterion_status_update_view_all_statuses(self, client, admin_group):
         """Test that all status values can be set."""
         user = UserFactory()
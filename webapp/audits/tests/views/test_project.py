@@ -1,19 +1,24 @@
 import pytest
-from audits.tests.factories import ProjectAuditFactory
+from audits.models.audit import ProjectAuditCriterion
+from audits.tests.factories import ProjectAuditCriterionFactory, ProjectAuditFactory
+from audits.views.project import search_projects
 from core.middleware import CURRENT_ORGANIZATION_SESSION_KEY
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
 from django.core.management import call_command
+from django.db import connection
 from django.urls import reverse
 from organization.models.organization import Project
 from organization.tests.factories import (
     OrganizationFactory,
     OrganizationMemberFactory,
     ProjectFactory,
+    ResourceFactory,
     UserFactory,
 )
 
 User = get_user_model()
+Status = ProjectAuditCriterion.ProjectAuditCriterionStatus
 
 
 @pytest.fixture(scope="module")
@@ -152,6 +157,77 @@ class TestProjectListView:
         projects = list(response.context["projects"])
         assert projects == [project]
 
+    def test_project_list_view_search_matches_description(
+        self, client, login_user, organization
+    ):
+        project = ProjectFactory(
+            name="Website", description="Public shop", organization=organization
+        )
+        ProjectFactory(name="Intranet", organization=organization)
+
+        url = reverse("audits:project_list")
+        response = client.get(url, data={"search": "shop"})
+
+        assert list(response.context["projects"]) == [project]
+
+    def test_project_list_view_summary(self, client, login_user, organization):
+        project = ProjectFactory(organization=organization)
+        ResourceFactory(project=project)
+        project_audit = ProjectAuditFactory(project=project)
+        ProjectAuditFactory(project=project)
+        for status in [
+            Status.COMPLIANT,
+            Status.COMPLIANT,
+            Status.NOT_COMPLIANT,
+            Status.NOT_APPLICABLE,
+        ]:
+            ProjectAuditCriterionFactory(project_audit=project_audit, status=status)
+        ProjectFactory(organization=organization)
+
+        url = reverse("audits:project_list")
+        response = client.get(url)
+
+        projects = {p.id: p for p in response.context["projects"]}
+        assert projects[project.id].audit_count == 2
+        assert projects[project.id].resource_count == 1
+        assert projects[project.id].compliance == 66
+        assert "66% compliant" in response.content.decode()
+        other = next(p for p in projects.values() if p.id != project.id)
+        assert (other.audit_count, other.resource_count) == (0, 0)
+        assert other.compliance is None
+
+    def test_project_list_view_queries(
+        self, client, login_user, organization, django_assert_max_num_queries
+    ):
+        def create_project():
+            project = ProjectFactory(organization=organization)
+            ResourceFactory(project=project)
+            ProjectAuditCriterionFactory(project_audit__project=project)
+
+        create_project()
+        url = reverse("audits:project_list")
+        with django_assert_max_num_queries(20) as captured:
+            client.get(url)
+        create_project()
+        create_project()
+
+        with django_assert_max_num_queries(len(captured)):
+            client.get(url)
+
+    def test_project_list_view_is_paginated(
+        self, client, login_user, organization, settings
+    ):
+        settings.PROJECTS_PAGE_SIZE = 2
+        for name in ["Alpha", "Beta", "Gamma"]:
+            ProjectFactory(name=name, organization=organization)
+
+        url = reverse("audits:project_list")
+        response = client.get(url, data={"page": 2})
+
+        assert response.status_code == 200
+        assert [p.name for p in response.context["projects"]] == ["Gamma"]
+        assert "Page 2 of 2" in response.content.decode()
+
 
 @pytest.mark.django_db
 class TestProjectDetailView:
@@ -524,3 +600,52 @@ class TestProjectFormViewPermissions:
 
         assert response.status_code == 403
         assert Project.objects.filter(name="My Project").count() == 0
+
+
+@pytest.mark.postgresql
+@pytest.mark.django_db
+class TestSearchProjectsPostgreSQL:
+    def test_search_tolerates_typos(self, client, login_user, organization):
+        project = ProjectFactory(name="Cybersecurity review", organization=organization)
+        ProjectFactory(name="Accessibility review", organization=organization)
+
+        url = reverse("audits:project_list")
+        response = client.get(url, data={"search": "cybersecurty"})
+
+        assert list(response.context["projects"]) == [project]
+
+    def test_search_best_matches_first(self, client, login_user, organization):
+        close = ProjectFactory(name="Websites", organization=organization)
+        exact = ProjectFactory(name="Website", organization=organization)
+
+        url = reverse("audits:project_list")
+        response = client.get(url, data={"search": "website"})
+
+        assert list(response.context["projects"]) == [exact, close]
+
+    def test_search_uses_the_trigram_indexes(self, organization):
+        with connection.cursor() as cursor:
+            # Enough projects for the indexes to be cheaper than a table scan
+            cursor.execute(
+                """
+                INSERT INTO organization_project (
+                    organization_id, name, slug, description, created_at, updated_at
+                )
+                SELECT %s, 'Project ' || md5(n::text), 'project-' || n,
+                    'Audit of ' || md5((-n)::text), now(), now()
+                FROM generate_series(1, 20000) AS n
+                """,
+                [organization.id],
+            )
+            # Merge the rows pending in the GIN indexes, as VACUUM would
+            for index in ("name", "description"):
+                cursor.execute(
+                    "SELECT gin_clean_pending_list(%s::regclass)",
+                    [f"organization_project_{index}_trgm_idx"],
+                )
+            cursor.execute("ANALYZE organization_project")
+
+        plan = search_projects(Project.objects.all(), "cybersecurity").explain()
+
+        assert "organization_project_name_trgm_idx" in plan
+        assert "organization_project_description_trgm_idx" in plan
@@ -1,14 +1,22 @@
+from unittest.mock import patch
+
 import pytest
-from audits.models.audit import ProjectAudit, ProjectAuditCriterion
+from audits.events import publish
+from audits.models.audit import AssessmentRun, ProjectAudit, ProjectAuditCriterion
 from audits.tests.factories import (
+    AssessmentRunFactory,
     AuditLibraryFactory,
+    CommentFactory,
     CriterionFactory,
+    ProjectAuditCriterionFactory,
     ProjectAuditFactory,
+    PromptFactory,
     UserFactory,
 )
 from core.middleware import CURRENT_ORGANIZATION_SESSION_KEY
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
+from django.contrib.messages import get_messages
 from django.core.management import call_command
 from django.urls import reverse
 from organization.tests.factories import (
@@ -107,6 +115,43 @@ class TestProjectAuditDetailView:
         assert response.context["audit"] == audit
         assert response.context["project"] == project
 
+    def test_projectaudit_detail_view_displays_activity(
+        self, client, admin_group, django_assert_max_num_queries
+    ):
+        user = UserFactory()
+        organization = OrganizationFactory()
+        OrganizationMemberFactory(
+            user=user, organization=organization, group=admin_group
+        )
+        audit = ProjectAuditFactory(project__organization=organization)
+        criteria = ProjectAuditCriterionFactory.create_batch(
+            3, project_audit=audit, criterion__audit_library=audit.audit_library
+        )
+        CommentFactory.create_batch(2, project_audit_criterion=criteria[0])
+        PromptFactory(project_audit_criterion=criteria[0])
+
+        client.force_login(user)
+        session = client.session
+        session[CURRENT_ORGANIZATION_SESSION_KEY] = (organization.id, organization.name)
+        session.save()
+
+        url = reverse(
+            "audits:projectaudit_detail",
+            kwargs={"project_slug": audit.project.slug, "pk": audit.pk},
+        )
+        client.get(url)
+        with django_assert_max_num_queries(50) as queries:
+            response = client.get(url)
+        CommentFactory.create_batch(2, project_audit_criterion=criteria[1])
+        PromptFactory(project_audit_criterion=criteria[2])
+
+        with django_assert_max_num_queries(len(queries)):
+            client.get(url)
+        content = response.content.decode()
+        assert "2 comments" in content
+        assert "1 AI session" in content
+        assert content.count("active ") == 1
+
     def test_projectaudit_detail_view_criteria_natural_sort(self, client, admin_group):
         """Test that audit criteria are sorted using natural sort order."""
         user = UserFactory()
@@ -328,6 +373,88 @@ class TestProjectAuditDetailViewPermissions:
         assert response.status_code == 404
 
 
+@pytest.fixture
+def fast_stream(settings):
+    settings.AUDIT_EVENTS_STREAM_TIMEOUT = 0
+    settings.AUDIT_EVENTS_POLL_INTERVAL = 0
+
+
+@pytest.mark.django_db
+class TestProjectAuditEventsView:
+    """Test the server-sent events of an audit."""
+
+    def _get(self, client, group):
+        user = UserFactory()
+        organization = OrganizationFactory()
+        OrganizationMemberFactory(user=user, organization=organization, group=group)
+        audit = ProjectAuditFactory(project__organization=organization)
+        client.force_login(user)
+        session = client.session
+        session[CURRENT_ORGANIZATION_SESSION_KEY] = (organization.id, organization.name)
+        session.save()
+        url = reverse(
+            "audits:projectaudit_events",
+            kwargs={"project_slug": audit.project.slug, "pk": audit.pk},
+        )
+        return audit, url
+
+    def test_login_required(self, client):
+        audit = ProjectAuditFactory()
+        url = reverse(
+            "audits:projectaudit_events",
+            kwargs={"project_slug": audit.project.slug, "pk": audit.pk},
+        )
+
+        response = client.get(url)
+
+        assert response.status_code == 302
+
+    def test_stream_after_cursor(self, client, reader_group, fast_stream):
+        audit, url = self._get(client, reader_group)
+        first = publish(audit.id, "<first>")
+        second = publish(audit.id, "<second>")
+
+        response = client.get(url, {"cursor": first.id})
+
+        assert response.status_code == 200
+        assert response["Content-Type"] == "text/event-stream"
+        assert response["Cache-Control"] == "no-cache"
+        content = b"".join(response.streaming_content).decode()
+        assert f"id: {second.id}\ndata: <second>" in content
+        assert "<first>" not in content
+
+    def test_stream_from_last_event_id(self, client, reader_group, fast_stream):
+        audit, url = self._get(client, reader_group)
+        first = publish(audit.id, "<first>")
+        publish(audit.id, "<second>")
+
+        response = client.get(url, {"cursor": 0}, headers={"Last-Event-ID": first.id})
+
+        content = b"".join(response.streaming_content).decode()
+        assert "<first>" not in content
+        assert "<second>" in content
+
+    def test_stream_without_cursor_starts_now(self, client, reader_group, fast_stream):
+        audit, url = self._get(client, reader_group)
+        publish(audit.id, "<old>")
+
+        response = client.get(url)
+
+        assert "<old>" not in b"".join(response.streaming_content).decode()
+
+    def test_cannot_stream_audit_from_different_organization(self, client, admin_group):
+        _, url = self._get(client, admin_group)
+        other = ProjectAuditFactory()
+        url = reverse(
+            "audits:projectaudit_events",
+            kwargs={"project_slug": other.project.slug, "pk": other.pk},
+        )
+
+        response = client.get(url)
+
+        assert response.status_code in (403, 404)
+
+
 @pytest.mark.django_db
 class TestNewProjectAuditView:
     """Test the new audit view."""
@@ -715,6 +842,73 @@ class TestDeleteProjectAuditView:
             in last_redirect_url
         )
 
+    def test_delete_projectaudit_is_soft(self, client, admin_group):
+        user = UserFactory()
+        organization = OrganizationFactory()
+        OrganizationMemberFactory(
+            user=user, organization=organization, group=admin_group
+        )
+        project = ProjectFactory(organization=organization)
+        audit = ProjectAuditFactory(project=project)
+        criterion = ProjectAuditCriterionFactory(project_audit=audit)
+        client.force_login(user)
+        session = client.session
+        session[CURRENT_ORGANIZATION_SESSION_KEY] = (organization.id, organization.name)
+        session.save()
+
+        response = client.post(
+            reverse(
+                "audits:projectaudit_delete",
+                kwargs={"project_slug": project.slug, "pk": audit.pk},
+            )
+        )
+
+        assert response.status_code == 302
+        assert [str(message) for message in get_messages(response.wsgi_request)] == [
+            "Audit deleted"
+        ]
+        assert ProjectAudit.all_objects.get(pk=audit.pk).deleted_at is not None
+        assert ProjectAuditCriterion.objects.filter(pk=criterion.pk).exists()
+
+    def test_deleted_projectaudit_is_not_found(self, client, admin_group):
+        user = UserFactory()
+        organization = OrganizationFactory()
+        OrganizationMemberFactory(
+            user=user, organization=organization, group=admin_group
+        )
+        project = ProjectFactory(organization=organization)
+        audit = ProjectAuditFactory(project=project)
+        criterion = ProjectAuditCriterionFactory(project_audit=audit)
+        audit.soft_delete()
+        client.force_login(user)
+        session = client.session
+        session[CURRENT_ORGANIZATION_SESSION_KEY] = (organization.id, organization.name)
+        session.save()
+
+        detail = client.get(
+            reverse(
+                "audits:projectaudit_detail",
+                kwargs={"project_slug": project.slug, "pk": audit.pk},
+            )
+        )
+        criterion_page = client.get(
+            reverse(
+                "audits:projectauditcriterion_detail",
+                kwargs={
+                    "project_slug": project.slug,
+                    "audit_id": audit.pk,
+                    "pk": criterion.pk,
+                },
+            )
+        )
+        project_page = client.get(
+            reverse("audits:project_detail", kwargs={"slug": project.slug})
+        )
+
+        assert detail.status_code == 404
+        assert criterion_page.status_code == 404
+        assert list(project_page.context["project"].audits.all()) == []
+
 
 @pytest.mark.django_db
 class TestDeleteProjectAuditViewPermissions:
@@ -948,3 +1142,190 @@ class TestDeleteProjectAuditViewPermissions:
         assert response.status_code == 404
         # l'audit ne doit pas être supprimé
         assert ProjectAudit.objects.filter(pk=audit.pk).exists()
+
+
+@pytest.fixture
+def assessment_url():
+    def _assessment_url(audit):
+        return reverse(
+            "audits:projectaudit_assessment",
+            kwargs={"project_slug": audit.project.slug, "pk": audit.pk},
+        )
+
+    return _assessment_url
+
+
+@pytest.fixture
+def logged_client(client):
+    def _logged_client(group, organization=None):
+        user = UserFactory()
+        organization = organization or OrganizationFactory()
+        OrganizationMemberFactory(user=user, organization=organization, group=group)
+        client.force_login(user)
+        session = client.session
+        session[CURRENT_ORGANIZATION_SESSION_KEY] = (organization.id, organization.name)
+        session.save()
+        return client, organization
+
+    return _logged_client
+
+
+@pytest.mark.django_db
+class TestProjectAuditAssessmentView:
+    """Test the AI assessment view of an audit."""
+
+    def test_login_required(self, client, assessment_url):
+        audit = ProjectAuditFactory()
+
+        response = client.get(assessment_url(audit))
+
+        assert response.status_code == 302
+        assert reverse("account_login") in response.url
+
+    def test_get_without_run(self, logged_client, assessment_url, reader_group):
+        client, organization = logged_client(reader_group)
+        audit = ProjectAuditFactory(project__organization=organization)
+
+        response = client.get(assessment_url(audit))
+
+        assert response.status_code == 200
+        assert response.context["audit"] == audit
+        assert response.context["run"] is None
+
+    def test_get_with_run(self, logged_client, assessment_url, reader_group):
+        client, organization = logged_client(reader_group)
+        audit = ProjectAuditFactory(project__organization=organization)
+        old_run = AssessmentRunFactory(project_audit=audit)
+        run = AssessmentRunFactory(
+            project_audit=audit, status=AssessmentRun.AssessmentRunStatus.RUNNING
+        )
+        criterion_10 = ProjectAuditCriterionFactory(
+            project_audit=audit, criterion__public_id="10"
+        )
+        criterion_2 = ProjectAuditCriterionFactory(
+            project_audit=audit, criterion__public_id="2"
+        )
+        prompt_10 = PromptFactory(
+            assessment_run=run, project_audit_criterion=criterion_10
+        )
+        prompt_2 = PromptFactory(
+            assessment_run=run, project_audit_criterion=criterion_2
+        )
+        PromptFactory(assessment_run=old_run, project_audit_criterion=criterion_2)
+
+        response = client.get(assessment_url(audit))
+
+        assert response.status_code == 200
+        assert response.context["run"] == run
+        assert response.context["run_prompts"] == [prompt_2, prompt_10]
+        assert b'data-controller="auto-refresh"' in response.content
+
+    def test_post_starts_assessment(
+        self, logged_client, assessment_url, writer_group, settings
+    ):
+        settings.ANTHROPIC_API_KEY = "test"  # pragma: allowlist secret
+        client, organization = logged_client(writer_group)
+        audit = ProjectAuditFactory(project__organization=organization)
+
+        with patch("audits.views.projectaudit.start_assessment") as start_assessment:
+            response = client.post(
+                assessment_url(audit), {"grouping": "TAG", "group_size": 5}
+            )
+
+        assert response.status_code == 302
+        assert response.url == assessment_url(audit)
+        run = AssessmentRun.objects.get(project_audit=audit)
+        assert run.grouping == AssessmentRun.AssessmentRunGrouping.TAG
+        assert run.group_size == 5
+        start_assessment.assert_called_once_with(run)
+
+    def test_post_without_ai_configured(
+        self, logged_client, assessment_url, writer_group, settings
+    ):
+        settings.ANTHROPIC_API_KEY = ""
+        client, organization = logged_client(writer_group)
+        audit = ProjectAuditFactory(project__organization=organization)
+
+        with patch("audits.views.projectaudit.start_assessment") as start_assessment:
+            response = client.post(assessment_url(audit), follow=True)
+
+        assert response.redirect_chain == [(assessment_url(audit), 302)]
+        assert [str(message) for message in response.context["messages"]] == [
+            "The AI assistant is not configured"
+        ]
+        assert not AssessmentRun.objects.filter(project_audit=audit).exists()
+        start_assessment.assert_not_called()
+
+    def test_post_invalid_grouping(
+        self, logged_client, assessment_url, writer_group, settings
+    ):
+        """A new run is not created when its grouping options are invalid."""
+        settings.ANTHROPIC_API_KEY = "test"  # pragma: allowlist secret
+        client, organization = logged_client(writer_group)
+        audit = ProjectAuditFactory(project__organization=organization)
+
+        with patch("audits.views.projectaudit.start_assessment") as start_assessment:
+            response = client.post(
+                assessment_url(audit), {"grouping": "CHUNK", "group_size": 0}
+            )
+
+        assert response.status_code == 200
+        assert "group_size" in response.context["form"].errors
+        assert not AssessmentRun.objects.filter(project_audit=audit).exists()
+        start_assessment.assert_not_called()
+
+    def test_post_resumes_failed_assessment(
+        self, logged_client, assessment_url, writer_group, settings
+    ):
+        settings.ANTHROPIC_API_KEY = "test"  # pragma: allowlist secret
+        client, organization = logged_client(writer_group)
+        audit = ProjectAuditFactory(project__organization=organization)
+        run = AssessmentRunFactory(
+            project_audit=audit, status=AssessmentRun.AssessmentRunStatus.FAILED
+        )
+
+        with patch("audits.views.projectaudit.start_assessment") as start_assessment:
+            client.post(assessment_url(audit))
+
+        start_assessment.assert_called_once_with(run)
+        assert AssessmentRun.objects.filter(project_audit=audit).count() == 1
+
+    def test_post_does_not_start_running_assessment_twice(
+        self, logged_client, assessment_url, writer_group, settings
+    ):
+        settings.ANTHROPIC_API_KEY = "test"  # pragma: allowlist secret
+        client, organization = logged_client(writer_group)
+        audit = ProjectAuditFactory(project__organization=organization)
+        AssessmentRunFactory(
+            project_audit=audit, status=AssessmentRun.AssessmentRunStatus.RUNNING
+        )
+
+        with patch("audits.views.projectaudit.start_assessment") as start_assessment:
+            response = client.post(assessment_url(audit))
+
+        assert response.status_code == 302
+        start_assessment.assert_not_called()
+        assert AssessmentRun.objects.filter(project_audit=audit).count() == 1
+
+    def test_reader_cannot_start_assessment(
+        self, logged_client, assessment_url, reader_group, settings
+    ):
+        settings.ANTHROPIC_API_KEY = "test"  # pragma: allowlist secret
+        client, organization = logged_client(reader_group)
+        audit = ProjectAuditFactory(project__organization=organization)
+
+        with patch("audits.views.projectaudit.start_assessment") as start_assessment:
+            response = client.post(assessment_url(audit))
+
+        assert response.status_code == 403
+        start_assessment.assert_not_called()
+
+    def test_cannot_view_assessment_from_different_organization(
+        self, logged_client, assessment_url, admin_group
+    ):
+        client, _ = logged_client(admin_group)
+        audit = ProjectAuditFactory()
+
+        response = client.get(assessment_url(audit))
+
+        assert response.status_code in (403, 404)
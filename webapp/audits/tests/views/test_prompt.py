@@ -1,9 +1,11 @@
 import uuid
-from unittest.mock import mock_open, patch
 
 import pytest
+from audits.ai.circuit import breaker
+from audits.ai.singleflight import SingleFlight, message_key
+from audits.ai.stand_in import prompt_cache
+from audits.models.audit import Prompt, PromptTurn
 from audits.tests.factories import ProjectAuditCriterionFactory, PromptFactory
-from audits.views.prompt import load_system_prompt
 from core.middleware import CURRENT_ORGANIZATION_SESSION_KEY
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
@@ -14,135 +16,12 @@ from organization.tests.factories import (
     OrganizationMemberFactory,
     UserFactory,
 )
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
 
 User = get_user_model()
 
 
-@pytest.fixture
-def template_content():
-    return (
-        "# Agent Description\n\n"
-        "You are an expert assistant.\n\n"
-        "## Criterion to analyze\n\n"
-        "{criterion_name}\n"
-        "Detailed description: {criterion_description}.\n\n"
-        "## Language used\n\n"
-        "Respond in {language}.\n\n"
-        "## Resources\n\n"
-        "{resources}\n"
-    )
-
-
-class TestLoadSystemPrompt:
-    """Unit tests for the load_system_prompt function."""
-
-    def test_load_system_prompt_replaces_all_placeholders(self, template_content):
-        """Test that all placeholders are correctly replaced."""
-
-        with patch("builtins.open", mock_open(read_data=template_content)):
-
-            result = load_system_prompt(
-                criterion_name="Test Criterion",
-                criterion_description="This is a test description",
-                resources="- Resource 1: http://example.com\n- Resource 2: http://test.com",
-                language="french",
-            )
-
-            assert result == (
-                "# Agent Description\n\n"
-                "You are an expert assistant.\n\n"
-                "## Criterion to analyze\n\n"
-                "Test Criterion\n"
-                "Detailed description: This is a test description.\n\n"
-                "## Language used\n\n"
-                "Respond in french.\n\n"
-                "## Resources\n\n"
-                "- Resource 1: http://example.com\n"
-                "- Resource 2: http://test.com\n"
-            )
-
-    def test_load_system_prompt_with_empty_strings(self, template_content):
-        """Test that the function works with empty strings."""
-
-        with patch("builtins.open", mock_open(read_data=template_content)):
-
-            result = load_system_prompt(
-                criterion_name="",
-                criterion_description="",
-                resources="",
-                language="",
-            )
-
-            assert result == (
-                "# Agent Description\n\n"
-                "You are an expert assistant.\n\n"
-                "## Criterion to analyze\n\n"
-                "\n"
-                "Detailed description: .\n\n"
-                "## Language used\n\n"
-                "Respond in .\n\n"
-                "## Resources\n\n"
-                "\n"
-            )
-
-    def test_load_system_prompt_with_special_characters(self, template_content):
-        """Test that the function handles special characters correctly."""
-
-        with patch("builtins.open", mock_open(read_data=template_content)):
-
-            result = load_system_prompt(
-                criterion_name="Criterion & Test < > \" '",
-                criterion_description="Description with\nnewlines\tand\ttabs",
-                resources="Resource: https://example.com?param=value&other=test",
-                language="français",
-            )
-
-            assert result == (
-                "# Agent Description\n\n"
-                "You are an expert assistant.\n\n"
-                "## Criterion to analyze\n\n"
-                "Criterion & Test < > \" '\n"
-                "Detailed description: Description with\nnewlines\tand\ttabs.\n\n"
-                "## Language used\n\n"
-                "Respond in français.\n\n"
-                "## Resources\n\n"
-                "Resource: https://example.com?param=value&other=test\n"
-            )
-
-    def test_load_system_prompt_uses_correct_file_path(self, template_content):
-        """Test that the correct file path is used."""
-
-        with patch("builtins.open", mock_open(read_data=template_content)) as mock_file:
-            load_system_prompt(
-                criterion_name="Test",
-                criterion_description="Test",
-                resources="Test",
-                language="english",
-            )
-
-            # Check that the file is opened with the correct path
-            mock_file.assert_called_once()
-            call_args = mock_file.call_args
-            # The first argument is the file path
-            file_path = call_args[0][0]
-            assert str(file_path).endswith("audits/prompts/system_prompt.md")
-
-    def test_load_system_prompt_encoding_utf8(self, template_content):
-        """Test that the file is read with UTF-8 encoding."""
-        with patch("builtins.open", mock_open(read_data=template_content)) as mock_file:
-            load_system_prompt(
-                criterion_name="Criterion with accents éàù",
-                criterion_description="",
-                resources="",
-                language="french",
-            )
-
-            # Vérifier que le fichier est ouvert avec encoding='utf-8'
-            mock_file.assert_called_once()
-            call_kwargs = mock_file.call_args[1]
-            assert call_kwargs.get("encoding") == "utf-8"
-
-
 @pytest.fixture(scope="module")
 def auth_fixture(django_db_setup, django_db_blocker):
     """
@@ -473,3 +352,243 @@ class TestPromptFormViewPermissions:
                 response.context.get("criterion").project_audit.project.organization_id
                 != organization1.id
             )
+
+
+@pytest.mark.django_db
+class TestPromptFormViewPost:
+    """Test sending a message to the agent."""
+
+    @pytest.fixture
+    def logged_writer(self, client, writer_group):
+        user = UserFactory()
+        organization = OrganizationFactory()
+        OrganizationMemberFactory(
+            user=user, organization=organization, group=writer_group
+        )
+        client.force_login(user)
+        session = client.session
+        session[CURRENT_ORGANIZATION_SESSION_KEY] = (organization.id, organization.name)
+        session.save()
+        return client, organization
+
+    def test_post_saves_the_conversation(self, logged_writer, settings):
+        """Test that the question and the agent answer are saved in the session."""
+        calls = []
+
+        def answer(messages, info):
+            calls.append((len(messages), info.instructions))
+            return ModelResponse(parts=[TextPart(f"Answer {len(calls)}")])
+
+        settings.ANTHROPIC_API_KEY = "test"  # pragma: allowlist secret
+        settings.ANTHROPIC_MODEL = FunctionModel(answer)
+        client, organization = logged_writer
+        criterion = ProjectAuditCriterionFactory(
+            project_audit__project__organization=organization,
+            criterion__name="Backups",
+        )
+        url = reverse(
+            "audits:prompt",
+            kwargs={
+                "project_slug": criterion.project_audit.project.slug,
+                "audit_id": criterion.project_audit.id,
+                "criterion_id": criterion.id,
+            },
+        )
+        session_id = uuid.uuid4()
+
+        response = client.post(url, {"message": "Hi", "session_id": session_id})
+        client.post(url, {"message": "And?", "session_id": session_id})
+
+        assert response.status_code == 302
+        assert response.url == f"{url}?session_id={session_id}"
+        prompt = Prompt.objects.get(session_id=session_id)
+        assert prompt.prompt["messages"] == [
+            {"role": "user", "content": "Hi"},
+            {"role": "assistant", "content": "Answer 1", "html": "<p>Answer 1</p>"},
+            {"role": "user", "content": "And?"},
+            {"role": "assistant", "content": "Answer 2", "html": "<p>Answer 2</p>"},
+        ]
+        # The history is sent with the second question
+        assert [count for count, _ in calls] == [1, 3]
+        assert all("Backups" in instructions for _, instructions in calls)
+        # Each turn is recorded
+        turns = PromptTurn.objects.filter(prompt=prompt)
+        assert turns.count() == 2
+        assert all(turn.input_tokens and turn.output_tokens for turn in turns)
+        assert {turn.organization_id for turn in turns} == {organization.id}
+
+    def test_post_reads_the_prompt_prefix_from_the_cache(self, logged_writer, settings):
+        """Test that the turns of a conversation reuse the cached prompt prefix."""
+        settings.ANTHROPIC_MODEL = "stand-in:latency=0,tokens_per_second=0"
+        settings.AI_PROMPT_CACHE_TTL = "5m"
+        prompt_cache.clear()
+        client, organization = logged_writer
+        criterion = ProjectAuditCriterionFactory(
+            project_audit__project__organization=organization
+        )
+        url = reverse(
+            "audits:prompt",
+            kwargs={
+                "project_slug": criterion.project_audit.project.slug,
+                "audit_id": criterion.project_audit.id,
+                "criterion_id": criterion.id,
+            },
+        )
+        session_id = uuid.uuid4()
+
+        for message in ("Hi", "And?", "Thanks"):
+            client.post(url, {"message": message, "session_id": session_id})
+
+        turns = PromptTurn.objects.filter(prompt__session_id=session_id).order_by("id")
+        assert [turn.cache_status for turn in turns] == [
+            PromptTurn.CacheStatus.WRITE,
+            PromptTurn.CacheStatus.HIT,
+            PromptTurn.CacheStatus.HIT,
+        ]
+        assert turns[1].cache_read_tokens == turns[0].cache_write_tokens
+        assert turns[2].cache_read_tokens > turns[1].cache_read_tokens
+
+    def test_post_is_rejected_when_rate_limited(self, logged_writer, settings):
+        """Test that no agent call is made once the budget is spent."""
+        calls = []
+
+        def answer(messages, info):
+            calls.append(messages)
+            return ModelResponse(parts=[TextPart("Answer")])
+
+        settings.ANTHROPIC_MODEL = FunctionModel(answer)
+        settings.AI_RATE_LIMIT_USER = {"writer": {"rate": 1, "burst": 1}}
+        settings.AI_RATE_LIMIT_MAX_WAIT = 0
+        client, organization = logged_writer
+        criterion = ProjectAuditCriterionFactory(
+            project_audit__project__organization=organization
+        )
+        url = reverse(
+            "audits:prompt",
+            kwargs={
+                "project_slug": criterion.project_audit.project.slug,
+                "audit_id": criterion.project_audit.id,
+                "criterion_id": criterion.id,
+            },
+        )
+        session_id = uuid.uuid4()
+
+        client.post(url, {"message": "Hi", "session_id": session_id})
+        response = client.post(url, {"message": "And?", "session_id": session_id})
+
+        assert response.status_code == 429
+        assert 0 < int(response["Retry-After"]) <= 60
+        assert "Too many AI requests" in response.content.decode()
+        assert response.context["prompt"].session_id == session_id
+        assert len(calls) == 1
+        assert len(Prompt.objects.get(session_id=session_id).prompt["messages"]) == 2
+
+    def test_post_fails_fast_when_the_circuit_is_open(self, logged_writer, settings):
+        """Test that no agent call is made while the provider is down."""
+        calls = []
+
+        def answer(messages, info):
+            calls.append(messages)
+            return ModelResponse(parts=[TextPart("Answer")])
+
+        settings.ANTHROPIC_MODEL = FunctionModel(answer)
+        settings.AI_CIRCUIT_FAILURE_THRESHOLD = 1
+        breaker.record_failure(TimeoutError())
+        client, organization = logged_writer
+        criterion = ProjectAuditCriterionFactory(
+            project_audit__project__organization=organization
+        )
+        url = reverse(
+            "audits:prompt",
+            kwargs={
+                "project_slug": criterion.project_audit.project.slug,
+                "audit_id": criterion.project_audit.id,
+                "criterion_id": criterion.id,
+            },
+        )
+
+        response = client.post(url, {"message": "Hi", "session_id": uuid.uuid4()})
+
+        assert response.status_code == 503
+        assert int(response["Retry-After"]) > 0
+        assert "The AI service is unavailable" in response.content.decode()
+        assert calls == []
+        assert not Prompt.objects.exists()
+
+    def test_duplicate_post_waits_for_the_first_one(
+        self, logged_writer, settings, monkeypatch
+    ):
+        """Test that a message submitted twice is sent to the agent once."""
+        calls = []
+
+        def answer(messages, info):
+            calls.append(messages)
+            return ModelResponse(parts=[TextPart("Answer")])
+
+        settings.ANTHROPIC_MODEL = FunctionModel(answer)
+        client, organization = logged_writer
+        criterion = ProjectAuditCriterionFactory(
+            project_audit__project__organization=organization
+        )
+        url = reverse(
+            "audits:prompt",
+            kwargs={
+                "project_slug": criterion.project_audit.project.slug,
+                "audit_id": criterion.project_audit.id,
+                "criterion_id": criterion.id,
+            },
+        )
+        session_id = uuid.uuid4()
+        # The first submission is in flight
+        leader = SingleFlight(message_key(session_id, "Hi"), timeout=5)
+        leader.lead()
+        # It lands, in another worker, while the duplicate waits
+        monkeypatch.setattr(
+            "audits.ai.singleflight.time.sleep", lambda seconds: leader.land()
+        )
+
+        response = client.post(url, {"message": "Hi", "session_id": session_id})
+        # It landed: a late duplicate is absorbed too
+        client.post(url, {"message": "Hi", "session_id": session_id})
+
+        assert response.status_code == 302
+        assert response.url == f"{url}?session_id={session_id}"
+        assert calls == []
+        # Another message is sent
+        client.post(url, {"message": "And?", "session_id": session_id})
+        assert len(calls) == 1
+
+    def test_retry_after_an_error_is_sent_again(self, logged_writer, settings):
+        """Test that a message is not absorbed as a duplicate of a failed one."""
+        calls = []
+
+        def answer(messages, info):
+            calls.append(messages)
+            if len(calls) == 1:
+                raise ValueError("Upstream error")
+            return ModelResponse(parts=[TextPart("Answer")])
+
+        settings.ANTHROPIC_MODEL = FunctionModel(answer)
+        client, organization = logged_writer
+        criterion = ProjectAuditCriterionFactory(
+            project_audit__project__organization=organization
+        )
+        url = reverse(
+            "audits:prompt",
+            kwargs={
+                "project_slug": criterion.project_audit.project.slug,
+                "audit_id": criterion.project_audit.id,
+                "criterion_id": criterion.id,
+            },
+        )
+        session_id = uuid.uuid4()
+
+        client.post(url, {"message": "Hi", "session_id": session_id})
+        client.post(url, {"message": "Hi", "session_id": session_id})
+
+        assert len(calls) == 2
+        roles = [
+            message["role"]
+            for message in Prompt.objects.get(session_id=session_id).prompt["messages"]
+        ]
+        assert roles == ["user", "error", "user", "assistant"]
@@ -0,0 +1,188 @@
+"""
+Query budgets of the views, rendered against a large dataset so that the N+1
+queries show.
+"""
+
+import pytest
+from audits.models.audit import ProjectAuditCriterion
+from audits.tests.factories import (
+    AuditLibraryFactory,
+    CommentFactory,
+    CriterionFactory,
+    ProjectAuditCriterionFactory,
+    ProjectAuditFactory,
+    PromptFactory,
+)
+from core.middleware import CURRENT_ORGANIZATION_SESSION_KEY
+from core.query_budget import load_budgets
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.db import transaction
+from django.urls import URLResolver, get_resolver, reverse
+from organization.tests.factories import (
+    OrganizationMemberFactory,
+    ProjectFactory,
+    ResourceFactory,
+)
+
+PROJECTS = 20
+AUDITS = 3
+CRITERIA = 40
+RESOURCES = 15
+COMMENTS = 30
+PROMPTS = 5
+
+# Streaming views, polling the database for as long as they are open
+UNBUDGETED = {"audits:projectaudit_events"}
+# Namespaces of the project views, besides the views of core/urls.py
+NAMESPACES = {"audits", "organization"}
+
+
+@pytest.fixture(scope="module")
+def dataset(django_db_setup, django_db_blocker):
+    """Organization with many projects, audits, criteria and comments."""
+    with django_db_blocker.unblock(), transaction.atomic():
+        call_command("loaddata", "content_type", verbosity=0)
+        call_command("loaddata", "auth", verbosity=0)
+        member = OrganizationMemberFactory(
+            user__is_staff=True, group=Group.objects.get(name="administrator")
+        )
+        organization = member.organization
+        users = [member.user] + [
+            OrganizationMemberFactory(organization=organization).user for _ in range(4)
+        ]
+        projects = [ProjectFactory(organization=organization) for _ in range(PROJECTS)]
+        project = projects[0]
+        resources = [ResourceFactory(project=p) for p in projects]
+        resources += [ResourceFactory(project=project) for _ in range(RESOURCES)]
+        audits = []
+        for index in range(AUDITS):
+            library = AuditLibraryFactory(organization=organization)
+            criteria = [
+                CriterionFactory(audit_library=library) for _ in range(CRITERIA)
+            ]
+            audit = ProjectAuditFactory(project=project, audit_library=library)
+            audits.append(audit)
+            statuses = ProjectAuditCriterion.ProjectAuditCriterionStatus.values
+            for position, criterion in enumerate(criteria):
+                ProjectAuditCriterionFactory(
+                    project_audit=audit,
+                    criterion=criterion,
+                    status=statuses[position % len(statuses)],
+                )
+        for other in projects[1:]:
+            ProjectAuditFactory(project=other, audit_library=audits[0].audit_library)
+        criterion = audits[0].project_audit_criteria.order_by("id").first()
+        comments = [
+            CommentFactory(
+                project_audit_criterion=criterion,
+                user=users[position % len(users)],
+                comment=f"Keys are rotated every {position} days",
+            )
+            for position in range(COMMENTS)
+        ]
+        prompts = [
+            PromptFactory(
+                project_audit_criterion=criterion,
+                prompt={
+                    "messages": [
+                        {"role": "user", "content": "Are the keys rotated?"},
+                        {"role": "assistant", "content": "**Compliant**"},
+                    ]
+                },
+            )
+            for _ in range(PROMPTS)
+        ]
+        yield {
+            "user": member.user,
+            "organization": organization,
+            "project": project,
+            "audit": audits[0],
+            "criterion": criterion,
+            "resource": resources[-1],
+            "comment": comments[-1],
+            "prompt": prompts[-1],
+        }
+        transaction.set_rollback(True)
+
+
+def _url(url_name: str, data: dict) -> str:
+    project = data["project"]
+    audit = data["audit"]
+    criterion = data["criterion"]
+    criterion_kwargs = {
+        "project_slug": project.slug,
+        "audit_id": audit.id,
+        "criterion_id": criterion.id,
+    }
+    kwargs = {
+        "audits:project_detail": {"slug": project.slug},
+        "audits:project_delete": {"slug": project.slug},
+        "audits:projectaudit_detail": {"project_slug": project.slug, "pk": audit.id},
+        "audits:projectaudit_new": {"project_slug": project.slug},
+        "audits:projectaudit_delete": {"project_slug": project.slug, "pk": audit.id},
+        "audits:projectaudit_assessment": {
+            "project_slug": project.slug,
+            "pk": audit.id,
+        },
+        "audits:resource_new": {"project_slug": project.slug},
+        "audits:projectauditcriterion_detail": {
+            "project_slug": project.slug,
+            "audit_id": audit.id,
+            "pk": criterion.id,
+        },
+        "audits:comments_list": criterion_kwargs,
+        "audits:comment_create": criterion_kwargs,
+        "audits:comment_form_cancel": criterion_kwargs,
+        "audits:prompt": criterion_kwargs,
+        "organization:switch": {"organization_id": data["organization"].id},
+    }
+    for name in ["detail", "edit", "delete", "snapshot"]:
+        kwargs[f"audits:resource_{name}"] = {
+            "project_slug": project.slug,
+            "pk": data["resource"].id,
+        }
+    for name in ["comment_update", "comment_delete", "comment_fragment"]:
+        kwargs[f"audits:{name}"] = {**criterion_kwargs, "pk": data["comment"].id}
+    url = reverse(url_name, kwargs=kwargs.get(url_name))
+    query = {
+        "audits:search": "?q=keys",
+        "audits:project_list": "?search=",
+        "audits:prompt": f"?session_id={data['prompt'].session_id}",
+        "audits:projectauditcriterion_detail": (
+            f"?session_id={data['prompt'].session_id}"
+        ),
+    }
+    return url + query.get(url_name, "")
+
+
+def _url_names(resolver=None, namespace=None) -> set[str]:
+    names = set()
+    for pattern in (resolver or get_resolver()).url_patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace in NAMESPACES:
+                names |= _url_names(pattern, pattern.namespace)
+        elif pattern.name:
+            names.add(f"{namespace}:{pattern.name}" if namespace else pattern.name)
+    return names
+
+
+def test_every_view_has_a_budget():
+    assert _url_names() - UNBUDGETED == set(load_budgets())
+
+
+@pytest.mark.parametrize("url_name", sorted(_url_names() - UNBUDGETED))
+def test_query_budget(url_name, dataset, client, query_budget):
+    client.force_login(dataset["user"])
+    session = client.session
+    session[CURRENT_ORGANIZATION_SESSION_KEY] = (
+        dataset["organization"].id,
+        dataset["organization"].name,
+    )
+    session.save()
+    url = _url(url_name, dataset)
+
+    with query_budget(url_name):
+        response = client.get(url)
+
+    assert response.status_code in (200, 302), url
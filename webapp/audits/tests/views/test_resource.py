@@ -1,15 +1,21 @@
+import io
+import zipfile
+from unittest.mock import patch
+
 import pytest
 from core.middleware import CURRENT_ORGANIZATION_SESSION_KEY
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.management import call_command
 from django.urls import reverse
-from organization.models.organization import Resource
+from organization.models.organization import Resource, ResourceSnapshot
 from organization.tests.factories import (
     OrganizationFactory,
     OrganizationMemberFactory,
     ProjectFactory,
     ResourceFactory,
+    ResourceSnapshotFactory,
     UserFactory,
 )
 
@@ -932,3 +938,125 @@ class TestDeleteResourceViewPermissions:
 
         assert response.status_code == 403
         assert Resource.objects.filter(pk=resource.pk).exists()
+
+
+@pytest.fixture
+def snapshots_root(settings, tmp_path):
+    settings.RESOURCE_SNAPSHOTS_ROOT = tmp_path / "snapshots"
+    return settings.RESOURCE_SNAPSHOTS_ROOT
+
+
+def _login(client, group):
+    user = UserFactory()
+    organization = OrganizationFactory()
+    OrganizationMemberFactory(user=user, organization=organization, group=group)
+    client.force_login(user)
+    session = client.session
+    session[CURRENT_ORGANIZATION_SESSION_KEY] = (organization.id, organization.name)
+    session.save()
+    return organization
+
+
+def _zip_upload(name="repository.zip"):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("src/backup.py", "def backup_database(): pass\n")
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@pytest.mark.django_db
+class TestResourceSnapshotView:
+    """Test the resource snapshot view."""
+
+    def _url(self, resource):
+        return reverse(
+            "audits:resource_snapshot",
+            kwargs={"project_slug": resource.project.slug, "pk": resource.pk},
+        )
+
+    def test_detail_shows_latest_snapshot(self, client, reader_group):
+        organization = _login(client, reader_group)
+        resource = ResourceFactory(project=ProjectFactory(organization=organization))
+        ResourceSnapshotFactory(resource=resource, source="old.zip")
+        snapshot = ResourceSnapshotFactory(
+            resource=resource,
+            source="new.zip",
+            status=ResourceSnapshot.Status.INDEXED,
+            files=12,
+            chunks=34,
+        )
+
+        response = client.get(
+            reverse(
+                "audits:resource_detail",
+                kwargs={"project_slug": resource.project.slug, "pk": resource.pk},
+            )
+        )
+
+        assert response.status_code == 200
+        assert response.context["snapshot"] == snapshot
+        assert "12 files, 34 excerpts indexed" in response.content.decode()
+
+    def test_upload_archive_starts_indexing(self, client, writer_group, snapshots_root):
+        organization = _login(client, writer_group)
+        resource = ResourceFactory(project=ProjectFactory(organization=organization))
+
+        with patch("audits.views.resource.start_indexing") as start_indexing:
+            response = client.post(self._url(resource), {"archive": _zip_upload()})
+
+        assert response.status_code == 302
+        assert response.url == reverse(
+            "audits:resource_detail",
+            kwargs={"project_slug": resource.project.slug, "pk": resource.pk},
+        )
+        snapshot = ResourceSnapshot.objects.get(resource=resource)
+        assert snapshot.kind == ResourceSnapshot.Kind.ARCHIVE
+        assert snapshot.source == "repository.zip"
+        assert (snapshot.get_directory() / "src" / "backup.py").exists()
+        start_indexing.assert_called_once_with(snapshot)
+
+    def test_local_checkout(self, client, writer_group, settings, tmp_path):
+        settings.RESOURCE_SNAPSHOT_LOCAL_ROOTS = [str(tmp_path)]
+        organization = _login(client, writer_group)
+        resource = ResourceFactory(project=ProjectFactory(organization=organization))
+
+        with patch("audits.views.resource.start_indexing") as start_indexing:
+            response = client.post(self._url(resource), {"path": str(tmp_path)})
+
+        assert response.status_code == 302
+        snapshot = ResourceSnapshot.objects.get(resource=resource)
+        assert snapshot.kind == ResourceSnapshot.Kind.LOCAL
+        assert snapshot.source == str(tmp_path)
+        start_indexing.assert_called_once_with(snapshot)
+
+    def test_invalid_archive(self, client, writer_group, snapshots_root):
+        organization = _login(client, writer_group)
+        resource = ResourceFactory(project=ProjectFactory(organization=organization))
+        upload = SimpleUploadedFile("repository.zip", b"not a zip")
+
+        with patch("audits.views.resource.start_indexing") as start_indexing:
+            response = client.post(self._url(resource), {"archive": upload})
+
+        assert response.status_code == 200
+        assert "Invalid archive" in str(response.context["snapshot_form"].errors)
+        assert not ResourceSnapshot.objects.exists()
+        start_indexing.assert_not_called()
+
+    def test_missing_archive(self, client, writer_group):
+        organization = _login(client, writer_group)
+        resource = ResourceFactory(project=ProjectFactory(organization=organization))
+
+        response = client.post(self._url(resource), {})
+
+        assert response.status_code == 200
+        assert response.context["snapshot_form"].errors
+        assert not ResourceSnapshot.objects.exists()
+
+    def test_reader_cannot_take_snapshot(self, client, reader_group):
+        organization = _login(client, reader_group)
+        resource = ResourceFactory(project=ProjectFactory(organization=organization))
+
+        response = client.post(self._url(resource), {"archive": _zip_upload()})
+
+        assert response.status_code == 403
+        assert not ResourceSnapshot.objects.exists()
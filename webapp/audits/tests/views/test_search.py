@@ -0,0 +1,115 @@
+import pytest
+from audits.tests.factories import CommentFactory, ProjectAuditCriterionFactory
+from core.middleware import CURRENT_ORGANIZATION_SESSION_KEY
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.urls import reverse
+from organization.tests.factories import OrganizationMemberFactory, UserFactory
+
+
+@pytest.mark.django_db
+class TestSearchView:
+    @pytest.fixture
+    def logged_reader(self, client):
+        call_command("loaddata", "content_type", verbosity=0)
+        call_command("loaddata", "auth", verbosity=0)
+        member = OrganizationMemberFactory(group=Group.objects.get(name="reader"))
+        client.force_login(member.user)
+        session = client.session
+        session[CURRENT_ORGANIZATION_SESSION_KEY] = (
+            member.organization_id,
+            member.organization.name,
+        )
+        session.save()
+        return client, member.organization
+
+    @pytest.fixture
+    def criterion(self, logged_reader):
+        _, organization = logged_reader
+        return ProjectAuditCriterionFactory(
+            project_audit__project__organization=organization,
+            project_audit__audit_library__organization=organization,
+            criterion__audit_library__organization=organization,
+            # Fixed texts, which the searched terms do not match
+            criterion__name="Backups",
+            criterion__description="Backups are tested.",
+        )
+
+    def test_login_required(self, client):
+        response = client.get(reverse("audits:search"))
+
+        assert response.status_code == 302
+
+    def test_organization_required(self, client):
+        client.force_login(UserFactory())
+
+        response = client.get(reverse("audits:search"))
+
+        assert response.status_code == 403
+
+    def test_search_form(self, logged_reader):
+        client, _ = logged_reader
+
+        response = client.get(reverse("audits:search"))
+
+        assert response.status_code == 200
+        assert "audits/search/results.html" in [t.name for t in response.templates]
+        assert not response.context["page"].rows
+
+    def test_search(self, logged_reader, criterion):
+        client, _ = logged_reader
+        CommentFactory(
+            project_audit_criterion=criterion, comment="Backups are encrypted & signed"
+        )
+
+        response = client.get(reverse("audits:search"), {"q": "encrypted signed"})
+
+        assert response.status_code == 200
+        content = response.content.decode()
+        assert "<mark>encrypted</mark> &amp; <mark>signed</mark>" in content
+        assert (
+            reverse(
+                "audits:projectauditcriterion_detail",
+                args=[
+                    criterion.project_audit.project.slug,
+                    criterion.project_audit_id,
+                    criterion.id,
+                ],
+            )
+            in content
+        )
+
+    def test_search_other_organization(self, logged_reader):
+        client, _ = logged_reader
+        CommentFactory(comment="Backups are encrypted")
+
+        response = client.get(reverse("audits:search"), {"q": "encrypted"})
+
+        assert response.status_code == 200
+        assert not response.context["page"].rows
+        assert "No results." in response.content.decode()
+
+    def test_search_next_page(self, logged_reader, criterion, settings):
+        settings.SEARCH_PAGE_SIZE = 1
+        client, _ = logged_reader
+        CommentFactory(project_audit_criterion=criterion, comment="Keys are rotated")
+        CommentFactory(project_audit_criterion=criterion, comment="Keys are stored")
+
+        response = client.get(reverse("audits:search"), {"q": "keys"})
+        cursor = response.context["page"].next_cursor
+        assert f'id="search_page_{cursor}"' in response.content.decode()
+
+        response = client.get(reverse("audits:search"), {"q": "keys", "cursor": cursor})
+
+        assert response.status_code == 200
+        assert "audits/search/page.html" in [t.name for t in response.templates]
+        assert f'<turbo-frame id="search_page_{cursor}">' in response.content.decode()
+        assert len(response.context["page"].rows) == 1
+        assert not response.context["page"].has_next
+
+    def test_search_invalid_cursor(self, logged_reader):
+        client, _ = logged_reader
+
+        response = client.get(reverse("audits:search"), {"q": "keys", "cursor": "x"})
+
+        assert response.status_code == 404
@@ -1,3 +1,4 @@
+from audits.views.ai import AIStatusView, AIUsageView
 from audits.views.comment import (
     CommentCreateView,
     CommentDeleteView,
@@ -15,21 +16,30 @@ from audits.views.project import (
 from audits.views.projectaudit import (
     DeleteProjectAuditView,
     NewProjectAuditView,
+    ProjectAuditAssessmentView,
     ProjectAuditDetailView,
+    ProjectAuditEventsView,
 )
 from audits.views.projectauditcriterion import CriterionDetailView
 from audits.views.prompt import PromptFormView
+from audits.views.search import SearchView
 from audits.views.resource import (
     DeleteResourceView,
     EditResourceView,
     NewResourceView,
     ResourceDetailView,
+    ResourceSnapshotView,
 )
 from django.urls import path
 
 app_name = "audits"
 
 urlpatterns = [
+    # AI provider status and usage
+    path("ai/status/", AIStatusView.as_view(), name="ai_status"),
+    path("ai/usage/", AIUsageView.as_view(), name="ai_usage"),
+    # Full-text search
+    path("search/", SearchView.as_view(), name="search"),
     # Projects URLs
     path("project/", ProjectListView.as_view(), name="project_list"),
     path("project/new/", ProjectFormView.as_view(), name="project_form"),
@@ -55,6 +65,16 @@ urlpatterns = [
         DeleteProjectAuditView.as_view(),
         name="projectaudit_delete",
     ),
+    path(
+        "project/<str:project_slug>/audit/<int:pk>/assessment/",
+        ProjectAuditAssessmentView.as_view(),
+        name="projectaudit_assessment",
+    ),
+    path(
+        "project/<str:project_slug>/audit/<int:pk>/events/",
+        ProjectAuditEventsView.as_view(),
+        name="projectaudit_events",
+    ),
     # Resources URLs
     path(
         "project/<str:project_slug>/resource/<int:pk>/",
@@ -76,6 +96,11 @@ urlpatterns = [
         DeleteResourceView.as_view(),
         name="resource_delete",
     ),
+    path(
+        "project/<str:project_slug>/resource/<int:pk>/snapshot/",
+        ResourceSnapshotView.as_view(),
+        name="resource_snapshot",
+    ),
     # Criteria URLs
     path(
         "project/<str:project_slug>/audit/<int:audit_id>/criterion/<int:pk>/",
@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from audits.ai.circuit import breaker
+from audits.ai.telemetry import usage_by_day, usage_by_project
+from audits.models.audit import Prompt
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.core.exceptions import PermissionDenied
+from django.db.models import QuerySet
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views import View
+from django.views.generic import TemplateView
+from organization.mixins import OrganizationPermissionMixin
+
+
+class AIStatusView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """State and failure accounting of the AI provider circuit breaker."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({"circuit_breaker": breaker.get_status()})
+
+
+class AIUsageView(LoginRequiredMixin, OrganizationPermissionMixin, TemplateView):
+    """AI usage and latency of the current organization, per day and project."""
+
+    # Members allowed to see the prompts can see what they cost
+    model = Prompt
+    template_name = "audits/ai/usage.html"
+    periods = (7, 30, 90)
+
+    def _get_queryset_with_organization_filter(
+        self, queryset: QuerySet[Prompt]
+    ) -> QuerySet[Prompt]:
+        return queryset.filter(
+            project_audit_criterion__project_audit__project__organization_id=(
+                self.current_organization_id
+            )
+        )
+
+    def _get_object_organization_id(self) -> int:
+        raise PermissionDenied("Object not found")
+
+    def get_days(self) -> int:
+        try:
+            days = int(self.request.GET.get("days", self.periods[1]))
+        except ValueError:
+            days = self.periods[1]
+        return days if days in self.periods else self.periods[1]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        days = self.get_days()
+        since = timezone.localdate() - timedelta(days=days - 1)
+        context["days"] = days
+        context["periods"] = self.periods
+        context["usage_by_day"] = usage_by_day(self.current_organization_id, since)
+        context["usage_by_project"] = usage_by_project(
+            self.current_organization_id, since
+        )
+        return context
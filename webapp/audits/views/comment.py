@@ -1,6 +1,10 @@
+from audits.events import publish_comment
 from audits.forms import CommentForm
 from audits.models.audit import Comment, ProjectAuditCriterion
+from audits.rerender import ensure_rendered
 from audits.views.mixin import CriteriaChildrenMixin
+from core.pagination import paginate_keyset
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
@@ -21,11 +25,14 @@ class CommentPermissionMixin(OrganizationPermissionMixin):
     def _get_queryset_with_organization_filter(
         self, queryset: QuerySet[Comment]
     ) -> QuerySet[Comment]:
-        return queryset.prefetch_related(
-            "project_audit_criterion__project_audit__project"
-        ).filter(
-            project_audit_criterion__project_audit__project__organization_id=(
-                self.current_organization_id
+        return (
+            queryset.select_related("user")
+            .prefetch_related("project_audit_criterion__project_audit__project")
+            .filter(
+                project_audit_criterion__project_audit__project__organization_id=(
+                    self.current_organization_id
+                ),
+                project_audit_criterion__project_audit__deleted_at=None,
             )
         )
 
@@ -40,24 +47,38 @@ class CommentPermissionMixin(OrganizationPermissionMixin):
         raise PermissionDenied("Object not found")
 
     def _get_criterion_filtered(self) -> ProjectAuditCriterion:
-        """Get criterion filtered by organization."""
-        criterion_id = self.kwargs.get("criterion_id")  # type: ignore[attr-defined]
-        return get_object_or_404(
-            ProjectAuditCriterion.objects.prefetch_related(
-                "project_audit__project"
-            ).filter(
-                project_audit__project__organization_id=self.current_organization_id
-            ),
-            id=criterion_id,
-        )
+        """Get criterion filtered by organization, once per request."""
+        if not hasattr(self, "_criterion_filtered"):
+            criterion_id = self.kwargs.get("criterion_id")  # type: ignore[attr-defined]
+            self._criterion_filtered = get_object_or_404(
+                ProjectAuditCriterion.objects.select_related(
+                    "project_audit__project"
+                ).filter(
+                    project_audit__project__organization_id=self.current_organization_id,
+                    project_audit__deleted_at=None,
+                ),
+                id=criterion_id,
+            )
+        return self._criterion_filtered
 
 
 class CommentListView(
     LoginRequiredMixin, CriteriaChildrenMixin, CommentPermissionMixin, TemplateView
 ):
-    """Display the list of comments for a criterion."""
+    """
+    Display the comments of a criterion, newest first, by page.
+
+    The next page is lazily loaded in a turbo frame when scrolled to, from the
+    `cursor` of the last comment displayed.
+    """
 
     template_name = "audits/comment/list.html"
+    page_template_name = "audits/comment/page.html"
+
+    def get_template_names(self):
+        if self.request.GET.get("cursor"):
+            return [self.page_template_name]
+        return [self.template_name]
 
     def get_object(self):
         """Get the criterion filtered by organization."""
@@ -73,9 +94,16 @@ class CommentListView(
         comments_queryset = Comment.objects.filter(
             project_audit_criterion=criterion
         ).select_related("user")
-        context["comments"] = self._get_queryset_with_organization_filter(
-            comments_queryset
-        ).order_by("-created_at")
+        page = paginate_keyset(
+            self._get_queryset_with_organization_filter(comments_queryset),
+            "created_at",
+            self.request.GET.get("cursor"),
+            settings.COMMENTS_PAGE_SIZE,
+        )
+        context["comments"] = page.rows
+        context["page"] = page
+        context["cursor"] = self.request.GET.get("cursor")
+        ensure_rendered(context["comments"])
         return context
 
 
@@ -107,7 +135,11 @@ class CommentCreateView(
         form.instance.user = self.request.user
         form.instance.project_audit_criterion = self._get_criterion_filtered()
         messages.success(self.request, _("Comment created successfully"))
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        publish_comment(
+            form.instance.project_audit_criterion, form.instance.id, "created"
+        )
+        return response
 
     def get_success_url(self):
         criterion = self._get_criterion_filtered()
@@ -145,6 +177,8 @@ class CommentUpdateView(
         messages.success(self.request, _("Comment updated successfully"))
         response = super().form_valid(form)
         obj = getattr(self, "object", None)
+        if obj:
+            publish_comment(obj.project_audit_criterion, obj.id, "updated")
 
         if obj and self.request.headers.get("Turbo-Frame"):
             assert isinstance(obj, Comment)
@@ -192,6 +226,15 @@ class CommentDeleteView(
         context["project"] = criterion.project_audit.project
         return context
 
+    def form_valid(self, form):
+        comment = self.object
+        assert isinstance(comment, Comment)
+        # The id is cleared by the deletion
+        comment_id = comment.id
+        response = super().form_valid(form)
+        publish_comment(comment.project_audit_criterion, comment_id, "deleted")
+        return response
+
     def get_success_url(self):
         comment = self.get_object()
         assert isinstance(comment, Comment)
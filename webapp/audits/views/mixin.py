@@ -5,24 +5,36 @@ from organization.models.organization import Project
 
 
 class ProjectChildrenMixin(View):
-    """Mixin for views that need to access project related data."""
+    """
+    Mixin for views that need to access project related data.
+
+    Each object is fetched once per request. Soft deleted objects are not found.
+    """
 
     def _get_project(self) -> Project:
-        project_slug = self.kwargs.get("project_slug")
-        return get_object_or_404(Project, slug=project_slug)
+        if not hasattr(self, "_project"):
+            project_slug = self.kwargs.get("project_slug")
+            self._project = get_object_or_404(Project, slug=project_slug)
+        return self._project
 
 
 class AuditChildrenMixin(ProjectChildrenMixin):
     """Mixin for views that need to access audit related data."""
 
     def _get_audit(self) -> ProjectAudit:
-        audit_id = self.kwargs.get("audit_id")
-        return get_object_or_404(ProjectAudit, id=audit_id)
+        if not hasattr(self, "_audit"):
+            audit_id = self.kwargs.get("audit_id")
+            self._audit = get_object_or_404(ProjectAudit, id=audit_id)
+        return self._audit
 
 
 class CriteriaChildrenMixin(AuditChildrenMixin):
     """Mixin for views that need to access criteria related data."""
 
     def _get_criterion(self) -> ProjectAuditCriterion:
-        criterion_id = self.kwargs.get("criterion_id")
-        return get_object_or_404(ProjectAuditCriterion, id=criterion_id)
+        if not hasattr(self, "_criterion"):
+            criterion_id = self.kwargs.get("criterion_id")
+            self._criterion = get_object_or_404(
+                ProjectAuditCriterion, id=criterion_id, project_audit__deleted_at=None
+            )
+        return self._criterion
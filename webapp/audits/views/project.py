@@ -1,13 +1,24 @@
 from audits.forms import ProjectForm
+from audits.models.audit import ProjectAudit, ProjectAuditCriterion
 from core.middleware import CURRENT_ORGANIZATION_SESSION_KEY
+from django.conf import settings
+from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import TrigramWordSimilarity
 from django.core.exceptions import PermissionDenied
-from django.db.models import QuerySet
-from django.http import HttpResponse
+from django.db import connection
+from django.db.models import Count, F, IntegerField, OuterRef, Prefetch, Q, QuerySet
+from django.db.models import Subquery, Value
+from django.db.models.functions import Coalesce, Greatest, NullIf
+from django.http import HttpResponse, HttpResponseRedirect
 from django.urls import reverse_lazy
+from django.utils.translation import gettext_lazy as _
 from django.views.generic import DeleteView, DetailView, FormView, ListView
 from organization.mixins import OrganizationPermissionMixin
-from organization.models.organization import Organization, Project
+from organization.models.organization import Organization, Project, Resource
+
+Status = ProjectAuditCriterion.ProjectAuditCriterionStatus
 
 
 class ProjectViewMixin(OrganizationPermissionMixin):
@@ -27,19 +38,83 @@ class ProjectViewMixin(OrganizationPermissionMixin):
         raise PermissionDenied("Object not found")
 
 
+def _count(queryset: QuerySet, project_field: str) -> Coalesce:
+    """Number of rows of `queryset` of each project, as a subquery."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{project_field: OuterRef("pk")})
+            .order_by()
+            .values(project_field)
+            .annotate(count=Count("id"))
+            .values("count"),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def annotate_summary(queryset: QuerySet[Project]) -> QuerySet[Project]:
+    """
+    Annotate the projects with their audit and resource counts, and their
+    compliance: the percentage of their applicable audit criteria which are
+    compliant (None without applicable criterion).
+    """
+    criteria = ProjectAuditCriterion.objects.filter(
+        project_audit__deleted_at=None
+    ).exclude(status=Status.NOT_APPLICABLE)
+    return queryset.annotate(
+        audit_count=_count(ProjectAudit.objects.all(), "project"),
+        resource_count=_count(Resource.objects.all(), "project"),
+        compliance=(
+            _count(criteria.filter(status=Status.COMPLIANT), "project_audit__project")
+            * 100
+            / NullIf(_count(criteria, "project_audit__project"), 0)
+        ),
+    )
+
+
+def search_projects(queryset: QuerySet[Project], text: str) -> QuerySet[Project]:
+    """
+    Projects whose name or description matches `text`.
+
+    On PostgreSQL the match is fuzzy, by trigram word similarity (using the
+    trigram indexes), and the best matches come first.
+    """
+    if connection.vendor != "postgresql":
+        return queryset.filter(
+            Q(name__icontains=text) | Q(description__icontains=text)
+        ).order_by("name", "id")
+    return (
+        queryset.filter(
+            Q(TrigramWordSimilar(F("name"), text))
+            | Q(TrigramWordSimilar(F("description"), text))
+        )
+        .annotate(
+            similarity=Greatest(
+                TrigramWordSimilarity(text, "name"),
+                TrigramWordSimilarity(text, "description"),
+            )
+        )
+        .order_by("-similarity", "name", "id")
+    )
+
+
 class ProjectListView(LoginRequiredMixin, ProjectViewMixin, ListView):
-    """List all user projects."""
+    """List all user projects, with a summary of their audits."""
 
     model = Project
     template_name = "audits/project/list.html"
     context_object_name = "projects"
 
+    def get_paginate_by(self, queryset):
+        return settings.PROJECTS_PAGE_SIZE
+
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().order_by("name", "id")
         search_query = self.request.GET.get("search", "").strip()
         if search_query:
-            queryset = queryset.filter(name__icontains=search_query)
-        return queryset
+            queryset = search_projects(queryset, search_query)
+        return annotate_summary(queryset)
 
 
 class ProjectDetailView(LoginRequiredMixin, ProjectViewMixin, DetailView):
@@ -49,6 +124,19 @@ class ProjectDetailView(LoginRequiredMixin, ProjectViewMixin, DetailView):
     template_name = "audits/project/detail.html"
     context_object_name = "project"
 
+    def get_queryset(self):
+        return (
+            super()
+            .get_queryset()
+            .prefetch_related(
+                Prefetch(
+                    "audits",
+                    queryset=ProjectAudit.objects.select_related("audit_library"),
+                ),
+                "resources",
+            )
+        )
+
 
 class ProjectFormView(LoginRequiredMixin, ProjectViewMixin, FormView):
     """Create a new project."""
@@ -86,3 +174,9 @@ class DeleteProjectView(LoginRequiredMixin, ProjectViewMixin, DeleteView):
 
     def get_success_url(self):
         return reverse_lazy("audits:project_list")
+
+    def form_valid(self, form):
+        # Hard deleted later, by the purge_deleted command
+        self.object.soft_delete()
+        messages.success(self.request, _("Project deleted"))
+        return HttpResponseRedirect(self.get_success_url())
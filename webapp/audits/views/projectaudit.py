@@ -1,11 +1,17 @@
-from audits.forms import NewAuditForm
+from audits.ai.agents import is_ai_configured
+from audits.ai.assessment import get_resumable_run, start_assessment
+from audits.events import last_event_id, stream_events
+from audits.forms import AssessmentRunForm, NewAuditForm
 from audits.models.audit import ProjectAudit, ProjectAuditCriterion
 from audits.utils import natural_sort_key
 from audits.views.mixin import ProjectChildrenMixin
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
+from django.db import transaction
 from django.db.models import QuerySet
+from django.http import HttpResponseRedirect, StreamingHttpResponse
+from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import DeleteView, DetailView, FormView
@@ -41,7 +47,10 @@ class ProjectAuditDetailView(LoginRequiredMixin, ProjectAuditViewMixin, DetailVi
     context_object_name = "audit"
 
     def get_context_data(self, **kwargs):
+        # Before the criteria are read: the events published meanwhile are replayed
+        events_cursor = last_event_id(self.kwargs["pk"])
         context = super().get_context_data(**kwargs)
+        context["events_cursor"] = events_cursor
         context["project"] = self._get_project()
         audit_criteria = list(
             self.get_object().project_audit_criteria.all().select_related("criterion")
@@ -60,6 +69,40 @@ class ProjectAuditDetailView(LoginRequiredMixin, ProjectAuditViewMixin, DetailVi
         )
 
 
+class ProjectAuditEventsView(LoginRequiredMixin, ProjectAuditViewMixin, DetailView):
+    """
+    Stream the changes of an audit to its open pages, as server-sent events of
+    Turbo Stream actions.
+
+    The stream starts after the `cursor` event, or the last event received by
+    the browser when it reconnects. It holds a worker thread while it is open:
+    see `audits.events` for how many streams a process serves.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(project=self._get_project())
+
+    def _get_cursor(self, audit: ProjectAudit) -> int:
+        cursor = self.request.headers.get("Last-Event-ID") or self.request.GET.get(
+            "cursor"
+        )
+        try:
+            return int(cursor)
+        except (TypeError, ValueError):
+            return last_event_id(audit.id)
+
+    def get(self, request, *args, **kwargs):
+        audit = self.get_object()
+        response = StreamingHttpResponse(
+            stream_events(audit.id, self._get_cursor(audit)),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        # Not buffered by nginx
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
 class NewProjectAuditView(LoginRequiredMixin, ProjectAuditViewMixin, FormView):
     """Create a new audit for a project."""
 
@@ -105,3 +148,73 @@ class DeleteProjectAuditView(LoginRequiredMixin, ProjectAuditViewMixin, DeleteVi
         context = super().get_context_data(**kwargs)
         context["project"] = self._get_project()
         return context
+
+    def form_valid(self, form):
+        # Hard deleted later, by the purge_deleted command
+        self.object.soft_delete()
+        messages.success(self.request, _("Audit deleted"))
+        return HttpResponseRedirect(self.get_success_url())
+
+
+class ProjectAuditAssessmentView(LoginRequiredMixin, ProjectAuditViewMixin, DetailView):
+    """Launch and follow the AI pre-assessment of every criterion of an audit."""
+
+    template_name = "audits/projectaudit/assessment.html"
+    context_object_name = "audit"
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        return queryset.filter(project=self._get_project())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["project"] = self._get_project()
+        run = self.object.assessment_runs.order_by("-created_at").first()
+        context["run"] = run
+        if run:
+            run_prompts = list(
+                run.prompts.select_related("project_audit_criterion__criterion")
+            )
+            run_prompts.sort(
+                key=lambda x: natural_sort_key(
+                    x.project_audit_criterion.criterion.public_id
+                )
+            )
+            context["run_prompts"] = run_prompts
+        context.setdefault("form", AssessmentRunForm())
+        return context
+
+    def post(self, request, *args, **kwargs):
+        audit = self.get_object()
+        if not is_ai_configured():
+            messages.error(request, _("The AI assistant is not configured"))
+            return redirect(
+                "audits:projectaudit_assessment",
+                project_slug=self._get_project().slug,
+                pk=audit.id,
+            )
+
+        with transaction.atomic():
+            # Lock the audit to avoid launching the same assessment twice
+            ProjectAudit.objects.select_for_update().filter(id=audit.id).first()
+            run = get_resumable_run(audit)
+            created = run is None
+            if created:
+                form = AssessmentRunForm(request.POST)
+                if not form.is_valid():
+                    self.object = audit
+                    return self.render_to_response(self.get_context_data(form=form))
+                form.instance.project_audit = audit
+                form.instance.user = request.user
+                run = form.save()
+
+        if not created and run.is_active:
+            messages.info(request, _("An AI assessment is already running"))
+        else:
+            start_assessment(run)
+            messages.success(request, _("AI assessment started"))
+        return redirect(
+            "audits:projectaudit_assessment",
+            project_slug=self._get_project().slug,
+            pk=audit.id,
+        )
@@ -1,3 +1,4 @@
+from audits.events import last_event_id, publish_status
 from audits.forms import StatusUpdateForm
 from audits.models.audit import ProjectAuditCriterion
 from audits.views.mixin import AuditChildrenMixin
@@ -26,7 +27,10 @@ class CriterionDetailView(
     ) -> QuerySet[ProjectAuditCriterion]:
         return queryset.prefetch_related(
             "project_audit__project", "project_audit"
-        ).filter(project_audit__project__organization_id=self.current_organization_id)
+        ).filter(
+            project_audit__project__organization_id=self.current_organization_id,
+            project_audit__deleted_at=None,
+        )
 
     def _get_object_organization_id(self) -> int:
         """Get object organization ID."""
@@ -42,7 +46,10 @@ class CriterionDetailView(
         return queryset.prefetch_related("criterion", "comments__user")
 
     def get_context_data(self, **kwargs):
+        # Before the page is rendered: the events published meanwhile are replayed
+        events_cursor = last_event_id(self.kwargs["audit_id"])
         context = super().get_context_data(**kwargs)
+        context["events_cursor"] = events_cursor
         context["project"] = self._get_project()
         context["audit"] = self._get_audit()
         context["session_id"] = self.request.GET.get("session_id")
@@ -60,4 +67,6 @@ class CriterionDetailView(
 
     def form_valid(self, form):
         messages.success(self.request, _("Status updated successfully"))
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        publish_status(self.object)
+        return response
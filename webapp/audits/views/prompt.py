@@ -1,42 +1,40 @@
 import logging
+import math
+import time
 import uuid
-from pathlib import Path
 from urllib.parse import urlencode
 
+from audits.ai.agents import get_agent, get_prompt_cache_settings, is_ai_configured
+from audits.ai.circuit import breaker
+from audits.ai.prompt import (
+    DEFAULT_USER_MESSAGE,
+    build_message_history,
+    build_system_prompt,
+    format_error_message,
+)
+from audits.ai.prompt_templates import TemplateName
+from audits.ai.ratelimit import RateLimitExceeded, acquire
+from audits.ai.retry import run_agent_sync
+from audits.ai.singleflight import SingleFlight, message_key
+from audits.ai.telemetry import TurnMetrics, get_model_name, record_turn
 from audits.forms import PromptForm
 from audits.models.audit import ProjectAuditCriterion, Prompt
+from audits.rerender import ensure_rendered
 from audits.views.mixin import CriteriaChildrenMixin
 from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
+from django.db import transaction
 from django.db.models import QuerySet
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as translate
 from django.views.generic import FormView
 from organization.mixins import OrganizationPermissionMixin
-from pydantic_ai import Agent
 
 logger = logging.getLogger(__name__)
 
 
-def load_system_prompt(
-    criterion_name: str,
-    criterion_description: str,
-    resources: str,
-    language: str,
-) -> str:
-    prompt_path = Path(settings.BASE_DIR) / "audits" / "prompts" / "system_prompt.md"
-    with open(prompt_path, "r", encoding="utf-8") as f:
-        prompt_template = f.read()
-    return prompt_template.format(
-        criterion_name=criterion_name,
-        criterion_description=criterion_description,
-        resources=resources,
-        language=language,
-    )
-
-
 class PromptFormView(
     LoginRequiredMixin, CriteriaChildrenMixin, OrganizationPermissionMixin, FormView
 ):
@@ -69,7 +67,8 @@ class PromptFormView(
         return queryset.prefetch_related(
             "project_audit_criterion__project_audit__project"
         ).filter(
-            project_audit_criterion__project_audit__project__organization_id=self.current_organization_id
+            project_audit_criterion__project_audit__project__organization_id=self.current_organization_id,
+            project_audit_criterion__project_audit__deleted_at=None,
         )
 
     def _get_object_organization_id(self) -> int:
@@ -83,16 +82,19 @@ class PromptFormView(
         raise PermissionDenied("Object not found")
 
     def _get_criterion_filtered(self) -> ProjectAuditCriterion:
-        """Get criterion filtered by organization."""
-        criterion_id = self.kwargs.get("criterion_id")  # type: ignore[attr-defined]
-        return get_object_or_404(
-            ProjectAuditCriterion.objects.prefetch_related(
-                "project_audit__project"
-            ).filter(
-                project_audit__project__organization_id=self.current_organization_id
-            ),
-            id=criterion_id,
-        )
+        """Get criterion filtered by organization, once per request."""
+        if not hasattr(self, "_criterion_filtered"):
+            criterion_id = self.kwargs.get("criterion_id")  # type: ignore[attr-defined]
+            self._criterion_filtered = get_object_or_404(
+                ProjectAuditCriterion.objects.select_related(
+                    "project_audit__project"
+                ).filter(
+                    project_audit__project__organization_id=self.current_organization_id,
+                    project_audit__deleted_at=None,
+                ),
+                id=criterion_id,
+            )
+        return self._criterion_filtered
 
     def get_object(self):
         """Return None for FormView, but ensure criterion is filtered."""
@@ -120,6 +122,7 @@ class PromptFormView(
                     self._get_queryset_with_organization_filter(prompt_queryset)
                 )
                 context["prompt"] = prompt
+                ensure_rendered([prompt])
             except (ValueError, TypeError):
                 context["session_id"] = uuid.uuid4()
         else:
@@ -159,22 +162,46 @@ class PromptFormView(
 
         return url
 
-    def form_valid(self, form):
-        session_id = form.cleaned_data.get("session_id")
-        # Store the session_id to use it in get_success_url
-        self._session_id = session_id
+    def _render_refused(self, form, message: str, retry_after: float, status: int):
+        """Render the conversation with an error instead of calling the agent."""
+        retry_after = math.ceil(retry_after)
+        form.add_error(None, message % {"seconds": retry_after})
+        context = self.get_context_data(form=form)
+        prompt = Prompt.objects.filter(
+            session_id=form.cleaned_data.get("session_id"),
+            project_audit_criterion=context["criterion"],
+        ).first()
+        if prompt is not None:
+            context["prompt"] = prompt
+            context["session_id"] = prompt.session_id
+            ensure_rendered([prompt])
+        response = self.render_to_response(context, status=status)
+        response["Retry-After"] = str(retry_after)
+        return response
+
+    def _get_flight_timeout(self) -> float:
+        """Longest duration of a turn: every attempt of the agent call times out."""
+        retries = settings.AI_PROMPT_MAX_RETRIES
+        return (
+            settings.AI_RATE_LIMIT_MAX_WAIT
+            + settings.AI_PROMPT_TIMEOUT * (retries + 1)
+            + settings.AI_PROMPT_BACKOFF_MAX * retries
+        )
 
-        user_message = form.cleaned_data.get("message", "").strip()
+    def _send_message(self, session_id, user_message: str) -> bool:
+        """
+        Send a message to the agent, and save it with its answer.
+
+        Returns:
+            Whether the agent answered; on error, the error is saved instead.
+        """
         name = user_message if user_message else translate("Prompt without question")
         max_name_length = Prompt._meta.get_field("name").max_length
         if len(name) > max_name_length:
             name = name[: max_name_length - 1] + "…"
 
         if user_message == "":
-            user_message = (
-                "can you check this assertion and tell me it is compliant, "
-                "not compliant, partially compliant or not applicable?"
-            )
+            user_message = DEFAULT_USER_MESSAGE
 
         criterion = self._get_criterion_filtered()
         prompt, _ = Prompt.objects.get_or_create(
@@ -187,60 +214,109 @@ class PromptFormView(
         # Filter out error messages and user messages that precede them
         filtered_messages_history = self._filter_prompt_in_error(messages_history)
 
-        if not hasattr(settings, "ANTHROPIC_API_KEY") or not settings.ANTHROPIC_API_KEY:
+        if not is_ai_configured():
             raise ValueError("ANTHROPIC_API_KEY is not configured.")
-        project = criterion.project_audit.project
-        resources = ""
-        for resource in project.resources.all():
-            resources += f"- {resource.get_type_display()}: {resource.url}\n"
-        system_prompt = load_system_prompt(
-            criterion_name=criterion.criterion.name,
-            criterion_description=criterion.criterion.description,
-            resources=resources,
-            language="english",
-        )
+        system_prompt = build_system_prompt(criterion)
 
-        agent = Agent(
-            settings.ANTHROPIC_MODEL,
-            instructions=system_prompt,
-        )
+        agent = get_agent(TemplateName.SYSTEM_PROMPT)
+        metrics = TurnMetrics(model=get_model_name(agent), latency=0.0)
 
+        start = time.perf_counter()
         try:
             # Send the message to Claude with the history
-            result = agent.run_sync(
+            result = run_agent_sync(
+                agent,
                 user_message,
+                breaker=breaker,
+                instructions=system_prompt,
                 message_history=(
-                    filtered_messages_history if filtered_messages_history else None
-                ),  # type: ignore
-            )
-
-            messages_history.extend(
-                [
-                    {"role": "user", "content": user_message},
-                    {"role": "assistant", "content": result.output},
-                ]
+                    build_message_history(filtered_messages_history) or None
+                ),
+                model_settings=get_prompt_cache_settings(),
             )
-
-            # Save the updated history to the JSON prompt
-
+            metrics.usage = result.usage()
+            metrics.model = result.response.model_name or metrics.model
+            new_messages = [
+                {"role": "user", "content": user_message},
+                {"role": "assistant", "content": result.output},
+            ]
+            answered = True
         except Exception as err:
             # In case of error, continue anyway to not block the user
-            # The error could be logged here if necessary
             logger.error("Something goes wrong: %s", err, exc_info=True)
-            error_message = f"""
-## An error occurred:
+            metrics.error = err
+            new_messages = [
+                {"role": "user", "content": user_message},
+                {"role": "error", "content": format_error_message(err)},
+            ]
+            answered = False
+        finally:
+            metrics.latency = time.perf_counter() - start
+
+        # Another message of the session may have been saved during the call:
+        # the history is appended to, not overwritten
+        with transaction.atomic():
+            prompt = Prompt.objects.select_for_update().get(pk=prompt.pk)
+            prompt.prompt = {
+                **prompt.prompt,
+                "messages": prompt.prompt.get("messages", []) + new_messages,
+            }
+            prompt.save()
+            project = criterion.project_audit.project
+            record_turn(
+                project.organization_id,
+                project.id,
+                metrics,
+                prompt=prompt,
+                user=self.request.user,
+            )
+        return answered
 
-{str(err)}
+    def form_valid(self, form):
+        session_id = form.cleaned_data.get("session_id")
+        # Store the session_id to use it in get_success_url
+        self._session_id = session_id
+        user_message = form.cleaned_data.get("message", "").strip()
 
-            """
-            messages_history.extend(
-                [
-                    {"role": "user", "content": user_message},
-                    {"role": "error", "content": error_message},
-                ]
+        # Rejected early, before any upstream call, when the provider is down
+        if breaker.get_state() == breaker.OPEN:
+            return self._render_refused(
+                form,
+                translate(
+                    "The AI service is unavailable, please retry in %(seconds)s "
+                    "seconds."
+                ),
+                breaker.get_retry_after(),
+                status=503,
             )
+
+        # A duplicate submission waits for the answer of the first one
+        flight = SingleFlight(
+            message_key(session_id, user_message), self._get_flight_timeout()
+        )
+        if not flight.lead():
+            if not flight.wait():
+                logger.warning("Prompt session %s: no answer in time", session_id)
+            return super().form_valid(form)
+
+        completed = False
+        try:
+            # Rejected early when the organization or the user has no budget left
+            try:
+                acquire(self.request.user, self.current_organization_id)
+            except RateLimitExceeded as err:
+                logger.warning("AI call rejected: %s", err)
+                return self._render_refused(
+                    form,
+                    translate(
+                        "Too many AI requests, please retry in %(seconds)s seconds."
+                    ),
+                    err.retry_after,
+                    status=429,
+                )
+            # A retry of a failed message is not absorbed as a duplicate
+            completed = self._send_message(session_id, user_message)
         finally:
-            prompt.prompt = {"messages": messages_history}
-            prompt.save()
+            flight.land(completed)
 
         return super().form_valid(form)
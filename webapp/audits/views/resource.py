@@ -1,14 +1,16 @@
-from audits.forms import ResourceForm
+from audits.ai.retrieval import SnapshotError, extract_archive, start_indexing
+from audits.forms import ResourceForm, ResourceSnapshotForm
 from audits.views.mixin import ProjectChildrenMixin
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
 from django.db.models import QuerySet
+from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import CreateView, DeleteView, DetailView, UpdateView
 from organization.mixins import OrganizationPermissionMixin
-from organization.models.organization import Resource
+from organization.models.organization import Resource, ResourceSnapshot
 
 
 class ResourceViewMixin(OrganizationPermissionMixin, ProjectChildrenMixin):
@@ -58,6 +60,52 @@ class ResourceDetailView(LoginRequiredMixin, ResourceViewMixin, DetailView):
 
     template_name = "audits/resource/detail.html"
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["snapshot"] = self.object.snapshots.order_by("-created_at").first()
+        context.setdefault("snapshot_form", ResourceSnapshotForm())
+        return context
+
+
+class ResourceSnapshotView(ResourceDetailView):
+    """Take a snapshot of the resource contents and index it in the background."""
+
+    def post(self, request, *args, **kwargs):
+        self.object = resource = self.get_object()
+        form = ResourceSnapshotForm(request.POST, request.FILES)
+        if not form.is_valid():
+            return self.render_to_response(self.get_context_data(snapshot_form=form))
+
+        archive = form.cleaned_data.get("archive")
+        if archive:
+            snapshot = ResourceSnapshot.objects.create(
+                resource=resource,
+                kind=ResourceSnapshot.Kind.ARCHIVE,
+                source=archive.name,
+            )
+            try:
+                extract_archive(archive, snapshot.get_directory())
+            except SnapshotError as err:
+                snapshot.delete()
+                form.add_error("archive", str(err))
+                return self.render_to_response(
+                    self.get_context_data(snapshot_form=form)
+                )
+        else:
+            snapshot = ResourceSnapshot.objects.create(
+                resource=resource,
+                kind=ResourceSnapshot.Kind.LOCAL,
+                source=form.cleaned_data["path"],
+            )
+
+        start_indexing(snapshot)
+        messages.success(request, _("Snapshot taken, its indexing started"))
+        return redirect(
+            "audits:resource_detail",
+            project_slug=self._get_project().slug,
+            pk=resource.id,
+        )
+
 
 class NewResourceView(LoginRequiredMixin, ResourceViewMixin, CreateView):
     """Create a new resource for a project."""
@@ -86,3 +134,8 @@ class DeleteResourceView(LoginRequiredMixin, ResourceViewMixin, DeleteView):
     """Delete a resource."""
 
     template_name = "audits/resource/confirm_delete.html"
+
+    def form_valid(self, form):
+        # Hard deleted later, by the purge_deleted command
+        self.object.soft_delete()
+        return redirect(self.get_success_url())
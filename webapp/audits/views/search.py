@@ -0,0 +1,50 @@
+from audits.models.audit import Comment
+from audits.search import search
+from django.conf import settings
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import PermissionDenied
+from django.db.models import QuerySet
+from django.views.generic import TemplateView
+from organization.mixins import OrganizationPermissionMixin
+
+
+class SearchView(LoginRequiredMixin, OrganizationPermissionMixin, TemplateView):
+    """
+    Search the criteria, comments and AI discussions of the current organization.
+
+    The next page of results is lazily loaded in a turbo frame, like the
+    comments.
+    """
+
+    # Members allowed to see the comments can search them
+    model = Comment
+    template_name = "audits/search/results.html"
+    page_template_name = "audits/search/page.html"
+
+    def _get_queryset_with_organization_filter(
+        self, queryset: QuerySet[Comment]
+    ) -> QuerySet[Comment]:
+        return queryset.filter(
+            project_audit_criterion__project_audit__project__organization_id=(
+                self.current_organization_id
+            )
+        )
+
+    def _get_object_organization_id(self) -> int:
+        raise PermissionDenied("Object not found")
+
+    def get_template_names(self):
+        if self.request.GET.get("cursor"):
+            return [self.page_template_name]
+        return [self.template_name]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get("q", "").strip()
+        cursor = self.request.GET.get("cursor")
+        context["query"] = query
+        context["cursor"] = cursor
+        context["page"] = search(
+            self.current_organization_id, query, cursor, settings.SEARCH_PAGE_SIZE
+        )
+        return context
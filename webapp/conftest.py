@@ -0,0 +1,36 @@
+import pytest
+from audits.ai.prompt_templates import registry
+from django.core.cache import cache
+from django.db import connection
+
+# Markers of the tests of a database vendor
+VENDORS = ("postgresql", "sqlite")
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--require-vendor",
+        choices=VENDORS,
+        help="Fail if the database is not of this vendor, rather than skip its tests",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip the tests of another database vendor than the configured one."""
+    required = config.getoption("--require-vendor")
+    if required and connection.vendor != required:
+        raise pytest.UsageError(
+            f"The database is {connection.vendor}, not {required} (DATABASE_URL)"
+        )
+    for item in items:
+        for vendor in VENDORS:
+            if item.get_closest_marker(vendor) and connection.vendor != vendor:
+                item.add_marker(pytest.mark.skip(reason=f"{vendor} only"))
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    """The local memory cache, unlike the database, outlives each test."""
+    yield
+    cache.clear()
+    registry.clear()
@@ -0,0 +1,288 @@
+"""
+Metrics of the webapp processes, exposed in the Prometheus text format.
+
+Counters and histograms are kept in memory by each process. With several worker
+processes, set `METRICS_MULTIPROCESS_DIR`: each process writes its values to a
+file of this directory (at most every `METRICS_FLUSH_INTERVAL` seconds, and when
+it exits), and the metrics view adds up the files of all the processes, exited
+ones included, so the counters only go down when the directory is cleared (e.g.
+on deployments).
+
+    TASKS = registry.counter("cosqua_tasks_total", "Tasks run.", ["kind"])
+    TASKS.inc(kind="import")
+
+The metrics view (`/metrics/`) is open to the staff, and to the scrapers sending
+`METRICS_TOKEN` as a bearer token.
+"""
+
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable
+from pathlib import Path
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+AI_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    labels = [
+        '{}="{}"'.format(
+            name,
+            value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+def _copy(value):
+    return list(value) if isinstance(value, list) else value
+
+
+class Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labels: list[str] | tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        # Values by label values
+        self._values: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} has the labels {self.labels}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def snapshot(self) -> dict[str, object]:
+        """Values by JSON encoded label values."""
+        with self._lock:
+            return {
+                json.dumps(key): _copy(value) for key, value in self._values.items()
+            }
+
+    def merge(self, first, second):
+        raise NotImplementedError
+
+    def samples(self, values: dict[str, object]) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, value: float, **labels) -> None:
+        """Set the total of a count kept elsewhere, e.g. by a functools cache."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def merge(self, first, second):
+        return first + second
+
+    def samples(self, values):
+        return [
+            f"{self.name}{_format_labels(self.labels, json.loads(key))} "
+            f"{_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        # Observations by bucket (the last one is +Inf), then their sum
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def merge(self, first, second):
+        return [a + b for a, b in zip(first, second)]
+
+    def samples(self, values):
+        lines = []
+        for key, counts in sorted(values.items()):
+            label_values = json.loads(key)
+            cumulated = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulated += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket"
+                    f"{_format_labels(self.labels, label_values, le)} {cumulated}"
+                )
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulated}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+        # Functions updating metrics kept elsewhere, before each snapshot
+        self.collectors: list[Callable[[], None]] = []
+        self._last_flush = 0.0
+
+    def _register(self, metric: Metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels=()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(
+        self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def collector(self, function: Callable[[], None]) -> Callable[[], None]:
+        """Decorator of a function updating metrics before each snapshot."""
+        self.collectors.append(function)
+        return function
+
+    def snapshot(self) -> dict[str, dict]:
+        """Values of the metrics of this process."""
+        for collect in self.collectors:
+            collect()
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def _path(self, directory: str, pid: int) -> Path:
+        return Path(directory) / f"{pid}.json"
+
+    def flush(self, force: bool = False) -> None:
+        """
+        Write the values of this process to the multiprocess directory, at
+        most every `METRICS_FLUSH_INTERVAL` seconds unless `force`.
+        """
+        directory = settings.METRICS_MULTIPROCESS_DIR
+        now = time.monotonic()
+        if not directory or (
+            not force and now - self._last_flush < settings.METRICS_FLUSH_INTERVAL
+        ):
+            return
+        self._last_flush = now
+        path = self._path(directory, os.getpid())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix(f".{threading.get_ident()}.tmp")
+        temporary.write_text(json.dumps(self.snapshot()))
+        os.replace(temporary, path)
+
+    def collect(self) -> dict[str, dict]:
+        """Values of the metrics of all the processes."""
+        values = self.snapshot()
+        directory = settings.METRICS_MULTIPROCESS_DIR
+        if not directory:
+            return values
+        own = self._path(directory, os.getpid())
+        for path in sorted(Path(directory).glob("*.json")):
+            if path == own:
+                continue
+            try:
+                snapshot = json.loads(path.read_text())
+            except (OSError, ValueError):
+                # Being replaced, or removed, by its process
+                continue
+            for name, samples in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                merged = values.setdefault(name, {})
+                for key, value in samples.items():
+                    merged[key] = (
+                        metric.merge(merged[key], value) if key in merged else value
+                    )
+        return values
+
+    def exposition(self) -> str:
+        """All the metrics, in the Prometheus text format."""
+        values = self.collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            lines.extend(metric.samples(values.get(name, {})))
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+atexit.register(lambda: registry.flush(force=True))
+
+HTTP_REQUESTS = registry.counter(
+    "cosqua_http_requests_total",
+    "Requests, by URL name and status class.",
+    ["view", "status"],
+)
+HTTP_DURATION = registry.histogram(
+    "cosqua_http_request_duration_seconds",
+    "Time to respond to the requests, by URL name.",
+    ["view"],
+)
+DB_QUERIES = registry.counter(
+    "cosqua_db_queries_total", "SQL queries of the requests, by URL name.", ["view"]
+)
+DB_DURATION = registry.histogram(
+    "cosqua_db_duration_seconds",
+    "Time of the SQL queries of each request, by URL name.",
+    ["view"],
+)
+AI_DURATION = registry.histogram(
+    "cosqua_ai_call_duration_seconds",
+    "Latency of the AI agent calls, retries included, by model and outcome.",
+    ["model", "outcome"],
+    buckets=AI_BUCKETS,
+)
+CACHE_REQUESTS = registry.counter(
+    "cosqua_cache_requests_total",
+    "Lookups of the caches of the app, by cache and result (hit or miss).",
+    ["cache", "result"],
+)
+
+
+def record_request(request, status_code: int, timings) -> None:
+    """Count a request, from its `core.profiling.RequestTimings`."""
+    match = getattr(request, "resolver_match", None)
+    view = match.view_name if match is not None else "unresolved"
+    HTTP_REQUESTS.inc(view=view, status=f"{status_code // 100}xx")
+    HTTP_DURATION.observe(timings.durations.get("total", 0.0), view=view)
+    DB_QUERIES.inc(timings.queries, view=view)
+    DB_DURATION.observe(timings.durations.get("db", 0.0), view=view)
+    registry.flush()
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
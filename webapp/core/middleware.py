@@ -2,8 +2,24 @@
 Custom Middleware
 """
 
+import logging
+from contextlib import ExitStack
+
+from core.metrics import record_request
+from core.profiling import (
+    RequestTimings,
+    current_timings,
+    should_profile,
+    start_profile,
+    stop_profile,
+    timings_scope,
+)
+from django.conf import settings
+from django.db import connections
 from organization.models import OrganizationMember
 
+logger = logging.getLogger(__name__)
+
 CURRENT_ORGANIZATION_SESSION_KEY = "current_organization"
 ORGANIZATIONS_SESSION_KEY = "user_organizations"
 
@@ -24,6 +40,10 @@ class ActiveNavMiddleware:
             active_nav["project"] = True
         if request.path.startswith("/dashboard"):
             active_nav["dashboard"] = True
+        if request.path.startswith("/audits/ai/usage"):
+            active_nav["ai_usage"] = True
+        if request.path.startswith("/audits/search"):
+            active_nav["search"] = True
 
         request.active_nav = active_nav
 
@@ -83,3 +103,61 @@ class OrganizationMiddleware:
 
         response = self.get_response(request)
         return response
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware measuring where the time of each request goes (see
+    core.profiling) and counting it in the metrics (see core.metrics), first in
+    the list to measure the other ones.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        timings.start("total")
+        with ExitStack() as stack:
+            stack.enter_context(timings_scope(timings))
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings))
+            try:
+                response = self.get_response(request)
+            finally:
+                if timings.profiler is not None:
+                    timings.profile = stop_profile(timings.profiler, request)
+        timings.stop("view")
+        timings.stop("total")
+        record_request(request, response.status_code, timings)
+
+        user = getattr(request, "user", None)
+        if settings.SERVER_TIMING_PUBLIC or (user is not None and user.is_staff):
+            response["Server-Timing"] = timings.header()
+        data = timings.log_data()
+        logger.info(
+            "%s %s %s %s",
+            request.method,
+            request.path,
+            response.status_code,
+            " ".join(f"{key}={value}" for key, value in data.items()),
+            extra={"timings": data},
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = current_timings()
+        if timings is None:
+            return None
+        if should_profile(request):
+            timings.profiler = start_profile()
+        timings.start("view")
+        return None
+
+    def process_template_response(self, request, response):
+        timings = current_timings()
+        if timings is not None:
+            timings.stop("view")
+            timings.start("template")
+            response.add_post_render_callback(lambda _: timings.stop("template"))
+        return response
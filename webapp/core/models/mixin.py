@@ -1,4 +1,9 @@
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
+
+# Condition of the rows which are not soft deleted, for partial indexes
+NOT_DELETED = models.Q(deleted_at__isnull=True)
 
 
 class TimestampedModel(models.Model):
@@ -7,3 +12,58 @@ class TimestampedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+    def soft_delete(self) -> int:
+        return self.update(deleted_at=timezone.now())
+
+    def restore(self) -> int:
+        return self.update(deleted_at=None)
+
+
+class SoftDeleteManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """Manager of the rows which are not soft deleted."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(NOT_DELETED)
+
+
+class SoftDeleteModel(models.Model):
+    """
+    Model whose rows are soft deleted: `objects`, and the related managers, hide
+    them at once, and the purge (see audits.deletion) hard deletes them after
+    `SOFT_DELETE_RETENTION_DAYS`. `all_objects` includes them.
+
+    The indexes used by `objects` should be partial (`condition=NOT_DELETED`).
+    """
+
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    @property
+    def is_deleted(self) -> bool:
+        return self.deleted_at is not None
+
+    def soft_delete(self) -> None:
+        self.deleted_at = timezone.now()
+        type(self).all_objects.filter(pk=self.pk).update(deleted_at=self.deleted_at)
+
+    def restore(self) -> None:
+        """
+        Restore the row. Raise ValidationError when a live row has taken one of
+        its unique values (partial unique constraints) since it was deleted.
+        """
+        deleted_at = self.deleted_at
+        self.deleted_at = None
+        try:
+            self.validate_constraints()
+        except ValidationError:
+            self.deleted_at = deleted_at
+            raise
+        type(self).all_objects.filter(pk=self.pk).update(deleted_at=None)
@@ -0,0 +1,82 @@
+"""
+Keyset (cursor) pagination.
+
+Instead of an offset, a page starts after the sort key of the last row of the
+previous page: with an index matching the ordering, the database seeks to the
+cursor and reads a page of rows, whatever the page number.
+
+Rows are ordered by a descending field (e.g. `created_at`) then by descending
+`id`, which breaks ties. The cursor is the opaque, URL and HTML id safe,
+encoding of these two values.
+"""
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from django.http import Http404
+
+
+@dataclass
+class KeysetPage:
+    rows: list
+    # Cursor of the next page, None on the last page
+    next_cursor: str | None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def encode_cursor(value, id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([value, id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Return the (value, id) of a cursor, raise ValueError if it is invalid."""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, id = json.loads(payload)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as err:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from err
+    if not isinstance(id, int):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return value, id
+
+
+def paginate_keyset(
+    queryset: QuerySet, field: str, cursor: str | None, size: int
+) -> KeysetPage:
+    """
+    Return the page of `queryset`, ordered by descending `field` and id, after
+    `cursor` (the first page when None).
+
+    Raise Http404 when the cursor is invalid.
+    """
+    queryset = queryset.order_by(f"-{field}", "-id")
+    if cursor:
+        try:
+            value, id = decode_cursor(cursor)
+            value = queryset.model._meta.get_field(field).to_python(value)
+        except (ValueError, ValidationError) as err:
+            raise Http404("Invalid cursor") from err
+        # The first condition bounds the index range scan, the second skips the
+        # rows of the previous page which share its last value
+        queryset = queryset.filter(**{f"{field}__lte": value}).filter(
+            Q(**{f"{field}__lt": value}) | Q(id__lt=id)
+        )
+    # One more row tells whether there is a next page
+    rows = list(queryset[: size + 1])
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.id)
+    return KeysetPage(rows, next_cursor)
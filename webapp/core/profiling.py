@@ -0,0 +1,178 @@
+"""
+Timings of the requests, to tell where the time of a slow page goes.
+
+`ServerTimingMiddleware` (core.middleware) measures the SQL queries (time and
+number), the view, the rendering of its template response, and the AI calls,
+which the code making them reports with `measure("ai")`. The timings are logged
+by the "core.middleware" logger, and sent to the staff (or to everyone, with
+`SERVER_TIMING_PUBLIC`) in a `Server-Timing` header, shown by the network panel
+of the browsers. Templates rendered by the view itself count in its time, and
+the queries of a template in the template time.
+
+A cProfile of the request is dumped in `PROFILING_ROOT` when a staff member adds
+`?profile` to the URL, and for a sample (`PROFILING_SAMPLE_RATE`) of the
+requests. One request is profiled at a time, and only the latest
+`PROFILING_MAX_FILES` dumps are kept.
+"""
+
+import cProfile
+import logging
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Metrics of the Server-Timing header, and their description
+METRICS = {
+    "db": "SQL",
+    "view": "View",
+    "template": "Template",
+    "ai": "AI",
+    "total": "Total",
+}
+PROFILE_PARAMETER = "profile"
+
+_timings: ContextVar["RequestTimings | None"] = ContextVar("timings", default=None)
+# cProfile cannot profile two requests at once
+_profiling = threading.Lock()
+
+
+@dataclass
+class RequestTimings:
+    # Seconds, by metric
+    durations: dict[str, float] = field(default_factory=dict)
+    queries: int = 0
+    # Profiler of the request, and its dump
+    profiler: cProfile.Profile | None = None
+    profile: Path | None = None
+    _started: dict[str, float] = field(default_factory=dict)
+
+    def start(self, metric: str) -> None:
+        self._started[metric] = time.perf_counter()
+
+    def stop(self, metric: str) -> None:
+        """Add the time since `start(metric)`, if it is running."""
+        start = self._started.pop(metric, None)
+        if start is not None:
+            self.add(metric, time.perf_counter() - start)
+
+    def add(self, metric: str, seconds: float) -> None:
+        self.durations[metric] = self.durations.get(metric, 0.0) + seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        """Execute wrapper timing the queries."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.add("db", time.perf_counter() - start)
+
+    def header(self) -> str:
+        """Value of the Server-Timing header."""
+        metrics = []
+        for metric, description in METRICS.items():
+            if metric == "db" and self.queries:
+                description = f"{self.queries} queries"
+            if metric in self.durations:
+                metrics.append(
+                    f"{metric};dur={self.durations[metric] * 1000:.1f};"
+                    f'desc="{description}"'
+                )
+        if self.profile:
+            metrics.append(f'profile;desc="{self.profile.name}"')
+        return ", ".join(metrics)
+
+    def log_data(self) -> dict:
+        data = {
+            f"{metric}_ms": round(seconds * 1000, 1)
+            for metric, seconds in self.durations.items()
+        }
+        data["queries"] = self.queries
+        if self.profile:
+            data["profile"] = str(self.profile)
+        return data
+
+
+def current_timings() -> RequestTimings | None:
+    """Timings of the request being measured, if any."""
+    return _timings.get()
+
+
+@contextmanager
+def timings_scope(timings: RequestTimings):
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+@contextmanager
+def measure(metric: str):
+    """Add the time of the block to `metric` of the request being measured."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = _timings.get()
+        if timings is not None:
+            timings.add(metric, time.perf_counter() - start)
+
+
+def should_profile(request) -> bool:
+    if PROFILE_PARAMETER in request.GET and request.user.is_staff:
+        return True
+    rate = settings.PROFILING_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+def start_profile() -> cProfile.Profile | None:
+    """Start profiling the request, unless another one is being profiled."""
+    if not _profiling.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiling tool is active (e.g. a debugger)
+        _profiling.release()
+        return None
+    return profiler
+
+
+def stop_profile(profiler: cProfile.Profile, request) -> Path:
+    """Stop profiling the request, and return the path of its dump."""
+    try:
+        profiler.disable()
+        path = Path(settings.PROFILING_ROOT) / _profile_name(request)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(path)
+        prune_profiles(path.parent, settings.PROFILING_MAX_FILES)
+        return path
+    finally:
+        _profiling.release()
+
+
+def prune_profiles(directory: Path, max_files: int) -> int:
+    """Delete the oldest dumps beyond `max_files`, and return their number."""
+    # The names start with their date
+    profiles = sorted(directory.glob("*.prof"), reverse=True)
+    for path in profiles[max_files:]:
+        path.unlink(missing_ok=True)
+    return max(0, len(profiles) - max_files)
+
+
+def _profile_name(request) -> str:
+    slug = re.sub(r"[^\w-]+", "-", request.path).strip("-") or "index"
+    stamp = timezone.now().strftime("%Y%m%dT%H%M%S%f")
+    return f"{stamp}-{request.method}-{slug[:80]}.prof"
@@ -0,0 +1,51 @@
+"""
+pytest plugin checking the query budgets of the views (see `core.query_budget`).
+
+The `query_budget` fixture wraps the requests of a test:
+
+    with query_budget("audits:project_list"):
+        client.get(reverse("audits:project_list"))
+
+The queries made under each budget are summarized at the end of the session,
+to tighten the budgets which are far above their usage.
+"""
+
+from contextlib import contextmanager
+
+import pytest
+
+# Most queries and duplicates made under each budget
+_usage: dict[str, tuple[int, int]] = {}
+
+
+@pytest.fixture
+def query_budget(db):
+    from core.query_budget import check_budget, record_queries
+
+    @contextmanager
+    def check(url_name: str, using: str = "default"):
+        with record_queries(using) as recorder:
+            yield recorder
+        queries, duplicates = _usage.get(url_name, (0, 0))
+        _usage[url_name] = (
+            max(queries, len(recorder.queries)),
+            max(duplicates, recorder.duplicates().total()),
+        )
+        check_budget(url_name, recorder)
+
+    return check
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _usage:
+        return
+    from core.query_budget import registry
+
+    terminalreporter.section("query budgets")
+    for url_name, (queries, duplicates) in sorted(_usage.items()):
+        budget = registry.get(url_name)
+        if budget is not None:
+            terminalreporter.write_line(
+                f"{url_name}: {queries}/{budget.queries} queries, "
+                f"{duplicates}/{budget.duplicates} duplicates"
+            )
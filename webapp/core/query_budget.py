@@ -0,0 +1,168 @@
+"""
+Query budgets of the views.
+
+Each app declares, in its `query_budgets` module, the maximum number of SQL
+queries a request to each of its URL names may make, and how many of them may
+be duplicates: the same SQL run again with other parameters, the signature of
+an N+1. The `core.pytest_query_budget` plugin checks them.
+
+    register({"audits:project_list": QueryBudget(queries=12)})
+
+A request over its budget raises `QueryBudgetExceeded`, whose report lists the
+duplicated queries with the code and template lines which ran them.
+"""
+
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from importlib import import_module
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.module_loading import autodiscover_modules
+
+# Transaction statements, not counted as duplicates
+TRANSACTION_PREFIXES = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+# Frames of the report of each query
+REPORT_FRAMES = 6
+# Duplicated queries in the report, and stacks of each of them
+REPORT_QUERIES = 5
+REPORT_STACKS = 3
+# Frames of the recording itself, left out of the reports
+_RECORDING_FILES = {__file__, str(Path(__file__).with_name("pytest_query_budget.py"))}
+
+
+@dataclass(frozen=True)
+class QueryBudget:
+    queries: int
+    duplicates: int = 0
+
+
+registry: dict[str, QueryBudget] = {}
+
+
+def register(budgets: dict[str, QueryBudget]) -> None:
+    """Declare the budgets of URL names ("namespace:name")."""
+    registry.update(budgets)
+
+
+def load_budgets() -> dict[str, QueryBudget]:
+    """
+    Import the `query_budgets` modules of the installed apps, and of core for
+    the views of core/urls.py.
+    """
+    import_module("core.query_budgets")
+    autodiscover_modules("query_budgets")
+    return registry
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@dataclass
+class RecordedQuery:
+    sql: str
+    # Innermost first: "path:line in function" of the project code, and
+    # "template:line" of the templates being rendered
+    frames: list[str] = field(default_factory=list)
+
+
+def _is_project_file(filename: str) -> bool:
+    return (
+        filename.startswith(str(settings.BASE_DIR))
+        and "site-packages" not in filename
+        and filename not in _RECORDING_FILES
+    )
+
+
+def _stack() -> list[str]:
+    from django.template.base import Node
+
+    frames = []
+    frame = sys._getframe(2)
+    while frame is not None and len(frames) < REPORT_FRAMES:
+        filename = frame.f_code.co_filename
+        # type() rather than isinstance(), which would evaluate lazy objects
+        node = frame.f_locals.get("self")
+        if _is_project_file(filename):
+            path = Path(filename).relative_to(settings.BASE_DIR)
+            frames.append(f"{path}:{frame.f_lineno} in {frame.f_code.co_name}")
+        elif issubclass(type(node), Node) and node.token is not None:
+            name = node.origin.template_name or node.origin.name
+            line = f"{name}:{node.token.lineno}"
+            if not frames or frames[-1] != line:
+                frames.append(line)
+        frame = frame.f_back
+    return frames
+
+
+class QueryRecorder:
+    """Execute wrapper recording the queries of a connection."""
+
+    def __init__(self):
+        self.queries: list[RecordedQuery] = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(RecordedQuery(sql, _stack()))
+        return execute(sql, params, many, context)
+
+    def duplicates(self) -> Counter:
+        """Number of times each SQL statement was run again."""
+        counts = Counter(
+            query.sql
+            for query in self.queries
+            if not query.sql.startswith(TRANSACTION_PREFIXES)
+        )
+        return Counter({sql: count - 1 for sql, count in counts.items() if count > 1})
+
+    def report(self, url_name: str, budget: QueryBudget) -> str:
+        duplicates = self.duplicates()
+        lines = [
+            f"{url_name} made {len(self.queries)} queries (budget "
+            f"{budget.queries}), {duplicates.total()} duplicates (budget "
+            f"{budget.duplicates})"
+        ]
+        for sql, count in duplicates.most_common(REPORT_QUERIES):
+            lines.append(f"\n{count + 1} times: {sql}")
+            # Each place running the query, with how many times it did
+            stacks = Counter(
+                tuple(query.frames) for query in self.queries if query.sql == sql
+            )
+            for frames, times in stacks.most_common(REPORT_STACKS):
+                lines.append(f"  {times} times from:")
+                lines.extend(f"    {frame}" for frame in frames)
+        if not duplicates:
+            for query in self.queries:
+                lines.append(f"\n{query.sql}")
+                lines.extend(f"    {frame}" for frame in query.frames[:1])
+        return "\n".join(lines)
+
+
+@contextmanager
+def record_queries(using: str = DEFAULT_DB_ALIAS):
+    recorder = QueryRecorder()
+    with connections[using].execute_wrapper(recorder):
+        yield recorder
+
+
+def check_budget(url_name: str, recorder: QueryRecorder) -> None:
+    """Raise `QueryBudgetExceeded` if `recorder` exceeds the budget of `url_name`."""
+    budget = load_budgets().get(url_name)
+    if budget is None:
+        raise QueryBudgetExceeded(f"{url_name} has no query budget")
+    if (
+        len(recorder.queries) > budget.queries
+        or recorder.duplicates().total() > budget.duplicates
+    ):
+        raise QueryBudgetExceeded(recorder.report(url_name, budget))
+
+
+@contextmanager
+def assert_query_budget(url_name: str, using: str = DEFAULT_DB_ALIAS):
+    """Check the queries run in the block against the budget of `url_name`."""
+    with record_queries(using) as recorder:
+        yield recorder
+    check_budget(url_name, recorder)
@@ -0,0 +1,11 @@
+"""Query budgets of the views of core/urls.py (see `core.query_budget`)."""
+
+from core.query_budget import QueryBudget, register
+
+register(
+    {
+        "index": QueryBudget(queries=8),
+        "dashboard": QueryBudget(queries=10),
+        "metrics": QueryBudget(queries=8),
+    }
+)
@@ -63,6 +63,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -115,6 +116,19 @@ DATABASE_URL = env.str("DATABASE_URL")
 
 DATABASES = {"default": dj_database_url.config(default=DATABASE_URL)}
 
+# Cache of the application, local to each process by default. A backend shared
+# by the processes (e.g. Redis, or the database cache, whose table is created by
+# `python manage.py createcachetable`) shares the rendered markdown and the
+# prompt template overrides between the workers.
+CACHES = {
+    "default": {
+        "BACKEND": env.str(
+            "CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": env.str("CACHE_LOCATION", default=""),
+    }
+}
+
 # Email configuration
 # In development, display emails in the console
 if DEBUG:
@@ -238,4 +252,117 @@ IMPORT_EXPORT_FORMATS = [CSV, XLSX, XLS]
 # Anthropic AI settings
 # ----------------------
 ANTHROPIC_API_KEY = env.str("ANTHROPIC_API_KEY", default="")
+# "stand-in[:latency=...,tokens_per_second=...,jitter=...]" selects an offline
+# model answering canned texts, for development and load tests
 ANTHROPIC_MODEL = env.str("ANTHROPIC_MODEL", default="anthropic:claude-sonnet-4-0")
+# Alternative API endpoint, e.g. a proxy or a local stand-in server
+ANTHROPIC_BASE_URL = env.str("ANTHROPIC_BASE_URL", default="")
+
+# HTTP client shared by every agent of a process
+AI_HTTP_MAX_CONNECTIONS = env.int("AI_HTTP_MAX_CONNECTIONS", default=20)
+# Seconds an idle connection is kept open
+AI_HTTP_KEEPALIVE_EXPIRY = env.float("AI_HTTP_KEEPALIVE_EXPIRY", default=30.0)
+# Use HTTP/2 when the `h2` package is installed
+AI_HTTP2 = env.bool("AI_HTTP2", default=True)
+
+# Token buckets in front of the prompt agent calls: `burst` calls at once, then
+# `rate` calls per minute, per organization and per user of a role group. Each
+# agent call of a batch assessment also takes a token of its organization. A
+# missing budget means no limit.
+AI_RATE_LIMIT_ORGANIZATION = {
+    "rate": env.float("AI_RATE_LIMIT_ORGANIZATION_RATE", default=60.0),
+    "burst": env.int("AI_RATE_LIMIT_ORGANIZATION_BURST", default=20),
+}
+AI_RATE_LIMIT_USER = {
+    "administrator": {"rate": 20.0, "burst": 10},
+    "writer": {"rate": 20.0, "burst": 10},
+    "reader": {"rate": 5.0, "burst": 2},
+}
+# Seconds a call may wait for a token before being rejected
+AI_RATE_LIMIT_MAX_WAIT = env.float("AI_RATE_LIMIT_MAX_WAIT", default=5.0)
+
+# Prompt agent calls: timeout of an attempt and retries of transient errors, in
+# seconds
+AI_PROMPT_TIMEOUT = env.float("AI_PROMPT_TIMEOUT", default=60.0)
+AI_PROMPT_MAX_RETRIES = env.int("AI_PROMPT_MAX_RETRIES", default=2)
+AI_PROMPT_BACKOFF_BASE = env.float("AI_PROMPT_BACKOFF_BASE", default=1.0)
+AI_PROMPT_BACKOFF_MAX = env.float("AI_PROMPT_BACKOFF_MAX", default=8.0)
+# Circuit breaker shared by the workers: consecutive transient failures opening
+# it, and seconds before a probe call is let through
+AI_CIRCUIT_FAILURE_THRESHOLD = env.int("AI_CIRCUIT_FAILURE_THRESHOLD", default=5)
+AI_CIRCUIT_RESET_TIMEOUT = env.float("AI_CIRCUIT_RESET_TIMEOUT", default=30.0)
+# Lifetime of the provider-side cache of the prompt prefix ("5m" or "1h"), empty
+# to disable prompt caching
+AI_PROMPT_CACHE_TTL = env.str("AI_PROMPT_CACHE_TTL", default="5m")
+# Seconds a process reuses the version of the prompt template overrides of a
+# library before reading it again from the cache
+PROMPT_TEMPLATES_VERSION_TTL = env.float("PROMPT_TEMPLATES_VERSION_TTL", default=5.0)
+
+# Batch AI pre-assessment of a whole audit
+AI_ASSESSMENT_CONCURRENCY = env.int("AI_ASSESSMENT_CONCURRENCY", default=8)
+# Timeout of a single agent call, in seconds
+AI_ASSESSMENT_TIMEOUT = env.float("AI_ASSESSMENT_TIMEOUT", default=120.0)
+AI_ASSESSMENT_MAX_RETRIES = env.int("AI_ASSESSMENT_MAX_RETRIES", default=3)
+# Exponential backoff (with jitter) between retries, in seconds
+AI_ASSESSMENT_BACKOFF_BASE = env.float("AI_ASSESSMENT_BACKOFF_BASE", default=2.0)
+AI_ASSESSMENT_BACKOFF_MAX = env.float("AI_ASSESSMENT_BACKOFF_MAX", default=30.0)
+
+# Comments displayed by page of the infinite scroll of a criterion
+COMMENTS_PAGE_SIZE = env.int("COMMENTS_PAGE_SIZE", default=20)
+
+# Live updates of the audit pages: seconds between the polls of the events, an
+# events stream lasts before the browser reconnects, and events are kept
+AUDIT_EVENTS_POLL_INTERVAL = env.float("AUDIT_EVENTS_POLL_INTERVAL", default=1.0)
+AUDIT_EVENTS_STREAM_TIMEOUT = env.float("AUDIT_EVENTS_STREAM_TIMEOUT", default=30.0)
+AUDIT_EVENTS_RETENTION = env.int("AUDIT_EVENTS_RETENTION", default=3600)
+# Milliseconds the browser waits before reconnecting to the events stream
+AUDIT_EVENTS_RETRY = env.int("AUDIT_EVENTS_RETRY", default=1000)
+# Each stream holds a worker thread: streams served at once by a process, below
+# its threads, and milliseconds the other pages wait before reconnecting
+AUDIT_EVENTS_MAX_STREAMS = env.int("AUDIT_EVENTS_MAX_STREAMS", default=4)
+AUDIT_EVENTS_BUSY_RETRY = env.int("AUDIT_EVENTS_BUSY_RETRY", default=15000)
+# Seconds of events read again by the streams, for the ones committed late
+AUDIT_EVENTS_OVERLAP = env.float("AUDIT_EVENTS_OVERLAP", default=5.0)
+
+# PostgreSQL text search configuration (language) of the search documents,
+# used when their index is created by the migration
+SEARCH_CONFIG = env.str("SEARCH_CONFIG", default="english")
+# Results by page of the search
+SEARCH_PAGE_SIZE = env.int("SEARCH_PAGE_SIZE", default=20)
+# Matches ranked by a search, the most recent ones: bounds the cost of a query
+# matching many documents
+SEARCH_MAX_CANDIDATES = env.int("SEARCH_MAX_CANDIDATES", default=1000)
+# Projects by page of the project list
+PROJECTS_PAGE_SIZE = env.int("PROJECTS_PAGE_SIZE", default=24)
+
+# Days the deleted projects, audits and resources are kept, before being purged
+SOFT_DELETE_RETENTION_DAYS = env.int("SOFT_DELETE_RETENTION_DAYS", default=30)
+
+# Timings of the requests: Server-Timing header sent to everyone rather than to
+# the staff only, share of the requests profiled (besides the ?profile requests
+# of the staff), directory of the profiles and number of profiles kept in it
+SERVER_TIMING_PUBLIC = env.bool("SERVER_TIMING_PUBLIC", default=False)
+PROFILING_SAMPLE_RATE = env.float("PROFILING_SAMPLE_RATE", default=0.0)
+PROFILING_ROOT = env.path("PROFILING_ROOT", default=BASE_DIR / "var" / "profiles")
+PROFILING_MAX_FILES = env.int("PROFILING_MAX_FILES", default=200)
+
+# Metrics of the processes (/metrics/): bearer token of the scrapers (none by
+# default: staff only), directory where each worker process writes its values
+# when there are several (empty: single process), and seconds between writes
+METRICS_TOKEN = env.str("METRICS_TOKEN", default="")
+METRICS_MULTIPROCESS_DIR = env.str("METRICS_MULTIPROCESS_DIR", default="")
+METRICS_FLUSH_INTERVAL = env.float("METRICS_FLUSH_INTERVAL", default=5.0)
+
+# Resource snapshots (uploaded archives or local checkouts) and their search
+# indexes, used to ground the AI answers in the resource contents
+RESOURCE_SNAPSHOTS_ROOT = env.path(
+    "RESOURCE_SNAPSHOTS_ROOT", default=BASE_DIR / "var" / "snapshots"
+)
+# Server directories under which local checkouts can be indexed (none by default)
+RESOURCE_SNAPSHOT_LOCAL_ROOTS = env.list("RESOURCE_SNAPSHOT_LOCAL_ROOTS", default=[])
+# Maximum uncompressed size of an uploaded archive, in bytes
+RESOURCE_SNAPSHOT_MAX_SIZE = env.int(
+    "RESOURCE_SNAPSHOT_MAX_SIZE", default=512 * 1024 * 1024
+)
+# Resource excerpts injected in the system prompts, 0 to disable them
+AI_RETRIEVAL_TOP_K = env.int("AI_RETRIEVAL_TOP_K", default=5)
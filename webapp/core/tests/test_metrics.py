@@ -0,0 +1,155 @@
+import json
+import os
+
+import pytest
+from core.metrics import (
+    DB_QUERIES,
+    HTTP_REQUESTS,
+    Registry,
+    record_cache,
+    record_request,
+    registry,
+)
+from core.profiling import RequestTimings
+
+
+@pytest.fixture
+def metrics():
+    metrics = Registry()
+    requests = metrics.counter("test_requests_total", "Requests.", ["view"])
+    latency = metrics.histogram(
+        "test_latency_seconds", "Latency.", ["view"], buckets=(0.1, 1.0)
+    )
+    return metrics, requests, latency
+
+
+def _value(exposition: str, sample: str) -> str:
+    for line in exposition.splitlines():
+        if line.startswith(sample + " "):
+            return line.split(" ")[-1]
+    raise AssertionError(f"{sample} is not exposed")
+
+
+class TestRegistry:
+    def test_exposition(self, metrics):
+        metrics, requests, latency = metrics
+        requests.inc(view="home")
+        requests.inc(2, view="home")
+        requests.inc(view='say "hi"')
+        latency.observe(0.05, view="home")
+        latency.observe(0.1, view="home")
+        latency.observe(5, view="home")
+
+        exposition = metrics.exposition()
+
+        assert exposition.splitlines()[:2] == [
+            "# HELP test_requests_total Requests.",
+            "# TYPE test_requests_total counter",
+        ]
+        assert _value(exposition, 'test_requests_total{view="home"}') == "3"
+        assert _value(exposition, 'test_requests_total{view="say \\"hi\\""}') == "1"
+        assert "# TYPE test_latency_seconds histogram" in exposition
+        bucket = 'test_latency_seconds_bucket{view="home",le="%s"}'
+        assert _value(exposition, bucket % "0.1") == "2"
+        assert _value(exposition, bucket % "1") == "2"
+        assert _value(exposition, bucket % "+Inf") == "3"
+        assert _value(exposition, 'test_latency_seconds_sum{view="home"}') == "5.15"
+        assert _value(exposition, 'test_latency_seconds_count{view="home"}') == "3"
+
+    def test_labels_are_checked(self, metrics):
+        _, requests, _ = metrics
+
+        with pytest.raises(ValueError, match="has the labels"):
+            requests.inc(status="2xx")
+
+    def test_duplicate_metric(self, metrics):
+        metrics, _, _ = metrics
+
+        with pytest.raises(ValueError, match="already registered"):
+            metrics.counter("test_requests_total", "Requests.")
+
+    def test_collector(self, metrics):
+        metrics, requests, _ = metrics
+        metrics.collector(lambda: requests.set(42, view="cached"))
+
+        exposition = metrics.exposition()
+
+        assert _value(exposition, 'test_requests_total{view="cached"}') == "42"
+
+
+class TestMultiprocess:
+    def test_flush_and_collect(self, metrics, settings, tmp_path):
+        settings.METRICS_MULTIPROCESS_DIR = str(tmp_path)
+        metrics, requests, latency = metrics
+        requests.inc(view="home")
+        latency.observe(0.5, view="home")
+        # Values written by another process, exited or not
+        (tmp_path / "1.json").write_text(
+            json.dumps(
+                {
+                    "test_requests_total": {'["home"]': 2.0, '["other"]': 1.0},
+                    "test_latency_seconds": {'["home"]': [1, 0, 0, 0.05]},
+                    "test_removed_total": {"[]": 1.0},
+                }
+            )
+        )
+        (tmp_path / "2.json").write_text("{")
+
+        metrics.flush()
+
+        assert json.loads((tmp_path / f"{os.getpid()}.json").read_text()) == {
+            "test_requests_total": {'["home"]': 1.0},
+            "test_latency_seconds": {'["home"]': [0, 1, 0, 0.5]},
+        }
+        exposition = metrics.exposition()
+        assert _value(exposition, 'test_requests_total{view="home"}') == "3"
+        assert _value(exposition, 'test_requests_total{view="other"}') == "1"
+        assert _value(exposition, 'test_latency_seconds_count{view="home"}') == "2"
+        assert _value(exposition, 'test_latency_seconds_sum{view="home"}') == "0.55"
+        assert "test_removed_total" not in exposition
+
+    def test_flush_interval(self, metrics, settings, tmp_path):
+        settings.METRICS_MULTIPROCESS_DIR = str(tmp_path)
+        settings.METRICS_FLUSH_INTERVAL = 60
+        metrics, requests, _ = metrics
+        path = tmp_path / f"{os.getpid()}.json"
+        metrics.flush()
+        requests.inc(view="home")
+
+        metrics.flush()
+        assert json.loads(path.read_text())["test_requests_total"] == {}
+
+        metrics.flush(force=True)
+        assert json.loads(path.read_text())["test_requests_total"] == {'["home"]': 1.0}
+
+    def test_single_process(self, metrics, tmp_path):
+        metrics, requests, _ = metrics
+        requests.inc(view="home")
+
+        metrics.flush(force=True)
+
+        assert not list(tmp_path.iterdir())
+
+
+class TestRecord:
+    def test_record_request(self, rf):
+        request = rf.get("/")
+        before = registry.snapshot()["cosqua_http_requests_total"]
+        timings = RequestTimings(durations={"total": 0.2, "db": 0.05}, queries=3)
+
+        record_request(request, 404, timings)
+
+        after = HTTP_REQUESTS.snapshot()
+        key = '["unresolved", "4xx"]'
+        assert after[key] == before.get(key, 0) + 1
+        assert DB_QUERIES.snapshot()['["unresolved"]'] >= 3
+
+    def test_record_cache(self):
+        record_cache("test", True)
+        record_cache("test", False)
+        record_cache("test", True)
+
+        exposition = registry.exposition()
+
+        hits = 'cosqua_cache_requests_total{cache="test",result="hit"}'
+        assert float(_value(exposition, hits)) >= 2
@@ -45,6 +45,22 @@ class TestActiveNavMiddleware:
 
         assert request.active_nav["project"] is True
 
+    def test_sets_ai_usage_active_for_ai_usage_path(self, rf):
+        middleware = ActiveNavMiddleware(lambda request: None)
+        request = rf.get("/audits/ai/usage/")
+
+        middleware(request)
+
+        assert request.active_nav["ai_usage"] is True
+
+    def test_sets_search_active_for_search_path(self, rf):
+        middleware = ActiveNavMiddleware(lambda request: None)
+        request = rf.get("/audits/search/")
+
+        middleware(request)
+
+        assert request.active_nav["search"] is True
+
     def test_no_active_nav_for_other_paths(self, rf):
         """Test that no active nav is set for other paths."""
         middleware = ActiveNavMiddleware(lambda request: None)
@@ -180,3 +196,75 @@ class TestOrganizationMiddleware:
 
         assert request.session[ORGANIZATIONS_SESSION_KEY] == []
         assert CURRENT_ORGANIZATION_SESSION_KEY not in request.session
+
+
+@pytest.mark.django_db
+class TestServerTimingMiddleware:
+    def test_header_for_staff(self, client):
+        """Test that the staff get the timings of their requests."""
+        client.force_login(UserFactory(is_staff=True))
+
+        response = client.get("/")
+
+        metrics = [
+            metric.split(";")[0] for metric in response["Server-Timing"].split(", ")
+        ]
+        assert metrics == ["db", "view", "total"]
+        assert "queries" in response["Server-Timing"]
+
+    def test_no_header_for_other_users(self, client):
+        """Test that the timings are not sent to the other users by default."""
+        client.force_login(UserFactory())
+
+        response = client.get("/")
+
+        assert "Server-Timing" not in response
+
+    def test_public_header_with_template(self, client, settings):
+        """Test the timing of the template rendered after the view."""
+        settings.SERVER_TIMING_PUBLIC = True
+
+        response = client.get("/")
+
+        assert response.status_code == 200
+        assert "template;dur=" in response["Server-Timing"]
+        assert "total;dur=" in response["Server-Timing"]
+
+    def test_log_line(self, client, caplog):
+        """Test that the timings of each request are logged."""
+        with caplog.at_level("INFO", logger="core.middleware"):
+            client.get("/")
+
+        [record] = caplog.records
+        assert record.getMessage().startswith("GET / 200 ")
+        assert record.timings["queries"] == 0
+        assert record.timings["total_ms"] > 0
+
+    def test_profile_for_staff(self, client, settings, tmp_path):
+        """Test that a staff member can profile a request."""
+        settings.PROFILING_ROOT = tmp_path
+        client.force_login(UserFactory(is_staff=True))
+
+        response = client.get("/?profile")
+
+        [dump] = tmp_path.iterdir()
+        assert dump.name.endswith("-GET-index.prof")
+        assert f'profile;desc="{dump.name}"' in response["Server-Timing"]
+
+    def test_no_profile_for_other_users(self, client, settings, tmp_path):
+        """Test that the other users cannot profile their requests."""
+        settings.PROFILING_ROOT = tmp_path
+        client.force_login(UserFactory())
+
+        client.get("/?profile")
+
+        assert not list(tmp_path.iterdir())
+
+    def test_sampled_profile(self, client, settings, tmp_path):
+        """Test that a sample of the requests are profiled."""
+        settings.PROFILING_ROOT = tmp_path
+        settings.PROFILING_SAMPLE_RATE = 1.0
+
+        client.get("/")
+
+        assert len(list(tmp_path.iterdir())) == 1
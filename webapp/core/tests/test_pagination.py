@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+from core.pagination import decode_cursor, encode_cursor, paginate_keyset
+from django.http import Http404
+from django.utils import timezone
+from organization.models.organization import Project
+from organization.tests.factories import OrganizationFactory, ProjectFactory
+
+
+@pytest.fixture
+def projects():
+    """Five projects, two of them created at the same time."""
+    organization = OrganizationFactory()
+    now = timezone.now()
+    projects = [ProjectFactory(organization=organization) for _ in range(5)]
+    for index, project in enumerate(projects):
+        project.created_at = now - timedelta(minutes=min(index, 3))
+    Project.objects.bulk_update(projects, ["created_at"])
+    return Project.objects.filter(organization=organization)
+
+
+class TestCursor:
+    def test_cursor_round_trip(self):
+        created_at = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.UTC)
+
+        cursor = encode_cursor(created_at, 42)
+
+        assert decode_cursor(cursor) == (created_at.isoformat(), 42)
+        assert cursor.replace("-", "").replace("_", "").isalnum()
+
+    @pytest.mark.parametrize("cursor", ["%%%", "bm90IGpzb24", "WzEsIngiXQ"])
+    def test_decode_invalid_cursor(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+@pytest.mark.django_db
+class TestPaginateKeyset:
+    def test_pages_follow_each_other(self, projects):
+        expected = list(projects.order_by("-created_at", "-id"))
+
+        first = paginate_keyset(projects, "created_at", None, 2)
+        second = paginate_keyset(projects, "created_at", first.next_cursor, 2)
+        last = paginate_keyset(projects, "created_at", second.next_cursor, 2)
+
+        assert first.rows + second.rows + last.rows == expected
+        assert first.has_next and second.has_next
+        assert not last.has_next
+
+    def test_ties_are_not_skipped(self, projects):
+        # The two last projects share their creation date
+        first = paginate_keyset(projects, "created_at", None, 4)
+        last = paginate_keyset(projects, "created_at", first.next_cursor, 4)
+
+        assert first.rows[-1].created_at == last.rows[0].created_at
+        assert last.rows[0].id < first.rows[-1].id
+
+    def test_exact_last_page_has_no_next(self, projects):
+        page = paginate_keyset(projects, "created_at", None, 5)
+
+        assert len(page.rows) == 5
+        assert page.next_cursor is None
+
+    def test_invalid_cursor(self, projects):
+        with pytest.raises(Http404):
+            paginate_keyset(projects, "created_at", encode_cursor("nope", 1), 2)
+
+    def test_page_costs_one_query(self, projects, django_assert_num_queries):
+        first = paginate_keyset(projects, "created_at", None, 2)
+
+        with django_assert_num_queries(1):
+            paginate_keyset(projects, "created_at", first.next_cursor, 2)
@@ -0,0 +1,119 @@
+import time
+from pathlib import Path
+
+from core.profiling import (
+    RequestTimings,
+    current_timings,
+    measure,
+    prune_profiles,
+    start_profile,
+    stop_profile,
+    timings_scope,
+)
+
+
+class TestRequestTimings:
+    def test_header(self):
+        timings = RequestTimings(durations={"total": 0.5, "db": 0.01234}, queries=3)
+
+        assert timings.header() == (
+            'db;dur=12.3;desc="3 queries", total;dur=500.0;desc="Total"'
+        )
+
+    def test_header_with_profile(self):
+        timings = RequestTimings(profile=Path("/tmp/profiles/request.prof"))
+
+        assert timings.header() == 'profile;desc="request.prof"'
+
+    def test_start_and_stop(self):
+        timings = RequestTimings()
+
+        timings.start("view")
+        timings.stop("view")
+        timings.stop("view")
+        timings.stop("template")
+
+        assert set(timings.durations) == {"view"}
+
+    def test_execute_wrapper(self):
+        timings = RequestTimings()
+
+        result = timings(lambda *args: "rows", "SELECT 1", None, False, {})
+
+        assert result == "rows"
+        assert timings.queries == 1
+        assert timings.durations["db"] >= 0
+
+    def test_log_data(self):
+        timings = RequestTimings(durations={"view": 0.0042}, queries=2)
+
+        assert timings.log_data() == {"view_ms": 4.2, "queries": 2}
+
+
+class TestMeasure:
+    def test_measure(self):
+        with timings_scope(RequestTimings()) as timings:
+            assert current_timings() is timings
+            with measure("ai"):
+                time.sleep(0.01)
+            with measure("ai"):
+                pass
+
+        assert timings.durations["ai"] >= 0.01
+        assert current_timings() is None
+
+    def test_outside_of_a_request(self):
+        with measure("ai"):
+            pass
+
+        assert current_timings() is None
+
+
+class TestProfile:
+    def test_profile(self, rf, settings, tmp_path):
+        settings.PROFILING_ROOT = tmp_path / "profiles"
+        request = rf.post("/audits/project/my-project/")
+
+        profiler = start_profile()
+        sum(range(100))
+        path = stop_profile(profiler, request)
+
+        assert path.parent == tmp_path / "profiles"
+        assert path.name.endswith("-POST-audits-project-my-project.prof")
+        assert path.stat().st_size > 0
+
+    def test_one_profile_at_a_time(self, rf, settings, tmp_path):
+        settings.PROFILING_ROOT = tmp_path
+        profiler = start_profile()
+
+        assert start_profile() is None
+
+        stop_profile(profiler, rf.get("/"))
+        profiler = start_profile()
+        assert profiler is not None
+        stop_profile(profiler, rf.get("/"))
+
+    def test_oldest_profiles_are_deleted(self, rf, settings, tmp_path):
+        settings.PROFILING_ROOT = tmp_path
+        settings.PROFILING_MAX_FILES = 2
+        old = tmp_path / "20200101T000000000000-GET-index.prof"
+        old.write_bytes(b"")
+        (tmp_path / "notes.txt").write_text("kept")
+
+        paths = []
+        for _ in range(2):
+            profiler = start_profile()
+            paths.append(stop_profile(profiler, rf.get("/")))
+
+        assert sorted(tmp_path.iterdir()) == sorted([*paths, tmp_path / "notes.txt"])
+
+
+class TestPruneProfiles:
+    def test_prune(self, tmp_path):
+        for day in range(1, 5):
+            (tmp_path / f"2026010{day}T000000000000-GET-index.prof").write_bytes(b"")
+
+        assert prune_profiles(tmp_path, 3) == 1
+        assert not (tmp_path / "20260101T000000000000-GET-index.prof").exists()
+        assert prune_profiles(tmp_path, 3) == 0
+        assert len(list(tmp_path.iterdir())) == 3
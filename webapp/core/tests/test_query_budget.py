@@ -0,0 +1,99 @@
+import pytest
+from core.query_budget import (
+    QueryBudget,
+    QueryBudgetExceeded,
+    assert_query_budget,
+    check_budget,
+    load_budgets,
+    record_queries,
+    registry,
+)
+from django.template import Context, Template
+from organization.models.organization import Project
+from organization.tests.factories import ProjectFactory
+
+
+@pytest.fixture
+def budget():
+    registry["test:view"] = QueryBudget(queries=2)
+    yield registry["test:view"]
+    del registry["test:view"]
+
+
+@pytest.mark.django_db
+class TestQueryRecorder:
+    def test_records_queries(self):
+        with record_queries() as recorder:
+            list(Project.objects.all())
+
+        assert len(recorder.queries) == 1
+        assert "organization_project" in recorder.queries[0].sql
+        assert (
+            recorder.queries[0].frames[0].startswith("core/tests/test_query_budget.py:")
+        )
+
+    def test_duplicates(self):
+        first, second = ProjectFactory(), ProjectFactory()
+
+        with record_queries() as recorder:
+            Project.objects.get(id=first.id)
+            Project.objects.get(id=second.id)
+            list(Project.objects.all())
+
+        assert recorder.duplicates().total() == 1
+
+    def test_template_frames(self):
+        ProjectFactory()
+        template = Template(
+            "{% for project in projects %}\n{{ project.organization.name }}"
+            "{% endfor %}"
+        )
+
+        with record_queries() as recorder:
+            template.render(Context({"projects": Project.objects.all()}))
+
+        assert "<unknown source>:2" in recorder.queries[1].frames
+
+
+@pytest.mark.django_db
+class TestCheckBudget:
+    def test_within_budget(self, budget):
+        with assert_query_budget("test:view"):
+            list(Project.objects.all())
+
+    def test_too_many_queries(self, budget):
+        with pytest.raises(QueryBudgetExceeded) as error:
+            with assert_query_budget("test:view"):
+                for _ in range(3):
+                    Project.objects.exists()
+
+        assert "test:view made 3 queries (budget 2), 2 duplicates" in str(error.value)
+
+    def test_duplicates_report(self, budget):
+        projects = ProjectFactory.create_batch(2)
+
+        with record_queries() as recorder:
+            for project in projects:
+                Project.objects.get(id=project.id)
+        with pytest.raises(QueryBudgetExceeded) as error:
+            check_budget("test:view", recorder)
+
+        report = str(error.value)
+        assert "1 duplicates (budget 0)" in report
+        assert "2 times: SELECT" in report
+        assert "2 times from:" in report
+        assert "core/tests/test_query_budget.py:" in report
+
+    def test_no_budget(self):
+        with pytest.raises(QueryBudgetExceeded, match="has no query budget"):
+            with assert_query_budget("test:unknown"):
+                pass
+
+
+class TestLoadBudgets:
+    def test_load_budgets(self):
+        budgets = load_budgets()
+
+        assert budgets["index"] == QueryBudget(queries=8)
+        assert "audits:project_list" in budgets
+        assert "organization:create" in budgets
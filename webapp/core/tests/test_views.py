@@ -121,3 +121,48 @@ class TestDashboardView:
         response = client.get(reverse("dashboard"))
 
         assert response.status_code == 403
+
+
+@pytest.mark.django_db
+class TestMetricsView:
+    def test_staff(self, client):
+        client.force_login(UserFactory(is_staff=True))
+        client.get(reverse("index"))
+
+        response = client.get(reverse("metrics"))
+
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+        content = response.content.decode()
+        assert "# TYPE cosqua_http_requests_total counter" in content
+        assert 'cosqua_http_requests_total{view="index",status="3xx"}' in content
+
+    def test_token(self, client, settings):
+        settings.METRICS_TOKEN = "secret"
+
+        response = client.get(
+            reverse("metrics"), headers={"Authorization": "Bearer secret"}
+        )
+
+        assert response.status_code == 200
+
+    def test_wrong_token(self, client, settings):
+        settings.METRICS_TOKEN = "secret"
+
+        response = client.get(
+            reverse("metrics"), headers={"Authorization": "Bearer other"}
+        )
+
+        assert response.status_code == 403
+
+    def test_no_token_configured(self, client):
+        response = client.get(reverse("metrics"), headers={"Authorization": "Bearer "})
+
+        assert response.status_code == 403
+
+    def test_other_users(self, client):
+        client.force_login(UserFactory())
+
+        response = client.get(reverse("metrics"))
+
+        assert response.status_code == 403
@@ -2,7 +2,7 @@
 URL configuration for core project.
 """
 
-from core.views import DashboardView, IndexView
+from core.views import DashboardView, IndexView, MetricsView
 from django.contrib import admin
 from django.urls import include, path
 
@@ -10,6 +10,7 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path("", IndexView.as_view(), name="index"),
     path("dashboard/", DashboardView.as_view(), name="dashboard"),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
     path("audits/", include(("audits.urls", "audits"), namespace="audits")),
     path(
         "organizations/",
@@ -2,10 +2,16 @@
 Views for core application.
 """
 
+import hmac
+
+from core.metrics import CONTENT_TYPE, registry
 from core.middleware import CURRENT_ORGANIZATION_SESSION_KEY, ORGANIZATIONS_SESSION_KEY
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import redirect
+from django.views import View
 from django.views.generic import TemplateView
 from organization.permissions import check_organization_permission
 
@@ -54,3 +60,22 @@ class DashboardView(LoginRequiredMixin, TemplateView):
 
         # Let LoginRequiredMixin handle authentication check and redirect if needed
         return super().dispatch(request, *args, **kwargs)
+
+
+class MetricsView(View):
+    """
+    Metrics of the processes in the Prometheus text format, for the staff and
+    the scrapers sending the `METRICS_TOKEN` bearer token.
+    """
+
+    def has_token(self, request) -> bool:
+        token = settings.METRICS_TOKEN
+        authorization = request.headers.get("Authorization", "")
+        return bool(token) and hmac.compare_digest(
+            authorization.encode(), f"Bearer {token}".encode()
+        )
+
+    def get(self, request, *args, **kwargs):
+        if not (request.user.is_staff or self.has_token(request)):
+            raise PermissionDenied("Metrics are restricted")
+        return HttpResponse(registry.exposition(), content_type=CONTENT_TYPE)
@@ -1,6 +1,7 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.exceptions import ValidationError
 from organization.models.organization import (
     Organization,
     OrganizationMember,
@@ -35,18 +36,51 @@ class OrganizationAdmin(admin.ModelAdmin):
     readonly_fields = ("slug", "created_at", "updated_at")
 
 
+class SoftDeleteAdminMixin:
+    """Show the soft deleted rows too, until they are purged, to restore them."""
+
+    actions = ["restore"]
+
+    def get_queryset(self, request):
+        queryset = self.model.all_objects.get_queryset()
+        ordering = self.get_ordering(request)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
+    @admin.action(description="Restore the selected deleted rows")
+    def restore(self, request, queryset):
+        restored = 0
+        for instance in queryset.filter(deleted_at__isnull=False):
+            try:
+                instance.restore()
+            except ValidationError as err:
+                # A live row has taken its name, or another unique value
+                self.message_user(
+                    request,
+                    f"{instance} cannot be restored: {' '.join(err.messages)}",
+                    level=messages.ERROR,
+                )
+            else:
+                restored += 1
+        if restored:
+            self.message_user(request, f"{restored} deleted row(s) restored.")
+
+
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
-    list_display = ("name", "slug", "organization")
+class ProjectAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
+    list_display = ("name", "slug", "organization", "deleted_at")
+    list_filter = (("deleted_at", admin.EmptyFieldListFilter),)
     search_fields = ("name", "slug", "organization__name")
-    readonly_fields = ("slug", "created_at", "updated_at")
+    readonly_fields = ("slug", "created_at", "updated_at", "deleted_at")
 
 
 @admin.register(Resource)
-class ResourceAdmin(admin.ModelAdmin):
-    list_display = ("name", "type", "project", "project__organization")
+class ResourceAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
+    list_display = ("name", "type", "project", "project__organization", "deleted_at")
+    list_filter = (("deleted_at", admin.EmptyFieldListFilter),)
     search_fields = ("name", "type", "project__name", "project__organization__name")
-    readonly_fields = ("created_at", "updated_at")
+    readonly_fields = ("created_at", "updated_at", "deleted_at")
 
 
 # Unregister the default User admin if it exists and register a custom one
@@ -0,0 +1,37 @@
+# Generated by Django 6.0.2 on 2026-10-19 11:02
+
+from django.db import migrations
+
+# Trigram indexes of the fuzzy project search, PostgreSQL only: SQLite falls
+# back to a case insensitive containment scan
+POSTGRESQL_INDEXES = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX organization_project_name_trgm_idx
+    ON organization_project USING GIN (name gin_trgm_ops);
+CREATE INDEX organization_project_description_trgm_idx
+    ON organization_project USING GIN (description gin_trgm_ops);
+"""
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(POSTGRESQL_INDEXES)
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "DROP INDEX IF EXISTS organization_project_name_trgm_idx;"
+            "DROP INDEX IF EXISTS organization_project_description_trgm_idx;"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("organization", "0004_resourcesnapshot"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
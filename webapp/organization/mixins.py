@@ -3,6 +3,7 @@ Mixins for views that need organization-scoped permission checks.
 """
 
 from abc import abstractmethod
+from functools import cache
 
 from core.middleware import CURRENT_ORGANIZATION_SESSION_KEY
 from django.core.exceptions import PermissionDenied
@@ -77,6 +78,8 @@ class OrganizationPermissionMixin:
             raise PermissionDenied("No organization selected")
 
         if hasattr(self, "get_object"):
+            # Fetched once per request, by these checks and by the view
+            self.get_object = cache(self.get_object)
             try:
                 object = self.get_object()
                 if object is not None:
@@ -1,7 +1,10 @@
-from core.models.mixin import TimestampedModel
+from pathlib import Path
+
+from core.models.mixin import NOT_DELETED, SoftDeleteModel, TimestampedModel
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from django_extensions.db.fields import AutoSlugField
 
@@ -66,7 +69,7 @@ class OrganizationMember(TimestampedModel, models.Model):
         )
 
 
-class Project(TimestampedModel, models.Model):
+class Project(SoftDeleteModel, TimestampedModel, models.Model):
     id = models.AutoField(primary_key=True)
     organization = models.ForeignKey(
         Organization, on_delete=models.CASCADE, related_name="projects"
@@ -80,13 +83,47 @@ class Project(TimestampedModel, models.Model):
     )
 
     class Meta:
-        unique_together = [("organization", "name"), ("organization", "slug")]
+        # The names and slugs of the soft deleted projects can be reused
+        constraints = [
+            models.UniqueConstraint(
+                fields=["organization", "name"],
+                condition=NOT_DELETED,
+                name="unique_project_name",
+            ),
+            models.UniqueConstraint(
+                fields=["organization", "slug"],
+                condition=NOT_DELETED,
+                name="unique_project_slug",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["deleted_at"],
+                condition=~NOT_DELETED,
+                name="project_deleted_at_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    @transaction.atomic
+    def soft_delete(self) -> None:
+        """Soft delete the project, with its audits and resources."""
+        super().soft_delete()
+        self.audits.update(deleted_at=self.deleted_at)
+        self.resources.update(deleted_at=self.deleted_at)
+
+    @transaction.atomic
+    def restore(self) -> None:
+        """Restore the project, with the audits and resources deleted with it."""
+        deleted_at = self.deleted_at
+        super().restore()
+        self.audits(manager="all_objects").filter(deleted_at=deleted_at).restore()
+        self.resources(manager="all_objects").filter(deleted_at=deleted_at).restore()
+
 
-class Resource(TimestampedModel, models.Model):
+class Resource(SoftDeleteModel, TimestampedModel, models.Model):
     class ResourceType(models.TextChoices):
         FRONTEND_CODE = "frontend_code", "Frontend Code"
         BACKEND_CODE = "backend_code", "Backend Code"
@@ -103,5 +140,66 @@ class Resource(TimestampedModel, models.Model):
     url = models.URLField(blank=True, default="", null=False)
     description = models.TextField(blank=True, default="", null=False)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["project"],
+                condition=NOT_DELETED,
+                name="resource_live_project_idx",
+            ),
+            models.Index(
+                fields=["deleted_at"],
+                condition=~NOT_DELETED,
+                name="resource_deleted_at_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.name
+
+
+class ResourceSnapshot(TimestampedModel, models.Model):
+    """
+    Contents of a resource at a point in time, indexed to ground the AI answers.
+
+    An uploaded archive is extracted under `RESOURCE_SNAPSHOTS_ROOT`; a local
+    checkout is read in place. Only the latest indexed snapshot of a resource is
+    kept in the search index of its project.
+    """
+
+    class Kind(models.TextChoices):
+        ARCHIVE = "archive", _("Archive")
+        LOCAL = "local", _("Local checkout")
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("Pending")
+        INDEXING = "indexing", _("Indexing")
+        INDEXED = "indexed", _("Indexed")
+        FAILED = "failed", _("Failed")
+
+    resource = models.ForeignKey(
+        Resource, on_delete=models.CASCADE, related_name="snapshots"
+    )
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    # Name of the uploaded archive, or path of the local checkout
+    source = models.CharField(max_length=1024)
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.PENDING
+    )
+    files = models.PositiveIntegerField(default=0)
+    chunks = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    indexed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.resource} - {self.source}"
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in (self.Status.PENDING, self.Status.INDEXING)
+
+    def get_directory(self) -> Path:
+        """Directory of the snapshot files."""
+        if self.kind == self.Kind.LOCAL:
+            return Path(self.source)
+        return Path(settings.RESOURCE_SNAPSHOTS_ROOT) / "archives" / str(self.id)
@@ -0,0 +1,10 @@
+"""Query budgets of the organization views (see `core.query_budget`)."""
+
+from core.query_budget import QueryBudget, register
+
+register(
+    {
+        "organization:create": QueryBudget(queries=8),
+        "organization:switch": QueryBudget(queries=9),
+    }
+)
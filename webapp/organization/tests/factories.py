@@ -8,6 +8,7 @@ from organization.models.organization import (
     OrganizationMember,
     Project,
     Resource,
+    ResourceSnapshot,
 )
 
 User = get_user_model()
@@ -71,3 +72,12 @@ class ResourceFactory(factory.django.DjangoModelFactory):
     type = fuzzy.FuzzyChoice([choice[0] for choice in Resource.ResourceType.choices])
     url = Faker("url")
     description = Faker("text", max_nb_chars=200)
+
+
+class ResourceSnapshotFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = ResourceSnapshot
+
+    resource = factory.SubFactory(ResourceFactory)
+    kind = ResourceSnapshot.Kind.ARCHIVE
+    source = "repository.zip"
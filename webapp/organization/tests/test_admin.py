@@ -1,5 +1,7 @@
 import pytest
+from django.contrib import messages
 from django.contrib.admin.sites import site
+from django.contrib.messages.storage.cookie import CookieStorage
 from django.contrib.auth import get_user_model
 from organization.admin.organization import (
     OrganizationAdmin,
@@ -10,10 +12,18 @@ from organization.admin.organization import (
     UserOrganizationMemberInline,
 )
 from organization.models import Organization, OrganizationMember, Project, Resource
+from organization.tests.factories import ProjectFactory
 
 User = get_user_model()
 
 
+@pytest.fixture
+def admin_request(rf):
+    request = rf.get("/")
+    request._messages = CookieStorage(request)
+    return request
+
+
 @pytest.mark.django_db
 class TestOrganizationAdmin:
     def test_organization_admin_is_registered(self):
@@ -74,6 +84,34 @@ class TestProjectAdmin:
         assert "created_at" in admin_instance.readonly_fields
         assert "updated_at" in admin_instance.readonly_fields
 
+    def test_project_admin_shows_and_restores_deleted_projects(self, admin_request):
+        """Test that ProjectAdmin lists the soft deleted projects to restore them."""
+        project = ProjectFactory()
+        project.soft_delete()
+        admin_instance = site._registry[Project]
+        request = admin_request
+        queryset = admin_instance.get_queryset(request)
+
+        assert list(queryset) == [project]
+
+        admin_instance.restore(request, queryset)
+
+        assert Project.objects.filter(id=project.id).exists()
+
+    def test_project_admin_reports_restore_conflicts(self, admin_request):
+        """Test that a project whose name was taken since is not restored."""
+        deleted = ProjectFactory(name="Unique Project")
+        deleted.soft_delete()
+        ProjectFactory(name="Unique Project", organization=deleted.organization)
+        admin_instance = site._registry[Project]
+
+        admin_instance.restore(admin_request, Project.all_objects.filter(id=deleted.id))
+
+        reported = list(admin_request._messages)
+        assert [message.level for message in reported] == [messages.ERROR]
+        assert "Unique Project cannot be restored" in reported[0].message
+        assert Project.all_objects.get(id=deleted.id).is_deleted
+
 
 @pytest.mark.django_db
 class TestResourceAdmin:
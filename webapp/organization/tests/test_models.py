@@ -1,5 +1,6 @@
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.db import IntegrityError
 from django.utils import timezone
 from organization.models.organization import (
@@ -7,12 +8,14 @@ from organization.models.organization import (
     OrganizationMember,
     Project,
     Resource,
+    ResourceSnapshot,
 )
 from organization.tests.factories import (
     OrganizationFactory,
     OrganizationMemberFactory,
     ProjectFactory,
     ResourceFactory,
+    ResourceSnapshotFactory,
     UserFactory,
 )
 
@@ -128,6 +131,52 @@ class TestProject:
 
         assert project.updated_at > initial_updated_at
 
+    def test_soft_delete(self, organization):
+        project = ProjectFactory(organization=organization)
+        resource = ResourceFactory(project=project)
+
+        project.soft_delete()
+
+        assert project.is_deleted
+        assert not Project.objects.filter(id=project.id).exists()
+        assert not organization.projects.exists()
+        assert Project.all_objects.get(id=project.id).deleted_at == project.deleted_at
+        assert Resource.all_objects.get(id=resource.id).deleted_at == project.deleted_at
+
+    def test_restore(self, organization):
+        project = ProjectFactory(organization=organization)
+        resource = ResourceFactory(project=project)
+        deleted_before = ResourceFactory(project=project)
+        deleted_before.soft_delete()
+        project.soft_delete()
+
+        project.restore()
+
+        assert not project.is_deleted
+        assert list(organization.projects.all()) == [project]
+        assert list(project.resources.all()) == [resource]
+
+    def test_restore_conflict(self, organization):
+        deleted = ProjectFactory(name="Unique Project", organization=organization)
+        resource = ResourceFactory(project=deleted)
+        deleted.soft_delete()
+        ProjectFactory(name="Unique Project", organization=organization)
+
+        with pytest.raises(ValidationError):
+            deleted.restore()
+
+        assert deleted.is_deleted
+        assert Project.all_objects.get(id=deleted.id).is_deleted
+        assert Resource.all_objects.get(id=resource.id).is_deleted
+
+    def test_name_of_deleted_project_is_reused(self, organization):
+        deleted = ProjectFactory(name="Unique Project", organization=organization)
+        deleted.soft_delete()
+
+        project = ProjectFactory(name="Unique Project", organization=organization)
+
+        assert project.slug == deleted.slug
+
 
 @pytest.fixture
 def project(organization):
@@ -233,6 +282,36 @@ def user():
     return UserFactory()
 
 
+@pytest.mark.django_db
+class TestResourceSnapshot:
+    def test_archive_directory(self, settings, tmp_path):
+        settings.RESOURCE_SNAPSHOTS_ROOT = tmp_path
+        snapshot = ResourceSnapshotFactory()
+
+        assert snapshot.get_directory() == tmp_path / "archives" / str(snapshot.id)
+
+    def test_local_directory(self):
+        snapshot = ResourceSnapshotFactory(
+            kind=ResourceSnapshot.Kind.LOCAL, source="/srv/checkouts/repository"
+        )
+
+        assert str(snapshot.get_directory()) == "/srv/checkouts/repository"
+
+    def test_is_active(self):
+        snapshot = ResourceSnapshotFactory()
+        assert snapshot.is_active
+
+        snapshot.status = ResourceSnapshot.Status.INDEXED
+        assert not snapshot.is_active
+
+    def test_cascade_delete(self):
+        snapshot = ResourceSnapshotFactory()
+
+        snapshot.resource.delete()
+
+        assert not ResourceSnapshot.objects.filter(id=snapshot.id).exists()
+
+
 @pytest.mark.django_db
 class TestOrganizationMember:
     def test_unique_user_organization_constraint(self, user):
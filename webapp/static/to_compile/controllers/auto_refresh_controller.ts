@@ -0,0 +1,30 @@
+import { Controller } from "@hotwired/stimulus"
+import type { FrameElement } from "@hotwired/turbo"
+
+export default class extends Controller {
+  static values = { url: String, interval: { type: Number, default: 3000 } }
+
+  declare urlValue: string
+  declare intervalValue: number
+
+  private timeout?: ReturnType<typeof setTimeout>
+
+  connect() {
+    // Reload the parent Turbo Frame, as long as the server renders this controller
+    this.timeout = setTimeout(() => {
+      const frame = this.element.closest("turbo-frame") as FrameElement | null
+      if (!frame) return
+      if (frame.src) {
+        void frame.reload()
+      } else {
+        frame.src = this.urlValue
+      }
+    }, this.intervalValue)
+  }
+
+  disconnect() {
+    if (this.timeout) {
+      clearTimeout(this.timeout)
+    }
+  }
+}
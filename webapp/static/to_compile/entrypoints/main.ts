@@ -1,5 +1,6 @@
 import { Application } from "@hotwired/stimulus"
 import * as Turbo from "@hotwired/turbo"
+import AutoRefreshController from "../controllers/auto_refresh_controller"
 import AutoSubmitController from "../controllers/auto_submit_controller"
 import DropdownController from "../controllers/dropdown_controller"
 import PromptFormController from "../controllers/prompt_form_controller"
@@ -15,6 +16,7 @@ window.stimulus = Application.start()
 window.stimulus.register("dropdown", DropdownController)
 window.stimulus.register("auto-submit", AutoSubmitController)
 window.stimulus.register("prompt-form", PromptFormController)
+window.stimulus.register("auto-refresh", AutoRefreshController)
 
 // Turbo Drive is disabled, but Turbo Frames still works
 Turbo.session.drive = false